@@ -1,3 +1,4 @@
+import asyncio
 from abc import ABC, abstractmethod
 from typing import Dict, Any, Optional
 
@@ -6,6 +7,10 @@ class BaseAgentInteractionManager(ABC):
     def invoke_agent(self, user_input: Optional[str]) -> Dict[str, Any]:
         pass
 
+    async def ainvoke_agent(self, user_input: Optional[str]) -> Dict[str, Any]:
+        """Variante asíncrona. Por defecto delega `invoke_agent` a un hilo (preservando contextvars)."""
+        return await asyncio.to_thread(self.invoke_agent, user_input)
+
 class AgentInteractionRegistry:
     _factory = None
 
@@ -80,6 +80,9 @@ class AgentState:
     # Estructura: {file_path: {"hash": str, "timestamp": float, "content": str}}
     file_hash_cache: Dict[str, Dict[str, Any]] = field(default_factory=dict)
 
+    # Resultados memorizados de herramientas idempotentes del turno (ToolResultCache)
+    tool_result_cache: Optional[Any] = field(default=None, repr=False, compare=False)
+
     def __setattr__(self, name, value):
         if name == "messages":
             history_manager = self.__dict__.get("history_manager_ref")
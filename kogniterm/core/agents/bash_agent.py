@@ -102,6 +102,8 @@ from kogniterm.terminal.keyboard_handler import KeyboardHandler
 from ..async_io_manager import get_io_manager, AsyncTaskResult
 from ..utils.tool_utils import get_tool_action_description, tool_requires_content_for_confirmation
 from .tool_executor import ToolExecutor
+from .parallel_tool_dispatcher import ToolCallItem
+from ..tool_result_cache import ToolResultCache
 from kogniterm.core.exceptions import UserConfirmationRequired
 
 import logging
@@ -584,7 +586,7 @@ class BashAgentRunner:
     """
     Motor asíncrono nativo para BashAgent que reemplaza LangGraph.
     Coordinación optimizada sin sobrecarga de nodos ni copia de estado:
-    call_model -> task_tracker (inline) -> execute_tools (asyncio.gather) -> verify -> learning (background).
+    call_model -> task_tracker (inline) -> execute_tools (planificador por dependencias) -> verify -> learning (background).
     """
 
     def __init__(
@@ -618,7 +620,22 @@ class BashAgentRunner:
             logger.debug(f"Fallback run_until_complete en BashAgentRunner: {e}")
             return asyncio.run(self._run_async(state))
 
-    async def _run_async(self, state: AgentState) -> Dict[str, Any]:
+    async def ainvoke(self, state: AgentState, config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Punto de entrada asíncrono nativo: el turno corre en el event loop del llamador.
+        Los tramos bloqueantes (streaming del LLM, verificación, aprobaciones vía
+        handler) se delegan a hilos efímeros en lugar de retener un worker por turno.
+        """
+        return await self._run_async(state, native=True)
+
+    @staticmethod
+    async def _blocking(native: bool, fn, *args):
+        """En modo nativo ejecuta `fn` en un hilo para no bloquear el event loop."""
+        if native:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    async def _run_async(self, state: AgentState, native: bool = False) -> Dict[str, Any]:
         state.stop_requested = False
         recursion_limit = 100
         turn_count = 0
@@ -633,20 +650,26 @@ class BashAgentRunner:
             if state.messages and isinstance(state.messages[-1], HumanMessage):
                 workspace_directory = os.getcwd()
                 sm = getattr(self.llm_service, 'skill_manager', None)
-                processed_content = process_prompt_references(state.messages[-1].content, workspace_directory, sm)
+                processed_content = await self._blocking(
+                    native, process_prompt_references, state.messages[-1].content, workspace_directory, sm
+                )
                 state.messages[-1] = HumanMessage(content=processed_content)
 
             # 2. Inferencia LLM
             sys_msg = get_system_message(self.llm_service)
             system_prompt = sys_msg.content if hasattr(sys_msg, "content") else str(sys_msg)
 
-            model_output = BaseAgentNode.call_model(
+            model_kwargs = dict(
                 state=state,
                 llm_service=self.llm_service,
                 system_prompt=system_prompt,
                 terminal_ui=self.terminal_ui,
                 interrupt_queue=self.interrupt_queue
             )
+            if native:
+                model_output = await asyncio.to_thread(BaseAgentNode.call_model, **model_kwargs)
+            else:
+                model_output = BaseAgentNode.call_model(**model_kwargs)
 
             if model_output.get("critical_loop_detected") or state.stop_requested:
                 return model_output
@@ -668,7 +691,7 @@ class BashAgentRunner:
             # 3. Fast-Path In-line para task_tracker
             tt_calls = [tc for tc in last_message.tool_calls if tc["name"] == "task_tracker"]
             if tt_calls:
-                self._process_task_tracker_inline(state, tt_calls)
+                await self._blocking(native, self._process_task_tracker_inline, state, tt_calls)
                 processed_ids = {msg.tool_call_id for msg in state.messages if isinstance(msg, ToolMessage)}
                 remaining = [tc for tc in last_message.tool_calls if tc["id"] not in processed_ids]
                 if not remaining:
@@ -688,9 +711,9 @@ class BashAgentRunner:
                     args_hash = str(tc['args'])
                 state.tool_call_history.append({"name": tc['name'], "args_hash": args_hash})
 
-            # 5. Ejecución Asíncrona Concurrente (asyncio.gather)
+            # 5. Ejecución Asíncrona Concurrente (planificada por dependencias)
             if parallel_calls:
-                pause_result = await self._execute_parallel_calls_async(state, parallel_calls)
+                pause_result = await self._execute_parallel_calls_async(state, parallel_calls, native=native)
                 if pause_result:
                     return pause_result
 
@@ -699,7 +722,7 @@ class BashAgentRunner:
                 tc = interactive_calls[0]
                 state.command_to_confirm = tc['args'].get('command', '')
                 state.tool_call_id_to_confirm = tc['id']
-                self.llm_service._save_history(state.messages)
+                await self._blocking(native, self.llm_service._save_history, state.messages)
                 return {
                     "messages": state.messages,
                     "command_to_confirm": state.command_to_confirm,
@@ -707,7 +730,10 @@ class BashAgentRunner:
                 }
 
             # 7. Verificación in-line de sintaxis Python
-            verification_node(state, self.llm_service, self.terminal_ui)
+            if native:
+                await asyncio.to_thread(verification_node, state, self.llm_service, self.terminal_ui)
+            else:
+                verification_node(state, self.llm_service, self.terminal_ui)
 
             # Pausa para confirmación si hay banderas de interacción en estado
             if (state.command_to_confirm is not None or
@@ -759,17 +785,22 @@ class BashAgentRunner:
 
         state.add_messages(tool_messages)
 
-    async def _execute_parallel_calls_async(self, state: AgentState, parallel_calls: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    async def _execute_parallel_calls_async(self, state: AgentState, parallel_calls: List[Dict[str, Any]], native: bool = False) -> Optional[Dict[str, Any]]:
         self.llm_service._current_agent_state = state
 
+        result_cache = ToolResultCache.for_state(state)
+
         def _run_tool(tc):
             return ToolExecutor.execute_single_tool(
-                tc, self.llm_service, self.terminal_ui, getattr(state, 'delegation_context', None)
+                tc, self.llm_service, self.terminal_ui, getattr(state, 'delegation_context', None), result_cache
             )
 
-        logger.info(f"Agente (Motor Nativo): Ejecutando {len(parallel_calls)} herramientas concurrentemente con asyncio.gather.")
-        tasks = [asyncio.to_thread(_run_tool, tc) for tc in parallel_calls]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        logger.info(f"Agente (Motor Nativo): Ejecutando {len(parallel_calls)} herramientas con planificación por dependencias.")
+        items = [ToolCallItem(id=tc['id'], name=tc['name'], args=tc['args']) for tc in parallel_calls]
+        calls_by_item = {id(item): tc for item, tc in zip(items, parallel_calls)}
+        results = await ToolExecutor.dispatcher_for(self.llm_service).run_scheduled(
+            items, lambda item: asyncio.to_thread(_run_tool, calls_by_item[id(item)])
+        )
 
         tool_messages = []
         for tc, res in zip(parallel_calls, results):
@@ -808,20 +839,24 @@ class BashAgentRunner:
                             "args": exception.tool_args
                         }
                         state.tool_call_id_to_confirm = tool_id
-                        self.command_approval_handler.handle_command_approval(
+                        approval_kwargs = dict(
                             command_to_execute="",
                             raw_tool_output=handler_raw_output,
                             tool_name=tool_name,
                             original_tool_args=exception.tool_args
                         )
-                        self.llm_service._save_history(state.messages)
+                        if native and hasattr(self.command_approval_handler, "ahandle_command_approval"):
+                            await self.command_approval_handler.ahandle_command_approval(**approval_kwargs)
+                        else:
+                            self.command_approval_handler.handle_command_approval(**approval_kwargs)
+                        await self._blocking(native, self.llm_service._save_history, state.messages)
                         return {"messages": state.messages}
                     else:
                         tool_messages.append(ToolMessage(content=f"Error: Confirmación requerida para {tool_id}", tool_call_id=tool_id))
                 elif isinstance(exception, InterruptedError):
                     state.stop_requested = True
                     state.reset_temporary_state()
-                    self.llm_service._save_history(state.messages)
+                    await self._blocking(native, self.llm_service._save_history, state.messages)
                     return {"messages": state.messages, "stop_requested": True}
                 else:
                     tool_messages.append(ToolMessage(content=content, tool_call_id=tool_id))
@@ -857,7 +892,7 @@ class BashAgentRunner:
                             state.tool_args_pending_confirmation = tool_args
                             state.tool_call_id_to_confirm = tool_id
                             state.add_messages(tool_messages)
-                            self.llm_service._save_history(state.messages)
+                            await self._blocking(native, self.llm_service._save_history, state.messages)
                             return {
                                 "messages": state.messages,
                                 "tool_pending_confirmation": state.tool_pending_confirmation,
@@ -869,7 +904,7 @@ class BashAgentRunner:
                         pass
 
         state.add_messages(tool_messages)
-        self.llm_service._save_history(state.messages)
+        await self._blocking(native, self.llm_service._save_history, state.messages)
         return None
 
     async def _run_learning_async(self, state: AgentState):
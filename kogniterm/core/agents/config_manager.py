@@ -1,40 +1,89 @@
 import os
+import threading
 import yaml
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 
 class AgentConfigManager:
+    # Gestores compartidos por workspace (ver `shared`)
+    _shared: Dict[str, "AgentConfigManager"] = {}
+    _shared_lock = threading.Lock()
+
     def __init__(self, workspace_dir: Optional[str] = None):
         self.workspace_dir = workspace_dir or os.getcwd()
         self.configs: Dict[str, Dict[str, Any]] = {}
-        
-    def discover_configs(self):
-        self.configs.clear()
-        
+        self._signature: Optional[Tuple] = None
+        self._lock = threading.RLock()
+
+    @classmethod
+    def shared(cls, workspace_dir: Optional[str] = None) -> "AgentConfigManager":
+        """
+        Gestor de proceso para `workspace_dir`. Solo vuelve a parsear las
+        definiciones cuando cambia algún mtime de los directorios de búsqueda o
+        de sus archivos; lanzar N sub-agentes reutiliza el mismo resultado.
+        """
+        key = os.path.abspath(workspace_dir or os.getcwd())
+        with cls._shared_lock:
+            manager = cls._shared.get(key)
+            if manager is None:
+                manager = cls._shared[key] = cls(workspace_dir=key)
+        manager.refresh()
+        return manager
+
+    def _search_paths(self):
         # Paths to search (ordered by priority: project -> user -> default)
-        paths = [
+        return [
             Path(self.workspace_dir) / ".agents",
             Path.home() / ".kogniterm" / "agents",
             Path(__file__).parent / "config"
         ]
-        
-        for path in paths:
-            if not path.exists() or not path.is_dir():
-                continue
-            for file_path in path.glob("*"):
-                if file_path.name == "AGENTS.md":  # Skip system rules file
+
+    def _current_signature(self) -> Tuple:
+        """(mtime, tamaño) de cada directorio de búsqueda y de sus archivos, sin leerlos."""
+        signature = []
+        for path in self._search_paths():
+            try:
+                entries = []
+                for entry in os.scandir(path):
+                    if entry.is_file():
+                        st = entry.stat()
+                        entries.append((entry.name, st.st_mtime_ns, st.st_size))
+                entries.sort()
+                signature.append((str(path), os.stat(path).st_mtime_ns, tuple(entries)))
+            except OSError:
+                signature.append((str(path), None, ()))
+        return tuple(signature)
+
+    def refresh(self) -> bool:
+        """Vuelve a descubrir las configuraciones si algo cambió en disco. Retorna True si re-escaneó."""
+        with self._lock:
+            if self._signature is not None and self._signature == self._current_signature():
+                return False
+            self.discover_configs()
+            return True
+
+    def discover_configs(self):
+        with self._lock:
+            self._signature = self._current_signature()
+            self.configs.clear()
+
+            for path in self._search_paths():
+                if not path.exists() or not path.is_dir():
                     continue
-                if file_path.suffix in (".yaml", ".yml", ".md"):
-                    try:
-                        self._parse_file(file_path)
-                    except Exception as e:
-                        import logging
-                        logging.getLogger(__name__).warning(f"Error parsing agent config {file_path}: {e}")
+                for file_path in path.glob("*"):
+                    if file_path.name == "AGENTS.md":  # Skip system rules file
+                        continue
+                    if file_path.suffix in (".yaml", ".yml", ".md"):
+                        try:
+                            self._parse_file(file_path)
+                        except Exception as e:
+                            import logging
+                            logging.getLogger(__name__).warning(f"Error parsing agent config {file_path}: {e}")
 
     def _parse_file(self, file_path: Path):
         content = file_path.read_text(encoding="utf-8")
         config = {}
-        
+
         if file_path.suffix == ".md":
             if content.startswith("---"):
                 end_idx = content.find("---", 3)
@@ -46,7 +95,7 @@ class AgentConfigManager:
                         config["system_prompt"] = body
         else:
             config = yaml.safe_load(content) or {}
-            
+
         if "name" in config:
             name = config["name"]
             # Only set if not already set by a higher priority directory
@@ -54,6 +103,9 @@ class AgentConfigManager:
                 self.configs[name] = config
 
     def get_agent_config(self, agent_name: str) -> Optional[Dict[str, Any]]:
-        if not self.configs:
-            self.discover_configs()
-        return self.configs.get(agent_name)
+        with self._lock:
+            if self._signature is None:
+                self.discover_configs()
+            config = self.configs.get(agent_name)
+        # Copia superficial: el gestor compartido no debe verse afectado por quien la use
+        return dict(config) if config is not None else None
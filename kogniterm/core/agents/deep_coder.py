@@ -1,7 +1,6 @@
 from __future__ import annotations
 import asyncio
 import contextlib
-import functools
 import json
 import logging
 import os
@@ -29,6 +28,7 @@ from rich.syntax import Syntax
 
 from kogniterm.ui.terminal_ui import TerminalUI
 from kogniterm.core.agent_state import AgentState
+from kogniterm.core.agents.graph_cache import bound_node
 from kogniterm.ui.themes import ColorPalette, Icons
 
 console = Console()
@@ -410,10 +410,10 @@ def create_deep_coder(llm_service: LLMService, terminal_ui: Any = None, interrup
 
     workflow = StateGraph(AgentState)
 
-    workflow.add_node("inject_context", functools.partial(context_injection_node, llm_service=llm_service, terminal_ui=terminal_ui))
-    workflow.add_node("call_model", functools.partial(call_deep_coder_node, llm_service=llm_service, terminal_ui=terminal_ui, interrupt_queue=interrupt_queue))
-    workflow.add_node("execute_tool", functools.partial(execute_tool_node, llm_service=llm_service, terminal_ui=terminal_ui, interrupt_queue=interrupt_queue))
-    workflow.add_node("verify", functools.partial(verification_node, llm_service=llm_service, terminal_ui=terminal_ui))
+    workflow.add_node("inject_context", bound_node(context_injection_node, llm_service=llm_service, terminal_ui=terminal_ui))
+    workflow.add_node("call_model", bound_node(call_deep_coder_node, llm_service=llm_service, terminal_ui=terminal_ui, interrupt_queue=interrupt_queue))
+    workflow.add_node("execute_tool", bound_node(execute_tool_node, llm_service=llm_service, terminal_ui=terminal_ui, interrupt_queue=interrupt_queue))
+    workflow.add_node("verify", bound_node(verification_node, llm_service=llm_service, terminal_ui=terminal_ui))
 
     workflow.set_entry_point("inject_context")
     workflow.add_edge("inject_context", "call_model")
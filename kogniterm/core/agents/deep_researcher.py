@@ -4,7 +4,6 @@ from typing import List, Optional, Dict, Any, TYPE_CHECKING, Literal
 
 if TYPE_CHECKING:
     from ..llm_service import LLMService
-import functools
 import queue
 import json
 import logging
@@ -35,6 +34,7 @@ from rich.text import Text
 from kogniterm.core.agent_state import AgentState
 from kogniterm.core.exceptions import UserConfirmationRequired
 from kogniterm.core.agents.base_agent import BaseAgentNode
+from kogniterm.core.agents.graph_cache import bound_node
 from kogniterm.core.agents.tool_executor import ToolExecutor
 from kogniterm.ui.themes import ColorPalette, Icons
 from kogniterm.ui.terminal_ui import TerminalUI
@@ -730,13 +730,13 @@ def create_deep_researcher(
 
     workflow.add_node(
         "planning",
-        functools.partial(
+        bound_node(
             planning_node, llm_service=llm_service, terminal_ui=terminal_ui
         ),
     )
     workflow.add_node(
         "research",
-        functools.partial(
+        bound_node(
             research_node,
             llm_service=llm_service,
             terminal_ui=terminal_ui,
@@ -745,19 +745,19 @@ def create_deep_researcher(
     )
     workflow.add_node(
         "reflection",
-        functools.partial(
+        bound_node(
             reflection_node, llm_service=llm_service, terminal_ui=terminal_ui
         ),
     )
     workflow.add_node(
         "synthesis",
-        functools.partial(
+        bound_node(
             synthesis_node, llm_service=llm_service, terminal_ui=terminal_ui
         ),
     )
     workflow.add_node(
         "call_model",
-        functools.partial(
+        bound_node(
             call_deep_model_node,
             llm_service=llm_service,
             terminal_ui=terminal_ui,
@@ -766,7 +766,7 @@ def create_deep_researcher(
     )
     workflow.add_node(
         "execute_tool",
-        functools.partial(
+        bound_node(
             execute_tool_node,
             llm_service=llm_service,
             terminal_ui=terminal_ui,
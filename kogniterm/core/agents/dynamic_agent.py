@@ -1,4 +1,3 @@
-import functools
 import queue
 import logging
 from typing import Optional, Any
@@ -6,6 +5,7 @@ from langgraph.graph import StateGraph, END
 from kogniterm.core.agent_state import AgentState
 from kogniterm.core.llm_service import LLMService
 from kogniterm.core.agents.base_agent import BaseAgentNode
+from kogniterm.core.agents.graph_cache import bound_node
 from kogniterm.core.agents.tool_executor import ToolExecutor, should_continue
 
 logger = logging.getLogger(__name__)
@@ -51,7 +51,7 @@ def create_dynamic_agent(
 
     workflow.add_node(
         "call_model",
-        functools.partial(
+        bound_node(
             call_dynamic_model_node,
             llm_service=llm_service,
             system_prompt=system_prompt,
@@ -61,7 +61,7 @@ def create_dynamic_agent(
     )
     workflow.add_node(
         "execute_tool",
-        functools.partial(
+        bound_node(
             ToolExecutor.execute_tool_node,
             llm_service=llm_service,
             terminal_ui=terminal_ui,
@@ -0,0 +1,155 @@
+"""
+AgentGraphCache — Grafos LangGraph compilados reutilizables entre sub-agentes.
+
+Construir y compilar el grafo de un sub-agente (nodos, aristas, `compile()`)
+se repetía para cada agente lanzado en paralelo aunque todos fueran idénticos.
+La caché guarda el grafo compilado por (tipo de agente, prompt de sistema,
+rol, herramientas permitidas, herramientas registradas) y por `llm_service`.
+
+Lo único propio de cada ejecución es la UI (el panel del agente) y la cola de
+interrupciones. Por eso el grafo se compila contra `BOUND_UI` y
+`BOUND_INTERRUPT_QUEUE`, proxies que resuelven el valor real desde un
+`ContextVar` fijado con `bind_agent_runtime` alrededor de `ainvoke`/`invoke`.
+LangGraph ejecuta los nodos copiando el contexto, así que cada agente ve su
+propio panel aunque compartan el mismo grafo.
+
+Los proxies solo resuelven en ese contexto: un hilo nuevo (p. ej. el
+`KeyboardHandler` que escucha ESC) vería None. Por eso los nodos se crean con
+`bound_node` en lugar de `functools.partial`: resuelve los proxies al entrar
+al nodo y la función recibe los objetos reales.
+
+Uso:
+    graph = get_agent_graph_cache().get_or_build(key, llm_service, build_fn)
+    with bind_agent_runtime(agent_ui, interrupt_queue):
+        await graph.ainvoke(state)
+"""
+
+import contextvars
+import functools
+import logging
+import threading
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+_bound_ui: contextvars.ContextVar = contextvars.ContextVar("agent_graph_ui", default=None)
+_bound_interrupt_queue: contextvars.ContextVar = contextvars.ContextVar("agent_graph_interrupt_queue", default=None)
+
+
+class ContextBoundProxy:
+    """
+    Delegado hacia el objeto fijado en un `ContextVar`. Sin objeto fijado se
+    comporta como None en lo posible: es falso y no tiene atributos.
+    """
+
+    __slots__ = ("_var", "_label")
+
+    def __init__(self, var: contextvars.ContextVar, label: str):
+        object.__setattr__(self, "_var", var)
+        object.__setattr__(self, "_label", label)
+
+    def resolve(self) -> Any:
+        return self._var.get()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._var.get(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._var.get(), name, value)
+
+    def __bool__(self) -> bool:
+        return bool(self._var.get())
+
+    def __repr__(self) -> str:
+        return f"<ContextBoundProxy {self._label} -> {self._var.get()!r}>"
+
+
+BOUND_UI = ContextBoundProxy(_bound_ui, "terminal_ui")
+BOUND_INTERRUPT_QUEUE = ContextBoundProxy(_bound_interrupt_queue, "interrupt_queue")
+
+
+class bound_node(functools.partial):
+    """`functools.partial` para nodos que resuelve los `ContextBoundProxy` al entrar al nodo."""
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        keywords = {
+            k: v.resolve() if isinstance(v, ContextBoundProxy) else v
+            for k, v in self.keywords.items()
+        }
+        return self.func(*self.args, *args, **{**keywords, **kwargs})
+
+
+@contextmanager
+def bind_agent_runtime(terminal_ui: Any, interrupt_queue: Any) -> Iterator[None]:
+    """Fija la UI y la cola de interrupciones que verán los grafos cacheados en este contexto."""
+    ui_token = _bound_ui.set(terminal_ui)
+    queue_token = _bound_interrupt_queue.set(interrupt_queue)
+    try:
+        yield
+    finally:
+        _bound_interrupt_queue.reset(queue_token)
+        _bound_ui.reset(ui_token)
+
+
+class AgentGraphCache:
+    """Caché LRU de grafos compilados por clave y por instancia de `llm_service`."""
+
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.builds = 0
+
+    def get_or_build(self, key: Hashable, llm_service: Any, builder: Callable[[], Any]) -> Any:
+        """
+        Retorna el grafo cacheado para (`key`, `llm_service`) o lo construye con
+        `builder()`, que debe compilarlo contra `BOUND_UI`/`BOUND_INTERRUPT_QUEUE`.
+        """
+        full_key = (key, id(llm_service))
+        with self._lock:
+            entry = self._entries.get(full_key)
+            if entry is not None:
+                service_ref, graph = entry
+                if service_ref() is llm_service:
+                    self._entries.move_to_end(full_key)
+                    self.hits += 1
+                    return graph
+                # El id se reutilizó para otro servicio: la entrada está obsoleta
+                del self._entries[full_key]
+
+            graph = builder()
+            self.builds += 1
+            try:
+                service_ref = weakref.ref(llm_service)
+            except TypeError:
+                return graph
+            self._entries[full_key] = (service_ref, graph)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return graph
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "builds": self.builds}
+
+
+_cache: Optional[AgentGraphCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_agent_graph_cache() -> AgentGraphCache:
+    """Caché global del proceso."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AgentGraphCache()
+    return _cache
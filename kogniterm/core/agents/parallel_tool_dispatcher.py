@@ -1,11 +1,18 @@
 import asyncio
+import contextvars
 import inspect
-from typing import List, Dict, Any, Callable
+import os
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import List, Dict, Any, Callable, Optional, Set
 from dataclasses import dataclass
 
+from ..skills.tool_effects import ToolEffects
+
+# Fallback for tools without declared side effects (legacy or MCP tools).
+# Skill tools declare theirs in SKILL.md under `tool_effects`.
 READ_ONLY_TOOLS = {
-    "read_file", "view_file", "list_dir", "grep_search", "search_web", 
-    "read_url_content", "get_file_info", "read_resource"
+    "read_file", "view_file", "list_dir", "grep_search", "search_web",
+    "read_url_content", "get_file_info", "read_resource",
 }
 
 @dataclass
@@ -21,15 +28,129 @@ class ToolResult:
     output: Any
     error: bool = False
 
+def _normalize_path(path: str) -> str:
+    return os.path.normpath(os.path.abspath(os.path.expanduser(path)))
+
+def _paths_overlap(a: str, b: str) -> bool:
+    """Two paths conflict when they are equal or one contains the other."""
+    return a == b or a.startswith(b + os.sep) or b.startswith(a + os.sep)
+
 class ParallelToolDispatcher:
-    """Dispatches tool calls concurrently for read-only ops and sequentially for stateful ops."""
+    """
+    Dispatches tool calls with dependency-aware scheduling.
 
-    def __init__(self, read_only_tools: set = READ_ONLY_TOOLS):
+    Each call only waits for the earlier calls it conflicts with:
+    read-only calls never wait for each other, stateful calls on disjoint
+    paths run concurrently, calls touching the same path keep their order,
+    and stateful calls without a known path act as barriers.
+    """
+
+    def __init__(
+        self,
+        read_only_tools: set = READ_ONLY_TOOLS,
+        effects_lookup: Optional[Callable[[str], Optional[ToolEffects]]] = None,
+    ):
         self.read_only_tools = read_only_tools
+        self.effects_lookup = effects_lookup
+
+    def effects_for(self, item: ToolCallItem) -> Optional[ToolEffects]:
+        """Declared side effects for a call (resolved per variant), if any."""
+        if self.effects_lookup is None:
+            return None
+        effects = self.effects_lookup(item.name)
+        if not isinstance(effects, ToolEffects):
+            return None
+        return effects.resolve(item.args)
 
-    def is_read_only(self, tool_name: str) -> bool:
+    def is_read_only(self, tool_name: str, item: Optional[ToolCallItem] = None) -> bool:
+        effects = self.effects_for(item or ToolCallItem(id="", name=tool_name, args={}))
+        if effects is not None:
+            return effects.read_only and not effects.spawns_process
         return tool_name in self.read_only_tools
 
+    def resource_paths(self, item: ToolCallItem) -> Optional[Set[str]]:
+        """Paths touched by a call, or None when they cannot be determined."""
+        effects = self.effects_for(item)
+        if effects is not None and effects.spawns_process:
+            return None
+        paths = {_normalize_path(p) for p in (effects or ToolEffects()).paths_in(item.args)}
+        if paths or self.is_read_only(item.name, item):
+            return paths
+        return None
+
+    def conflicts(self, earlier: ToolCallItem, later: ToolCallItem) -> bool:
+        if self.is_read_only(earlier.name, earlier) and self.is_read_only(later.name, later):
+            return False
+        earlier_paths = self.resource_paths(earlier)
+        later_paths = self.resource_paths(later)
+        if earlier_paths is None or later_paths is None:
+            return True
+        return any(_paths_overlap(a, b) for a in earlier_paths for b in later_paths)
+
+    def build_dependencies(self, tool_calls: List[ToolCallItem]) -> List[Set[int]]:
+        """For each call, the indices of earlier calls it must wait for."""
+        deps: List[Set[int]] = []
+        for i, later in enumerate(tool_calls):
+            deps.append({j for j in range(i) if self.conflicts(tool_calls[j], later)})
+        return deps
+
+    async def run_scheduled(self, tool_calls: List[ToolCallItem], runner: Callable) -> List[Any]:
+        """
+        Runs `runner(item)` for every call honouring the dependency graph.
+        Results come back in call order; exceptions are returned, not raised.
+        """
+        deps = self.build_dependencies(tool_calls)
+        tasks: List[asyncio.Task] = []
+
+        async def _run(index: int, item: ToolCallItem):
+            if deps[index]:
+                await asyncio.gather(*(tasks[j] for j in deps[index]), return_exceptions=True)
+            res = runner(item)
+            if inspect.isawaitable(res):
+                res = await res
+            return res
+
+        for index, item in enumerate(tool_calls):
+            tasks.append(asyncio.ensure_future(_run(index, item)))
+        return list(await asyncio.gather(*tasks, return_exceptions=True))
+
+    def run_scheduled_sync(
+        self, tool_calls: List[ToolCallItem], runner: Callable, max_workers: int = 8
+    ) -> List[Any]:
+        """
+        Thread-based variant of `run_scheduled` for synchronous graph nodes.
+        Calls are submitted in order to a FIFO pool, so every dependency has
+        already started when a dependent call begins waiting: no deadlock.
+        Each call runs in a copy of the caller's context (per-session state).
+        """
+        if len(tool_calls) <= 1:
+            results = []
+            for item in tool_calls:
+                try:
+                    results.append(runner(item))
+                except Exception as e:
+                    results.append(e)
+            return results
+
+        deps = self.build_dependencies(tool_calls)
+        futures = []
+
+        def _run(index: int, item: ToolCallItem):
+            if deps[index]:
+                wait([futures[j] for j in deps[index]])
+            return runner(item)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tool_calls)))) as pool:
+            for index, item in enumerate(tool_calls):
+                futures.append(pool.submit(contextvars.copy_context().run, _run, index, item))
+            wait(futures)
+
+        results = []
+        for future in futures:
+            exc = future.exception()
+            results.append(exc if exc is not None else future.result())
+        return results
+
     async def _execute_single(self, item: ToolCallItem, executor: Callable) -> ToolResult:
         try:
             if inspect.iscoroutinefunction(executor):
@@ -42,33 +163,12 @@ class ParallelToolDispatcher:
             return ToolResult(call_id=item.id, name=item.name, output=str(e), error=True)
 
     async def execute_batch(self, tool_calls: List[ToolCallItem], executors: Dict[str, Callable]) -> List[ToolResult]:
-        results: Dict[str, ToolResult] = {}
-        
-        i = 0
-        n = len(tool_calls)
-        while i < n:
-            item = tool_calls[i]
+        async def _runner(item: ToolCallItem) -> ToolResult:
             executor = executors.get(item.name)
             if not executor:
-                results[item.id] = ToolResult(
+                return ToolResult(
                     call_id=item.id, name=item.name, output=f"Unknown tool: {item.name}", error=True
                 )
-                i += 1
-                continue
-
-            if self.is_read_only(item.name):
-                parallel_batch = []
-                while i < n and self.is_read_only(tool_calls[i].name) and tool_calls[i].name in executors:
-                    parallel_batch.append(tool_calls[i])
-                    i += 1
-                
-                tasks = [self._execute_single(call, executors[call.name]) for call in parallel_batch]
-                batch_results = await asyncio.gather(*tasks)
-                for res in batch_results:
-                    results[res.call_id] = res
-            else:
-                res = await self._execute_single(item, executor)
-                results[res.call_id] = res
-                i += 1
+            return await self._execute_single(item, executor)
 
-        return [results[item.id] for item in tool_calls if item.id in results]
+        return await self.run_scheduled(tool_calls, _runner)
@@ -18,6 +18,13 @@ from ..agent_state import AgentState
 from ..llm_service import LLMService
 from ..exceptions import UserConfirmationRequired
 from ..utils.tool_utils import get_tool_action_description
+from ..utils.output_pruner import StreamingOutputPruner, smart_prune_tool_output
+from ..skills.tool_effects import ToolEffects
+from ..tool_result_cache import CACHED_RESULT_NOTICE, ToolResultCache
+from ..shared_artifact_cache import SharedArtifactCache
+from ..early_tool_dispatch import EarlyToolDispatcher
+from ..tracing import traced
+from .parallel_tool_dispatcher import ParallelToolDispatcher, ToolCallItem
 
 logger = logging.getLogger(__name__)
 console = Console()
@@ -30,15 +37,46 @@ class ToolExecutor:
     # Semáforo de concurrencia: limita el número de herramientas que se ejecutan simultáneamente
     # para evitar sobrecarga del sistema (CPU, I/O, red, etc.)
     _concurrency_semaphore = threading.Semaphore(8)
+    max_parallel_tools = 8
 
     @staticmethod
+    def dispatcher_for(llm_service: Optional[LLMService]) -> ParallelToolDispatcher:
+        """Planificador por dependencias alimentado con los efectos declarados por las skills."""
+        sm = getattr(llm_service, "skill_manager", None)
+        lookup = getattr(sm, "get_tool_effects", None)
+        return ParallelToolDispatcher(effects_lookup=lookup if callable(lookup) else None)
+
+    @staticmethod
+    @traced("tool.execute", lambda tc, *a, **k: {"tool": tc.get("name", "")})
     def execute_single_tool(
         tc: Dict[str, Any],
         llm_service: LLMService,
         terminal_ui: Optional[Any] = None,
         delegation_context: Optional[Any] = None,
+        result_cache: Optional[ToolResultCache] = None,
+    ) -> tuple:
+        """
+        Ejecuta una herramienta individual y retorna (tool_id, content, exception).
+        Con `result_cache`, las herramientas declaradas idempotentes se sirven desde
+        memoria si ya se ejecutaron en este turno con los mismos argumentos. En un
+        sub-agente (`delegation_context`) se consulta además la caché compartida
+        con sus hermanos (`SharedArtifactCache`).
+        """
+        try:
+            return ToolExecutor._execute_single_tool(tc, llm_service, terminal_ui, delegation_context, result_cache)
+        finally:
+            # Servida desde caché, bloqueada o fallida antes de reclamarla: el
+            # resultado anticipado (si se despachó durante el stream) se descarta
+            EarlyToolDispatcher.discard_for(llm_service, tc)
+
+    @staticmethod
+    def _execute_single_tool(
+        tc: Dict[str, Any],
+        llm_service: LLMService,
+        terminal_ui: Optional[Any],
+        delegation_context: Optional[Any],
+        result_cache: Optional[ToolResultCache],
     ) -> tuple:
-        """Ejecuta una herramienta individual y retorna (tool_id, content, exception)."""
         tool_name = tc["name"]
         tool_args = tc["args"]
         tool_id = tc["id"]
@@ -93,6 +131,35 @@ class ToolExecutor:
             if skill:
                 skill_name = skill.name
 
+        effects = ToolExecutor._resolve_effects(llm_service, tool_name, tool_args)
+        cacheable = result_cache is not None and effects is not None and effects.idempotent
+        fingerprint = None
+        if cacheable:
+            cached = result_cache.get(tool_name, tool_args, effects)
+            if cached is not None:
+                logger.info(f"Resultado de '{tool_name}' servido desde la caché del turno.")
+                if terminal_ui and is_tui:
+                    terminal_ui.print_tool_notification(
+                        tool_name, f"{action_desc} (caché)", skill_name=skill_name
+                    )
+                return tool_id, CACHED_RESULT_NOTICE + cached, None
+            fingerprint = result_cache.fingerprint(tool_args, effects)
+
+        shared_cache = None
+        agent_id = getattr(delegation_context, "agent_id", None)
+        if delegation_context is not None and effects is not None and effects.idempotent:
+            shared_cache = SharedArtifactCache.for_service(llm_service)
+            shared = shared_cache.acquire(tool_name, tool_args, effects, agent_id)
+            if shared is not None:
+                logger.info(f"Resultado de '{tool_name}' servido desde la caché compartida de sub-agentes.")
+                if terminal_ui and is_tui:
+                    terminal_ui.print_tool_notification(
+                        tool_name, f"{action_desc} (compartido)", skill_name=skill_name
+                    )
+                return tool_id, shared, None
+            if fingerprint is None:
+                fingerprint = shared_cache.fingerprint(tool_args, effects)
+
         # Notificación inicial
         if terminal_ui:
             if is_tui:
@@ -113,6 +180,8 @@ class ToolExecutor:
         ToolExecutor._concurrency_semaphore.acquire()
         logger.debug(f"Semáforo adquirido para {tool_name}. Disponible: {ToolExecutor._concurrency_semaphore._value}")
         
+        stream = None
+        invoked = False
         try:
             full_tool_output = ""
             last_ui_update = 0
@@ -122,55 +191,86 @@ class ToolExecutor:
                 or any(kw in tool_name.lower() for kw in ["command", "bash", "terminal", "shell", "python_exec"])
             )
 
-            res = llm_service._invoke_tool_with_interrupt(
-                tool, tool_args, delegation_context
-            )
+            # La salida de comandos se poda en streaming con memoria acotada
+            # (ANSI, ventanas de cabecera/cola, errores y volcado a ~/.kogniterm/logs)
+            stream = StreamingOutputPruner(tool_name=tool_name) if is_terminal_tool else None
+
+            # Si se lanzó mientras el modelo aún generaba, se recoge ese resultado
+            invoked = True
+            res = EarlyToolDispatcher.claim_for(llm_service, tc, delegation_context)
+            if res is not None:
+                logger.info(f"Resultado de '{tool_name}' despachado durante el stream del modelo.")
+            else:
+                res = llm_service._invoke_tool_with_interrupt(
+                    tool, tool_args, delegation_context
+                )
             if isinstance(res, str):
                 full_tool_output = res
+                stream = None
             elif isinstance(res, (dict, list)):
                 full_tool_output = json.dumps(res, ensure_ascii=False)
+                stream = None
             elif hasattr(res, "__iter__") and not isinstance(res, (bytes, bytearray)):
                 for part in res:
                     if part:
-                        full_tool_output += str(part)
+                        if stream is not None:
+                            stream.feed(str(part))
+                        else:
+                            full_tool_output += str(part)
                         current_time = time.time()
                         if (
                             not is_tui
                             and terminal_ui
                             and (current_time - last_ui_update > ui_update_interval)
                         ):
+                            display_output = stream.display_text() if stream is not None else full_tool_output
                             if is_terminal_tool and hasattr(terminal_ui, "update_terminal_output"):
                                 terminal_ui.update_terminal_output(
-                                    tool_name, full_tool_output, tool_call_id=tool_id, command=command_hint
+                                    tool_name, display_output, tool_call_id=tool_id, command=command_hint
                                 )
                             elif is_terminal_tool and hasattr(terminal_ui, "update_tool_display"):
                                 terminal_ui.update_tool_display(
-                                    tool_name, full_tool_output, command=command_hint
+                                    tool_name, display_output, command=command_hint
                                 )
                             last_ui_update = current_time
+                if stream is not None:
+                    full_tool_output = stream.finish()
             else:
                 full_tool_output = str(res) if res is not None else ""
+                stream = None
 
             # Emitir actualización final para la UI (solo para herramientas de terminal/comando)
+            display_output = stream.display_text() if stream is not None else full_tool_output
             if is_terminal_tool and hasattr(terminal_ui, "update_terminal_output"):
                 terminal_ui.update_terminal_output(
-                    tool_name, full_tool_output, tool_call_id=tool_id, command=command_hint
+                    tool_name, display_output, tool_call_id=tool_id, command=command_hint
                 )
             elif is_terminal_tool and hasattr(terminal_ui, "update_tool_display"):
                 terminal_ui.update_tool_display(
-                    tool_name, full_tool_output, command=command_hint
+                    tool_name, display_output, command=command_hint
                 )
             # Post-procesamiento (Skills refresh, etc.)
             full_tool_output = ToolExecutor._handle_special_tools(tool_name, full_tool_output, llm_service)
 
             # Aplicar truncado inteligente para salidas extensas (preservando errores y guardando log completo)
-            from ..utils.output_pruner import smart_prune_tool_output
-            full_tool_output = smart_prune_tool_output(full_tool_output, tool_name=tool_name)
+            if stream is None:
+                full_tool_output = smart_prune_tool_output(full_tool_output, tool_name=tool_name)
 
             # Renderizado de resultado (CLI, solo para comandos)
             if not is_tui and is_terminal_tool:
                 ToolExecutor._render_cli_result(tool_name, full_tool_output)
 
+            if cacheable:
+                result_cache.put(tool_name, tool_args, effects, full_tool_output, fingerprint)
+            elif result_cache is not None and not (effects and effects.read_only):
+                # Herramienta con efectos (o sin metadatos): lo memorizado puede estar obsoleto
+                result_cache.clear()
+            if shared_cache is not None:
+                full_tool_output = shared_cache.publish(
+                    tool_name, tool_args, effects, full_tool_output, fingerprint, agent_id
+                )
+                shared_cache = None
+
             return tool_id, full_tool_output, None
 
         except UserConfirmationRequired as e:
@@ -181,6 +281,15 @@ class ToolExecutor:
             logger.error(f"Error en {tool_name}: {e}")
             return tool_id, f"Error: {e}", e
         finally:
+            if stream is not None:
+                # Si la herramienta falló a medias, el log volcado sigue abierto
+                stream.close()
+            if shared_cache is not None:
+                # Error o interrupción: los hermanos que esperaban ejecutan por su cuenta
+                shared_cache.release(tool_name, tool_args)
+            if invoked and (effects is None or not effects.read_only):
+                # Escritura o comando (aunque fallara a medias): lo compartido puede estar obsoleto
+                ToolExecutor._invalidate_shared_artifacts(llm_service, effects, tool_args)
             # Liberar el semáforo de concurrencia
             ToolExecutor._concurrency_semaphore.release()
             logger.debug(f"Semáforo liberado para {tool_name}. Disponible: {ToolExecutor._concurrency_semaphore._value}")
@@ -189,6 +298,26 @@ class ToolExecutor:
             if terminal_ui and hasattr(terminal_ui, "stop_live"):
                 terminal_ui.stop_live()
 
+    @staticmethod
+    def _invalidate_shared_artifacts(llm_service, effects: Optional[ToolEffects], tool_args: Any) -> None:
+        """Descarta de la caché compartida lo que una herramienta con efectos pudo cambiar."""
+        shared = SharedArtifactCache.for_service(llm_service)
+        if effects is not None and effects.writes_files:
+            for path in effects.paths_in(tool_args):
+                shared.invalidate_path(path)
+        # Un comando de shell o una escritura sin rutas declaradas pueden tocar cualquier archivo
+        shared.invalidate_unscoped()
+
+    @staticmethod
+    def _resolve_effects(llm_service, tool_name: str, tool_args: Any) -> Optional[ToolEffects]:
+        """Efectos declarados por la skill para esta llamada concreta (None si no hay)."""
+        sm = getattr(llm_service, "skill_manager", None)
+        get_effects = getattr(sm, "get_tool_effects", None)
+        effects = get_effects(tool_name) if callable(get_effects) else None
+        if not isinstance(effects, ToolEffects):
+            return None
+        return effects.resolve(tool_args)
+
     @staticmethod
     def _handle_special_tools(tool_name, output, llm_service):
         if tool_name in ["refresh_tools", "skill_factory"] and hasattr(
@@ -232,18 +361,26 @@ class ToolExecutor:
         interrupt_queue: Optional[queue.Queue] = None,
         delegation_context: Optional[Any] = None,
     ):
-        """Nodo de ejecución para grafos de agentes."""
+        """
+        Nodo de ejecución para grafos de agentes.
+        Las llamadas de un mismo turno se planifican por dependencias (ver
+        ParallelToolDispatcher) y sus resultados se procesan en el orden emitido.
+        """
         last_message = state.messages[-1]
         if not (isinstance(last_message, AIMessage) and last_message.tool_calls):
             return state
 
-        tool_messages = []
         is_tui = getattr(terminal_ui, "is_tui", False)
 
         # 1. Registrar y Verificar Interrupciones
         del_ctx = delegation_context or getattr(state, "delegation_context", None)
         is_autonomous = getattr(state, "autonomous_approvals", False) or del_ctx is not None
 
+        # Mensajes indexados por posición de la llamada para conservar el orden original
+        slots: List[Optional[ToolMessage]] = []
+        runnable: List[tuple] = []
+        interactive_tc = None
+
         for tc in last_message.tool_calls:
             # Detección de bucles (hash de args)
             state.tool_call_history.append(
@@ -259,7 +396,7 @@ class ToolExecutor:
                 logger.warning(
                     f"La herramienta '{tc['name']}' fue bloqueada para el subagente (rol: {role_name})"
                 )
-                tool_messages.append(
+                slots.append(
                     ToolMessage(
                         content=f"Error: La herramienta '{tc['name']}' está deshabilitada debido a restricciones del rol ({role_name}).",
                         tool_call_id=tc["id"],
@@ -267,37 +404,35 @@ class ToolExecutor:
                 )
                 continue
 
-            # Caso especial: execute_command (esperar confirmación solo si es el orquestador principal e interactivo)
+            # Caso especial: execute_command (esperar confirmación solo si es el orquestador principal e interactivo).
+            # Las llamadas posteriores no se ejecutan: el modelo las reemitirá tras la confirmación.
             if tc["name"] == "execute_command" and not is_autonomous:
-                state.command_to_confirm = tc["args"].get("command")
-                state.tool_call_id_to_confirm = tc["id"]
-                if terminal_ui:
-                    skill_name = ""
-                    if hasattr(llm_service, "skill_manager"):
-                        skill = llm_service.skill_manager.get_skill_for_tool(
-                            tc["name"]
-                        )
-                        if skill:
-                            skill_name = skill.name
-                    terminal_ui.print_tool_notification(
-                        "execute_command",
-                        f"Preparando: {state.command_to_confirm}",
-                        skill_name=skill_name,
-                    )
+                interactive_tc = tc
+                break
+
+            runnable.append((len(slots), tc))
+            slots.append(None)
+
+        # 2. Ejecutar con planificación por dependencias: lecturas y rutas disjuntas en
+        # paralelo, escrituras sobre el mismo archivo en orden.
+        items = [ToolCallItem(id=tc["id"], name=tc["name"], args=tc["args"]) for _, tc in runnable]
+        calls_by_item = {id(item): tc for item, (_, tc) in zip(items, runnable)}
+        result_cache = ToolResultCache.for_state(state)
+        results = ToolExecutor.dispatcher_for(llm_service).run_scheduled_sync(
+            items,
+            lambda item: ToolExecutor.execute_single_tool(
+                calls_by_item[id(item)], llm_service, terminal_ui, del_ctx, result_cache
+            ),
+            max_workers=ToolExecutor.max_parallel_tools,
+        )
 
-                if tool_messages:
-                    state.messages.extend(tool_messages)
-                return {
-                    "messages": state.messages,
-                    "command_to_confirm": state.command_to_confirm,
-                }
-
-            tid, content, exc = ToolExecutor.execute_single_tool(
-                tc,
-                llm_service,
-                terminal_ui,
-                del_ctx,
-            )
+        # 3. Procesar resultados en el orden emitido por el modelo (aprobaciones ordenadas)
+        for (slot, tc), res in zip(runnable, results):
+            if isinstance(res, Exception):
+                logger.error(f"Excepción al ejecutar herramienta {tc['name']}: {res}")
+                tid, content, exc = tc["id"], f"Error al ejecutar {tc['name']}: {res}", res
+            else:
+                tid, content, exc = res
 
             if isinstance(exc, UserConfirmationRequired):
                 if not is_autonomous:
@@ -310,14 +445,37 @@ class ToolExecutor:
                 else:
                     logger.info("Subagente autónomo: omitida la pausa de confirmación de usuario para '%s'.", exc.tool_name)
 
-            if tid and any(
-                tc["id"] == tid and tc["name"] == "complete_task"
-                for tc in last_message.tool_calls
-            ):
+            if tc["name"] == "complete_task":
                 state.completed = True
                 state.result = content
 
-            tool_messages.append(ToolMessage(content=content, tool_call_id=tid))
+            slots[slot] = ToolMessage(content=content, tool_call_id=tid)
+
+        tool_messages = [m for m in slots if m is not None]
+
+        if interactive_tc is not None:
+            state.command_to_confirm = interactive_tc["args"].get("command")
+            state.tool_call_id_to_confirm = interactive_tc["id"]
+            if terminal_ui:
+                skill_name = ""
+                if hasattr(llm_service, "skill_manager"):
+                    skill = llm_service.skill_manager.get_skill_for_tool(
+                        interactive_tc["name"]
+                    )
+                    if skill:
+                        skill_name = skill.name
+                terminal_ui.print_tool_notification(
+                    "execute_command",
+                    f"Preparando: {state.command_to_confirm}",
+                    skill_name=skill_name,
+                )
+
+            if tool_messages:
+                state.messages.extend(tool_messages)
+            return {
+                "messages": state.messages,
+                "command_to_confirm": state.command_to_confirm,
+            }
 
         state.messages.extend(tool_messages)
         if terminal_ui:
@@ -370,7 +528,9 @@ class ToolExecutor:
             # Función síncrona que se ejecutará en el executor
             def run_tool_sync():
                 full_tool_output = ""
-                tool_output_generator = llm_service._invoke_tool_with_interrupt(tool, tool_args)
+                tool_output_generator = EarlyToolDispatcher.claim_for(llm_service, tc)
+                if tool_output_generator is None:
+                    tool_output_generator = llm_service._invoke_tool_with_interrupt(tool, tool_args)
                 for chunk in tool_output_generator:
                     full_tool_output += str(chunk)
                 return full_tool_output
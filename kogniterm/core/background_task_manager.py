@@ -2,20 +2,23 @@
 BackgroundTaskManager — Gestor de tareas de terminal en segundo plano para KogniTerm.
 
 Permite ejecutar comandos asíncronos en subprocesos independientes/PTY, capturar
-su salida en búferes de log, consultar su estado (running, completed, failed, killed)
+su salida en búferes de log (la lectura de todos los PTY la hace un único hilo,
+ver `pty_multiplexer`), consultar su estado (running, completed, failed, killed)
 y cancelar su ejecución de forma segura.
 """
 
+import codecs
 import logging
 import os
 import pty
-import select
 import subprocess
 import threading
 import time
 from typing import Any, Dict, List, Optional
 
 from kogniterm.core.delegation.command_rules import CommandRulesResolver
+from kogniterm.core.output_ring_buffer import OutputRingBuffer
+from kogniterm.core.pty_multiplexer import drain_fd, get_pty_multiplexer
 
 logger = logging.getLogger(__name__)
 
@@ -44,38 +47,47 @@ class BackgroundTask:
         self.end_time: Optional[float] = None
         self.exit_code: Optional[int] = None
         self.pid: Optional[int] = None
-        self._output_chunks: List[str] = []
+        # Memoria constante: anillo acotado en bytes con volcado a disco
+        self._output = OutputRingBuffer(spill_prefix=f"kogniterm-{task_id}-")
+        self._read_cursor = 0
         self._lock = threading.Lock()
         self.process: Optional[subprocess.Popen] = None
         self._master_fd: Optional[int] = None
 
     def append_output(self, text: str) -> None:
-        with self._lock:
-            self._output_chunks.append(text)
+        self._output.append(text)
 
     def get_output(self, tail_lines: Optional[int] = None) -> str:
-        with self._lock:
-            full_text = "".join(self._output_chunks)
         if tail_lines and tail_lines > 0:
-            lines = full_text.splitlines(keepends=True)
-            return "".join(lines[-tail_lines:])
-        return full_text
+            return self._output.tail(tail_lines)
+        return self._output.read_all()
+
+    def read_output(self, cursor: Optional[int] = None, max_bytes: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Lectura incremental: devuelve solo la salida posterior a `cursor` (por
+        defecto, posterior a la última lectura incremental) y el cursor siguiente.
+        """
+        with self._lock:
+            start = self._read_cursor if cursor is None else cursor
+            text, next_cursor, lost = self._output.read_since(start, max_bytes=max_bytes)
+            if cursor is None:
+                self._read_cursor = next_cursor
+        return {"output": text, "cursor": next_cursor, "lost_bytes": lost}
 
     def to_dict(self) -> Dict[str, Any]:
-        with self._lock:
-            duration = (self.end_time or time.time()) - self.start_time
-            output_len = sum(len(c) for c in self._output_chunks)
-            return {
-                "task_id": self.task_id,
-                "command": self.command,
-                "cwd": self.cwd,
-                "status": self.status,
-                "pid": self.pid,
-                "exit_code": self.exit_code,
-                "start_time": self.start_time,
-                "duration_seconds": round(duration, 2),
-                "output_bytes": output_len,
-            }
+        duration = (self.end_time or time.time()) - self.start_time
+        return {
+            "task_id": self.task_id,
+            "command": self.command,
+            "cwd": self.cwd,
+            "status": self.status,
+            "pid": self.pid,
+            "exit_code": self.exit_code,
+            "start_time": self.start_time,
+            "duration_seconds": round(duration, 2),
+            "output_bytes": self._output.total_bytes,
+            "output_bytes_in_memory": self._output.memory_bytes,
+        }
 
 
 class BackgroundTaskManager:
@@ -103,21 +115,24 @@ class BackgroundTaskManager:
         with self._lock:
             self._tasks[task_id] = task
 
-        thread = threading.Thread(
-            target=self._run_task_thread,
-            args=(task,),
-            daemon=True,
-            name=f"KogniTerm-BackgroundTask-{task_id}",
-        )
-        thread.start()
+        try:
+            self._launch_task(task)
+        except Exception as e:
+            logger.error(f"Error ejecutando tarea en segundo plano {task.task_id}: {e}")
+            task.append_output(f"\n[Error de ejecución: {e}]\n")
+            task.status = STATUS_FAILED
+            task.end_time = time.time()
         return task
 
-    def _run_task_thread(self, task: BackgroundTask) -> None:
-        master_fd, slave_fd = None, None
+    def _launch_task(self, task: BackgroundTask) -> None:
+        """
+        Lanza el proceso en un PTY y delega su lectura en el multiplexor
+        compartido: no hay un hilo por tarea ni sondeo con timeout. La tarea se
+        da por terminada cuando el proceso sale (aunque algún hijo suyo siga
+        reteniendo el PTY).
+        """
+        master_fd, slave_fd = pty.openpty()
         try:
-            master_fd, slave_fd = pty.openpty()
-            task._master_fd = master_fd
-
             # Configurar PTY (ONLCR)
             try:
                 import termios
@@ -136,52 +151,42 @@ class BackgroundTaskManager:
                 stdin=slave_fd,
                 start_new_session=True,
             )
+        except Exception:
+            os.close(master_fd)
+            raise
+        finally:
             os.close(slave_fd)
-            slave_fd = None
-
-            task.process = process
-            task.pid = process.pid
-
-            while True:
-                r, _, _ = select.select([master_fd], [], [], 0.1)
-                if master_fd in r:
-                    try:
-                        data = os.read(master_fd, 8192).decode(errors="replace")
-                        if not data:
-                            break
-                        task.append_output(data)
-                    except OSError:
-                        break
-
-                if process.poll() is not None:
-                    # Lectura final
-                    try:
-                        r, _, _ = select.select([master_fd], [], [], 0.05)
-                        if r:
-                            data = os.read(master_fd, 8192).decode(errors="replace")
-                            if data:
-                                task.append_output(data)
-                    except OSError:
-                        pass
-                    break
-
-            exit_code = process.poll()
+
+        task.process = process
+        task.pid = process.pid
+        task._master_fd = master_fd
+
+        mux = get_pty_multiplexer()
+        # Decodificador incremental: un carácter multibyte puede quedar partido entre lecturas
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        reading = [True]
+
+        def on_data(data: bytes) -> None:
+            task.append_output(decoder.decode(data))
+
+        def stop_reading() -> None:
+            if reading[0]:
+                reading[0] = False
+                mux.remove(master_fd, close=True)
+
+        def on_exit(exit_code: Optional[int]) -> None:
+            if reading[0]:
+                # Lectura final de lo que el proceso dejó en el PTY antes de salir
+                on_data(drain_fd(master_fd))
+                stop_reading()
+            task.append_output(decoder.decode(b"", final=True))
             task.exit_code = exit_code
             if task.status != STATUS_KILLED:
                 task.status = STATUS_COMPLETED if exit_code == 0 else STATUS_FAILED
-
-        except Exception as e:
-            logger.error(f"Error ejecutando tarea en segundo plano {task.task_id}: {e}")
-            task.append_output(f"\n[Error de ejecución: {e}]\n")
-            if task.status != STATUS_KILLED:
-                task.status = STATUS_FAILED
-        finally:
             task.end_time = time.time()
-            if master_fd is not None:
-                try:
-                    os.close(master_fd)
-                except OSError:
-                    pass
+
+        mux.add_reader(master_fd, on_data, on_eof=stop_reading)
+        mux.watch_process(process, on_exit)
 
     def list_tasks(self) -> List[Dict[str, Any]]:
         with self._lock:
@@ -191,12 +196,21 @@ class BackgroundTaskManager:
         with self._lock:
             return self._tasks.get(task_id)
 
-    def get_task_status(self, task_id: str) -> Optional[Dict[str, Any]]:
+    def get_task_status(
+        self, task_id: str, tail_lines: int = 100, only_new: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Estado de la tarea con su salida: las últimas `tail_lines` líneas o, con
+        `only_new`, solo lo producido desde la consulta incremental anterior.
+        """
         task = self.get_task(task_id)
         if not task:
             return None
         info = task.to_dict()
-        info["output"] = task.get_output(tail_lines=100)
+        if only_new:
+            info.update(task.read_output())
+        else:
+            info["output"] = task.get_output(tail_lines=tail_lines)
         return info
 
     def kill_task(self, task_id: str) -> bool:
@@ -1,10 +1,11 @@
+import codecs
 import os
 import re
-import tempfile
 import pty
-import select
+import shutil
 import subprocess
 import sys
+import tempfile
 import termios
 import time
 import tty
@@ -12,29 +13,39 @@ import queue
 import shlex
 import logging
 import threading
-from typing import Optional, Generator, Any
+import uuid
+from typing import Optional, Generator, Any, Tuple
 from .config import settings
 from .background_task_manager import BackgroundTaskManager
+from .pty_multiplexer import get_pty_multiplexer
 
 logger = logging.getLogger(__name__)
 
+_DONE_MARKER_PREFIX = "##KOGNITERM_DONE_"
+# Readline activa/desactiva el "bracketed paste" en cada línea; no es salida del comando
+_BRACKETED_PASTE_OFF = "\x1b[?2004l"
+INTERRUPTED_NOTICE = "\n\n⚠️  Comando interrumpido por el usuario.\n"
+# Por encima de este tamaño el comando no se escribe en la línea del PTY: el modo
+# canónico la refleja en el eco y la corta en ~4 KB. Viaja por una FIFO.
+_PTY_INLINE_MAX = 1024
 
-def _transform_python3_dash_c(command: str) -> tuple[str, bool, Optional[str]]:
+
+def _parse_python3_dash_c(command: str) -> Optional[Tuple[str, str, str, str, str]]:
     """
-    Transforma comandos python -c "..." o python -c '...' (con cualquier ruta de python,
-    comillas simples, dobles o triples) a ejecución desde un archivo temporal.
-    
+    Localiza una invocación python -c "..." o python -c '...' (con cualquier ruta de
+    python, comillas simples, dobles o triples) y extrae su código.
+
     Procesamiento determinista en tiempo lineal O(N) sin retroceso catastrófico de regex.
-    
+
     Returns:
-        (comando_transformado, fue_transformado, ruta_temp)
+        (prefijo, binario_python, flags, código, sufijo) o None si no hay python -c
     """
     cmd_stripped = command.strip()
     
     # Localizar la invocación de python seguida de flags opcionales y -c
     match_py = re.search(r'(?:^|(?<=[\s&|;]))([^\s&|;]*python[0-9.]*)\s+((?:-[a-zA-Z0-9]+\s+)*)-c(?=\s|$)', cmd_stripped)
     if not match_py:
-        return command, False, None
+        return None
     
     py_bin = match_py.group(1)
     py_flags = match_py.group(2) or ""
@@ -44,7 +55,7 @@ def _transform_python3_dash_c(command: str) -> tuple[str, bool, Optional[str]]:
     
     rest = cmd_stripped[end_c_pos:].lstrip()
     if not rest:
-        return command, False, None
+        return None
     
     code = ""
     quote_str = None
@@ -81,7 +92,7 @@ def _transform_python3_dash_c(command: str) -> tuple[str, bool, Optional[str]]:
             i += 1
             
         if not found_end:
-            return command, False, None
+            return None
             
         code_raw = rest[content_start:content_end]
         suffix = rest[content_end + q_len:]
@@ -109,21 +120,61 @@ def _transform_python3_dash_c(command: str) -> tuple[str, bool, Optional[str]]:
         code = rest[:i].strip()
         suffix = rest[i:]
         if not code:
-            return command, False, None
+            return None
 
-    # Crear archivo temporal
-    fd, temp_path = tempfile.mkstemp(suffix='.py', prefix='kogniterm_py_')
-    os.close(fd)
-    
-    # Escribir código al archivo
-    with open(temp_path, 'w', encoding='utf-8') as f:
-        f.write(code)
-        
-    prefix_before = cmd_stripped[:start_pos]
+    return cmd_stripped[:start_pos], py_bin, py_flags, code, suffix
+
+
+def _ansi_c_quote(text: str) -> str:
+    """
+    Cita `text` como cadena ANSI-C de bash ($'...') en una sola línea: los saltos
+    de línea viajan como \\n, así que el shell interactivo no entra en PS2 (>)
+    ni se desincroniza el eco del PTY.
+    """
+    out = []
+    for ch in text:
+        if ch == "\\":
+            out.append("\\\\")
+        elif ch == "'":
+            out.append("\\'")
+        elif ch == "\n":
+            out.append("\\n")
+        elif ch == "\t":
+            out.append("\\t")
+        elif ch == "\r":
+            out.append("\\r")
+        elif ord(ch) < 0x20 or ord(ch) == 0x7f:
+            out.append(f"\\x{ord(ch):02x}")
+        else:
+            out.append(ch)
+    return "$'" + "".join(out) + "'"
+
+
+def _inline_python3_dash_c(command: str) -> tuple[str, bool]:
+    """
+    Reescribe python -c "..." pasando el código como argumento ANSI-C de una
+    sola línea (y con -u para streaming), sin archivo temporal.
+
+    Returns:
+        (comando_transformado, fue_transformado)
+    """
+    parsed = _parse_python3_dash_c(command)
+    if parsed is None:
+        return command, False
+    prefix_before, py_bin, py_flags, code, suffix = parsed
     u_flag = "" if "-u" in py_flags.split() else "-u "
-    transformed = f"{prefix_before}{py_bin} {py_flags}{u_flag}{temp_path}{suffix}"
-    
-    return transformed, True, temp_path
+    return f"{prefix_before}{py_bin} {py_flags}{u_flag}-c {_ansi_c_quote(code)}{suffix}", True
+
+
+def _frame_for_pty(command: str) -> str:
+    """
+    Convierte un comando multilínea en una única línea `eval $'...'`: se
+    ejecuta en el shell actual (como `source`, conservando cd/exports) sin
+    archivo temporal ni líneas de continuación en el PTY.
+    """
+    if "\n" not in command:
+        return command
+    return f"eval {_ansi_c_quote(command)}"
 
 
 
@@ -141,9 +192,19 @@ class CommandExecutor:
         self._persistent_master_fd: Optional[int] = None
         self._persistent_slave_fd: Optional[int] = None
         self._persistent_shell_process: Optional[subprocess.Popen] = None
-        self._last_command_done_marker = "##KOGNITERM_DONE_MARKER##"
+        self._last_command_done_marker = f"{_DONE_MARKER_PREFIX}MARKER##"
+        # Código de salida del último comando ejecutado con `execute` (None si se interrumpió)
+        self.last_exit_code: Optional[int] = None
+        # False si el último `execute` terminó sin ver su marcador (interrupción, timeout,
+        # shell muerto o generador abandonado): el comando podría seguir en marcha
+        self.last_command_completed: bool = True
+        # Salida del shell persistente, alimentada por el multiplexor de PTYs (b"" = EOF)
+        self._pty_output: "queue.Queue[bytes]" = queue.Queue()
+        self._input_pipe_registered = False
         self.background_task_manager = BackgroundTaskManager()
         self._exec_lock = threading.Lock()
+        # Directorio privado con las FIFOs de los comandos largos (se crea a demanda)
+        self._fifo_dir: Optional[str] = None
 
     def set_workspace_directory(self, workspace_dir: str) -> None:
         """Actualiza el directorio de trabajo y sincroniza la sesión PTY activa."""
@@ -159,6 +220,15 @@ class CommandExecutor:
             except Exception as e:
                 logger.warning(f"Error cambiando directorio en PTY: {e}")
 
+    def warm_up(self, cwd: Optional[str] = None) -> None:
+        """Arranca el shell persistente por adelantado (lo usa el pool de shells)."""
+        if not self.is_alive():
+            self._start_persistent_session(cwd)
+
+    def is_alive(self) -> bool:
+        """Indica si el shell persistente está en marcha."""
+        return self._persistent_shell_process is not None and self._persistent_shell_process.poll() is None
+
     def execute_background(self, command: str, cwd: Optional[str] = None) -> dict:
         """Ejecuta un comando en segundo plano sin bloquear el flujo principal."""
         target_cwd = cwd or self.workspace_directory or os.getcwd()
@@ -187,7 +257,7 @@ class CommandExecutor:
         target_cwd = os.path.abspath(target_cwd)
         
         # Inicializar sesión persistente si no existe
-        if self._persistent_shell_process is None or self._persistent_shell_process.poll() is not None:
+        if not self.is_alive():
             self._start_persistent_session(target_cwd)
         else:
             if getattr(self, "_current_shell_cwd", None) != target_cwd:
@@ -213,46 +283,42 @@ class CommandExecutor:
         # 0. Limpiar buffer de entrada/salida previo para evitar desincronización
         # Esto evita que residuos de comandos anteriores (o el prompt oculto) 
         # se mezclen con el output del comando actual.
-        try:
-            while True:
-                r, _, _ = select.select([master_fd], [], [], 0.0)
-                if r:
-                    os.read(master_fd, 8192)
-                else:
-                    break
-        except:
-            pass
+        self._discard_pending_output()
+        pty_output = self._pty_output
 
-        # Transformar comandos python -c "..." (multilínea o no, de cualquier venv/ruta)
-        # a ejecución desde archivo temporal para evitar problemas de eco, PS2 (>) y PTY
-        command, was_transformed, temp_path = _transform_python3_dash_c(command)
+        # Sin archivos temporales: python -c lleva su código como argumento ANSI-C
+        # de una línea y los comandos multilínea viajan como `eval $'...'`, lo que
+        # evita problemas de eco y PS2 (>) en el PTY.
+        command, _ = _inline_python3_dash_c(command)
         
         # Eliminar saltos de línea y espacios al final para evitar errores sintácticos
         command = command.rstrip()
         
-        original_command = command
+        feed = None
+        if len(command.encode()) > _PTY_INLINE_MAX:
+            # Comando largo: el shell lo lee de una FIFO con `.` (mismo shell, como eval)
+            feed = self._feed_through_fifo(command)
+            command = f". {shlex.quote(feed[0])}"
+        else:
+            command = _frame_for_pty(command)
         stripped_command = command.strip()
-        is_multiline = "\n" in stripped_command
-        
-        if not was_transformed and is_multiline:
-            fd, temp_path = tempfile.mkstemp(suffix='.sh', prefix='kogniterm_run_')
-            os.close(fd)
-            with open(temp_path, 'w', encoding='utf-8') as f:
-                f.write(command)
-            command = f"source {temp_path}"
-            was_transformed = True
-            yield f"[KogniTerm] Ejecutando comando multilínea desde archivo temporal: {temp_path}\n"
-        elif was_transformed:
-            yield f"[KogniTerm] Transformando comando python -c a archivo temporal: {temp_path}\n"
-
 
         # Enviar el comando al shell persistente.
         # El tamaño ya se ajusta con ioctl(TIOCSWINSZ), por lo que no inyectamos
         # un comando stty en línea para evitar que aparezca en el output renderizado.
+        # Marcador único por comando: la salida rezagada de un comando anterior
+        # (p. ej. interrumpido con Ctrl+C) no puede dar por terminado el actual.
+        # El marcador enmarca además el código de salida: ##KOGNITERM_DONE_<nonce>:<código>##
+        self._last_command_done_marker = f"{_DONE_MARKER_PREFIX}{uuid.uuid4().hex[:12]}:"
+        self.last_exit_code = None
+        self.last_command_completed = False
         half_len = len(self._last_command_done_marker) // 2
         part1 = self._last_command_done_marker[:half_len]
         part2 = self._last_command_done_marker[half_len:]
-        marker = f"echo '{part1}''{part2}'"
+        marker = f"echo '{part1}''{part2}'$?'##'"
+        # Así aparece el marcador en el eco del comando (con las comillas partidas)
+        echo_signature = f"{part1}''{part2}'$?'##'"
+        done_pattern = re.compile(re.escape(self._last_command_done_marker) + r"(\d+)##")
         
         # Construcción segura del comando y el marcador para evitar errores sintácticos de bash
         if not stripped_command:
@@ -276,121 +342,206 @@ class CommandExecutor:
             
             # Longitud de seguridad para no retener buffer innecesariamente
             max_prefix_len = max(len(marker_to_hide), len(echo_cmd_to_hide)) + 2
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            shell_exited_at: Optional[float] = None
+            echo_eol_pending = False
             
             while True:
                 # Verificar interrupción
                 if interrupt_queue and not interrupt_queue.empty():
                     interrupt_queue.get()
                     os.write(master_fd, b"\x03") # Ctrl+C al shell
-                    yield "\n\n⚠️  Comando interrumpido por el usuario.\n"
+                    yield INTERRUPTED_NOTICE
                     break
  
-                readable_fds, _, _ = select.select([master_fd, self._input_pipe_read], [], [], 0.002)
- 
-                if master_fd in readable_fds:
-                    try:
-                        # Leer fragmento del PTY
-                        data = os.read(master_fd, 4096).decode(errors='replace')
-                        if not data:
-                            break
-                        
-                        search_buffer += data
+                # El multiplexor entrega la salida en cuanto llega; el timeout solo
+                # sirve para revisar la cola de interrupciones y si el shell sigue vivo.
+                try:
+                    chunk = pty_output.get(timeout=0.05)
+                except queue.Empty:
+                    if self.is_alive():
+                        continue
+                    # El shell murió: se da un margen al EOF del PTY, que un hijo en
+                    # segundo plano puede retener indefinidamente
+                    if shell_exited_at is None:
+                        shell_exited_at = time.monotonic()
+                    if time.monotonic() - shell_exited_at < 0.5:
+                        continue
+                    chunk = b""
+                if not chunk:
+                    # EOF: el shell terminó (p. ej. `exit 3`); su código es el del comando
+                    if search_buffer:
+                        yield search_buffer.replace('\r\n', '\n')
+                    shell = self._persistent_shell_process
+                    if shell is not None:
+                        try:
+                            self.last_exit_code = shell.wait(timeout=1)
+                        except subprocess.TimeoutExpired:
+                            pass
+                    break
+
+                data = decoder.decode(chunk)
+                search_buffer += data
  
-                        # Filtrar el eco del comando completo provocado por bash readline
-                        if not getattr(self, '_echo_filtered', True):
-                            clean_buf = re.sub(r'\x1b\[[0-9;?]*[a-zA-Z]', '', search_buffer).lstrip()
-                            cmd_stripped = original_command.strip()
-                            prefix_len = min(len(cmd_stripped), 16)
-                            
-                            # 1. Si aparece el marcador limpio de finalización, NO es un eco: desactivar filtro de inmediato
-                            if marker_to_hide in search_buffer:
-                                self._echo_filtered = True
-                            # 2. Si detectamos la firma de nuestro marcador en el eco, descartar la línea de eco
-                            elif "##KOGNITERM_''DONE_MARKER##" in search_buffer:
-                                parts = search_buffer.split("##KOGNITERM_''DONE_MARKER##", 1)
-                                rest = parts[1]
-                                if rest.startswith("'"):
-                                    rest = rest[1:]
-                                if rest.startswith("\r"):
-                                    rest = rest[1:]
-                                if rest.startswith("\n"):
-                                    rest = rest[1:]
-                                search_buffer = rest
-                                self._echo_filtered = True
-                            # 3. Si tenemos un salto de línea completo en el buffer, evaluar la primera línea
-                            elif "\n" in search_buffer:
-                                first_line, rest = search_buffer.split("\n", 1)
-                                clean_first = re.sub(r'\x1b\[[0-9;?]*[a-zA-Z]', '', first_line).strip()
-                                if prefix_len == 0 or (clean_first and (cmd_stripped.startswith(clean_first) or clean_first.startswith(cmd_stripped[:prefix_len]))):
-                                    # La primera línea era el eco del comando, la descartamos
-                                    search_buffer = rest
-                                self._echo_filtered = True
-                            # 4. Si el buffer no empieza con el prefijo esperado, ECHO probablemente está desactivado
-                            elif prefix_len > 0 and len(clean_buf) >= prefix_len and not clean_buf.startswith(cmd_stripped[:prefix_len]):
-                                self._echo_filtered = True
-                            # 5. Si el buffer es muy largo, desactivar filtro por seguridad
-                            elif len(clean_buf) > len(cmd_stripped) + 150:
-                                self._echo_filtered = True
-
-
-                        # Si el marcador de fin aparece completo, hemos terminado
-                        if marker_to_hide in search_buffer:
-                            parts = search_buffer.split(marker_to_hide)
-                            final_output = parts[0]
-                            # Limpiar restos de \r y yield final
-                            if final_output:
-                                clean_output = final_output.replace('\r\n', '\n')
-                                if clean_output: yield clean_output
+                # Descartar el eco del comando provocado por bash readline: la firma de nuestro
+                # marcador lo identifica sin ambigüedad (nonce por comando). Se comprueba siempre,
+                # no solo la primera vez, porque el eco puede llegar dos veces si la tty lo
+                # reflejó antes de que readline tomara el control; se corta por la última aparición.
+                if echo_signature in search_buffer:
+                    search_buffer = search_buffer.rsplit(echo_signature, 1)[1]
+                    echo_eol_pending = True
+                    self._echo_filtered = True
+                # El salto de línea que cierra el eco puede llegar en otro fragmento
+                if echo_eol_pending and search_buffer:
+                    if search_buffer.startswith("\r"):
+                        search_buffer = search_buffer[1:]
+                    if search_buffer.startswith("\n"):
+                        search_buffer = search_buffer[1:]
+                        echo_eol_pending = False
+                    elif search_buffer:
+                        echo_eol_pending = False
+                if search_buffer.startswith(_BRACKETED_PASTE_OFF):
+                    search_buffer = search_buffer[len(_BRACKETED_PASTE_OFF):].lstrip("\r")
+
+                # Heurísticas mientras la firma aún no ha llegado (o si ECHO está desactivado)
+                if not getattr(self, '_echo_filtered', True):
+                    clean_buf = re.sub(r'\x1b\[[0-9;?]*[a-zA-Z]', '', search_buffer).lstrip()
+                    cmd_stripped = stripped_command
+                    prefix_len = min(len(cmd_stripped), 16)
+                    
+                    # 1. Si aparece el marcador limpio de finalización sin eco previo: desactivar filtro
+                    if marker_to_hide in search_buffer:
+                        self._echo_filtered = True
+                    # 2. Si tenemos un salto de línea completo en el buffer, evaluar la primera línea
+                    elif "\n" in search_buffer:
+                        first_line, rest = search_buffer.split("\n", 1)
+                        clean_first = re.sub(r'\x1b\[[0-9;?]*[a-zA-Z]', '', first_line).strip()
+                        if prefix_len == 0 or (clean_first and (cmd_stripped.startswith(clean_first) or clean_first.startswith(cmd_stripped[:prefix_len]))):
+                            # La primera línea era el eco del comando, la descartamos
+                            search_buffer = rest
+                        self._echo_filtered = True
+                    # 3. Si el buffer no empieza con el prefijo esperado, ECHO probablemente está desactivado
+                    elif prefix_len > 0 and len(clean_buf) >= prefix_len and not clean_buf.startswith(cmd_stripped[:prefix_len]):
+                        self._echo_filtered = True
+                    # 4. Si el buffer es muy largo, desactivar filtro por seguridad
+                    elif len(clean_buf) > len(cmd_stripped) + 150:
+                        self._echo_filtered = True
+
+
+                # Si el marcador de fin aparece completo (con su código de salida), hemos terminado
+                done = done_pattern.search(search_buffer)
+                if done:
+                    self.last_exit_code = int(done.group(1))
+                    self.last_command_completed = True
+                    final_output = search_buffer[:done.start()]
+                    # Limpiar restos de \r y yield final
+                    if final_output:
+                        clean_output = final_output.replace('\r\n', '\n')
+                        if clean_output: yield clean_output
+                    break
+                
+                # Yield preventivo: Soltar todo lo que no sea un posible inicio del marcador.
+                # Si el marcador ya llegó pero falta el código de salida, se retiene desde él;
+                # si no, buscamos el sufijo más largo del buffer que sea prefijo del marcador.
+                marker_prefix_len = 0
+                if marker_to_hide in search_buffer:
+                    marker_prefix_len = len(search_buffer) - search_buffer.index(marker_to_hide)
+                else:
+                    for i in range(min(len(search_buffer), len(marker_to_hide)), 0, -1):
+                        if marker_to_hide.startswith(search_buffer[-i:]):
+                            marker_prefix_len = i
                             break
-                        
-                        # Yield preventivo: Soltar todo lo que no sea un posible inicio del marcador.
-                        # Buscamos el sufijo más largo del buffer que sea prefijo del marcador.
-                        marker_prefix_len = 0
-                        for i in range(min(len(search_buffer), len(marker_to_hide)), 0, -1):
-                            if marker_to_hide.startswith(search_buffer[-i:]):
-                                marker_prefix_len = i
-                                break
-                        
-                        if marker_prefix_len < len(search_buffer):
-                            to_yield = search_buffer[:-marker_prefix_len] if marker_prefix_len > 0 else search_buffer
-                            search_buffer = search_buffer[-marker_prefix_len:] if marker_prefix_len > 0 else ""
-                            
-                            clean_to_yield = to_yield.replace('\r\n', '\n') # Solo normalizar saltos de línea, preservar \r
-                            if clean_to_yield:
-                                yield clean_to_yield
-                            
-                    except OSError:
-                        break
                 
+                if marker_prefix_len < len(search_buffer):
+                    to_yield = search_buffer[:-marker_prefix_len] if marker_prefix_len > 0 else search_buffer
+                    search_buffer = search_buffer[-marker_prefix_len:] if marker_prefix_len > 0 else ""
+                    
+                    clean_to_yield = to_yield.replace('\r\n', '\n') # Solo normalizar saltos de línea, preservar \r
+                    if clean_to_yield:
+                        yield clean_to_yield
+                    
                 # Yield lo que queda en el buffer si no hay datos nuevos y no parece inicio de marcador
-                if search_buffer and master_fd not in readable_fds:
+                if search_buffer and pty_output.empty():
                     if not getattr(self, '_echo_filtered', True):
                         self._echo_filtered = True
-                    if not marker_to_hide.startswith(search_buffer):
+                    if not marker_to_hide.startswith(search_buffer) and not search_buffer.startswith(marker_to_hide):
                         clean_remaining = search_buffer.replace('\r\n', '\n')
                         if clean_remaining:
                             yield clean_remaining
                         search_buffer = ""
 
-                if self._input_pipe_read in readable_fds:
-                    try:
-                        injected_input = os.read(self._input_pipe_read, 1024)
-                        if injected_input:
-                            os.write(master_fd, injected_input)
-                    except Exception as e:
-                        logger.error(f"Error inyectando entrada al PTY: {e}")
-
         finally:
             self.process = None
-            # Limpiar archivo temporal si fue creado
-            if was_transformed and temp_path and os.path.exists(temp_path):
-                try:
-                    os.unlink(temp_path)
-                except:
-                    pass
+            if feed is not None:
+                self._finish_fifo_feed(*feed)
+
+    def _feed_through_fifo(self, command: str) -> Tuple[str, threading.Thread]:
+        """
+        Crea una FIFO de un solo uso y escribe en ella `command` desde un hilo; la
+        escritura se bloquea hasta que el shell la abre. El contenido nunca toca disco.
+        """
+        if self._fifo_dir is None or not os.path.isdir(self._fifo_dir):
+            self._fifo_dir = tempfile.mkdtemp(prefix="kogniterm-pty-")
+        path = os.path.join(self._fifo_dir, uuid.uuid4().hex[:12])
+        os.mkfifo(path, 0o600)
+        payload = (command + "\n").encode()
+
+        def _write() -> None:
+            try:
+                with open(path, "wb") as fifo:
+                    fifo.write(payload)
+            except OSError:
+                pass  # El comando se abortó antes de que el shell lo leyera
+
+        writer = threading.Thread(target=_write, daemon=True, name="KogniTerm-PtyFeed")
+        writer.start()
+        return path, writer
+
+    @staticmethod
+    def _finish_fifo_feed(path: str, writer: threading.Thread) -> None:
+        """Libera el hilo escritor si el shell nunca leyó la FIFO y la elimina."""
+        if writer.is_alive():
+            # Abrir y cerrar el otro extremo desbloquea el open() del escritor
+            try:
+                os.close(os.open(path, os.O_RDONLY | os.O_NONBLOCK))
+            except OSError:
+                pass
+            writer.join(timeout=1)
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+    def _discard_pending_output(self, wait: float = 0.0) -> None:
+        """Descarta la salida ya recibida del shell persistente (eco de `cd`, banner, restos)."""
+        try:
+            while True:
+                if wait:
+                    self._pty_output.get(timeout=wait)
+                else:
+                    self._pty_output.get_nowait()
+        except queue.Empty:
+            pass
+
+    def _inject_input(self, data: bytes) -> None:
+        """Reenvía al shell persistente lo escrito en el pipe de entrada (desde la TUI)."""
+        try:
+            if self._persistent_master_fd is not None:
+                os.write(self._persistent_master_fd, data)
+        except Exception as e:
+            logger.error(f"Error inyectando entrada al PTY: {e}")
 
     def _start_persistent_session(self, cwd=None):
-        """Inicia un shell persistente en un PTY."""
+        """Inicia un shell persistente en un PTY cuya lectura hace el multiplexor compartido."""
+        mux = get_pty_multiplexer()
+        if self._persistent_master_fd is not None:
+            # El shell anterior murió: liberar su PTY
+            mux.remove(self._persistent_master_fd, close=True)
+            if self._persistent_slave_fd is not None:
+                try:
+                    os.close(self._persistent_slave_fd)
+                except OSError:
+                    pass
         self._persistent_master_fd, self._persistent_slave_fd = pty.openpty()
         
         # Dejar ECHO activado por defecto para permitir que el usuario vea lo que escribe 
@@ -419,22 +570,57 @@ class CommandExecutor:
             cwd=target_cwd,
             env=os.environ.copy()
         )
+        # El shell ya tiene su copia del esclavo: cerrarla aquí hace que su salida
+        # (`exit`, crash) llegue como EOF al maestro en vez de dejar `execute` colgado
+        os.close(self._persistent_slave_fd)
+        self._persistent_slave_fd = None
+        # Cola nueva por sesión: lo que aún llegue del PTY anterior no se mezcla
+        self._pty_output = queue.Queue()
+        output = self._pty_output
+        mux.add_reader(self._persistent_master_fd, output.put, on_eof=lambda: output.put(b""))
+        if not self._input_pipe_registered and self._input_pipe_read is not None:
+            mux.add_reader(self._input_pipe_read, self._inject_input)
+            self._input_pipe_registered = True
+
         # Consumir el banner inicial del shell y configurar variables sin demoras estáticas
         try:
             # Desactivar el PROMPT para que no se filtre en la TUI
             # El prompt vacío (PS1="") es vital para una salida limpia en paneles
-            os.write(self._persistent_master_fd, b"export PS1='' PROMPT_COMMAND=''\n")
-            
-            # Leer el buffer inicial de forma eficiente con timeout mínimo
-            for _ in range(20):
-                r, _, _ = select.select([self._persistent_master_fd], [], [], 0.001)
-                if r:
-                    os.read(self._persistent_master_fd, 8192)
-                else:
-                    break
+            os.write(
+                self._persistent_master_fd,
+                b"export PS1='' PROMPT_COMMAND=''; bind 'set enable-bracketed-paste off' 2>/dev/null\n",
+            )
+            self._wait_until_ready()
         except:
             pass
 
+    def _wait_until_ready(self, timeout: float = 10.0) -> bool:
+        """
+        Espera a que el shell recién arrancado procese la configuración inicial
+        (los perfiles de `bash --login` pueden tardar segundos) y descarta el
+        banner, de modo que un shell caliente no mezcle nada con el primer comando.
+        """
+        ready = f"{_DONE_MARKER_PREFIX}READY_{uuid.uuid4().hex[:8]}##"
+        half_len = len(ready) // 2
+        os.write(self._persistent_master_fd, f"echo '{ready[:half_len]}''{ready[half_len:]}'\n".encode())
+        deadline = time.monotonic() + timeout
+        seen = b""
+        target = ready.encode()
+        while time.monotonic() < deadline:
+            try:
+                chunk = self._pty_output.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if not chunk:
+                return False
+            seen = (seen + chunk)[-4096:]
+            if target in seen:
+                # Lo que siga al marcador (salto de línea, bracketed paste) también sobra
+                self._discard_pending_output(wait=0.01)
+                return True
+        logger.warning("El shell persistente no respondió a tiempo durante el arranque")
+        return False
+
     def terminate(self):
         """Interrumpe el comando actual enviando SIGINT al grupo de procesos."""
         if self._persistent_shell_process:
@@ -444,6 +630,63 @@ class CommandExecutor:
             except:
                 pass
 
+    def close(self):
+        """
+        Cierra el shell persistente y libera los descriptores del PTY y del pipe de entrada.
+
+        Con control de trabajos el comando en primer plano tiene su propio grupo de
+        procesos: se cuelga (SIGHUP) el shell, que lo reenvía a sus trabajos, y lo que
+        siga vivo de ese grupo o del del shell se mata con SIGKILL.
+        """
+        shell = self._persistent_shell_process
+        if shell is not None and shell.poll() is None:
+            import signal
+            groups = set()
+            try:
+                groups.add(os.getpgid(shell.pid))
+            except OSError:
+                pass
+            if self._persistent_master_fd is not None:
+                try:
+                    groups.add(os.tcgetpgrp(self._persistent_master_fd))
+                except OSError:
+                    pass
+            try:
+                shell.send_signal(signal.SIGHUP)
+                shell.wait(timeout=0.5)
+            except Exception:
+                pass
+            for pgid in groups:
+                try:
+                    os.killpg(pgid, signal.SIGKILL)
+                except OSError:
+                    pass
+            try:
+                shell.wait(timeout=1)
+            except Exception:
+                pass
+        self._persistent_shell_process = None
+        # Los descriptores vigilados los cierra el multiplexor al desregistrarlos
+        mux = get_pty_multiplexer()
+        if self._persistent_master_fd is not None:
+            mux.remove(self._persistent_master_fd, close=True)
+            self._persistent_master_fd = None
+        if self._input_pipe_registered and self._input_pipe_read is not None:
+            mux.remove(self._input_pipe_read, close=True)
+            self._input_pipe_read = None
+            self._input_pipe_registered = False
+        if self._fifo_dir is not None:
+            shutil.rmtree(self._fifo_dir, ignore_errors=True)
+            self._fifo_dir = None
+        for fd_attr in ("_persistent_master_fd", "_persistent_slave_fd", "_input_pipe_read", "_input_pipe_write"):
+            fd = getattr(self, fd_attr, None)
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+                setattr(self, fd_attr, None)
+
     def write_input(self, data: str):
         """Envía texto al proceso actual a través del pipe de entrada."""
         if isinstance(data, str):
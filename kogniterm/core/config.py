@@ -33,6 +33,58 @@ class Settings(BaseSettings):
     rate_limit_period: int = 60
     rate_limit_calls: int = 20
 
+    # Instantánea del registro de skills (descubrimiento e import diferido)
+    skill_registry_snapshot: bool = Field(True, validation_alias="KOGNITERM_SKILL_SNAPSHOT")
+
+    # Pool de shells persistentes (execute_command)
+    shell_pool_size: int = Field(4, validation_alias="KOGNITERM_SHELL_POOL_SIZE")
+    shell_pool_idle_timeout: float = Field(300.0, validation_alias="KOGNITERM_SHELL_POOL_IDLE_TIMEOUT")
+    shell_pool_isolation: str = Field("key", validation_alias="KOGNITERM_SHELL_POOL_ISOLATION")
+
+    # Pool de kernels de Jupyter (python_executor)
+    kernel_pool_size: int = Field(4, validation_alias="KOGNITERM_KERNEL_POOL_SIZE")
+    kernel_pool_prewarm: int = Field(1, validation_alias="KOGNITERM_KERNEL_POOL_PREWARM")
+    kernel_pool_idle_timeout: float = Field(600.0, validation_alias="KOGNITERM_KERNEL_POOL_IDLE_TIMEOUT")
+    kernel_pool_memory_limit_mb: int = Field(2048, validation_alias="KOGNITERM_KERNEL_POOL_MEMORY_LIMIT_MB")
+    kernel_pool_hard_memory_limit: bool = Field(False, validation_alias="KOGNITERM_KERNEL_POOL_HARD_MEMORY_LIMIT")
+    kernel_pool_eviction_grace: float = Field(10.0, validation_alias="KOGNITERM_KERNEL_POOL_EVICTION_GRACE")
+
+    # Telemetría de sesión (JSONL por lotes)
+    telemetry_flush_interval: float = Field(2.0, validation_alias="KOGNITERM_TELEMETRY_FLUSH_INTERVAL")
+    telemetry_max_bytes: int = Field(10 * 1024 * 1024, validation_alias="KOGNITERM_TELEMETRY_MAX_BYTES")
+
+    # Tracing por spans del turno del agente (/trace y exportación OTLP/JSON)
+    tracing_enabled: bool = Field(True, validation_alias="KOGNITERM_TRACING")
+    trace_file: Optional[str] = Field(None, validation_alias="KOGNITERM_TRACE_FILE")
+
+    # Planificador de llamadas LLM de sub-agentes (cupos y presupuestos)
+    subagent_max_llm_calls: int = Field(4, validation_alias="KOGNITERM_SUBAGENT_MAX_LLM_CALLS")
+    subagent_provider_limits: str = Field("", validation_alias="KOGNITERM_SUBAGENT_PROVIDER_LIMITS")
+    subagent_max_tokens: int = Field(0, validation_alias="KOGNITERM_SUBAGENT_MAX_TOKENS")
+    subagent_max_cost: float = Field(0.0, validation_alias="KOGNITERM_SUBAGENT_MAX_COST")
+
+    # Caché de artefactos compartida entre sub-agentes hermanos
+    shared_artifact_cache_bytes: int = Field(64 * 1024 * 1024, validation_alias="KOGNITERM_SHARED_CACHE_MAX_BYTES")
+    shared_artifact_ttl: float = Field(300.0, validation_alias="KOGNITERM_SHARED_CACHE_TTL")
+
+    # Caché HTTP en disco de web_fetch/github (ETag, Last-Modified, max-age)
+    http_cache_enabled: bool = Field(True, validation_alias="KOGNITERM_HTTP_CACHE")
+    http_cache_dir: Optional[str] = Field(None, validation_alias="KOGNITERM_HTTP_CACHE_DIR")
+    http_cache_max_bytes: int = Field(256 * 1024 * 1024, validation_alias="KOGNITERM_HTTP_CACHE_MAX_BYTES")
+
+    # Memoria persistente de búsquedas (search_memory)
+    search_memory_capacity: int = Field(500, validation_alias="KOGNITERM_SEARCH_MEMORY_CAPACITY")
+    search_memory_ttl: float = Field(7 * 24 * 3600.0, validation_alias="KOGNITERM_SEARCH_MEMORY_TTL")
+    search_memory_threshold: float = Field(0.82, validation_alias="KOGNITERM_SEARCH_MEMORY_THRESHOLD")
+
+    # Servidores MCP: timeouts y caché de manifiestos de herramientas
+    mcp_connect_timeout: float = Field(20.0, validation_alias="KOGNITERM_MCP_CONNECT_TIMEOUT")
+    mcp_call_timeout: float = Field(120.0, validation_alias="KOGNITERM_MCP_CALL_TIMEOUT")
+    mcp_manifest_dir: Optional[str] = Field(None, validation_alias="KOGNITERM_MCP_MANIFEST_DIR")
+
+    # Despacho anticipado de herramientas de solo lectura durante el stream
+    early_tool_dispatch: bool = Field(True, validation_alias="KOGNITERM_EARLY_TOOL_DISPATCH")
+
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
 
 settings = Settings()
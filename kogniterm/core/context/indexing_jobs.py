@@ -0,0 +1,372 @@
+"""
+Gestor de trabajos de indexación del codebase.
+
+Garantiza un único trabajo por workspace: las peticiones repetidas se fusionan
+con el trabajo en curso (como mucho una pasada adicional), los trabajos se pueden
+cancelar y se reanudan desde un checkpoint en `.kogniterm/index_checkpoint.jsonl`,
+y ceden el paso a las búsquedas interactivas entre lotes de archivos.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+EventListener = Callable[[str, Dict[str, Any]], None]
+
+CHECKPOINT_FILENAME = "index_checkpoint.jsonl"
+
+
+# ── Prioridad interactiva ─────────────────────────────────────────────────────
+
+_interactive_lock = threading.Lock()
+_interactive_count = 0
+
+
+@contextlib.contextmanager
+def interactive_priority():
+    """
+    Marca una operación interactiva (p. ej. `codebase_search`) en curso.
+    Mientras haya alguna activa, los trabajos de indexación pausan entre lotes
+    para no competir por la API de embeddings ni por ChromaDB.
+    """
+    global _interactive_count
+    with _interactive_lock:
+        _interactive_count += 1
+    try:
+        yield
+    finally:
+        with _interactive_lock:
+            _interactive_count -= 1
+
+
+def interactive_active() -> bool:
+    with _interactive_lock:
+        return _interactive_count > 0
+
+
+# ── Trabajos ──────────────────────────────────────────────────────────────────
+
+
+class IndexingJob:
+    """Estado observable de un trabajo de indexación de un workspace."""
+
+    def __init__(self, workspace_dir: str, full: bool = False):
+        self.job_id = str(uuid.uuid4())
+        self.workspace_dir = workspace_dir
+        self.status = "queued"  # queued | running | completed | cancelled | failed
+        self.files_total = 0
+        self.files_done = 0
+        self.chunks_indexed = 0
+        self.resumed = False
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.rerun_requested = False
+        self.full = full
+        self.listeners: List[EventListener] = []
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("queued", "running")
+
+    def add_listener(self, listener: Optional[EventListener]) -> None:
+        if listener is not None and listener not in self.listeners:
+            self.listeners.append(listener)
+
+    def emit(self, event_type: str, data: Dict[str, Any]) -> None:
+        payload = {"job_id": self.job_id, "workspace": self.workspace_dir, **data}
+        for listener in list(self.listeners):
+            try:
+                listener(event_type, payload)
+            except Exception as e:
+                logger.debug(f"IndexingJob: listener falló para {event_type}: {e}")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "workspace": self.workspace_dir,
+            "status": self.status,
+            "files_total": self.files_total,
+            "files_done": self.files_done,
+            "chunks_indexed": self.chunks_indexed,
+            "resumed": self.resumed,
+            "rerun_requested": self.rerun_requested,
+            "error": self.error,
+        }
+
+
+class IndexingJobManager:
+    """
+    Cola de trabajos de indexación: uno por workspace, con coalescencia,
+    cancelación, reanudación por checkpoint y prioridad para búsquedas.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 8,
+        indexer_factory: Optional[Callable[[str], Any]] = None,
+        vdb_factory: Optional[Callable[[str], Any]] = None,
+    ):
+        self.batch_size = batch_size
+        self._indexer_factory = indexer_factory
+        self._vdb_factory = vdb_factory
+        self._jobs: Dict[str, IndexingJob] = {}
+
+    # ── API pública ────────────────────────────────────────────────────────
+
+    def submit(
+        self,
+        workspace_dir: str,
+        listener: Optional[EventListener] = None,
+        full: bool = False,
+    ) -> IndexingJob:
+        """
+        Encola la indexación de `workspace_dir`. Si ya hay un trabajo activo se
+        reutiliza: se suscribe el listener y se pide una única pasada extra
+        (incremental) para recoger cambios posteriores al escaneo.
+
+        Sin `full`, un workspace ya indexado solo re-indexa los archivos
+        nuevos, modificados o borrados desde la última indexación.
+        """
+        workspace_dir = os.path.abspath(workspace_dir)
+        job = self._jobs.get(workspace_dir)
+        if job is not None and job.active:
+            job.add_listener(listener)
+            if job.status == "running":
+                job.rerun_requested = True
+            logger.info(f"IndexingJobManager: petición fusionada con el trabajo {job.job_id} ({workspace_dir}).")
+            return job
+
+        job = IndexingJob(workspace_dir, full=full)
+        job.add_listener(listener)
+        self._jobs[workspace_dir] = job
+        job.task = asyncio.create_task(self._run(job))
+        return job
+
+    def cancel(self, workspace_dir: str) -> bool:
+        """Cancela el trabajo activo; el checkpoint se conserva para reanudar."""
+        job = self._jobs.get(os.path.abspath(workspace_dir))
+        if job is None or not job.active or job.task is None:
+            return False
+        job.rerun_requested = False
+        job.task.cancel()
+        return True
+
+    def get(self, workspace_dir: str) -> Optional[IndexingJob]:
+        return self._jobs.get(os.path.abspath(workspace_dir))
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        return [job.to_dict() for job in self._jobs.values()]
+
+    async def shutdown(self) -> None:
+        """Cancela todos los trabajos activos (checkpoints intactos)."""
+        tasks = [j.task for j in self._jobs.values() if j.active and j.task]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    # ── Ejecución ──────────────────────────────────────────────────────────
+
+    def _make_indexer(self, workspace_dir: str):
+        if self._indexer_factory:
+            return self._indexer_factory(workspace_dir)
+        from kogniterm.core.context.codebase_indexer import CodebaseIndexer
+        return CodebaseIndexer(workspace_dir)
+
+    def _make_vdb(self, workspace_dir: str):
+        if self._vdb_factory:
+            return self._vdb_factory(workspace_dir)
+        from kogniterm.core.context.vector_db_manager import VectorDBManager
+        return VectorDBManager.get_for_path(workspace_dir)
+
+    async def _run(self, job: IndexingJob) -> None:
+        try:
+            incremental = not job.full
+            while True:
+                job.status = "running"
+                job.rerun_requested = False
+                await self._index_once(job, incremental=incremental)
+                if not job.rerun_requested:
+                    break
+                incremental = True
+                logger.info(f"IndexingJobManager: pasada adicional fusionada para {job.workspace_dir}.")
+            job.status = "completed"
+            job.emit("indexing_complete", {"chunks": job.chunks_indexed})
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            job.emit("indexing_cancelled", {"files_done": job.files_done, "files_total": job.files_total})
+        except Exception as e:
+            logger.error(f"Error en tarea de indexación: {e}")
+            job.status = "failed"
+            job.error = str(e)
+            job.emit("indexing_error", {"message": str(e)})
+        finally:
+            job.finished_at = time.time()
+
+    async def _index_once(self, job: IndexingJob, incremental: bool) -> None:
+        workspace_dir = job.workspace_dir
+        indexer = await asyncio.to_thread(self._make_indexer, workspace_dir)
+        vdb = await asyncio.to_thread(self._make_vdb, workspace_dir)
+
+        checkpoint = _load_checkpoint(workspace_dir)
+        if checkpoint:
+            # Reanudación: el checkpoint manda sobre el modo solicitado y fija la
+            # lista exacta de archivos de la pasada interrumpida (sin re-listar).
+            done = checkpoint["done"]
+            files = checkpoint["files"]
+            job.resumed = True
+            logger.info(
+                f"IndexingJobManager: reanudando pasada {checkpoint['mode']} de {workspace_dir} "
+                f"desde checkpoint ({len(done)}/{len(files)} archivos)."
+            )
+            pending = [f for f in files if f not in done]
+            if pending:
+                # Un lote cancelado a medias pudo llegar a ChromaDB sin quedar
+                # anotado: se borran sus chunks para no duplicarlos al rehacerlo.
+                await asyncio.to_thread(vdb.delete_file_chunks, pending)
+        else:
+            done = set()
+            if (
+                incremental
+                and await asyncio.to_thread(indexer._load_file_state)
+                and await asyncio.to_thread(vdb.is_indexed)
+            ):
+                mode = "incremental"
+                changes = await asyncio.to_thread(indexer.get_changed_files)
+                stale = changes["changed"] + changes["deleted"]
+                if stale:
+                    await asyncio.to_thread(vdb.delete_file_chunks, stale)
+                files = changes["changed"] + changes["new"]
+            else:
+                mode = "full"
+                files = await asyncio.to_thread(indexer.list_code_files, workspace_dir)
+                await asyncio.to_thread(vdb.clear_collection)
+            files = [os.path.abspath(f) for f in files]
+            _start_checkpoint(workspace_dir, mode, files)
+            pending = files
+
+        job.files_total = len(files)
+        job.files_done = len(files) - len(pending)
+
+        for start in range(0, len(pending), self.batch_size):
+            await self._yield_to_interactive()
+            batch = pending[start:start + self.batch_size]
+
+            chunks: List[Dict[str, Any]] = []
+            for file_path in batch:
+                chunks.extend(await asyncio.to_thread(indexer.chunk_file, file_path))
+            if chunks:
+                embeddings = await asyncio.to_thread(
+                    indexer.embeddings_service.generate_embeddings,
+                    [c["content"] for c in chunks],
+                )
+                valid = []
+                for chunk, embedding in zip(chunks, embeddings or []):
+                    if embedding:
+                        chunk["embedding"] = embedding
+                        valid.append(chunk)
+                if len(valid) < len(chunks):
+                    logger.warning(f"Skipped {len(chunks) - len(valid)} chunks due to missing or empty embeddings.")
+                if valid:
+                    await asyncio.to_thread(vdb.add_chunks, valid)
+                job.chunks_indexed += len(valid)
+
+            _append_checkpoint(workspace_dir, batch)
+            job.files_done += len(batch)
+            job.emit(
+                "indexing_progress",
+                {
+                    "current": job.files_done,
+                    "total": job.files_total,
+                    "description": f"Indexing: {os.path.basename(batch[-1])}",
+                    "percentage": int((job.files_done / job.files_total) * 100) if job.files_total else 0,
+                },
+            )
+
+        await asyncio.to_thread(indexer._save_file_state, indexer.build_current_file_state())
+        _clear_checkpoint(workspace_dir)
+
+    async def _yield_to_interactive(self) -> None:
+        while interactive_active():
+            await asyncio.sleep(0.05)
+
+
+# ── Checkpoints ───────────────────────────────────────────────────────────────
+
+
+def _checkpoint_path(workspace_dir: str) -> str:
+    return os.path.join(workspace_dir, ".kogniterm", CHECKPOINT_FILENAME)
+
+
+def _load_checkpoint(workspace_dir: str) -> Optional[Dict[str, Any]]:
+    """
+    Checkpoint de una pasada interrumpida: `{"mode", "files", "done"}`, o None.
+
+    El archivo es JSON Lines: una cabecera con el modo y la lista exacta de
+    archivos de la pasada, seguida de una línea `{"done": [...]}` por lote
+    terminado. Una última línea truncada (corte a mitad de escritura) se ignora.
+    """
+    path = _checkpoint_path(workspace_dir)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    except IOError:
+        return None
+    try:
+        header = json.loads(lines[0]) if lines else None
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(header, dict) or not isinstance(header.get("files"), list):
+        return None
+    done = set()
+    for line in lines[1:]:
+        try:
+            done.update(json.loads(line).get("done", []))
+        except (json.JSONDecodeError, AttributeError):
+            continue
+    return {"mode": header.get("mode", "full"), "files": header["files"], "done": done}
+
+
+def _start_checkpoint(workspace_dir: str, mode: str, files: List[str]) -> None:
+    """Escribe la cabecera de una pasada nueva (reemplaza cualquier checkpoint previo)."""
+    path = _checkpoint_path(workspace_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"mode": mode, "files": files, "started_at": time.time()}) + "\n")
+        os.replace(tmp_path, path)
+    except IOError as e:
+        logger.error(f"Error guardando checkpoint de indexación: {e}")
+
+
+def _append_checkpoint(workspace_dir: str, batch: List[str]) -> None:
+    """Anota un lote terminado sin reescribir el checkpoint completo."""
+    try:
+        with open(_checkpoint_path(workspace_dir), "a", encoding="utf-8") as f:
+            f.write(json.dumps({"done": [os.path.abspath(p) for p in batch]}) + "\n")
+    except IOError as e:
+        logger.error(f"Error guardando checkpoint de indexación: {e}")
+
+
+def _clear_checkpoint(workspace_dir: str) -> None:
+    try:
+        os.remove(_checkpoint_path(workspace_dir))
+    except FileNotFoundError:
+        pass
+
+
+indexing_jobs = IndexingJobManager()
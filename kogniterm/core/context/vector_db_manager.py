@@ -3,6 +3,7 @@ from chromadb.config import Settings
 import os
 from typing import List, Dict, Any, Optional
 import logging
+import threading
 import uuid
 
 logger = logging.getLogger(__name__)
@@ -10,6 +11,7 @@ logger = logging.getLogger(__name__)
 class VectorDBManager:
     _instance: Optional["VectorDBManager"] = None
     _instances: dict[str, "VectorDBManager"] = {}
+    _instances_lock = threading.RLock()
 
     def __init__(self, project_path: str):
         VectorDBManager._instance = self  # Guardar como singleton
@@ -36,9 +38,21 @@ class VectorDBManager:
         if not cwd:
             cwd = os.getcwd()
         cwd = os.path.abspath(cwd)
-        if cwd not in cls._instances:
-            cls._instances[cwd] = cls(cwd)
-        return cls._instances[cwd]
+        return cls.get_for_path(cwd)
+
+    @classmethod
+    def get_for_path(cls, project_path: str) -> "VectorDBManager":
+        """Devuelve la instancia compartida para `project_path`, creándola si no existe.
+
+        Un único cliente ChromaDB por workspace: las sesiones del servidor que
+        apuntan al mismo directorio reutilizan la misma conexión.
+        """
+        path = os.path.abspath(project_path)
+        with cls._instances_lock:
+            instance = cls._instances.get(path)
+            if instance is None or getattr(instance, "client", None) is None:
+                instance = cls(path)
+            return instance
 
     @staticmethod
     def _is_corruption_error(exc: Exception) -> bool:
@@ -209,6 +223,20 @@ class VectorDBManager:
                 logger.error(f"Error clearing collection: {e}")
                 raise
 
+    def delete_file_chunks(self, file_paths: List[str]):
+        """Removes every chunk that belongs to the given files (incremental re-indexing)."""
+        if not file_paths or not self.collection:
+            return
+        try:
+            self.collection.delete(where={"file_path": {"$in": list(file_paths)}})
+        except Exception as e:
+            if self._is_corruption_error(e):
+                logger.warning("Corruption error while deleting chunks. Resetting DB...")
+                self._reset_and_reinit()
+            else:
+                logger.error(f"Error deleting chunks from ChromaDB: {e}")
+                raise
+
     def is_indexed(self) -> bool:
         """Checks if the project is already indexed."""
         try:
@@ -4,6 +4,7 @@ from .delegation_manager import DelegationManager
 from .heartbeat_monitor import HeartbeatMonitor
 from .command_rules import CommandRulesResolver
 from .agent_pool import AgentPool
+from .scheduler import AgentPreempted, SubAgentScheduler, get_subagent_scheduler
 
 __all__ = [
     "AgentRole",
@@ -15,4 +16,7 @@ __all__ = [
     "HeartbeatMonitor",
     "CommandRulesResolver",
     "AgentPool",
+    "AgentPreempted",
+    "SubAgentScheduler",
+    "get_subagent_scheduler",
 ]
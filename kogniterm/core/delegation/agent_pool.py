@@ -1,6 +1,9 @@
 import asyncio
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+
+from .models import DelegationLimits
+from .scheduler import SubAgentScheduler, get_subagent_scheduler
 
 logger = logging.getLogger(__name__)
 
@@ -9,11 +12,28 @@ class AgentPool:
     """
     Administra la ejecución paralela y asíncrona de múltiples subagentes.
     Encapsula el paralelismo verdadero usando asyncio.Semaphore.
+
+    El semáforo solo admite agentes; cada llamada LLM que hagan pasa además
+    por el `SubAgentScheduler` (cupos globales/por proveedor, prioridad,
+    deadline y presupuesto de tokens/coste de `limits`).
     """
 
-    def __init__(self, max_concurrent: int = 5):
+    def __init__(
+        self,
+        max_concurrent: int = 5,
+        scheduler: Optional[SubAgentScheduler] = None,
+        limits: Optional[DelegationLimits] = None,
+    ):
         self.semaphore = asyncio.Semaphore(max_concurrent)
         self.active_tasks: Dict[str, asyncio.Task] = {}
+        self._scheduler = scheduler
+        self.limits = limits
+
+    @property
+    def scheduler(self) -> SubAgentScheduler:
+        if self._scheduler is None:
+            self._scheduler = get_subagent_scheduler()
+        return self._scheduler
 
     async def execute_agent(
         self,
@@ -21,33 +41,50 @@ class AgentPool:
         agent_graph: Any,
         initial_state: Any,
         recursion_limit: int,
+        priority: int = 0,
+        deadline: Optional[float] = None,
     ) -> Any:
         async with self.semaphore:
             logger.info(f"AgentPool: Iniciando ejecución de subagente {agent_id}")
+            scheduler = self.scheduler
+            scheduler.register(agent_id, priority=priority, deadline=deadline, limits=self.limits)
             try:
-                return await agent_graph.ainvoke(
-                    initial_state,
-                    config={"recursion_limit": recursion_limit},
-                )
+                with scheduler.bind(agent_id):
+                    return await agent_graph.ainvoke(
+                        initial_state,
+                        config={"recursion_limit": recursion_limit},
+                    )
             except Exception as e:
                 logger.exception(f"AgentPool: Error en subagente {agent_id}: {e}")
                 raise
+            finally:
+                scheduler.unregister(agent_id)
 
     async def execute_parallel(
         self, agents_to_run: List[Dict[str, Any]]
     ) -> List[Any]:
-        tasks = []
-        for spec in agents_to_run:
+        # Los de mayor prioridad (valor menor) piden primero su plaza en el semáforo
+        order = sorted(range(len(agents_to_run)), key=lambda i: agents_to_run[i].get("priority", 0))
+        tasks: List[Optional[asyncio.Task]] = [None] * len(agents_to_run)
+        for i in order:
+            spec = agents_to_run[i]
             agent_id = spec["id"]
             graph = spec["graph"]
             initial_state = spec["initial_state"]
             limit = spec.get("recursion_limit", 1000)
 
             task = asyncio.create_task(
-                self.execute_agent(agent_id, graph, initial_state, limit)
+                self.execute_agent(
+                    agent_id,
+                    graph,
+                    initial_state,
+                    limit,
+                    priority=spec.get("priority", 0),
+                    deadline=spec.get("deadline"),
+                )
             )
             self.active_tasks[agent_id] = task
-            tasks.append(task)
+            tasks[i] = task
 
         try:
             results = await asyncio.gather(*tasks, return_exceptions=True)
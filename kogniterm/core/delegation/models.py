@@ -8,6 +8,8 @@ class DelegationLimits:
     max_depth: int = 2
     max_concurrent_children: int = 3
     child_timeout: float = 300.0  # 5 minutos
+    max_tokens_per_child: Optional[int] = None  # None = sin límite
+    max_cost_per_child: Optional[float] = None  # USD estimados, None = sin límite
 
 @dataclass
 class DelegationContext:
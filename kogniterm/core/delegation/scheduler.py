@@ -0,0 +1,373 @@
+"""
+SubAgentScheduler — Planificación de las llamadas LLM de los sub-agentes.
+
+`AgentPool` admite agentes completos; este planificador reparte lo escaso de
+verdad: las llamadas al modelo. Cada `llm_service.invoke` de un sub-agente es
+un paso que pide turno con `step()`:
+
+- Un único cupo global y un cupo por proveedor. Un cupo libre se entrega al
+  paso en espera de mayor prioridad (y deadline más cercano) cuyo proveedor
+  tenga hueco, venga del agente que venga: un proveedor saturado no bloquea a
+  los agentes que usan otro.
+- Ante un 429 el cupo del proveedor se reduce a la mitad y se recupera de uno
+  en uno con las llamadas exitosas (AIMD).
+- Cada agente registrado lleva su presupuesto de tokens y coste (desde
+  `DelegationLimits`) y su deadline. Al agotarlo se le expulsa con
+  `AgentPreempted` en su siguiente paso o en mitad del streaming.
+
+El agente en curso (y su planificador) viaja en un `ContextVar` fijado con
+`bind()`; LangGraph copia el contexto a sus hilos de nodo, así que
+`llm_service.invoke` lo ve sin cambiar la firma de los nodos.
+"""
+
+import contextvars
+import heapq
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .models import DelegationLimits
+
+logger = logging.getLogger(__name__)
+
+_current_agent: contextvars.ContextVar = contextvars.ContextVar("subagent_scheduler_agent", default=None)
+
+_PROVIDER_FAMILIES = (
+    ("gemini", "gemini"),
+    ("claude", "anthropic"),
+    ("gpt", "openai"),
+    ("o1", "openai"),
+    ("o3", "openai"),
+)
+
+
+def provider_for_model(model: Optional[str]) -> str:
+    """Proveedor de un nombre de modelo LiteLLM ("openrouter/x/y" -> "openrouter")."""
+    model = (model or "").lower()
+    if "/" in model:
+        return model.split("/", 1)[0]
+    for prefix, provider in _PROVIDER_FAMILIES:
+        if model.startswith(prefix):
+            return provider
+    return "default"
+
+
+def parse_provider_limits(spec: Optional[str]) -> Dict[str, int]:
+    """Parsea "openai=4,anthropic=2" a {"openai": 4, "anthropic": 2}. Ignora entradas inválidas."""
+    limits: Dict[str, int] = {}
+    for item in (spec or "").split(","):
+        name, _, value = item.partition("=")
+        try:
+            limits[name.strip().lower()] = max(1, int(value))
+        except ValueError:
+            continue
+    return limits
+
+
+class AgentPreempted(BaseException):
+    """
+    El planificador detuvo al sub-agente (presupuesto o deadline agotado).
+    Es BaseException, como `AgentTaskCompleted`, para que los nodos que
+    capturan Exception no la conviertan en un mensaje y el grafo se detenga.
+    """
+
+    def __init__(self, agent_id: str, reason: str):
+        super().__init__(f"{agent_id}: {reason}")
+        self.agent_id = agent_id
+        self.reason = reason
+
+
+@dataclass
+class AgentBudget:
+    """Prioridad, deadline y consumo de un sub-agente registrado."""
+
+    agent_id: str
+    priority: int = 0
+    deadline: Optional[float] = None  # time.monotonic()
+    max_tokens: Optional[int] = None
+    max_cost: Optional[float] = None
+    tokens_used: int = 0
+    cost_used: float = 0.0
+    steps: int = 0
+    preempted: Optional[str] = None
+
+    def exhausted(self, pending_tokens: int = 0) -> Optional[str]:
+        """Motivo por el que el agente debe detenerse, o None."""
+        if self.preempted:
+            return self.preempted
+        if self.max_tokens is not None and self.tokens_used + pending_tokens > self.max_tokens:
+            return f"presupuesto de tokens agotado ({self.tokens_used + pending_tokens}/{self.max_tokens})"
+        if self.max_cost is not None and self.cost_used > self.max_cost:
+            return f"presupuesto de coste agotado (${self.cost_used:.4f}/${self.max_cost:.4f})"
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            return "deadline superado"
+        return None
+
+
+@dataclass
+class _ProviderState:
+    limit: int
+    current: int
+    active: int = 0
+    successes: int = 0
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    deadline: float
+    seq: int
+    agent_id: Optional[str] = field(compare=False)
+    provider: str = field(compare=False)
+
+
+class SchedulerStep:
+    """Turno concedido por `SubAgentScheduler.step`; acumula el consumo de la llamada."""
+
+    def __init__(self, scheduler: "SubAgentScheduler", agent_id: Optional[str], provider: str):
+        self.scheduler = scheduler
+        self.agent_id = agent_id
+        self.provider = provider
+        self.rate_limited = False
+        self.failed = False
+
+    def check(self, pending_tokens: int = 0) -> None:
+        """Lanza `AgentPreempted` si los tokens en curso agotan el presupuesto del agente."""
+        self.scheduler._check(self.agent_id, pending_tokens)
+
+    def charge(self, tokens: int, cost: float = 0.0) -> None:
+        self.scheduler.charge(self.agent_id, tokens, cost)
+
+
+class SubAgentScheduler:
+    """Cupos globales y por proveedor para las llamadas LLM de los sub-agentes."""
+
+    def __init__(
+        self,
+        max_concurrent: int = 4,
+        provider_limits: Optional[Dict[str, int]] = None,
+        default_provider_limit: Optional[int] = None,
+    ):
+        self.max_concurrent = max(1, max_concurrent)
+        self.provider_limits = dict(provider_limits or {})
+        self.default_provider_limit = default_provider_limit or self.max_concurrent
+        self._cond = threading.Condition()
+        self._active = 0
+        self._providers: Dict[str, _ProviderState] = {}
+        self._agents: Dict[str, AgentBudget] = {}
+        self._waiting: List[_Waiter] = []
+        self._seq = itertools.count()
+        self.granted = 0
+        self.preemptions = 0
+
+    # ── Registro de agentes ──────────────────────────────────────────────────
+
+    def register(
+        self,
+        agent_id: str,
+        priority: int = 0,
+        deadline: Optional[float] = None,
+        limits: Optional[DelegationLimits] = None,
+    ) -> AgentBudget:
+        """
+        Registra un sub-agente. `priority` menor se atiende antes; `deadline`
+        son segundos desde ahora. Los presupuestos salen de `limits`.
+        """
+        limits = limits or DelegationLimits()
+        budget = AgentBudget(
+            agent_id=agent_id,
+            priority=priority,
+            deadline=time.monotonic() + deadline if deadline else None,
+            max_tokens=limits.max_tokens_per_child,
+            max_cost=limits.max_cost_per_child,
+        )
+        with self._cond:
+            self._agents[agent_id] = budget
+        return budget
+
+    def unregister(self, agent_id: str) -> Optional[AgentBudget]:
+        with self._cond:
+            budget = self._agents.pop(agent_id, None)
+            self._cond.notify_all()
+        return budget
+
+    def budget(self, agent_id: str) -> Optional[AgentBudget]:
+        return self._agents.get(agent_id)
+
+    @contextmanager
+    def bind(self, agent_id: str) -> Iterator[None]:
+        """Asocia las llamadas LLM de este contexto al agente `agent_id` de este planificador."""
+        token = _current_agent.set((self, agent_id))
+        try:
+            yield
+        finally:
+            _current_agent.reset(token)
+
+    @staticmethod
+    def current() -> Optional[Tuple["SubAgentScheduler", str]]:
+        """(planificador, agent_id) fijados con `bind()` en este contexto, o None."""
+        return _current_agent.get()
+
+    def preempt(self, agent_id: str, reason: str = "detenido por el planificador") -> None:
+        """Marca al agente para que su próximo paso lance `AgentPreempted`."""
+        with self._cond:
+            budget = self._agents.get(agent_id)
+            if budget and not budget.preempted:
+                budget.preempted = reason
+                self._cond.notify_all()
+
+    # ── Pasos (llamadas LLM) ─────────────────────────────────────────────────
+
+    @contextmanager
+    def step(self, provider: str, agent_id: Optional[str] = None) -> Iterator[SchedulerStep]:
+        """
+        Bloquea el hilo hasta obtener un cupo para una llamada a `provider`.
+        Lanza `AgentPreempted` si el agente agotó su presupuesto o deadline.
+        """
+        if agent_id is None:
+            bound = _current_agent.get()
+            agent_id = bound[1] if bound and bound[0] is self else None
+        self._acquire(agent_id, provider)
+        step = SchedulerStep(self, agent_id, provider)
+        try:
+            yield step
+        except AgentPreempted:
+            raise
+        except BaseException:
+            step.failed = True
+            raise
+        finally:
+            self._release(step)
+
+    def _provider(self, provider: str) -> _ProviderState:
+        state = self._providers.get(provider)
+        if state is None:
+            limit = self.provider_limits.get(provider, self.default_provider_limit)
+            state = self._providers[provider] = _ProviderState(limit=limit, current=limit)
+        return state
+
+    def _preempt_reason(self, agent_id: Optional[str], pending_tokens: int = 0) -> Optional[str]:
+        budget = self._agents.get(agent_id) if agent_id else None
+        if budget is None:
+            return None
+        reason = budget.exhausted(pending_tokens)
+        if reason and not budget.preempted:
+            budget.preempted = reason
+            self.preemptions += 1
+            logger.info("SubAgentScheduler: sub-agente %s detenido: %s", agent_id, reason)
+        return reason
+
+    def _check(self, agent_id: Optional[str], pending_tokens: int = 0) -> None:
+        with self._cond:
+            reason = self._preempt_reason(agent_id, pending_tokens)
+        if reason:
+            raise AgentPreempted(agent_id, reason)
+
+    def _next_grantable(self) -> Optional[_Waiter]:
+        if self._active >= self.max_concurrent:
+            return None
+        for waiter in sorted(self._waiting):
+            state = self._provider(waiter.provider)
+            if state.active < state.current:
+                return waiter
+        return None
+
+    def _acquire(self, agent_id: Optional[str], provider: str) -> None:
+        budget = self._agents.get(agent_id) if agent_id else None
+        deadline = budget.deadline if budget and budget.deadline is not None else float("inf")
+        waiter = _Waiter(
+            priority=budget.priority if budget else 0,
+            deadline=deadline,
+            seq=next(self._seq),
+            agent_id=agent_id,
+            provider=provider,
+        )
+        with self._cond:
+            heapq.heappush(self._waiting, waiter)
+            try:
+                while True:
+                    reason = self._preempt_reason(agent_id)
+                    if reason:
+                        raise AgentPreempted(agent_id, reason)
+                    if self._next_grantable() is waiter:
+                        break
+                    timeout = None if deadline == float("inf") else max(0.0, deadline - time.monotonic())
+                    self._cond.wait(timeout=min(timeout, 1.0) if timeout is not None else 1.0)
+            finally:
+                self._waiting.remove(waiter)
+                heapq.heapify(self._waiting)
+
+            self._active += 1
+            self._provider(provider).active += 1
+            self.granted += 1
+            if budget:
+                budget.steps += 1
+            self._cond.notify_all()
+
+    def _release(self, step: SchedulerStep) -> None:
+        with self._cond:
+            self._active -= 1
+            state = self._provider(step.provider)
+            state.active -= 1
+            if step.rate_limited:
+                state.current = max(1, state.current // 2)
+                state.successes = 0
+                logger.info(
+                    "SubAgentScheduler: 429 de %s, cupo reducido a %d", step.provider, state.current
+                )
+            elif not step.failed and state.current < state.limit:
+                state.successes += 1
+                if state.successes >= state.current:
+                    state.current += 1
+                    state.successes = 0
+            self._cond.notify_all()
+
+    def report_rate_limit(self, provider: str) -> None:
+        """Reduce el cupo de `provider` tras un 429 recibido fuera de un paso."""
+        with self._cond:
+            state = self._provider(provider)
+            state.current = max(1, state.current // 2)
+            state.successes = 0
+
+    def charge(self, agent_id: Optional[str], tokens: int, cost: float = 0.0) -> None:
+        """Anota el consumo de una llamada ya terminada."""
+        if not agent_id:
+            return
+        with self._cond:
+            budget = self._agents.get(agent_id)
+            if budget is not None:
+                budget.tokens_used += max(0, tokens)
+                budget.cost_used += max(0.0, cost)
+
+    def stats(self) -> Dict[str, object]:
+        with self._cond:
+            return {
+                "active": self._active,
+                "waiting": len(self._waiting),
+                "granted": self.granted,
+                "preemptions": self.preemptions,
+                "providers": {name: (s.active, s.current, s.limit) for name, s in self._providers.items()},
+            }
+
+
+_scheduler: Optional[SubAgentScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_subagent_scheduler() -> SubAgentScheduler:
+    """Planificador global del proceso, configurado desde `settings`."""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                from kogniterm.core.config import settings
+
+                _scheduler = SubAgentScheduler(
+                    max_concurrent=settings.subagent_max_llm_calls,
+                    provider_limits=parse_provider_limits(settings.subagent_provider_limits),
+                )
+    return _scheduler
@@ -1,8 +1,31 @@
+"""
+Telemetría de sesión: costes de LLM y trazas de delegación.
+
+Registrar un evento es O(1) y no toca disco: el evento se encola y un hilo de
+fondo (`TelemetrySink`) lo escribe por lotes en un archivo JSONL de solo
+anexado, `.kogniterm/telemetry/session_<id>.jsonl`, que se rota al superar
+`max_bytes`. Tras cada lote se reescribe además un resumen agregado
+(`session_<id>.json`) con los totales, el desglose por modelo y los últimos
+eventos; su tamaño está acotado y no crece con la duración de la sesión.
+"""
+
+import atexit
 import json
+import logging
 import os
+import threading
 import time
+import weakref
+from collections import deque
 from dataclasses import dataclass, field, asdict
-from typing import List, Optional
+from typing import Any, Callable, Dict, List, Optional
+
+from kogniterm.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Eventos recientes que conserva el resumen agregado
+ROLLUP_RECENT_EVENTS = 50
 
 
 @dataclass
@@ -26,13 +49,131 @@ class DelegationTrace:
     timestamp: float = field(default_factory=time.time)
 
 
+class TelemetrySink:
+    """
+    Escritor por lotes de eventos JSONL con rotación.
+
+    `submit` solo encola; el hilo de fondo (arrancado con el primer evento)
+    vacía la cola cada `flush_interval` segundos o en cuanto se acumulan
+    `batch_size` eventos, con una única escritura por lote. `rollup`, si se
+    indica, se invoca tras cada lote para escribir el resumen agregado.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        rollup: Optional[Callable[[], None]] = None,
+        flush_interval: Optional[float] = None,
+        batch_size: int = 256,
+        max_bytes: Optional[int] = None,
+        backups: int = 3,
+    ):
+        self.path = path
+        self.rollup = rollup
+        self.flush_interval = flush_interval if flush_interval is not None else settings.telemetry_flush_interval
+        self.batch_size = max(1, batch_size)
+        self.max_bytes = max_bytes if max_bytes is not None else settings.telemetry_max_bytes
+        self.backups = max(0, backups)
+        self._queue: deque = deque()
+        self._wakeup = threading.Event()
+        self._write_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self.written = 0
+        _live_sinks.add(self)
+
+    def submit(self, event: Dict[str, Any]) -> None:
+        """Encola un evento para el siguiente lote (no bloquea)."""
+        self._queue.append(event)
+        if self._thread is None:
+            self._start()
+        if len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+
+    def _start(self) -> None:
+        with self._start_lock:
+            if self._thread is not None or self._closed:
+                return
+            self._thread = threading.Thread(target=self._run, name="telemetry-sink", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"No se pudo escribir la telemetría en {self.path}: {e}")
+
+    def flush(self) -> int:
+        """Escribe los eventos pendientes y actualiza el resumen. Retorna cuántos escribió."""
+        with self._write_lock:
+            batch = []
+            while self._queue:
+                batch.append(self._queue.popleft())
+            if batch:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                payload = "".join(json.dumps(e, ensure_ascii=False, default=str) + "\n" for e in batch)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(payload)
+                self.written += len(batch)
+                self._rotate_if_needed()
+            if batch and self.rollup:
+                self.rollup()
+            return len(batch)
+
+    def _rotate_if_needed(self) -> None:
+        if self.max_bytes <= 0:
+            return
+        try:
+            if os.path.getsize(self.path) < self.max_bytes:
+                return
+        except OSError:
+            return
+        base, ext = os.path.splitext(self.path)
+        if self.backups == 0:
+            os.remove(self.path)
+            return
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{base}.{i}{ext}"
+            if os.path.exists(src):
+                os.replace(src, f"{base}.{i + 1}{ext}")
+        os.replace(self.path, f"{base}.1{ext}")
+
+    def close(self) -> None:
+        """Detiene el hilo de fondo y escribe lo pendiente."""
+        self._closed = True
+        self._wakeup.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=5)
+        self.flush()
+        _live_sinks.discard(self)
+
+
+_live_sinks: "weakref.WeakSet[TelemetrySink]" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_all_sinks() -> None:
+    for sink in list(_live_sinks):
+        try:
+            sink.close()
+        except Exception:
+            pass
+
+
 class TelemetryTracker:
     """
     Rastrea costes y trazas de ejecución por sesión (KiloSession-like).
-    Persiste los datos en .kogniterm/telemetry/session_<id>.json.
+    Los eventos se anexan a .kogniterm/telemetry/session_<id>.jsonl y el
+    resumen agregado se guarda en .kogniterm/telemetry/session_<id>.json.
     """
 
-    def __init__(self, session_id: str, workspace_dir: str):
+    def __init__(self, session_id: str, workspace_dir: str, flush_interval: Optional[float] = None,
+                 max_bytes: Optional[int] = None):
         self.session_id = session_id
         self.workspace_dir = workspace_dir
         self.start_time = time.time()
@@ -41,6 +182,23 @@ class TelemetryTracker:
         self.total_cost: float = 0.0
         self.total_input_tokens: int = 0
         self.total_output_tokens: int = 0
+        self.models: Dict[str, Dict[str, Any]] = {}
+        self.delegation_status: Dict[str, int] = {}
+        self._recent: Dict[str, deque] = {
+            "llm_calls": deque(maxlen=ROLLUP_RECENT_EVENTS),
+            "delegations": deque(maxlen=ROLLUP_RECENT_EVENTS),
+        }
+        self._lock = threading.Lock()
+
+        telemetry_dir = os.path.join(self.workspace_dir, ".kogniterm", "telemetry")
+        self.trace_path = os.path.join(telemetry_dir, f"session_{self.session_id}.json")
+        self.events_path = os.path.join(telemetry_dir, f"session_{self.session_id}.jsonl")
+        self.sink = TelemetrySink(
+            self.events_path,
+            rollup=self._write_rollup,
+            flush_interval=flush_interval,
+            max_bytes=max_bytes,
+        )
 
     def record_llm_call(
         self,
@@ -50,11 +208,19 @@ class TelemetryTracker:
         cost: float,
     ) -> None:
         trace = LLMCallTrace(model, input_tokens, output_tokens, cost)
-        self.llm_calls.append(trace)
-        self.total_cost += cost
-        self.total_input_tokens += input_tokens
-        self.total_output_tokens += output_tokens
-        self.save_trace()
+        event = asdict(trace)
+        with self._lock:
+            self.llm_calls.append(trace)
+            self.total_cost += cost
+            self.total_input_tokens += input_tokens
+            self.total_output_tokens += output_tokens
+            stats = self.models.setdefault(model, {"calls": 0, "input_tokens": 0, "output_tokens": 0, "cost": 0.0})
+            stats["calls"] += 1
+            stats["input_tokens"] += input_tokens
+            stats["output_tokens"] += output_tokens
+            stats["cost"] += cost
+            self._recent["llm_calls"].append(event)
+        self.sink.submit(dict(event, type="llm_call"))
 
     def record_delegation(
         self,
@@ -75,25 +241,48 @@ class TelemetryTracker:
             duration=duration,
             summary=summary,
         )
-        self.delegations.append(trace)
-        self.save_trace()
-
-    def save_trace(self) -> None:
-        telemetry_dir = os.path.join(self.workspace_dir, ".kogniterm", "telemetry")
-        os.makedirs(telemetry_dir, exist_ok=True)
-        file_path = os.path.join(telemetry_dir, f"session_{self.session_id}.json")
+        event = asdict(trace)
+        with self._lock:
+            self.delegations.append(trace)
+            self.delegation_status[status] = self.delegation_status.get(status, 0) + 1
+            self._recent["delegations"].append(event)
+        self.sink.submit(dict(event, type="delegation"))
 
+    def rollup(self) -> Dict[str, Any]:
+        """Resumen agregado de la sesión (totales, desglose y últimos eventos)."""
         now = time.time()
-        data = {
-            "session_id": self.session_id,
-            "start_time": self.start_time,
-            "end_time": now,
-            "total_duration": now - self.start_time,
-            "total_cost": self.total_cost,
-            "total_input_tokens": self.total_input_tokens,
-            "total_output_tokens": self.total_output_tokens,
-            "llm_calls": [asdict(c) for c in self.llm_calls],
-            "delegations": [asdict(d) for d in self.delegations],
-        }
-        with open(file_path, "w", encoding="utf-8") as f:
+        with self._lock:
+            return {
+                "session_id": self.session_id,
+                "start_time": self.start_time,
+                "end_time": now,
+                "total_duration": now - self.start_time,
+                "total_cost": self.total_cost,
+                "total_input_tokens": self.total_input_tokens,
+                "total_output_tokens": self.total_output_tokens,
+                "llm_call_count": len(self.llm_calls),
+                "delegation_count": len(self.delegations),
+                "models": {m: dict(s) for m, s in self.models.items()},
+                "delegation_status": dict(self.delegation_status),
+                "events_file": os.path.basename(self.events_path),
+                "llm_calls": list(self._recent["llm_calls"]),
+                "delegations": list(self._recent["delegations"]),
+            }
+
+    def _write_rollup(self) -> None:
+        data = self.rollup()
+        os.makedirs(os.path.dirname(self.trace_path), exist_ok=True)
+        tmp_path = f"{self.trace_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
             json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.trace_path)
+
+    def flush(self) -> None:
+        """Escribe de inmediato los eventos pendientes y el resumen."""
+        self.sink.flush()
+
+    def save_trace(self) -> None:
+        self.flush()
+
+    def close(self) -> None:
+        self.sink.close()
@@ -0,0 +1,257 @@
+"""
+Despacho anticipado de herramientas mientras el modelo sigue generando.
+
+Con tool calls nativos, los argumentos de cada llamada llegan por deltas y el
+`AIMessage` final solo se emite cuando termina el stream, de modo que las
+herramientas de un turno con varias llamadas esperan a que el modelo acabe
+de escribir todas (y el texto que las acompaña). Aquí, en cuanto el JSON de
+argumentos de una llamada está completo, la herramienta se lanza en segundo
+plano; cuando el agente la ejecuta después, recoge ese resultado en lugar de
+volver a invocarla.
+
+Solo se adelantan herramientas declaradas `read_only` e `idempotent` (sin
+`spawns_process`), y siguiendo el orden del modelo: una llamada se lanza
+únicamente si todas las anteriores del turno también se lanzaron, así una
+lectura nunca se adelanta a una escritura que el modelo pidió antes. Si el
+stream se interrumpe o falla, las llamadas en curso se cancelan y sus
+resultados se descartan.
+
+Uso:
+    dispatcher = EarlyToolDispatcher.for_service(llm_service)
+    stream = dispatcher.stream(delegation_context) if dispatcher else None
+    ...
+    stream.observe(tool_calls)      # tras acumular cada delta de tool_calls
+    stream.cancel()                 # si el stream se interrumpe
+    ...
+    res = EarlyToolDispatcher.claim_for(llm_service, tc, delegation_context)
+    EarlyToolDispatcher.discard_for(llm_service, tc)  # en cualquier otra salida
+"""
+
+import concurrent.futures
+import contextvars
+import json
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from .skills.tool_effects import ToolEffects
+
+logger = logging.getLogger(__name__)
+
+# Resultados pendientes de reclamar que se conservan como máximo
+MAX_PENDING = 64
+
+
+@dataclass
+class _EarlyCall:
+    name: str
+    args: Dict[str, Any]
+    context: Any
+    future: concurrent.futures.Future
+    cancelled: threading.Event = field(default_factory=threading.Event)
+
+
+def _complete_args(raw: str) -> Optional[Dict[str, Any]]:
+    """Argumentos de una llamada nativa si su JSON ya está completo, o None."""
+    raw = (raw or "").strip()
+    if not raw.endswith("}"):
+        return None
+    try:
+        args = json.loads(raw)
+    except ValueError:
+        return None
+    return args if isinstance(args, dict) else None
+
+
+class EarlyToolDispatcher:
+    """Ejecuta en segundo plano las llamadas de solo lectura completas de un stream en curso."""
+
+    def __init__(
+        self,
+        run_tool: Callable[[str, Dict[str, Any], Any], Any],
+        effects_lookup: Callable[[str, Dict[str, Any]], Optional[ToolEffects]],
+        max_workers: int = 4,
+    ):
+        self._run_tool = run_tool
+        self._effects_lookup = effects_lookup
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="kogniterm-early-tool"
+        )
+        self._calls: "OrderedDict[str, _EarlyCall]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.dispatched = 0
+        self.claimed = 0
+        self.cancelled = 0
+
+    @staticmethod
+    def for_service(llm_service: Any) -> Optional["EarlyToolDispatcher"]:
+        """Despachador de la sesión de `llm_service` (None si está desactivado)."""
+        from .config import settings
+
+        if not settings.early_tool_dispatch:
+            return None
+        dispatcher = getattr(llm_service, "_early_tool_dispatcher", None)
+        if isinstance(dispatcher, EarlyToolDispatcher):
+            return dispatcher
+
+        def run_tool(name: str, args: Dict[str, Any], delegation_context: Any) -> Any:
+            tool = llm_service.get_tool(name)
+            if tool is None:
+                raise LookupError(f"Herramienta '{name}' no encontrada")
+            res = llm_service._invoke_tool_with_interrupt(tool, args, delegation_context)
+            if isinstance(res, (str, bytes, dict, list)) or not hasattr(res, "__iter__"):
+                return res
+            # La salida en streaming se consume aquí; quien la reclame la recorre igual
+            return iter(list(res))
+
+        def effects_lookup(name: str, args: Dict[str, Any]) -> Optional[ToolEffects]:
+            sm = getattr(llm_service, "skill_manager", None)
+            get_effects = getattr(sm, "get_tool_effects", None)
+            effects = get_effects(name) if callable(get_effects) else None
+            return effects.resolve(args) if isinstance(effects, ToolEffects) else None
+
+        dispatcher = EarlyToolDispatcher(run_tool, effects_lookup)
+        try:
+            llm_service._early_tool_dispatcher = dispatcher
+        except AttributeError:
+            pass
+        return dispatcher
+
+    @staticmethod
+    def claim_for(llm_service: Any, tool_call: Dict[str, Any], delegation_context: Any = None) -> Optional[Any]:
+        """Resultado anticipado de `tool_call` en la sesión de `llm_service`, si lo hay."""
+        dispatcher = getattr(llm_service, "_early_tool_dispatcher", None)
+        if not isinstance(dispatcher, EarlyToolDispatcher):
+            return None
+        return dispatcher.claim(
+            tool_call.get("id"), tool_call.get("name"), tool_call.get("args"), delegation_context
+        )
+
+    @staticmethod
+    def discard_for(llm_service: Any, tool_call: Dict[str, Any]) -> None:
+        """Cancela el resultado anticipado de `tool_call` si nadie lo reclamó (p. ej. se sirvió desde caché)."""
+        dispatcher = getattr(llm_service, "_early_tool_dispatcher", None)
+        call_id = tool_call.get("id") if isinstance(tool_call, dict) else None
+        if isinstance(dispatcher, EarlyToolDispatcher) and call_id:
+            dispatcher.cancel({call_id})
+
+    def eligible(self, name: str, args: Dict[str, Any], delegation_context: Any = None) -> bool:
+        blocked = getattr(delegation_context, "blocked_tools", None) or ()
+        if name in blocked:
+            return False
+        effects = self._effects_lookup(name, args)
+        return bool(
+            effects is not None
+            and effects.read_only
+            and effects.idempotent
+            and not effects.spawns_process
+        )
+
+    def stream(self, delegation_context: Any = None) -> "EarlyDispatchStream":
+        return EarlyDispatchStream(self, delegation_context)
+
+    # ── Ejecución ────────────────────────────────────────────────────────────
+
+    def dispatch(self, call_id: str, name: str, args: Dict[str, Any], delegation_context: Any = None) -> None:
+        """Lanza la llamada en segundo plano con el contexto (cwd, workspace...) de quien llama."""
+        ctx = contextvars.copy_context()
+        future = self._executor.submit(ctx.run, self._run_tool, name, args, delegation_context)
+        call = _EarlyCall(name=name, args=args, context=delegation_context, future=future)
+        with self._lock:
+            self._calls[call_id] = call
+            self.dispatched += 1
+            while len(self._calls) > MAX_PENDING:
+                _, old = self._calls.popitem(last=False)
+                old.future.cancel()
+        logger.debug("Herramienta '%s' (%s) despachada durante el stream.", name, call_id)
+
+    def claim(
+        self, call_id: Optional[str], name: Optional[str], args: Any, delegation_context: Any = None
+    ) -> Optional[Any]:
+        """
+        Salida (lo que habría retornado `_invoke_tool_with_interrupt`, ya
+        consumido) de una llamada despachada antes de tiempo, o None si
+        no se despachó, fue cancelada, falló o el modelo la terminó con otros
+        argumentos: en ese caso quien llama la ejecuta de la forma habitual.
+        """
+        if not call_id:
+            return None
+        with self._lock:
+            call = self._calls.pop(call_id, None)
+        if call is None or call.cancelled.is_set():
+            return None
+        if call.name != name or call.args != args or call.context is not delegation_context:
+            call.future.cancel()
+            return None
+        try:
+            result = call.future.result()
+        except (concurrent.futures.CancelledError, Exception) as e:
+            logger.debug("Resultado anticipado de '%s' descartado: %s", name, e)
+            return None
+        with self._lock:
+            self.claimed += 1
+        return result
+
+    def cancel(self, call_ids: Set[str]) -> None:
+        """Descarta las llamadas indicadas; las que ya corren terminan sin que nadie las recoja."""
+        with self._lock:
+            for call_id in call_ids:
+                call = self._calls.pop(call_id, None)
+                if call is not None:
+                    call.cancelled.set()
+                    call.future.cancel()
+                    self.cancelled += 1
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "dispatched": self.dispatched,
+                "claimed": self.claimed,
+                "cancelled": self.cancelled,
+                "pending": len(self._calls),
+            }
+
+
+class EarlyDispatchStream:
+    """Seguimiento de las llamadas nativas de un único stream."""
+
+    def __init__(self, dispatcher: EarlyToolDispatcher, delegation_context: Any = None):
+        self.dispatcher = dispatcher
+        self.delegation_context = delegation_context
+        self._next = 0
+        self._blocked = False
+        self._dispatched: Set[str] = set()
+
+    def observe(self, tool_calls: List[Dict[str, Any]]) -> None:
+        """
+        Revisa las llamadas acumuladas (formato delta: id + function.name/arguments)
+        y despacha las nuevas que ya estén completas y sean elegibles, en orden.
+        """
+        while not self._blocked and self._next < len(tool_calls):
+            tc = tool_calls[self._next]
+            function = tc.get("function") or {}
+            name = function.get("name")
+            args = _complete_args(function.get("arguments", ""))
+            if not name or not tc.get("id") or args is None:
+                # Aún llegando: las siguientes esperan a que se complete
+                return
+            if not self.dispatcher.eligible(name, args, self.delegation_context):
+                # A partir de aquí el orden importa (podría escribir): no se adelanta nada más
+                self._blocked = True
+                return
+            self.dispatcher.dispatch(tc["id"], name, args, self.delegation_context)
+            self._dispatched.add(tc["id"])
+            self._next += 1
+
+    def cancel(self) -> None:
+        if self._dispatched:
+            self.dispatcher.cancel(self._dispatched)
+            self._dispatched = set()
+        self._blocked = True
+
+    @property
+    def dispatched(self) -> Set[str]:
+        return set(self._dispatched)
@@ -9,6 +9,8 @@ import time
 import threading
 from contextlib import contextmanager
 
+from .tracing import traced
+
 
 class AutoSavingMessageList(list):
     """Lista que persiste automáticamente el historial tras cada mutación con debounce."""
@@ -161,14 +163,15 @@ class HistoryManager:
     SUMMARY_TRUNCATION_SUFFIX = "... [Resumen truncado para evitar bucles]"
     MAX_TOOL_MESSAGE_CONTENT_LENGTH_ASSUMED = 100000
     
-    def __init__(self, history_file_path: str, max_history_messages: int = 100, max_history_chars: int = 150000, auto_save_interval: Optional[float] = None, thread_manager: Optional[Any] = None, llm_service: Optional[Any] = None):
+    def __init__(self, history_file_path: str, max_history_messages: int = 100, max_history_chars: int = 150000, auto_save_interval: Optional[float] = None, thread_manager: Optional[Any] = None, llm_service: Optional[Any] = None, tokenizer: Optional[Any] = None):
         self.history_file_path = history_file_path
         self.max_history_messages = max_history_messages
         self.max_history_chars = max_history_chars
         self._save_lock = threading.RLock()
         self._conversation_history = AutoSavingMessageList()
         self.conversation_history = self._load_history() or []
-        self.tokenizer = tiktoken.encoding_for_model("gpt-4")
+        # Permite reutilizar un tokenizer ya cargado (p. ej. el del LLMService compartido)
+        self.tokenizer = tokenizer or tiktoken.encoding_for_model("gpt-4")
         self._tokenizer = self.tokenizer
         self._message_length_cache: Dict[int, int] = {}
         
@@ -755,6 +758,7 @@ class HistoryManager:
                         break
         return additional_length
 
+    @traced("history.summarize", lambda self, history, *a, **k: {"messages": len(history)})
     def _summarize_and_compress(self, 
                                history: List[BaseMessage],
                                summarize_method: Callable[[List[BaseMessage]], str],
@@ -814,6 +818,7 @@ class HistoryManager:
             console.print(f"[green]Historial resumido. {len(messages_to_summarize)} mensajes condensados en un resumen manteniendo el objetivo inicial.[/green]")
         return new_history
 
+    @traced("history.process")
     def get_processed_history_for_llm(self, 
                                      llm_service_summarize_method: Callable[[List[BaseMessage]], str],
                                      max_history_messages: int = 100,
@@ -0,0 +1,304 @@
+"""
+HttpCache — Caché HTTP en disco con peticiones condicionales y sesión compartida.
+
+Las skills de red (`web_fetch`, `github`) repetían las mismas descargas en cada
+vuelta de un bucle de investigación. Esta caché:
+
+- Reutiliza una única `requests.Session` con pool de conexiones por host.
+- Guarda las respuestas 200 en disco (`~/.kogniterm/cache/http` por defecto):
+  metadatos en `<clave>.json`, cuerpo en `<clave>.body`.
+- Sirve sin red mientras la respuesta esté fresca (`Cache-Control: max-age`,
+  `Expires`, o la heurística del 10 % de la edad de `Last-Modified`).
+- Pasada la frescura, revalida con `If-None-Match` / `If-Modified-Since`; un
+  304 reutiliza el cuerpo guardado.
+- Respeta `no-store` (no se guarda) y `no-cache` (se revalida siempre).
+
+La clave incluye la URL, `Accept` y una huella de `Authorization` (nunca el
+token), así que las respuestas de tokens distintos no se mezclan.
+
+Uso:
+    resp = get_http_cache().get(url, headers={"Accept": "application/json"})
+    resp.status_code, resp.text, resp.from_cache
+"""
+
+import email.utils
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+_STORED_HEADERS = ("etag", "last-modified", "content-type", "cache-control", "expires", "date")
+_MAX_AGE_RE = re.compile(r"max-age\s*=\s*(\d+)")
+# Tope de la frescura heurística (sin max-age ni Expires)
+HEURISTIC_MAX_LIFETIME = 24 * 3600
+
+
+@dataclass
+class CachedResponse:
+    """Respuesta HTTP, venga de la red o de la caché."""
+
+    url: str
+    status_code: int
+    headers: Dict[str, str] = field(default_factory=dict)
+    content: bytes = b""
+    from_cache: bool = False
+    revalidated: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status_code < 400
+
+    @property
+    def text(self) -> str:
+        encoding = requests.utils.get_encoding_from_headers(self.headers) or "utf-8"
+        try:
+            return self.content.decode(encoding, errors="replace")
+        except LookupError:
+            return self.content.decode("utf-8", errors="replace")
+
+    def json(self) -> Any:
+        return json.loads(self.text)
+
+
+def _parse_http_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def freshness_lifetime(headers: Dict[str, str]) -> float:
+    """Segundos durante los que la respuesta puede servirse sin revalidar."""
+    cache_control = headers.get("cache-control", "").lower()
+    if "no-cache" in cache_control or "no-store" in cache_control:
+        return 0.0
+    match = _MAX_AGE_RE.search(cache_control)
+    if match:
+        return float(match.group(1))
+    date = _parse_http_date(headers.get("date")) or time.time()
+    expires = _parse_http_date(headers.get("expires"))
+    if expires is not None:
+        return max(0.0, expires - date)
+    last_modified = _parse_http_date(headers.get("last-modified"))
+    if last_modified is not None:
+        return min(HEURISTIC_MAX_LIFETIME, max(0.0, (date - last_modified) * 0.1))
+    return 0.0
+
+
+class HttpCache:
+    """Sesión HTTP con pool de conexiones y caché en disco según las cabeceras de caché."""
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        max_bytes: Optional[int] = None,
+        enabled: Optional[bool] = None,
+        pool_size: int = 16,
+        timeout: float = 30.0,
+    ):
+        if cache_dir is None or max_bytes is None or enabled is None:
+            from .config import settings
+
+            cache_dir = cache_dir or settings.http_cache_dir or os.path.expanduser("~/.kogniterm/cache/http")
+            max_bytes = settings.http_cache_max_bytes if max_bytes is None else max_bytes
+            enabled = settings.http_cache_enabled if enabled is None else enabled
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+
+    # ── Claves y disco ───────────────────────────────────────────────────────
+
+    @staticmethod
+    def cache_key(url: str, headers: Optional[Dict[str, str]] = None) -> str:
+        lowered = {k.lower(): v for k, v in (headers or {}).items()}
+        auth = lowered.get("authorization")
+        auth_print = hashlib.sha256(auth.encode()).hexdigest()[:16] if auth else ""
+        raw = f"{url}\n{lowered.get('accept', '')}\n{auth_print}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _paths(self, key: str):
+        base = os.path.join(self.cache_dir, key[:2], key)
+        return base + ".json", base + ".body"
+
+    def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        meta_path, body_path = self._paths(key)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                meta["body"] = f.read()
+            return meta
+        except (OSError, ValueError):
+            return None
+
+    def _write_atomic(self, path: str, data: bytes) -> None:
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def _store(self, key: str, url: str, status: int, headers: Dict[str, str], body: Optional[bytes]) -> None:
+        meta_path, body_path = self._paths(key)
+        meta = {
+            "url": url,
+            "status": status,
+            "headers": headers,
+            "stored_at": time.time(),
+            "lifetime": freshness_lifetime(headers),
+        }
+        try:
+            os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+            if body is not None:
+                try:
+                    previous = os.path.getsize(body_path)
+                except OSError:
+                    previous = 0
+                self._write_atomic(body_path, body)
+                # Al re-guardar una clave se sustituye su cuerpo: solo cuenta la diferencia
+                self._account(len(body) - previous)
+            self._write_atomic(meta_path, json.dumps(meta).encode("utf-8"))
+        except OSError as e:
+            logger.debug("HttpCache: no se pudo guardar %s: %s", url, e)
+
+    def _account(self, added: int) -> None:
+        with self._lock:
+            if self._size is None:
+                # El primer recuento ya incluye lo que se acaba de escribir
+                self._size = self._scan_size()
+            else:
+                self._size += added
+            over = self._size > self.max_bytes > 0
+        if over:
+            self._evict()
+
+    def _scan_size(self) -> int:
+        total = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".body"):
+                    try:
+                        total += os.path.getsize(os.path.join(root, name))
+                    except OSError:
+                        pass
+        return total
+
+    def _evict(self) -> None:
+        """Borra las entradas menos recientes hasta quedar en el 90 % de `max_bytes`."""
+        bodies = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".body"):
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                        bodies.append((st.st_mtime, st.st_size, path))
+                    except OSError:
+                        pass
+        bodies.sort()
+        total = sum(size for _, size, _ in bodies)
+        target = int(self.max_bytes * 0.9)
+        for _, size, path in bodies:
+            if total <= target:
+                break
+            for victim in (path, path[: -len(".body")] + ".json"):
+                try:
+                    os.remove(victim)
+                except OSError:
+                    pass
+            total -= size
+        with self._lock:
+            self._size = total
+
+    # ── API ──────────────────────────────────────────────────────────────────
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None, timeout: Optional[float] = None) -> CachedResponse:
+        """GET con caché. Errores de red se propagan como `requests.RequestException`."""
+        headers = dict(headers or {})
+        timeout = timeout or self.timeout
+        if not self.enabled:
+            return self._fetch(url, headers, timeout)
+
+        key = self.cache_key(url, headers)
+        cached = self._load(key)
+        if cached is not None:
+            age = time.time() - cached["stored_at"]
+            if age < cached.get("lifetime", 0):
+                self.hits += 1
+                return CachedResponse(url, cached["status"], cached["headers"], cached["body"], from_cache=True)
+            stored = cached["headers"]
+            if stored.get("etag"):
+                headers["If-None-Match"] = stored["etag"]
+            if stored.get("last-modified"):
+                headers["If-Modified-Since"] = stored["last-modified"]
+
+        resp = self._fetch(url, headers, timeout)
+        if resp.status_code == 304 and cached is not None:
+            self.revalidations += 1
+            merged = dict(cached["headers"])
+            merged.update({k: v for k, v in resp.headers.items() if k in _STORED_HEADERS})
+            self._store(key, url, cached["status"], merged, None)
+            try:
+                os.utime(self._paths(key)[1])
+            except OSError:
+                pass
+            return CachedResponse(url, cached["status"], merged, cached["body"], from_cache=True, revalidated=True)
+
+        self.misses += 1
+        cache_control = resp.headers.get("cache-control", "").lower()
+        has_validators = "etag" in resp.headers or "last-modified" in resp.headers
+        if resp.status_code == 200 and "no-store" not in cache_control and (
+            has_validators or freshness_lifetime(resp.headers) > 0
+        ):
+            self._store(key, url, resp.status_code, resp.headers, resp.content)
+        return resp
+
+    def _fetch(self, url: str, headers: Dict[str, str], timeout: float) -> CachedResponse:
+        raw = self.session.get(url, headers=headers, timeout=timeout)
+        kept = {k.lower(): v for k, v in raw.headers.items() if k.lower() in _STORED_HEADERS}
+        return CachedResponse(raw.url or url, raw.status_code, kept, raw.content)
+
+    def clear(self) -> None:
+        import shutil
+
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        with self._lock:
+            self._size = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "revalidations": self.revalidations, "misses": self.misses}
+
+
+_http_cache: Optional[HttpCache] = None
+_http_cache_lock = threading.Lock()
+
+
+def get_http_cache() -> HttpCache:
+    """Caché HTTP global del proceso, configurada desde `settings`."""
+    global _http_cache
+    if _http_cache is None:
+        with _http_cache_lock:
+            if _http_cache is None:
+                _http_cache = HttpCache()
+    return _http_cache
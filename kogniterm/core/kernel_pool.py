@@ -0,0 +1,422 @@
+"""
+KernelPool — Pool de kernels de Jupyter precalentados para `python_executor`.
+
+Arrancar un kernel cuesta varios segundos; el pool los arranca en segundo plano
+al inicio de la sesión para que la primera ejecución de código sea inmediata.
+Cada agente (clave = `agent_id`, o "main" para el agente principal) recibe su
+propio kernel y lo conserva entre ejecuciones, de modo que sub-agentes en
+paralelo no pisan el estado de los demás. Un kernel solo atiende una ejecución
+a la vez: si el mismo agente lanza dos, la segunda espera.
+
+- Los kernels precalentados ("de reserva") no tienen clave; el primer préstamo
+  de una clave nueva toma uno y se prepara otro de reemplazo.
+- Los kernels con clave ociosos más de `idle_timeout` segundos se cierran.
+- Con el pool lleno, una clave nueva ocupa el hueco de un kernel sin estado
+  (de reserva o aún sin usar). Si todos tienen estado espera a que se libere
+  uno y, pasados `eviction_grace` segundos, cierra el kernel ocioso menos usado
+  de otro agente ("main" el último). El dueño de un kernel cerrado así (o por
+  inactividad) recibe un aviso en su siguiente ejecución (`pop_eviction_notice`).
+- `memory_limit_mb` limita la memoria de cada kernel: el pool recicla el kernel
+  cuya memoria residente lo supere al terminar una ejecución. Solo con
+  `hard_memory_limit` se pasa además a la fábrica como límite duro (RLIMIT_AS),
+  que rompe librerías que reservan mucho espacio virtual (numpy/BLAS, torch).
+
+La fábrica de kernels la registra la skill `python-executor`
+(`register_kernel_factory`); el núcleo no depende de jupyter_client.
+
+Uso:
+    pool = get_kernel_pool()
+    with pool.lease(key=agent_id) as kernel:
+        for chunk in kernel.execute_code_stream(code):
+            ...
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+KernelFactory = Callable[[Optional[int]], Any]
+
+
+@dataclass
+class _PooledKernel:
+    kernel: Any
+    key: Optional[str]
+    busy: bool = False
+    recycle: bool = False
+    last_used: float = field(default_factory=time.monotonic)
+    executions: int = 0
+
+
+def kernel_memory_mb(kernel: Any) -> Optional[float]:
+    """Memoria residente (MB) del proceso del kernel, si se puede leer (Linux /proc)."""
+    pid = getattr(kernel, "pid", None)
+    if not pid:
+        return None
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii", errors="replace") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        return None
+    return None
+
+
+class KernelPool:
+    """Pool acotado de kernels con préstamo por agente, reserva precalentada y límites."""
+
+    def __init__(
+        self,
+        kernel_factory: KernelFactory,
+        max_kernels: Optional[int] = None,
+        idle_timeout: Optional[float] = None,
+        memory_limit_mb: Optional[int] = None,
+        spares: Optional[int] = None,
+        hard_memory_limit: Optional[bool] = None,
+        eviction_grace: Optional[float] = None,
+    ):
+        self._factory = kernel_factory
+        self.max_kernels = max(1, max_kernels if max_kernels is not None else settings.kernel_pool_size)
+        self.idle_timeout = idle_timeout if idle_timeout is not None else settings.kernel_pool_idle_timeout
+        self.memory_limit_mb = memory_limit_mb if memory_limit_mb is not None else settings.kernel_pool_memory_limit_mb
+        self.spares = max(0, spares if spares is not None else settings.kernel_pool_prewarm)
+        self.hard_memory_limit = (
+            hard_memory_limit if hard_memory_limit is not None else settings.kernel_pool_hard_memory_limit
+        )
+        self.eviction_grace = max(
+            0.0, eviction_grace if eviction_grace is not None else settings.kernel_pool_eviction_grace
+        )
+        self._kernels: List[_PooledKernel] = []
+        # Claves cuyo kernel (con estado) se cerró sin que su agente lo pidiera
+        self._evicted_keys: Set[str] = set()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._reaper: Optional[threading.Thread] = None
+        self._stop_reaper = threading.Event()
+        self.created = 0
+        self.recycled = 0
+        self.evicted = 0
+
+    # ── Préstamo ───────────────────────────────────────────────────────────
+
+    @contextmanager
+    def lease(self, key: str = "main", timeout: Optional[float] = None) -> Iterator[Any]:
+        """
+        Presta el kernel de `key` (creándolo o tomando uno de reserva si no
+        tiene). Espera si está ocupado o si el pool está lleno, hasta `timeout`
+        segundos (TimeoutError si se agota).
+        """
+        entry = self._acquire(key, timeout)
+        try:
+            yield entry.kernel
+        finally:
+            self._release(entry)
+
+    def _acquire(self, key: str, timeout: Optional[float]) -> _PooledKernel:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        # Plazo tras el cual se puede cerrar el kernel con estado de otro agente
+        evict_at = time.monotonic() + self.eviction_grace
+        took_spare = False
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("KernelPool cerrado")
+                own = next((k for k in self._kernels if k.key == key), None)
+                entry = None
+                if own is not None:
+                    if not own.busy:
+                        entry = own
+                else:
+                    entry = self._find_spare()
+                    took_spare = entry is not None
+                    if entry is None and len(self._kernels) >= self.max_kernels:
+                        # Pool lleno: liberar el hueco de un kernel sin estado o, agotada
+                        # la espera, el del agente ocioso menos usado
+                        victim = self._eviction_candidate(force=time.monotonic() >= evict_at)
+                        if victim is not None:
+                            self._evict(victim)
+                    if entry is None and len(self._kernels) < self.max_kernels:
+                        entry = _PooledKernel(kernel=None, key=key)
+                        self._kernels.append(entry)
+                if entry is not None:
+                    entry.key = key
+                    entry.busy = True
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"No hay kernels libres en el pool (máximo {self.max_kernels})")
+                if own is None and self._eviction_candidate(force=True) is not None:
+                    # Despertar al cumplirse el plazo de desalojo aunque nadie devuelva un kernel
+                    grace_left = max(0.0, evict_at - time.monotonic())
+                    remaining = grace_left if remaining is None else min(remaining, grace_left)
+                self._cond.wait(remaining)
+
+        if entry.kernel is not None and not entry.kernel.is_alive():
+            logger.warning(f"KernelPool: el kernel de '{key}' murió; arrancando uno nuevo.")
+            self._stop(entry.kernel)
+            entry.kernel = None
+        if entry.kernel is None:
+            # Arrancar fuera del lock: un arranque en frío no debe bloquear otros préstamos
+            try:
+                entry.kernel = self._start()
+            except Exception:
+                with self._cond:
+                    if entry in self._kernels:
+                        self._kernels.remove(entry)
+                    self._cond.notify_all()
+                raise
+        if took_spare:
+            self.prewarm_async()
+        self._ensure_reaper()
+        return entry
+
+    def _find_spare(self) -> Optional[_PooledKernel]:
+        spares = [k for k in self._kernels if k.key is None and not k.busy and k.kernel is not None]
+        alive = [k for k in spares if k.kernel.is_alive()]
+        return alive[0] if alive else (spares[0] if spares else None)
+
+    def _eviction_candidate(self, force: bool) -> Optional[_PooledKernel]:
+        """
+        Kernel ocioso cuyo hueco puede liberarse: uno sin estado (de reserva, sin
+        ejecuciones o muerto) o, con `force`, el del agente menos usado ("main" el último).
+        """
+        idle = [k for k in self._kernels if not k.busy and k.kernel is not None]
+        stateless = [k for k in idle if k.key is None or not k.executions or not k.kernel.is_alive()]
+        if stateless:
+            return min(stateless, key=lambda k: k.last_used)
+        if force and idle:
+            return min(idle, key=lambda k: (k.key == "main", k.last_used))
+        return None
+
+    def _evict(self, entry: _PooledKernel) -> None:
+        """Cierra un kernel sin que su agente lo pida, avisándole si tenía estado (con el lock)."""
+        if entry.key is not None and entry.executions and entry.kernel.is_alive():
+            self._evicted_keys.add(entry.key)
+            self.evicted += 1
+            logger.warning(f"KernelPool: se cierra el kernel ocioso de '{entry.key}' para liberar un hueco.")
+        self._discard(entry)
+
+    def pop_eviction_notice(self, key: str) -> bool:
+        """True (una sola vez) si el kernel de `key` se cerró sin que su agente lo pidiera."""
+        with self._cond:
+            if key in self._evicted_keys:
+                self._evicted_keys.discard(key)
+                return True
+            return False
+
+    def _release(self, entry: _PooledKernel) -> None:
+        self.enforce_memory_limit(entry.kernel)
+        with self._cond:
+            entry.busy = False
+            entry.executions += 1
+            entry.last_used = time.monotonic()
+            discard = self._closed or entry.recycle or not entry.kernel.is_alive()
+            if discard:
+                self._discard(entry)
+            self._cond.notify_all()
+
+    def _start(self) -> Any:
+        kernel = self._factory((self.memory_limit_mb or None) if self.hard_memory_limit else None)
+        self.created += 1
+        return kernel
+
+    def _discard(self, entry: _PooledKernel) -> None:
+        """Saca el kernel del pool y lo detiene (llamar con el lock tomado)."""
+        if entry in self._kernels:
+            self._kernels.remove(entry)
+        if entry.kernel is not None:
+            # Detener un kernel tarda; no retener el lock mientras tanto
+            threading.Thread(target=self._stop, args=(entry.kernel,), daemon=True, name="KogniTerm-KernelStop").start()
+
+    @staticmethod
+    def _stop(kernel: Any) -> None:
+        try:
+            kernel.stop_kernel()
+        except Exception as e:
+            logger.debug(f"KernelPool: error deteniendo kernel: {e}")
+
+    # ── Límites ────────────────────────────────────────────────────────────
+
+    def enforce_memory_limit(self, kernel: Any) -> Optional[float]:
+        """
+        Si el kernel supera `memory_limit_mb`, lo marca para reciclarse al
+        devolverlo y retorna su memoria en MB; si no, retorna None.
+        """
+        if not self.memory_limit_mb or kernel is None:
+            return None
+        with self._cond:
+            entry = next((k for k in self._kernels if k.kernel is kernel), None)
+            if entry is None or entry.recycle:
+                return None
+        usage = kernel_memory_mb(kernel)
+        if usage is None or usage <= self.memory_limit_mb:
+            return None
+        with self._cond:
+            if entry.recycle:
+                return None
+            entry.recycle = True
+            self.recycled += 1
+        logger.warning(f"KernelPool: el kernel de '{entry.key}' usa {usage:.0f} MB (límite {self.memory_limit_mb} MB); se reciclará.")
+        return usage
+
+    def recycle(self, kernel: Any) -> None:
+        """Marca el kernel para detenerlo al devolverse (p. ej. si quedó ejecutando código)."""
+        with self._cond:
+            entry = next((k for k in self._kernels if k.kernel is kernel), None)
+            if entry is None or entry.recycle:
+                return
+            entry.recycle = True
+            self.recycled += 1
+        logger.warning(f"KernelPool: el kernel de '{entry.key}' se reciclará al devolverse.")
+
+    # ── Mantenimiento ──────────────────────────────────────────────────────
+
+    def prewarm(self, count: Optional[int] = None) -> int:
+        """Arranca kernels de reserva hasta tener `count` (por defecto `spares`)."""
+        target = self.spares if count is None else count
+        started = 0
+        while True:
+            with self._cond:
+                reserve = sum(1 for k in self._kernels if k.key is None)
+                if self._closed or reserve >= target or len(self._kernels) >= self.max_kernels:
+                    break
+                entry = _PooledKernel(kernel=None, key=None, busy=True)
+                self._kernels.append(entry)
+            try:
+                entry.kernel = self._start()
+                started += 1
+            except Exception as e:
+                logger.warning(f"KernelPool: no se pudo precalentar un kernel: {e}")
+            with self._cond:
+                entry.busy = False
+                entry.last_used = time.monotonic()
+                if entry.kernel is None or self._closed:
+                    self._discard(entry)
+                self._cond.notify_all()
+            if entry.kernel is None:
+                break
+        return started
+
+    def prewarm_async(self, count: Optional[int] = None) -> threading.Thread:
+        """Precalienta en segundo plano (al iniciar la sesión o tras consumir una reserva)."""
+        thread = threading.Thread(target=self.prewarm, args=(count,), daemon=True, name="KogniTerm-KernelPrewarm")
+        thread.start()
+        return thread
+
+    def reap_idle(self) -> int:
+        """Cierra los kernels de agentes ociosos más de `idle_timeout` segundos (o ya muertos)."""
+        now = time.monotonic()
+        with self._cond:
+            stale = [
+                k for k in self._kernels
+                if not k.busy and k.kernel is not None
+                and ((k.key is not None and now - k.last_used >= self.idle_timeout) or not k.kernel.is_alive())
+            ]
+            for entry in stale:
+                self._evict(entry)
+            if stale:
+                self._cond.notify_all()
+        if stale:
+            logger.debug(f"KernelPool: {len(stale)} kernels ociosos cerrados")
+        return len(stale)
+
+    def _ensure_reaper(self) -> None:
+        if self._reaper is not None or self.idle_timeout <= 0:
+            return
+        with self._cond:
+            if self._reaper is not None:
+                return
+            self._reaper = threading.Thread(target=self._reap_loop, daemon=True, name="KogniTerm-KernelPoolReaper")
+            self._reaper.start()
+
+    def _reap_loop(self) -> None:
+        interval = max(1.0, self.idle_timeout / 2)
+        while not self._stop_reaper.wait(interval):
+            self.reap_idle()
+
+    def kernel_for(self, key: str) -> Optional[Any]:
+        """Kernel asignado a `key`, sin prestarlo (p. ej. para leer su última salida)."""
+        with self._cond:
+            entry = next((k for k in self._kernels if k.key == key), None)
+            return entry.kernel if entry else None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "max_kernels": self.max_kernels,
+                "kernels": len(self._kernels),
+                "spares": sum(1 for k in self._kernels if k.key is None and k.kernel is not None),
+                "busy": sum(1 for k in self._kernels if k.busy),
+                "created": self.created,
+                "recycled": self.recycled,
+                "evicted": self.evicted,
+                "memory_limit_mb": self.memory_limit_mb,
+            }
+
+    def close(self) -> None:
+        """Detiene los kernels ociosos; los prestados se detienen al devolverse."""
+        self._stop_reaper.set()
+        with self._cond:
+            self._closed = True
+            idle = [k for k in self._kernels if not k.busy]
+            for entry in idle:
+                if entry in self._kernels:
+                    self._kernels.remove(entry)
+            self._cond.notify_all()
+        for entry in idle:
+            if entry.kernel is not None:
+                self._stop(entry.kernel)
+
+
+_kernel_factory: Optional[KernelFactory] = None
+_default_pool: Optional[KernelPool] = None
+_default_pool_lock = threading.Lock()
+
+
+def register_kernel_factory(factory: KernelFactory) -> None:
+    """
+    Registra la función que arranca un kernel: recibe el límite duro de memoria
+    en MB (o None si no hay que aplicarlo) y devuelve un kernel ya listo con
+    `is_alive()`, `stop_kernel()` y `pid`.
+    """
+    global _kernel_factory
+    with _default_pool_lock:
+        _kernel_factory = factory
+
+
+def get_kernel_pool() -> Optional[KernelPool]:
+    """Pool global de kernels (KOGNITERM_KERNEL_POOL_*); None si ninguna skill registró una fábrica."""
+    global _default_pool
+    with _default_pool_lock:
+        if _kernel_factory is None:
+            return None
+        if _default_pool is None or _default_pool._closed:
+            _default_pool = KernelPool(_kernel_factory)
+        return _default_pool
+
+
+def prewarm_kernel_pool() -> bool:
+    """Precalienta el pool en segundo plano si hay fábrica y `kernel_pool_prewarm` > 0."""
+    if settings.kernel_pool_prewarm <= 0:
+        return False
+    pool = get_kernel_pool()
+    if pool is None:
+        return False
+    pool.prewarm_async()
+    return True
+
+
+def close_kernel_pool() -> None:
+    global _default_pool
+    with _default_pool_lock:
+        pool, _default_pool = _default_pool, None
+    if pool is not None:
+        pool.close()
@@ -1,5 +1,5 @@
 from .provider_config import ProviderConfig, setup_litellm_global_config
 from .message_converter import to_litellm_message, from_litellm_message, convert_langchain_tool_to_litellm
-from .tool_parser import parse_tool_calls_from_text, extract_args, extract_balanced_content, generate_short_id
+from .tool_parser import parse_tool_calls_from_text, IncrementalToolCallParser, extract_args, extract_balanced_content, generate_short_id
 from .streaming_executor import StreamingExecutor
 from .rate_limiter import RateLimiter
@@ -7,6 +7,10 @@ from typing import Generator, Union, List, Dict, Any, Optional
 from langchain_core.messages import AIMessage, BaseMessage
 from litellm import completion
 
+from kogniterm.core.tracing import get_tracer
+from kogniterm.core.llm.tool_parser import IncrementalToolCallParser
+from kogniterm.core.early_tool_dispatch import EarlyDispatchStream
+
 logger = logging.getLogger(__name__)
 
 class StreamingExecutor:
@@ -14,13 +18,40 @@ class StreamingExecutor:
         self.provider_config = provider_config
         self.interrupt_queue = interrupt_queue
         self.stop_generation_flag = False
+        # Llamadas escritas en el texto detectadas mientras llega el stream
+        self.detected_tool_calls: List[Dict[str, Any]] = []
+
+    def execute_stream(
+        self,
+        completion_kwargs,
+        parse_fn,
+        id_gen_fn,
+        tool_names: Optional[List[str]] = None,
+        early_dispatch: Optional[EarlyDispatchStream] = None,
+    ) -> Generator[Union[AIMessage, str], None, None]:
+        """Ejecuta el stream de LiteLLM, maneja chunks, razonamiento y tool_calls.
+
+        Si se pasan `tool_names`, las llamadas escritas en el texto se detectan
+        de forma incremental mientras llega el stream (ver
+        `IncrementalToolCallParser`) en lugar de re-analizar todo el texto con
+        `parse_fn` al final del turno.
 
-    def execute_stream(self, completion_kwargs, parse_fn, id_gen_fn) -> Generator[Union[AIMessage, str], None, None]:
-        """Ejecuta el stream de LiteLLM, maneja chunks, razonamiento y tool_calls."""
+        Con `early_dispatch`, cada tool call nativo cuyos argumentos ya estén
+        completos se ofrece al despachador anticipado mientras sigue el stream;
+        si se interrumpe, esas llamadas se cancelan.
+        """
         self.stop_generation_flag = False
         full_response_content = ""
         full_reasoning_content = ""
         tool_calls = []
+        text_parsers = None
+        if tool_names is not None:
+            content_parser = IncrementalToolCallParser(tool_names, id_gen_fn)
+            text_parsers = {"content": content_parser, "reasoning": content_parser.sibling()}
+        self.detected_tool_calls = []
+        tracer = get_tracer()
+        request_span = tracer.start_span("llm.request", model=completion_kwargs.get("model", ""))
+        stream_span = None
         
         try:
             # 1. Obtener el generador (con fallback automático si se configuró en ProviderManager)
@@ -38,6 +69,9 @@ class StreamingExecutor:
             
             for chunk in response_generator:
                 current_time = time.time()
+                if stream_span is None:
+                    request_span.end()
+                    stream_span = tracer.start_span("llm.stream", model=completion_kwargs.get("model", ""))
                 
                 # Check timeouts
                 if (current_time - last_chunk_time) > chunk_timeout:
@@ -71,11 +105,15 @@ class StreamingExecutor:
                 reasoning_delta = getattr(delta, 'reasoning_content', None)
                 if reasoning_delta is not None:
                     full_reasoning_content += str(reasoning_delta)
+                    if text_parsers:
+                        self.detected_tool_calls.extend(text_parsers["reasoning"].feed(str(reasoning_delta)))
                     yield f"__THINKING__:{reasoning_delta}"
 
                 # Capturar contenido
                 if getattr(delta, 'content', None) is not None:
                     full_response_content += str(delta.content)
+                    if text_parsers:
+                        self.detected_tool_calls.extend(text_parsers["content"].feed(str(delta.content)))
                     yield str(delta.content)
                 
                 # Capturar Tool Calls
@@ -100,13 +138,27 @@ class StreamingExecutor:
                                     tool_calls[idx]["function"]["arguments"] = str(tc.function.arguments)
                                 else:
                                     tool_calls[idx]["function"]["arguments"] += str(tc.function.arguments)
+                    if early_dispatch is not None:
+                        early_dispatch.observe(tool_calls)
+
+            request_span.end()
+            if stream_span is not None:
+                stream_span.end()
+
+            text_tool_calls = None
+            if text_parsers:
+                text_parsers["content"].finish()
+                text_tool_calls = text_parsers["reasoning"].finish()
 
             if self.stop_generation_flag:
+                if early_dispatch is not None:
+                    early_dispatch.cancel()
                 final_tool_calls = self._consolidate_tool_calls(
                     tool_calls, 
                     full_response_content, 
                     full_reasoning_content, 
-                    parse_fn
+                    parse_fn,
+                    text_tool_calls
                 )
                 yield AIMessage(
                     content=full_response_content,
@@ -119,7 +171,8 @@ class StreamingExecutor:
                     tool_calls, 
                     full_response_content, 
                     full_reasoning_content, 
-                    parse_fn
+                    parse_fn,
+                    text_tool_calls
                 )
                 
                 if final_tool_calls:
@@ -140,9 +193,14 @@ class StreamingExecutor:
 
         except Exception as e:
             logger.error(f"Error in execution: {e}")
+            if early_dispatch is not None:
+                early_dispatch.cancel()
+            request_span.end(status="error", error=type(e).__name__)
+            if stream_span is not None:
+                stream_span.end(status="error", error=type(e).__name__)
             raise e
 
-    def _consolidate_tool_calls(self, native_calls, content, reasoning, parse_fn) -> List[Dict[str, Any]]:
+    def _consolidate_tool_calls(self, native_calls, content, reasoning, parse_fn, text_tool_calls=None) -> List[Dict[str, Any]]:
         final_tool_calls = []
         
         # 1. Herramientas nativas
@@ -157,10 +215,11 @@ class StreamingExecutor:
                 "args": args
             })
             
-        # 2. Herramientas parseadas del texto
-        combined_text = "\n".join([content, reasoning])
-        if combined_text.strip():
-            text_tool_calls = parse_fn(combined_text)
+        # 2. Herramientas parseadas del texto (ya detectadas en streaming si hubo parser incremental)
+        if text_tool_calls is None:
+            combined_text = "\n".join([content, reasoning])
+            text_tool_calls = parse_fn(combined_text) if combined_text.strip() else []
+        if text_tool_calls:
             for tc_text in text_tool_calls:
                 found = next((tc for tc in final_tool_calls if tc['name'] == tc_text['name']), None)
                 if found:
@@ -2,7 +2,47 @@ import re
 import json
 import secrets
 import string
-from typing import List, Dict, Any, Optional
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple
+
+# Patrones precompilados (antes se recompilaban en cada llamada y por estrategia)
+_CONTROL_CHARS_RE = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f-\x9f]')
+_PAIR_RE = re.compile(r'(\w+)\s*[:=]\s*(?:"([^"]*)"|\'([^\']*)\'|(\d+)|([^\s,{}]+))')
+
+# ESTRATEGIA A: los cuatro prefijos explícitos en una sola alternancia
+_EXPLICIT_RE = re.compile(
+    r'(?:(?:LLAMADA_A_HERRAMIENTA|Herramienta|Tool):|\[TOOL_CALL\])\s*(\w+)', re.IGNORECASE
+)
+# Distancia máxima entre el nombre explícito y el JSON de argumentos
+_EXPLICIT_JSON_WINDOW = 200
+
+# ESTRATEGIA B: lenguaje natural con JSON inline - patrones amplios
+# Captura: "usa search con {...}", "usa 'search' con {...}", "usa \"search\" con {...}"
+_NL_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r'(?:usa|usar|utiliza|usamos|usando|use|luego)\s+(?:la\s+herramienta\s+|la\s+)?["\']?(\w+)["\']?\s*(?:,?\s*(?:luego\s+)?(?:con\s+(?:los\s+)?(?:argumentos?|args?)?)?\s*)?\s*(\{[^}]+\})',
+    r'(?:llama?r?|llamamos)\s+(?:a\s+)?(?:la\s+herramienta\s+)?["\']?(\w+)["\']?\s*(?:con\s+(?:argumentos?|args?)?\s*)?\s*(\{[^}]+\})',
+    r'(?:vamos\s+a\s+)?(?:usar|llamar)\s+(?:la\s+herramienta\s+|la\s+)?["\']?(\w+)["\']?\s*(?:con\s+(?:argumentos?|args?)?\s*)?\s*(\{[^}]+\})',
+    r'(?:usa|usar|utiliza)\s+(?:la\s+herramienta\s+)?(\w+)\s*(?:con\s+(?:argumentos?|args?)?\s*)?\s*(\{[^}]+\})',
+    r'\b(\w+)\s*con\s+(?:argumentos?|args?)?\s*(\{[^}]+\})',
+    r'(?:usa|usamos)\s+(?:la\s+herramienta\s+)?(\w+)\s*\(\s*(\{[^}]+\})\s*\)',
+))
+# Patrón sin argumentos JSON explicitos: ej. "usa read_file"
+_NO_ARG_RE = re.compile(
+    r'(?:usa|usar|utiliza|usamos|usando|use)\s+(?:la\s+herramienta\s+|la\s+)?["\']?(\w+)["\']?(?!\s*con|\s*\{)',
+    re.IGNORECASE,
+)
+# ESTRATEGIA D: Formatos Legacy tipo Codigo "name({args})"
+_LEGACY_RE = re.compile(r'\b(\w+)\s*\(([\{].*?[\}])\)', re.DOTALL)
+# Contexto previo en el que se busca el nombre de un bloque JSON que solo trae argumentos
+_JSON_LOOKBACK = 300
+
+# `scan_once` decodifica un valor JSON desde una posición sin copiar el texto y,
+# al fallar, lanza StopIteration sin calcular línea/columna (raw_decode cuenta
+# los saltos de línea de todo el texto previo en cada intento fallido)
+_JSON_SCAN_ONCE = json.JSONDecoder().scan_once
+# Un objeto JSON empieza por '{' seguido de una clave o de '}'
+_JSON_OBJECT_START_RE = re.compile(r'\{\s*["}]')
+
 
 def generate_short_id(length: int = 9) -> str:
     """Genera un ID alfanum\u00e9rico corto compatible con proveedores estrictos como Mistral."""
@@ -44,135 +84,306 @@ def extract_args(args_str: str) -> Dict[str, Any]:
         return json.loads(args_str)
     except:
         result = {}
-        pair_pattern = r'(\w+)\s*[:=]\s*(?:"([^"]*)"|\'([^\']*)\'|(\d+)|([^\s,{}]+))'
-        for m in re.finditer(pair_pattern, args_str):
+        for m in _PAIR_RE.finditer(args_str):
             key = m.group(1)
             value = m.group(2) or m.group(3) or m.group(4) or m.group(5)
-            if value and value.isdigit(): 
+            if value and value.isdigit():
                 try: value = int(value)
                 except ValueError: pass
             result[key] = value
         return result
 
-def parse_tool_calls_from_text(text: str, tool_names: List[str], id_generator=None) -> List[Dict[str, Any]]:
+
+class _ToolNameIndex:
+    """Resolución de nombres de herramienta sin distinguir mayúsculas, por diccionario."""
+
+    def __init__(self, tool_names: Tuple[str, ...]):
+        self.names = [(name.lower(), name) for name in tool_names]
+        self.by_lower: Dict[str, str] = {}
+        for lowered, name in self.names:
+            # Ante nombres que solo difieren en mayúsculas gana el primero, como antes
+            self.by_lower.setdefault(lowered, name)
+
+    def resolve(self, name: Any) -> Optional[str]:
+        return self.by_lower.get(str(name).lower())
+
+    def any_in(self, lowered_text: str) -> bool:
+        return any(lowered in lowered_text for lowered, _ in self.names)
+
+    def first_in(self, lowered_text: str) -> Optional[str]:
+        return next((name for lowered, name in self.names if lowered in lowered_text), None)
+
+
+@lru_cache(maxsize=32)
+def _name_index(tool_names: Tuple[str, ...]) -> _ToolNameIndex:
+    return _ToolNameIndex(tool_names)
+
+
+def _call_key(name: str, args: Any) -> str:
+    try:
+        return f"{name}:{json.dumps(args, sort_keys=True)}"
+    except (TypeError, ValueError):
+        return f"{name}:{args!r}"
+
+
+def _scan(text: str, start: int, index: _ToolNameIndex, final: bool = True):
     """
-    Analiza el texto para encontrar llamadas a herramientas usando m\u00faltiples estrategias.
+    Aplica todas las estrategias a las coincidencias que empiezan en `text[start:]`
+    (`text[:start]` solo sirve de contexto).
+
+    Retorna `(con_nombre, sin_args, estructuradas)`: llamadas de las estrategias
+    A/B, nombres detectados sin argumentos y llamadas de las estrategias C/D.
+    Con `final=False` (texto aún incompleto) una mención sin argumentos al final
+    del texto se ignora, porque aún puede seguirle "con {...}".
     """
-    if not text:
-        return []
-    
-    if id_generator is None:
-        id_generator = generate_short_id
+    named: List[Tuple[str, Any]] = []
+    no_arg: List[str] = []
+    structured: List[Tuple[str, Any]] = []
 
-    tool_calls = []
-    seen_combinations = set()
-    valid_tool_calls = []
-    
-    # 1. Limpieza inicial: Quitar caracteres de control invisibles
-    clean_text = re.sub(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f-\x9f]', '', text)
-    
-    # ESTRATEGIA A: Patrones expl\u00edcitos
-    explicit_patterns = [
-        r'LLAMADA_A_HERRAMIENTA:\s*(\w+)',
-        r'Herramienta:\s*(\w+)',
-        r'\[TOOL_CALL\]\s*(\w+)',
-        r'Tool:\s*(\w+)'
-    ]
-    for pat in explicit_patterns:
-        for match in re.finditer(pat, clean_text, re.IGNORECASE):
-            tool_name = match.group(1).strip()
-            real_name = next((k for k in tool_names if k.lower() == tool_name.lower()), None)
-            if real_name:
-                search_start = match.end()
-                json_start = clean_text.find('{', search_start)
-                if json_start != -1 and (json_start - search_start) < 200:
-                    args_str = extract_balanced_content(clean_text, json_start)
-                    if args_str:
-                        args = extract_args(args_str)
-                        tool_calls.append({"id": id_generator(), "name": real_name, "args": args})
-
-    # ESTRATEGIA B: Lenguaje natural con JSON inline - patrones amplios
-    # Captura: "usa search con {...}", "usa 'search' con {...}", "usa \"search\" con {...}"
-    nl_patterns = [
-        r'(?:usa|usar|utiliza|usamos|usando|use|luego)\s+(?:la\s+herramienta\s+|la\s+)?["\']?(\w+)["\']?\s*(?:,?\s*(?:luego\s+)?(?:con\s+(?:los\s+)?(?:argumentos?|args?)?)?\s*)?\s*(\{[^}]+\})',
-        r'(?:llama?r?|llamamos)\s+(?:a\s+)?(?:la\s+herramienta\s+)?["\']?(\w+)["\']?\s*(?:con\s+(?:argumentos?|args?)?\s*)?\s*(\{[^}]+\})',
-        r'(?:vamos\s+a\s+)?(?:usar|llamar)\s+(?:la\s+herramienta\s+|la\s+)?["\']?(\w+)["\']?\s*(?:con\s+(?:argumentos?|args?)?\s*)?\s*(\{[^}]+\})',
-        r'(?:usa|usar|utiliza)\s+(?:la\s+herramienta\s+)?(\w+)\s*(?:con\s+(?:argumentos?|args?)?\s*)?\s*(\{[^}]+\})',
-        r'(\w+)\s*con\s+(?:argumentos?|args?)?\s*(\{[^}]+\})',
-        r'(?:usa|usamos)\s+(?:la\s+herramienta\s+)?(\w+)\s*\(\s*(\{[^}]+\})\s*\)',
-    ]
-    for pat in nl_patterns:
-        for match in re.finditer(pat, clean_text, re.IGNORECASE):
-            tool_name = match.group(1).strip()
-            args_str = match.group(2).strip()
-            real_name = next((k for k in tool_names if k.lower() == tool_name.lower()), None)
+    # Prefiltro: si ningún nombre de herramienta aparece, ninguna estrategia puede acertar
+    if not index.any_in(text[max(0, start - _JSON_LOOKBACK):].lower()):
+        return named, no_arg, structured
+
+    # ESTRATEGIA A: Patrones explícitos
+    for match in _EXPLICIT_RE.finditer(text, start):
+        real_name = index.resolve(match.group(1))
+        if real_name:
+            search_start = match.end()
+            json_start = text.find('{', search_start, search_start + _EXPLICIT_JSON_WINDOW)
+            if json_start != -1:
+                args_str = extract_balanced_content(text, json_start)
+                if args_str:
+                    named.append((real_name, extract_args(args_str)))
+
+    # ESTRATEGIA B: Lenguaje natural con JSON inline
+    for pat in _NL_PATTERNS:
+        for match in pat.finditer(text, start):
+            real_name = index.resolve(match.group(1))
             if real_name:
-                args_str_balanced = extract_balanced_content(clean_text, match.start(2))
+                args_str_balanced = extract_balanced_content(text, match.start(2))
                 if args_str_balanced:
                     args = extract_args(args_str_balanced)
                 else:
-                    args = extract_args(args_str)
-                tool_calls.append({"id": id_generator(), "name": real_name, "args": args})
-
-    # Patrón sin argumentos JSON explicitos: ej. "usa read_file"
-    no_arg_pattern = r'(?:usa|usar|utiliza|usamos|usando|use)\s+(?:la\s+herramienta\s+|la\s+)?["\']?(\w+)["\']?(?!\s*con|\s*\{)'
-    for match in re.finditer(no_arg_pattern, clean_text, re.IGNORECASE):
-        tool_name = match.group(1).strip()
-        real_name = next((k for k in tool_names if k.lower() == tool_name.lower()), None)
-        if real_name:
-            if not any(tc['name'] == real_name for tc in tool_calls):
-                tool_calls.append({"id": id_generator(), "name": real_name, "args": {}})
-
-    # ESTRATEGIA C: Bloques JSON estructurados
-    for i in range(len(clean_text)):
-        if clean_text[i] == '{':
-            json_str = extract_balanced_content(clean_text, i)
-            if json_str:
-                try:
-                    data = json.loads(json_str)
-                    if isinstance(data, dict) and data:
-                        name = data.get("name") or data.get("tool") or data.get("function")
-                        args = data.get("args") or data.get("arguments") or data.get("parameters") or {}
-                        
-                        if name:
-                            real_name = next((k for k in tool_names if k.lower() == str(name).lower()), None)
-                            if real_name:
-                                tool_calls.append({"id": id_generator(), "name": real_name, "args": args})
-                        
-                        elif len(data) == 1:
-                            potential_name = list(data.keys())[0]
-                            if str(potential_name).lower() in [k.lower() for k in tool_names]:
-                                real_name = next(k for k in tool_names if k.lower() == str(potential_name).lower())
-                                tool_calls.append({"id": id_generator(), "name": real_name, "args": data[potential_name]})
-                        
-                        elif not any(k in data for k in ["name", "tool", "function"]):
-                            lookback = clean_text[max(0, i-300):i].lower()
-                            for tname in tool_names:
-                                if tname.lower() in lookback:
-                                    tool_calls.append({"id": id_generator(), "name": tname, "args": data})
-                                    break
-                except:
-                    continue
+                    args = extract_args(match.group(2))
+                named.append((real_name, args))
+
+    for match in _NO_ARG_RE.finditer(text, start):
+        real_name = index.resolve(match.group(1))
+        if real_name and (final or text[match.end():].strip()):
+            no_arg.append(real_name)
+
+    # ESTRATEGIA C: Bloques JSON estructurados (decodificador en C, sin recorrer carácter a carácter)
+    for start_match in _JSON_OBJECT_START_RE.finditer(text, start):
+        i = start_match.start()
+        try:
+            data, _ = _JSON_SCAN_ONCE(text, i)
+        except (StopIteration, ValueError):
+            continue
+        if isinstance(data, dict) and data:
+            name = data.get("name") or data.get("tool") or data.get("function")
+            args = data.get("args") or data.get("arguments") or data.get("parameters") or {}
+
+            if name:
+                real_name = index.resolve(name)
+                if real_name:
+                    structured.append((real_name, args))
+
+            elif len(data) == 1:
+                potential_name = next(iter(data))
+                real_name = index.resolve(potential_name)
+                if real_name:
+                    structured.append((real_name, data[potential_name]))
+
+            elif not any(k in data for k in ["name", "tool", "function"]):
+                real_name = index.first_in(text[max(0, i - _JSON_LOOKBACK):i].lower())
+                if real_name:
+                    structured.append((real_name, data))
 
     # ESTRATEGIA D: Formatos Legacy tipo Codigo "name({args})"
-    legacy_pattern = r'(\w+)\s*\(([\{].*?[\}])\)'
-    for match in re.finditer(legacy_pattern, clean_text, re.DOTALL):
+    for match in _LEGACY_RE.finditer(text, start):
         name, args_str = match.groups()
-        real_name = next((k for k in tool_names if k.lower() == name.lower()), None)
+        real_name = index.resolve(name)
         if real_name:
-            args = extract_args(args_str)
-            tool_calls.append({"id": id_generator(), "name": real_name, "args": args})
+            structured.append((real_name, extract_args(args_str)))
 
-    # Filtrar duplicados y consolidar
-    for tc in tool_calls:
-        try:
-            args_json = json.dumps(tc['args'], sort_keys=True)
-            key = f"{tc['name']}:{args_json}"
-            if key not in seen_combinations:
-                seen_combinations.add(key)
-                valid_tool_calls.append(tc)
-        except:
-            if tc not in valid_tool_calls: 
-                valid_tool_calls.append(tc)
+    return named, no_arg, structured
+
+
+def parse_tool_calls_from_text(text: str, tool_names: List[str], id_generator=None) -> List[Dict[str, Any]]:
+    """
+    Analiza el texto para encontrar llamadas a herramientas usando m\u00faltiples estrategias.
+    """
+    if not text:
+        return []
+
+    if id_generator is None:
+        id_generator = generate_short_id
+
+    # 1. Limpieza inicial: Quitar caracteres de control invisibles
+    clean_text = _CONTROL_CHARS_RE.sub('', text)
+    named, no_arg, structured = _scan(clean_text, 0, _name_index(tuple(tool_names)))
+
+    candidates = list(named)
+    named_names = {name for name, _ in named}
+    for name in dict.fromkeys(no_arg):
+        if name not in named_names:
+            candidates.append((name, {}))
+    candidates.extend(structured)
 
+    # Filtrar duplicados y consolidar
+    valid_tool_calls = []
+    seen_combinations = set()
+    for name, args in candidates:
+        key = _call_key(name, args)
+        if key not in seen_combinations:
+            seen_combinations.add(key)
+            valid_tool_calls.append({"id": id_generator(), "name": name, "args": args})
     return valid_tool_calls
+
+
+class _ParseState:
+    """Llamadas y menciones compartidas por los parsers de un mismo turno."""
+
+    def __init__(self):
+        self.calls: List[Dict[str, Any]] = []
+        self.seen: set = set()
+        self.named: set = set()
+        self.no_arg: Dict[str, None] = {}
+        self.open = 0
+
+
+class IncrementalToolCallParser:
+    """
+    Versión incremental de `parse_tool_calls_from_text` alimentada con los
+    deltas del stream.
+
+    Lleva la profundidad de llaves del texto recibido y solo analiza cuando el
+    texto vuelve a nivel 0 (se cierra un bloque `{...}`, un `)` o un salto de
+    línea): cada análisis cubre lo nuevo más `CONTEXT` caracteres previos, así
+    que el coste total es lineal y `finish()` solo procesa la cola pendiente.
+    Las llamadas sin argumentos ("usa read_file") se resuelven en `finish()`,
+    porque el texto siguiente aún podría aportar sus argumentos.
+
+    El contenido y el razonamiento llegan por separado: `sibling()` crea un
+    parser para el otro texto que comparte llamadas y duplicados con este,
+    como el análisis del texto combinado. Las menciones sin argumentos se
+    resuelven cuando terminan todos los parsers del grupo.
+    """
+
+    # Solapamiento entre análisis: cubre el prefijo "usa X con argumentos" y la
+    # ventana de 200 caracteres de la estrategia explícita
+    CONTEXT = 512
+
+    def __init__(self, tool_names: List[str], id_generator=None, _state: Optional[_ParseState] = None):
+        self._tool_names = tuple(tool_names)
+        self._index = _name_index(self._tool_names)
+        self._id_generator = id_generator or generate_short_id
+        # Solo se conserva la cola del texto necesaria como contexto
+        self._tail = ""
+        self._tail_offset = 0
+        self._length = 0
+        self._scanned = 0
+        self._depth = 0
+        self._in_string = False
+        self._string_char = None
+        self._escaped = False
+        self._state = _state or _ParseState()
+        self._state.open += 1
+        self._finished = False
+
+    def sibling(self) -> "IncrementalToolCallParser":
+        """Parser para otro texto del mismo turno que comparte llamadas y duplicados con este."""
+        return IncrementalToolCallParser(self._tool_names, self._id_generator, _state=self._state)
+
+    @property
+    def tool_calls(self) -> List[Dict[str, Any]]:
+        """Llamadas detectadas hasta ahora en todo el grupo (copia)."""
+        return list(self._state.calls)
+
+    def feed(self, delta: str) -> List[Dict[str, Any]]:
+        """Añade un delta del stream y retorna las llamadas completas detectadas por primera vez."""
+        if not delta or self._finished:
+            return []
+        clean = _CONTROL_CHARS_RE.sub('', delta)
+        if not clean:
+            return []
+        boundary = None
+        for offset, char in enumerate(clean):
+            if self._depth > 0:
+                if self._in_string:
+                    if self._escaped:
+                        self._escaped = False
+                    elif char == '\\':
+                        self._escaped = True
+                    elif char == self._string_char:
+                        self._in_string = False
+                    continue
+                if char in '"\'':
+                    self._in_string = True
+                    self._string_char = char
+                elif char == '{':
+                    self._depth += 1
+                elif char == '}':
+                    self._depth -= 1
+                    if self._depth == 0:
+                        boundary = offset
+            elif char == '{':
+                self._depth = 1
+            elif char in ')\n':
+                boundary = offset
+        self._tail += clean
+        self._length += len(clean)
+        if boundary is None:
+            return []
+        return self._scan_until(self._length - len(clean) + boundary + 1, final=False)
+
+    def finish(self) -> List[Dict[str, Any]]:
+        """
+        Analiza la cola pendiente y retorna todas las llamadas del grupo; el
+        último parser en terminar resuelve las menciones sin argumentos.
+        """
+        state = self._state
+        if not self._finished:
+            self._finished = True
+            self._scan_until(self._length, final=True)
+            state.open -= 1
+            if state.open == 0:
+                for name in state.no_arg:
+                    if name not in state.named:
+                        self._add(name, {})
+        return list(state.calls)
+
+    def _scan_until(self, end: int, final: bool) -> List[Dict[str, Any]]:
+        window_start = max(self._tail_offset, self._scanned - self.CONTEXT)
+        text = self._tail[: end - self._tail_offset]
+        named, no_arg, structured = _scan(text, window_start - self._tail_offset, self._index, final=final)
+        self._scanned = end
+
+        new_calls = []
+        for name, args in named:
+            self._state.named.add(name)
+            call = self._add(name, args)
+            if call:
+                new_calls.append(call)
+        for name in no_arg:
+            self._state.no_arg.setdefault(name, None)
+        for name, args in structured:
+            call = self._add(name, args)
+            if call:
+                new_calls.append(call)
+
+        # Recortar la cola: el próximo análisis necesita CONTEXT más el lookback de la estrategia C
+        keep_from = max(0, end - self.CONTEXT - _JSON_LOOKBACK)
+        if keep_from > self._tail_offset:
+            self._tail = self._tail[keep_from - self._tail_offset:]
+            self._tail_offset = keep_from
+        return new_calls
+
+    def _add(self, name: str, args: Any) -> Optional[Dict[str, Any]]:
+        key = _call_key(name, args)
+        if key in self._state.seen:
+            return None
+        self._state.seen.add(key)
+        call = {"id": self._id_generator(), "name": name, "args": args}
+        self._state.calls.append(call)
+        return call
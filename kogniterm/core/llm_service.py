@@ -183,9 +183,14 @@ else:
     logger.info(f"🤖 Configuración inicial detectada: Proveedor Genérico ({model_to_use})")
 
 from .exceptions import UserConfirmationRequired # Importar la excepción
+from .skills.registry_snapshot import LazySkillTool
+from .skills.tool_effects import DEFAULT_PATH_ARGS, ToolEffects
 import tiktoken # Importar tiktoken
 from .context.workspace_context import WorkspaceContext # Importar WorkspaceContext
 from .history_manager import HistoryManager
+from .tracing import get_tracer, traced_generator
+from .early_tool_dispatch import EarlyToolDispatcher
+from .llm.tool_parser import IncrementalToolCallParser
 
 
 
@@ -197,6 +202,9 @@ class LLMService:
     _context_workspace_context = contextvars.ContextVar('workspace_context', default=None)
     _context_vector_db_manager = contextvars.ContextVar('vector_db_manager', default=None)
     _context_current_workspace_dir = contextvars.ContextVar('current_workspace_dir', default=None)
+    _context_terminal_ui = contextvars.ContextVar('terminal_ui', default=None)
+    _context_telemetry_tracker = contextvars.ContextVar('telemetry_tracker', default=None)
+    _context_session_id = contextvars.ContextVar('session_id', default=None)
 
     def __init__(self, interrupt_queue: Optional[queue.Queue] = None, use_multi_provider: bool = True):
         self._use_context_vars = False
@@ -266,8 +274,12 @@ class LLMService:
             self.vector_db_manager = None
 
         # Inicializar DelegationManager y HeartbeatMonitor
-        from kogniterm.core.delegation import DelegationManager, HeartbeatMonitor
-        self.delegation_manager = DelegationManager()
+        from kogniterm.core.delegation import DelegationLimits, DelegationManager, HeartbeatMonitor
+        from .config import settings
+        self.delegation_manager = DelegationManager(DelegationLimits(
+            max_tokens_per_child=settings.subagent_max_tokens or None,
+            max_cost_per_child=settings.subagent_max_cost or None,
+        ))
         self.heartbeat_monitor = HeartbeatMonitor()
         self.heartbeat_monitor.start()
         self._thread_local = threading.local()
@@ -284,6 +296,10 @@ class LLMService:
         self.skill_manager.discover_all_skills()
         for skill_name in self.skill_manager.skills:
             self.skill_manager.load_skill(skill_name)
+        self.skill_manager.save_registry_snapshot()
+
+        # Precalentar kernels de python_executor en segundo plano
+        threading.Thread(target=self._prewarm_python_kernels, daemon=True, name="KogniTerm-KernelPrewarm").start()
             
         # print("DEBUG: Generando esquemas de herramientas...")
         self.tool_names = [getattr(tool, 'name', tool.__class__.__name__) for tool in self.skill_manager.get_tools()]
@@ -398,6 +414,7 @@ class LLMService:
                 self.skill_manager.discover_all_skills()
                 for skill_name in self.skill_manager.skills:
                     self.skill_manager.load_skill(skill_name)
+                self.skill_manager.save_registry_snapshot()
                 # Actualizar schemas y tool_map
                 self.tool_names = [getattr(tool, 'name', tool.__class__.__name__) for tool in self.skill_manager.get_tools()]
                 self.tool_schemas = []
@@ -481,6 +498,48 @@ class LLMService:
         else:
             self._fallback_current_workspace_dir = value
 
+    @property
+    def terminal_ui(self):
+        val = self._context_terminal_ui.get()
+        return val if val is not None else getattr(self, '_fallback_terminal_ui', None)
+
+    @terminal_ui.setter
+    def terminal_ui(self, value):
+        if getattr(self, '_use_context_vars', False):
+            self._context_terminal_ui.set(value)
+        else:
+            self._fallback_terminal_ui = value
+
+    @property
+    def session_id(self) -> str:
+        """Sesión en curso: la del servidor si hay una activa, si no una propia de esta instancia."""
+        val = self._context_session_id.get()
+        if val is not None:
+            return val
+        fallback = getattr(self, '_fallback_session_id', None)
+        if fallback is None:
+            fallback = self._fallback_session_id = uuid.uuid4().hex[:12]
+        return fallback
+
+    @session_id.setter
+    def session_id(self, value):
+        if getattr(self, '_use_context_vars', False):
+            self._context_session_id.set(value)
+        else:
+            self._fallback_session_id = value
+
+    @property
+    def telemetry_tracker(self):
+        val = self._context_telemetry_tracker.get()
+        return val if val is not None else getattr(self, '_fallback_telemetry_tracker', None)
+
+    @telemetry_tracker.setter
+    def telemetry_tracker(self, value):
+        if getattr(self, '_use_context_vars', False):
+            self._context_telemetry_tracker.set(value)
+        else:
+            self._fallback_telemetry_tracker = value
+
     @property
     def current_delegation_context(self):
         return getattr(self._thread_local, "delegation_context", None)
@@ -980,6 +1039,7 @@ class LLMService:
             except Exception:
                 pass
 
+            schema_span = get_tracer().start_span("llm.tool_schemas", model=self.model_name)
             converted_tools = []
             seen_names = set()
             is_thinking = self.is_thinking_model()
@@ -1011,6 +1071,7 @@ class LLMService:
             except Exception:
                 pass
             self.litellm_tools = converted_tools
+            schema_span.end(tools=len(converted_tools))
             logger.debug(f"📋 Total herramientas convertidas: {len(converted_tools)}")
         return self.litellm_tools
 
@@ -1270,37 +1331,73 @@ class LLMService:
             rate_in, rate_out = (1.0, 3.0)
         return ((input_tokens / 1_000_000) * rate_in) + ((output_tokens / 1_000_000) * rate_out)
 
+    def _estimate_input_tokens(self, history: Optional[List[BaseMessage]], system_message: Optional[str]) -> int:
+        if history:
+            hist_str = "\n".join(str(m.content) for m in history)
+        else:
+            hist_str = "\n".join(str(m.content) for m in (self.conversation_history or []))
+        if system_message:
+            hist_str += "\n" + system_message
+        return max(len(hist_str) // 4, 1)
+
+    def _scheduler_step(self):
+        """
+        Turno del planificador de sub-agentes para esta llamada, o None si no
+        se está dentro de un sub-agente (o este hilo ya tiene un turno).
+        """
+        from kogniterm.core.delegation.scheduler import SubAgentScheduler, provider_for_model
+
+        bound = SubAgentScheduler.current()
+        thread_local = getattr(self, "_thread_local", None)
+        if bound is None or thread_local is None or getattr(thread_local, "scheduler_step", None) is not None:
+            return None
+        scheduler, agent_id = bound
+        return scheduler.step(provider_for_model(self.model_name), agent_id)
+
     def invoke(self, history: Optional[List[BaseMessage]] = None, system_message: Optional[str] = None, interrupt_queue: Optional[queue.Queue] = None, save_history: bool = True, include_tools: bool = True) -> Generator[Union[AIMessage, str], None, None]:
         full_content = ""
+        step_cm = self._scheduler_step()
+        step = step_cm.__enter__() if step_cm is not None else None
+        in_tokens = None
+        if step is not None:
+            self._thread_local.scheduler_step = step
+            in_tokens = self._estimate_input_tokens(history, system_message)
+        span = get_tracer().start_span("llm.invoke", model=self.model_name or "")
         try:
-            for chunk in self._invoke_inner(history, system_message, interrupt_queue, save_history, include_tools):
+            if step is not None:
+                step.check(in_tokens)
+            inner = self._invoke_inner(history, system_message, interrupt_queue, save_history, include_tools)
+            for chunk in traced_generator(span, inner):
                 if isinstance(chunk, AIMessage):
                     full_content = chunk.content or ""
                 elif isinstance(chunk, str):
                     if not chunk.startswith("__THINKING__:"):
                         full_content += chunk
+                    if step is not None:
+                        # Expulsar en mitad del streaming si la respuesta agota el presupuesto
+                        step.check(in_tokens + len(full_content) // 4)
                 yield chunk
         finally:
-            if hasattr(self, "telemetry_tracker") and self.telemetry_tracker:
-                hist_str = ""
-                if history:
-                    hist_str = "\n".join(str(m.content) for m in history)
-                else:
-                    hist_str = "\n".join(str(m.content) for m in (self.conversation_history or []))
-                if system_message:
-                    hist_str += "\n" + system_message
-                
-                in_tokens = max(len(hist_str) // 4, 1)
+            tracker = self.telemetry_tracker if hasattr(self, "telemetry_tracker") else None
+            if tracker or step is not None:
+                if in_tokens is None:
+                    in_tokens = self._estimate_input_tokens(history, system_message)
                 out_tokens = max(len(full_content) // 4, 1)
                 model_name = self.model_name or "gemini-1.5-flash"
                 cost = self._estimate_cost(model_name, in_tokens, out_tokens)
-                
-                self.telemetry_tracker.record_llm_call(
-                    model=model_name,
-                    input_tokens=in_tokens,
-                    output_tokens=out_tokens,
-                    cost=cost
-                )
+
+                if tracker:
+                    tracker.record_llm_call(
+                        model=model_name,
+                        input_tokens=in_tokens,
+                        output_tokens=out_tokens,
+                        cost=cost
+                    )
+                if step is not None:
+                    step.charge(in_tokens + out_tokens, cost)
+            if step_cm is not None:
+                self._thread_local.scheduler_step = None
+                step_cm.__exit__(*sys.exc_info())
 
     def _invoke_inner(self, history: Optional[List[BaseMessage]] = None, system_message: Optional[str] = None, interrupt_queue: Optional[queue.Queue] = None, save_history: bool = True, include_tools: bool = True, context_retry_count: int = 0) -> Generator[Union[AIMessage, str], None, None]:
         """
@@ -1710,6 +1807,18 @@ class LLMService:
         full_response_content = ""
         full_reasoning_content = ""
         tool_calls = []
+        # Herramientas de solo lectura que se lanzan antes de que acabe el stream; se
+        # cancelan si el turno no llega a emitir sus tool_calls (error, interrupción o
+        # GeneratorExit porque quien consume cierra el generador)
+        early_dispatch = None
+        stream_completed = False
+        if completion_kwargs.get("tools"):
+            dispatcher = EarlyToolDispatcher.for_service(self)
+            if dispatcher is not None:
+                early_dispatch = dispatcher.stream(self.current_delegation_context)
+        # Llamadas escritas en el texto: se detectan mientras llega el stream, no al final
+        content_parser = IncrementalToolCallParser(list(getattr(self, "tool_map", None) or {}), self._generate_short_id)
+        reasoning_parser = content_parser.sibling()
 
         try:
             sys.stderr.flush()
@@ -1717,6 +1826,11 @@ class LLMService:
             
             logger.debug(f"DEBUG: Enviando mensajes al LLM: {json.dumps(completion_kwargs['messages'], indent=2)}")
             logger.debug(f"DEBUG: completion_kwargs: {json.dumps(completion_kwargs, indent=2)}")
+
+            # Spans: petición hasta el primer chunk (TTFT) y, desde ahí, el stream
+            tracer = get_tracer()
+            request_span = tracer.start_span("llm.request", model=self.model_name)
+            stream_span = None
             
             # Usar MultiProviderManager si está habilitado
             if self.use_multi_provider and self.provider_manager:
@@ -1783,6 +1897,12 @@ class LLMService:
 
             for chunk in response_generator:
                 current_time = time.time()
+                if stream_span is None:
+                    request_span.end()
+                    stream_span = tracer.start_span("llm.stream", model=self.model_name)
+                    parent = tracer.current_span()
+                    if parent is not None:
+                        parent.set(ttft_ms=round(request_span.duration_ms, 1))
                 
                 # Detectar estancamiento entre chunks
                 if current_time - last_chunk_time > chunk_timeout:
@@ -1830,6 +1950,7 @@ class LLMService:
                 reasoning_delta = getattr(delta, 'reasoning_content', None)
                 if reasoning_delta is not None:
                     full_reasoning_content += str(reasoning_delta)
+                    reasoning_parser.feed(str(reasoning_delta))
                     yield f"__THINKING__:{reasoning_delta}"
 
                 content_delta = getattr(delta, 'content', None)
@@ -1855,6 +1976,7 @@ class LLMService:
                                 if safe_len > 0:
                                     text_to_yield = remaining_text[:safe_len]
                                     full_response_content += text_to_yield
+                                    content_parser.feed(text_to_yield)
                                     yield text_to_yield
                                     processed_index += safe_len
                                 else:
@@ -1865,6 +1987,7 @@ class LLMService:
                                 text_before = remaining_text[:tag_idx]
                                 if text_before:
                                     full_response_content += text_before
+                                    content_parser.feed(text_before)
                                     yield text_before
                                 
                                 processed_index += tag_idx + len("<thought>")
@@ -1881,6 +2004,7 @@ class LLMService:
                                 if safe_len > 0:
                                     thought_to_yield = remaining_text[:safe_len]
                                     full_reasoning_content += thought_to_yield
+                                    reasoning_parser.feed(thought_to_yield)
                                     yield f"__THINKING__:{thought_to_yield}"
                                     processed_index += safe_len
                                 else:
@@ -1891,6 +2015,7 @@ class LLMService:
                                 thought_before = remaining_text[:close_idx]
                                 if thought_before:
                                     full_reasoning_content += thought_before
+                                    reasoning_parser.feed(thought_before)
                                     yield f"__THINKING__:{thought_before}"
                                 
                                 processed_index += close_idx + len("</thought>")
@@ -1928,9 +2053,16 @@ class LLMService:
                                     tool_calls[idx]["function"]["arguments"] = str(tc.function.arguments)
                                 else:
                                     tool_calls[idx]["function"]["arguments"] += str(tc.function.arguments)
+                    if early_dispatch is not None:
+                        early_dispatch.observe(tool_calls)
 
+            request_span.end()
+            if stream_span is not None:
+                stream_span.end(finish_reason=str(last_finish_reason or ""))
 
             if self.stop_generation_flag:
+                if early_dispatch is not None:
+                    early_dispatch.cancel()
                 yield AIMessage(
                     content=full_response_content,
                     additional_kwargs={"reasoning_content": full_reasoning_content} if full_reasoning_content else {}
@@ -2003,10 +2135,12 @@ class LLMService:
                                 reasoning_delta = getattr(cont_delta, 'reasoning_content', None)
                                 if reasoning_delta is not None:
                                     full_reasoning_content += str(reasoning_delta)
+                                    reasoning_parser.feed(str(reasoning_delta))
                                     yield f"__THINKING__:{reasoning_delta}"
 
                                 if getattr(cont_delta, 'content', None) is not None:
                                     full_response_content += str(cont_delta.content)
+                                    content_parser.feed(str(cont_delta.content))
                                     yield str(cont_delta.content)
 
                                 cont_tool_calls = getattr(cont_delta, 'tool_calls', None)
@@ -2055,19 +2189,12 @@ class LLMService:
                             tc_final["thought_signature"] = tc["thought_signature"]
                         final_tool_calls.append(tc_final)
                 
-                # 2. Complementar con parseo de texto (siempre, para máxima robustez)
-                # Combinar contenido de respuesta y razonamiento para el parser, así no importa dónde lo escriba el modelo
-                parsing_source = []
-                if full_response_content and full_response_content.strip():
-                    parsing_source.append(full_response_content)
-                if full_reasoning_content and full_reasoning_content.strip():
-                    parsing_source.append(full_reasoning_content)
-                
-                combined_text = "\n".join(parsing_source)
-                
-                if combined_text.strip():
-                    text_tool_calls = self._parse_tool_calls_from_text(combined_text)
-                    
+                # 2. Complementar con las llamadas escritas en el texto (siempre, para máxima robustez).
+                # Contenido y razonamiento comparten parser, así no importa dónde lo escriba el modelo
+                content_parser.finish()
+                text_tool_calls = reasoning_parser.finish()
+
+                if text_tool_calls:
                     # Fusionar evitando duplicados. Si ya existe una llamada nativa CON argumentos, preferirla.
                     # Si la nativa está vacía pero la del texto tiene argumentos, preferir la del texto.
                     for tc_text in text_tool_calls:
@@ -2084,7 +2211,9 @@ class LLMService:
                         else:
                             # No existe, añadirla
                             final_tool_calls.append(tc_text)
-                
+
+                # Las llamadas adelantadas quedan listas para que el agente las reclame
+                stream_completed = True
                 if final_tool_calls:
                     if not full_response_content or not full_response_content.strip():
                         full_response_content = ""
@@ -2481,6 +2610,9 @@ class LLMService:
                 else:
                     friendly_message = f"¡Ups! 🌐 El proveedor del modelo (OpenRouter) está experimentando problemas técnicos temporales: '{error_msg}'. Por favor, intenta de nuevo en unos momentos."
             elif "RateLimitError" in error_type or "429" in error_msg:
+                step = getattr(getattr(self, "_thread_local", None), "scheduler_step", None)
+                if step is not None:
+                    step.rate_limited = True
                 friendly_message = "¡Vaya! 🚦 Hemos alcanzado el límite de velocidad del modelo. Esperemos un momento antes de intentarlo de nuevo."
             elif "APIConnectionError" in error_type:
                 friendly_message = "¡Vaya! 🔌 Parece que hay un problema de conexión con el servidor del modelo. Revisa tu conexión a internet."
@@ -2500,6 +2632,9 @@ class LLMService:
                  logger.debug(traceback.format_exc())
             
             yield AIMessage(content=friendly_message)
+        finally:
+            if early_dispatch is not None and not stream_completed:
+                early_dispatch.cancel()
 
     def summarize_conversation_history(self, messages_to_summarize: Optional[List[BaseMessage]] = None, force_truncate: bool = False) -> str:
         """
@@ -2772,6 +2907,18 @@ Limita el resumen a 5000 caracteres."""
         """Encuentra y devuelve una herramienta por su nombre (soporta BaseTool y Callables)."""
         return self.skill_manager.get_tool(tool_name)
 
+    def _prewarm_python_kernels(self) -> None:
+        """Importa python_executor (registra la fábrica de kernels) y precalienta el pool."""
+        from .config import settings
+        from .kernel_pool import prewarm_kernel_pool
+        if settings.kernel_pool_prewarm <= 0:
+            return
+        try:
+            if self.skill_manager.get_tool("python_executor") is not None:
+                prewarm_kernel_pool()
+        except Exception as e:
+            logger.debug(f"No se pudo precalentar el pool de kernels: {e}")
+
     def close(self):
         """Libera recursos y cierra conexiones de servicios internos."""
         try:
@@ -2810,8 +2957,34 @@ Limita el resumen a 5000 caracteres."""
         else:
             print("MultiProviderManager no está habilitado")
 
+    def _resolve_session_path_args(self, tool_name: str, args: Dict[str, Any]) -> None:
+        """Convierte en absolutas, respecto a `os.getcwd()` de la sesión, las rutas relativas de `args`."""
+        sm = getattr(self, 'skill_manager', None)
+        get_effects = getattr(sm, 'get_tool_effects', None)
+        effects = get_effects(tool_name) if callable(get_effects) else None
+        keys = effects.resolve(args).path_keys() if isinstance(effects, ToolEffects) else DEFAULT_PATH_ARGS
+        base = os.getcwd()
+
+        def _absolute(value: Any) -> Any:
+            if not isinstance(value, str) or not value.strip():
+                return value
+            expanded = os.path.expanduser(value)
+            return expanded if os.path.isabs(expanded) else os.path.join(base, expanded)
+
+        for key in keys:
+            value = args.get(key)
+            if isinstance(value, (list, tuple)):
+                args[key] = [_absolute(v) for v in value]
+            elif value is not None:
+                args[key] = _absolute(value)
+
     def _invoke_tool_with_interrupt(self, tool: BaseTool, tool_args: dict, delegation_context: Optional[Any] = None, terminal_ui: Optional[Any] = None) -> Generator[Any, None, None]:
         """Invoca una herramienta en un hilo separado, permitiendo la interrupción."""
+        if isinstance(tool, LazySkillTool):
+            # El proxy de la instantánea solo expone (*args, **kwargs): los parámetros
+            # inyectables (llm_service, delegation_context...) salen de la firma real
+            tool = tool.resolve()
+
         def _tool_target():
             try:
                 injected_args = tool_args.copy() if isinstance(tool_args, dict) else {}
@@ -2826,6 +2999,11 @@ Limita el resumen a 5000 caracteres."""
                                 injected_args['command'] = injected_args.pop(alias)
                                 break
 
+                    # En el servidor el cwd del proceso no es el de la sesión: las
+                    # rutas relativas se resuelven contra el cwd lógico de la sesión
+                    if getattr(self, '_use_context_vars', False) and self._context_current_workspace_dir.get() is not None:
+                        self._resolve_session_path_args(tool_name_attr, injected_args)
+
                     # Extraer la función subyacente real (incluso en LangChain StructuredTool)
                     target_func = getattr(tool, 'func', tool)
                     if hasattr(tool, 'run') and callable(getattr(tool, 'run')):
@@ -2895,13 +3073,16 @@ Limita el resumen a 5000 caracteres."""
             except Exception as e:
                 raise e
 
-        future = self.tool_executor.submit(_tool_target)
+        # Propagar las contextvars de la sesión (cwd, workspace, UI) al hilo de la herramienta
+        future = self.tool_executor.submit(contextvars.copy_context().run, _tool_target)
         if not hasattr(self, 'active_tool_futures'):
             self.active_tool_futures = []
         self.active_tool_futures.append(future)
 
         try:
-            while not future.done():
+            # Sin `while not future.done()`: una herramienta rápida que termina antes
+            # de la primera comprobación perdería su resultado
+            while True:
                 if self.interrupt_queue and not self.interrupt_queue.empty():
                     raise InterruptedError("Interrupción detectada")
                 try:
@@ -2938,6 +3119,8 @@ Limita el resumen a 5000 caracteres."""
                         yield result
                     return
                 except TimeoutError:
+                    if future.done() and isinstance(future.exception(), TimeoutError):
+                        raise  # TimeoutError de la propia herramienta
                     continue
         finally:
             if future in self.active_tool_futures:
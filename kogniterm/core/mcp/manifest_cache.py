@@ -0,0 +1,75 @@
+"""
+Caché en disco del manifiesto de herramientas de cada servidor MCP.
+
+Tras conectar con un servidor se guarda su lista de herramientas (nombre,
+descripción y esquema de entrada) en `~/.kogniterm/cache/mcp/<servidor>.json`
+junto con la huella de su configuración. En el siguiente arranque, si la
+configuración no ha cambiado, las herramientas se registran desde el
+manifiesto sin esperar al handshake; la sesión se abre en segundo plano.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_UNSAFE_NAME_RE = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+def config_hash(config: Dict[str, Any]) -> str:
+    """Huella de la configuración de un servidor (sin el flag `disabled`)."""
+    relevant = {k: v for k, v in config.items() if k != "disabled"}
+    raw = json.dumps(relevant, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class MCPManifestCache:
+    """Manifiestos de herramientas MCP indexados por servidor y huella de configuración."""
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        if cache_dir is None:
+            from kogniterm.core.config import settings
+
+            cache_dir = settings.mcp_manifest_dir or os.path.expanduser("~/.kogniterm/cache/mcp")
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+
+    def _path(self, server_name: str) -> str:
+        return os.path.join(self.cache_dir, _UNSAFE_NAME_RE.sub("_", server_name) + ".json")
+
+    def load(self, server_name: str, digest: str) -> Optional[List[Dict[str, Any]]]:
+        """Herramientas guardadas para `server_name`, o None si no hay manifiesto o la configuración cambió."""
+        try:
+            with open(self._path(server_name), encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("config_hash") != digest:
+            return None
+        tools = data.get("tools")
+        return tools if isinstance(tools, list) else None
+
+    def save(self, server_name: str, digest: str, tools: List[Dict[str, Any]]) -> None:
+        path = self._path(server_name)
+        payload = {"config_hash": digest, "saved_at": time.time(), "tools": tools}
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with self._lock:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(payload, f, ensure_ascii=False)
+                os.replace(tmp, path)
+            except OSError as e:
+                logger.debug("MCPManifestCache: no se pudo guardar %s: %s", path, e)
+
+    def invalidate(self, server_name: str) -> None:
+        try:
+            os.remove(self._path(server_name))
+        except OSError:
+            pass
@@ -1,19 +1,68 @@
 import asyncio
 import logging
+import threading
 from typing import Dict, Any, List, Optional
 from kogniterm.terminal.config_manager import ConfigManager
 from kogniterm.core.mcp.config import MCPServerConfig
+from kogniterm.core.mcp.manifest_cache import MCPManifestCache, config_hash
+from kogniterm.core.mcp.session_pool import MCPSessionPool, get_mcp_session_pool
 
 logger = logging.getLogger(__name__)
 
+
+def _format_call_result(result: Any) -> str:
+    """Convierte un `CallToolResult` de MCP en el texto que ve el LLM."""
+    parts = []
+    for item in getattr(result, "content", None) or []:
+        text = getattr(item, "text", None)
+        parts.append(text if text is not None else f"[{getattr(item, 'type', 'contenido')} no textual]")
+    output = "\n".join(parts)
+    if getattr(result, "isError", False):
+        return f"Error: {output or 'la herramienta MCP falló'}"
+    return output
+
+
 class MCPManager:
-    """Gestor singleton para la administración de conexiones y herramientas MCP."""
+    """Gestor singleton para la administración de conexiones y herramientas MCP.
+
+    Los servidores se conectan en paralelo, cada uno con su timeout, y sus
+    sesiones se mantienen abiertas en `MCPSessionPool` para invocar las
+    herramientas. Si existe un manifiesto en caché para la configuración
+    actual de un servidor, sus herramientas se registran sin esperar al
+    handshake y la sesión se abre en segundo plano.
+
+    El estado (estados, herramientas por servidor, `active_tools`) se
+    modifica desde el loop de quien llama a `reload` y desde el loop del
+    pool (refrescos en segundo plano), así que se protege con `_state_lock`;
+    cada `reload` abre una generación nueva y los refrescos de generaciones
+    anteriores se descartan.
+    """
     _instance: Optional["MCPManager"] = None
 
-    def __init__(self):
-        self.config_manager = ConfigManager()
-        self.active_tools: List[Any] = []
-        self.server_statuses: Dict[str, Dict[str, Any]] = {}
+    def __init__(
+        self,
+        config_manager: Optional[ConfigManager] = None,
+        pool: Optional[MCPSessionPool] = None,
+        manifest_cache: Optional[MCPManifestCache] = None,
+        connect_timeout: Optional[float] = None,
+        call_timeout: Optional[float] = None,
+    ):
+        if connect_timeout is None or call_timeout is None:
+            from kogniterm.core.config import settings
+
+            connect_timeout = settings.mcp_connect_timeout if connect_timeout is None else connect_timeout
+            call_timeout = settings.mcp_call_timeout if call_timeout is None else call_timeout
+        self.config_manager = config_manager or ConfigManager()
+        self.pool = pool or get_mcp_session_pool()
+        self.manifest_cache = manifest_cache or MCPManifestCache()
+        self.connect_timeout = connect_timeout
+        self.call_timeout = call_timeout
+        self._active_tools: List[Any] = []
+        self._server_statuses: Dict[str, Dict[str, Any]] = {}
+        self._server_tools: Dict[str, List[Any]] = {}
+        self._server_configs: Dict[str, Dict[str, Any]] = {}
+        self._generation = 0
+        self._state_lock = threading.RLock()
 
     @classmethod
     def get_instance(cls) -> "MCPManager":
@@ -21,54 +70,145 @@ class MCPManager:
             cls._instance = cls()
         return cls._instance
 
+    @property
+    def active_tools(self) -> List[Any]:
+        """Herramientas de todos los servidores conectados (copia)."""
+        with self._state_lock:
+            return list(self._active_tools)
+
+    @property
+    def server_statuses(self) -> Dict[str, Dict[str, Any]]:
+        """Estado de cada servidor tras el último `reload` (copia)."""
+        with self._state_lock:
+            return {name: dict(status) for name, status in self._server_statuses.items()}
+
     async def reload(self):
         """Sincroniza los servidores activos y carga sus herramientas."""
         servers = self.config_manager.get_mcp_servers()
-        self.active_tools.clear()
-        self.server_statuses.clear()
-        
+        enabled = {n: c for n, c in servers.items() if not c.get("disabled", False)}
+        with self._state_lock:
+            self._generation += 1
+            generation = self._generation
+            self._server_statuses.clear()
+            self._server_tools.clear()
+            removed = [name for name in self._server_configs if name not in enabled]
+            for name in removed:
+                self._server_configs.pop(name, None)
+
+        # Cerrar las sesiones de servidores eliminados o deshabilitados
+        for name in removed:
+            await self.pool.disconnect(name)
+
+        pending = []
         for name, config_dict in servers.items():
-            if config_dict.get("disabled", False):
-                self.server_statuses[name] = {"status": "disabled", "tools": []}
+            if name not in enabled:
+                with self._state_lock:
+                    self._server_statuses[name] = {"status": "disabled", "tools": []}
                 continue
-            
-            try:
-                tools = await self._load_server_tools(name, config_dict)
-                self.active_tools.extend(tools)
-                self.server_statuses[name] = {
-                    "status": "connected",
-                    "tools": [getattr(t, "name", str(t)) for t in tools]
-                }
-            except Exception as e:
-                logger.error(f"Error al conectar con servidor MCP {name}: {e}")
-                self.server_statuses[name] = {"status": "error", "error": str(e), "tools": []}
-
-    async def _load_server_tools(self, name: str, config_dict: Dict[str, Any]) -> List[Any]:
-        """Carga las herramientas de un servidor MCP por stdio o sse."""
+            with self._state_lock:
+                self._server_configs[name] = config_dict
+            manifest = self.manifest_cache.load(name, config_hash(config_dict))
+            if manifest is not None:
+                self._set_server_tools(name, config_dict, manifest, generation, from_cache=True)
+                self.pool.submit(self._refresh_in_background(name, config_dict, generation))
+            else:
+                pending.append(name)
+
+        # Handshakes en paralelo: un servidor colgado solo cuesta su propio timeout
+        await asyncio.gather(*(self._connect_server(name, enabled[name], generation) for name in pending))
+        with self._state_lock:
+            if generation == self._generation:
+                self._rebuild_active_tools()
+
+    async def _connect_server(self, name: str, config_dict: Dict[str, Any], generation: int) -> None:
         try:
-            from langchain_mcp_adapters.tools import load_mcp_tools
-            from mcp import ClientSession, StdioServerParameters
-            from mcp.client.stdio import stdio_client
-            
-            transport = config_dict.get("transport", "stdio")
-            if transport == "stdio":
-                cmd = config_dict.get("command")
-                if not cmd:
-                    return []
-                server_params = StdioServerParameters(
-                    command=cmd,
-                    args=config_dict.get("args", []),
-                    env=config_dict.get("env", None)
-                )
-                async with stdio_client(server_params) as (read, write):
-                    async with ClientSession(read, write) as session:
-                        await session.initialize()
-                        tools = await load_mcp_tools(session)
-                        return tools
-            return []
+            manifest = await self.pool.connect(name, config_dict, self.connect_timeout)
+        except Exception as e:
+            logger.error(f"Error al conectar con servidor MCP {name}: {e}")
+            self._set_server_error(name, config_dict, e, generation)
+            return
+        self.manifest_cache.save(name, config_hash(config_dict), manifest)
+        self._set_server_tools(name, config_dict, manifest, generation)
+
+    async def _refresh_in_background(self, name: str, config_dict: Dict[str, Any], generation: int) -> None:
+        """Abre la sesión de un servidor cargado desde caché y actualiza su manifiesto (en el loop del pool)."""
+        try:
+            manifest = await self.pool.connect_on_loop(name, config_dict, self.connect_timeout)
         except Exception as e:
-            logger.warning(f"No se pudieron cargar herramientas nativas MCP para {name}: {e}")
-            return []
+            logger.warning(f"No se pudo abrir la sesión MCP de {name}: {e}")
+            self._set_server_error(name, config_dict, e, generation, rebuild=True)
+            return
+        digest = config_hash(config_dict)
+        if manifest != self.manifest_cache.load(name, digest):
+            self.manifest_cache.save(name, digest, manifest)
+            self._set_server_tools(name, config_dict, manifest, generation, rebuild=True)
+            return
+        with self._state_lock:
+            if self._is_current(name, config_dict, generation) and name in self._server_statuses:
+                self._server_statuses[name].pop("manifest", None)
+
+    def _is_current(self, name: str, config_dict: Dict[str, Any], generation: int) -> bool:
+        # Llamar con `_state_lock`: descarta resultados de un `reload` anterior
+        return generation == self._generation and self._server_configs.get(name) == config_dict
+
+    def _set_server_tools(
+        self, name: str, config_dict: Dict[str, Any], manifest: List[Dict[str, Any]],
+        generation: int, from_cache: bool = False, rebuild: bool = False,
+    ) -> None:
+        tools = [self._build_tool(name, config_dict, entry) for entry in manifest]
+        status = {"status": "connected", "tools": [t.name for t in tools]}
+        if from_cache:
+            status["manifest"] = "cached"
+        with self._state_lock:
+            if not self._is_current(name, config_dict, generation):
+                return
+            self._server_tools[name] = tools
+            self._server_statuses[name] = status
+            if rebuild:
+                self._rebuild_active_tools()
+
+    def _set_server_error(
+        self, name: str, config_dict: Dict[str, Any], error: Exception, generation: int, rebuild: bool = False
+    ) -> None:
+        with self._state_lock:
+            if not self._is_current(name, config_dict, generation):
+                return
+            self._server_statuses[name] = {"status": "error", "error": str(error), "tools": []}
+            # Solo hay algo que quitar si se registraron herramientas desde la caché
+            if self._server_tools.pop(name, None) is not None and rebuild:
+                self._rebuild_active_tools()
+
+    def _rebuild_active_tools(self) -> None:
+        # Llamar con `_state_lock`
+        self._active_tools = [t for tools in self._server_tools.values() for t in tools]
+
+    def _build_tool(self, server_name: str, config_dict: Dict[str, Any], entry: Dict[str, Any]):
+        """Herramienta LangChain que invoca `entry` a través de la sesión persistente del servidor."""
+        from langchain_core.tools import StructuredTool
+
+        tool_name = entry["name"]
+        pool = self.pool
+
+        def _run(**kwargs) -> str:
+            result = pool.call_tool_sync(
+                server_name, config_dict, tool_name, kwargs, self.connect_timeout, self.call_timeout
+            )
+            return _format_call_result(result)
+
+        async def _arun(**kwargs) -> str:
+            result = await pool.call_tool(
+                server_name, config_dict, tool_name, kwargs, self.connect_timeout, self.call_timeout
+            )
+            return _format_call_result(result)
+
+        return StructuredTool(
+            name=tool_name,
+            description=entry.get("description") or tool_name,
+            args_schema=entry.get("inputSchema") or {"type": "object", "properties": {}},
+            func=_run,
+            coroutine=_arun,
+            metadata={"mcp_server": server_name},
+        )
 
     async def test_connection(self, config_dict: Dict[str, Any]) -> Dict[str, Any]:
         """Prueba la conexión con un servidor MCP sin guardar la configuración."""
@@ -78,24 +218,27 @@ class MCPManager:
                 cmd = config_dict.get("command")
                 if not cmd:
                     return {"status": "error", "message": "Comando no especificado"}
-                # Intenta ejecutar o validar el comando
-                tools = await self._load_server_tools("test", config_dict)
-                tool_names = [getattr(t, "name", str(t)) for t in tools]
-                return {"status": "ok", "tools": tool_names}
             elif transport == "sse":
                 url = config_dict.get("url")
                 if not url:
                     return {"status": "error", "message": "URL de SSE no especificada"}
-                return {"status": "ok", "tools": []}
-            return {"status": "error", "message": f"Transporte desconocido: {transport}"}
+            else:
+                return {"status": "error", "message": f"Transporte desconocido: {transport}"}
+            manifest = await self.pool.probe(config_dict, self.connect_timeout)
+            return {"status": "ok", "tools": [entry["name"] for entry in manifest]}
         except Exception as e:
             return {"status": "error", "message": str(e)}
 
+    async def shutdown(self):
+        """Cierra todas las sesiones MCP abiertas."""
+        await self.pool.close_all()
+
     def get_all_servers_status(self) -> Dict[str, Any]:
         """Devuelve el estado de todos los servidores MCP configurados."""
         servers = self.config_manager.get_mcp_servers()
+        statuses = self.server_statuses
         result = {}
         for name, conf in servers.items():
-            st = self.server_statuses.get(name, {"status": "disconnected", "tools": []})
+            st = statuses.get(name, {"status": "disconnected", "tools": []})
             result[name] = {**conf, **st}
         return result
@@ -0,0 +1,264 @@
+"""
+Pool de sesiones MCP de larga duración.
+
+Antes, cada carga de herramientas abría un cliente stdio/SSE solo para
+listarlas y lo cerraba, así que las herramientas resultantes quedaban ligadas
+a una sesión muerta. Aquí cada servidor tiene una conexión persistente:
+
+- Todas las sesiones viven en un event loop propio en un hilo de fondo, de
+  modo que sobreviven al loop de quien las creó (FastAPI, `asyncio.run`...).
+- Cada conexión corre en su propia tarea: los context managers de `mcp`
+  (basados en anyio) se abren y se cierran en la misma tarea.
+- La conexión tiene timeout; si la sesión se cae, la siguiente llamada a una
+  herramienta reconecta una vez.
+
+Uso:
+    pool = get_mcp_session_pool()
+    tools = await pool.connect("fs", config, timeout=20)   # desde cualquier loop
+    pool.call_tool_sync("fs", "read_file", {"path": "x"})  # desde cualquier hilo
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import threading
+from typing import Any, Coroutine, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _tool_manifest(tool: Any) -> Dict[str, Any]:
+    """Entrada de manifiesto serializable a partir de un `mcp.types.Tool`."""
+    return {
+        "name": tool.name,
+        "description": tool.description or "",
+        "inputSchema": tool.inputSchema or {"type": "object", "properties": {}},
+    }
+
+
+class MCPServerConnection:
+    """Sesión persistente con un servidor MCP, gestionada por una tarea del loop del pool."""
+
+    def __init__(self, name: str, config: Dict[str, Any]):
+        self.name = name
+        self.config = config
+        self.session: Any = None
+        self.tools: List[Dict[str, Any]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._ready: Optional[asyncio.Future] = None
+        self._closing: Optional[asyncio.Event] = None
+
+    def _transport(self):
+        transport = self.config.get("transport", "stdio")
+        if transport == "stdio":
+            from mcp import StdioServerParameters
+            from mcp.client.stdio import stdio_client
+
+            cmd = self.config.get("command")
+            if not cmd:
+                raise ValueError("Comando no especificado")
+            params = StdioServerParameters(
+                command=cmd,
+                args=self.config.get("args", []),
+                env=self.config.get("env") or None,
+            )
+            return stdio_client(params)
+        if transport == "sse":
+            from mcp.client.sse import sse_client
+
+            url = self.config.get("url")
+            if not url:
+                raise ValueError("URL de SSE no especificada")
+            return sse_client(url, headers=self.config.get("headers") or None)
+        raise ValueError(f"Transporte desconocido: {transport}")
+
+    async def _run(self) -> None:
+        from contextlib import AsyncExitStack
+
+        from mcp import ClientSession
+
+        try:
+            async with AsyncExitStack() as stack:
+                read, write = await stack.enter_async_context(self._transport())
+                session = await stack.enter_async_context(ClientSession(read, write))
+                await session.initialize()
+                listed = await session.list_tools()
+                self.tools = [_tool_manifest(t) for t in listed.tools]
+                self.session = session
+                if not self._ready.done():
+                    self._ready.set_result(self.tools)
+                await self._closing.wait()
+        except BaseException as e:
+            if not self._ready.done():
+                self._ready.set_exception(e if isinstance(e, Exception) else ConnectionError(str(e) or "cancelada"))
+            elif not isinstance(e, asyncio.CancelledError):
+                logger.warning("Sesión MCP '%s' terminada: %s", self.name, e)
+            if isinstance(e, (KeyboardInterrupt, SystemExit)):
+                raise
+        finally:
+            self.session = None
+
+    async def open(self, timeout: float) -> List[Dict[str, Any]]:
+        """Abre la sesión y retorna el manifiesto de herramientas (reutiliza la sesión viva)."""
+        if self.session is not None:
+            return self.tools
+        if self._task is None or self._task.done():
+            loop = asyncio.get_running_loop()
+            self._ready = loop.create_future()
+            self._closing = asyncio.Event()
+            self._task = loop.create_task(self._run(), name=f"mcp:{self.name}")
+        try:
+            return await asyncio.wait_for(asyncio.shield(self._ready), timeout)
+        except asyncio.TimeoutError:
+            await self.close()
+            raise TimeoutError(f"El servidor MCP '{self.name}' no respondió en {timeout:g}s")
+
+    async def close(self) -> None:
+        task = self._task
+        self._task = None
+        if task is None or task.done():
+            return
+        self._closing.set()
+        try:
+            if not self._ready.done():
+                # Handshake sin terminar: no hay sesión que cerrar ordenadamente
+                raise asyncio.TimeoutError
+            await asyncio.wait_for(asyncio.shield(task), 5)
+        except (asyncio.TimeoutError, Exception):
+            task.cancel()
+            try:
+                await task
+            except BaseException:
+                pass
+
+
+class MCPSessionPool:
+    """Conexiones MCP persistentes, una por servidor, en un loop de fondo compartido."""
+
+    def __init__(self):
+        self._connections: Dict[str, MCPServerConnection] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    # ── Loop de fondo ────────────────────────────────────────────────────────
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def _run_loop():
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(ready.set)
+                    loop.run_forever()
+
+                self._thread = threading.Thread(target=_run_loop, name="kogniterm-mcp", daemon=True)
+                self._thread.start()
+                ready.wait()
+                self._loop = loop
+            return self._loop
+
+    def submit(self, coro: Coroutine) -> concurrent.futures.Future:
+        """Programa `coro` en el loop del pool y retorna un Future de `concurrent.futures`."""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    async def _await(self, coro: Coroutine) -> Any:
+        """Espera `coro` (ejecutada en el loop del pool) desde cualquier otro loop."""
+        return await asyncio.wrap_future(self.submit(coro))
+
+    # ── Conexiones ───────────────────────────────────────────────────────────
+
+    async def connect(self, name: str, config: Dict[str, Any], timeout: float) -> List[Dict[str, Any]]:
+        """Conecta (o reutiliza la conexión de) `name` y retorna su manifiesto de herramientas."""
+        return await self._await(self.connect_on_loop(name, config, timeout))
+
+    async def connect_on_loop(self, name: str, config: Dict[str, Any], timeout: float) -> List[Dict[str, Any]]:
+        """Como `connect`, para coroutines que ya corren en el loop del pool (las de `submit`)."""
+        conn = self._connections.get(name)
+        if conn is not None and conn.config != config:
+            await conn.close()
+            conn = None
+        if conn is None:
+            conn = MCPServerConnection(name, config)
+            self._connections[name] = conn
+        return await conn.open(timeout)
+
+    async def probe(self, config: Dict[str, Any], timeout: float) -> List[Dict[str, Any]]:
+        """Abre una conexión temporal, lista las herramientas y la cierra."""
+
+        async def _probe():
+            conn = MCPServerConnection("test", config)
+            try:
+                return await conn.open(timeout)
+            finally:
+                await conn.close()
+
+        return await self._await(_probe())
+
+    async def disconnect(self, name: str) -> None:
+        await self._await(self._disconnect(name))
+
+    async def _disconnect(self, name: str) -> None:
+        conn = self._connections.pop(name, None)
+        if conn is not None:
+            await conn.close()
+
+    async def close_all(self) -> None:
+        if self._loop is None:
+            return
+        for name in list(self._connections):
+            await self.disconnect(name)
+
+    def is_connected(self, name: str) -> bool:
+        conn = self._connections.get(name)
+        return conn is not None and conn.session is not None
+
+    # ── Invocación ───────────────────────────────────────────────────────────
+
+    async def _call_tool(
+        self, name: str, config: Dict[str, Any], tool: str, arguments: Dict[str, Any],
+        connect_timeout: float, call_timeout: float,
+    ) -> Any:
+        for attempt in range(2):
+            await self.connect_on_loop(name, config, connect_timeout)
+            conn = self._connections[name]
+            try:
+                return await asyncio.wait_for(conn.session.call_tool(tool, arguments), call_timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"La herramienta MCP '{tool}' no respondió en {call_timeout:g}s")
+            except Exception as e:
+                # Los errores de la herramienta llegan como resultado (isError); una
+                # excepción aquí indica una sesión caída: se reconecta una vez.
+                if attempt:
+                    raise
+                logger.info("Reconectando con el servidor MCP '%s' tras error: %s", name, e)
+                await self._disconnect(name)
+
+    def call_tool_sync(
+        self, name: str, config: Dict[str, Any], tool: str, arguments: Dict[str, Any],
+        connect_timeout: float, call_timeout: float,
+    ) -> Any:
+        future = self.submit(self._call_tool(name, config, tool, arguments, connect_timeout, call_timeout))
+        return future.result()
+
+    async def call_tool(
+        self, name: str, config: Dict[str, Any], tool: str, arguments: Dict[str, Any],
+        connect_timeout: float, call_timeout: float,
+    ) -> Any:
+        return await self._await(self._call_tool(name, config, tool, arguments, connect_timeout, call_timeout))
+
+
+_pool: Optional[MCPSessionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_mcp_session_pool() -> MCPSessionPool:
+    """Pool de sesiones MCP global del proceso."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = MCPSessionPool()
+    return _pool
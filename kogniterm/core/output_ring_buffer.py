@@ -0,0 +1,219 @@
+"""
+OutputRingBuffer — Búfer de salida acotado en bytes con volcado a disco.
+
+Pensado para procesos de larga duración (servidores de desarrollo, `tail -f`):
+la memoria está acotada por `max_memory_bytes`; lo que sale del anillo se
+vuelca a un archivo temporal (rotado al superar `max_spill_bytes`), de modo que
+el coste en memoria es constante y el disco también queda acotado.
+
+Cada byte escrito tiene un offset absoluto y creciente. Eso permite:
+- `tail(n)`: últimas n líneas leyendo solo desde el final (O(tail)).
+- `read_since(cursor)`: lecturas incrementales; devuelve el texto nuevo y el
+  cursor siguiente. Si el cursor apunta a datos ya descartados, se indica
+  cuántos bytes se perdieron.
+"""
+
+import codecs
+import os
+import tempfile
+import threading
+import weakref
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+DEFAULT_MEMORY_BYTES = int(os.environ.get("KOGNITERM_BG_OUTPUT_MEMORY_BYTES", 1024 * 1024))
+DEFAULT_SPILL_BYTES = int(os.environ.get("KOGNITERM_BG_OUTPUT_SPILL_BYTES", 32 * 1024 * 1024))
+
+_READ_BLOCK = 64 * 1024
+
+
+def _remove_files(paths: List[str]) -> None:
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class _SpillSegment:
+    """Archivo de volcado que contiene los bytes [start, end) del flujo."""
+
+    def __init__(self, path: str, start: int):
+        self.path = path
+        self.start = start
+        self.end = start
+
+    def read(self, begin: int, end: int) -> bytes:
+        begin, end = max(begin, self.start), min(end, self.end)
+        if begin >= end:
+            return b""
+        with open(self.path, "rb") as f:
+            f.seek(begin - self.start)
+            return f.read(end - begin)
+
+
+class OutputRingBuffer:
+    def __init__(
+        self,
+        max_memory_bytes: int = DEFAULT_MEMORY_BYTES,
+        max_spill_bytes: int = DEFAULT_SPILL_BYTES,
+        spill_prefix: str = "kogniterm-output-",
+    ):
+        self.max_memory_bytes = max_memory_bytes
+        self.max_spill_bytes = max_spill_bytes
+        self._spill_prefix = spill_prefix
+        self._chunks: Deque[bytes] = deque()
+        self._memory_bytes = 0
+        self._memory_start = 0  # offset absoluto del primer byte en memoria
+        self._total = 0  # offset absoluto del siguiente byte a escribir
+        # Como mucho dos segmentos: el anterior (rotado) y el actual
+        self._segments: List[_SpillSegment] = []
+        self._lock = threading.Lock()
+        self._spill_paths: List[str] = []
+        self._finalizer = weakref.finalize(self, _remove_files, self._spill_paths)
+
+    # ── Escritura ──────────────────────────────────────────────────────────
+
+    def append(self, text: str) -> None:
+        if not text:
+            return
+        data = text.encode("utf-8", errors="replace")
+        with self._lock:
+            self._chunks.append(data)
+            self._memory_bytes += len(data)
+            self._total += len(data)
+            while self._memory_bytes > self.max_memory_bytes and len(self._chunks) > 1:
+                evicted = self._chunks.popleft()
+                self._memory_bytes -= len(evicted)
+                self._spill(evicted)
+                self._memory_start += len(evicted)
+
+    def _spill(self, data: bytes) -> None:
+        if len(data) > self.max_spill_bytes:
+            # Sin disco (o bloque mayor que el límite): el volcado deja de ser contiguo
+            self._drop_segments()
+            return
+        segment = self._segments[-1] if self._segments else None
+        if segment is None or segment.end - segment.start + len(data) > self.max_spill_bytes:
+            if len(self._segments) == 2:
+                self._drop_segment(self._segments[0])
+            try:
+                fd, path = tempfile.mkstemp(prefix=self._spill_prefix, suffix=".log")
+                os.close(fd)
+            except OSError:
+                self._drop_segments()
+                return
+            self._spill_paths.append(path)
+            segment = _SpillSegment(path, self._memory_start)
+            self._segments.append(segment)
+        try:
+            with open(segment.path, "ab") as f:
+                f.write(data)
+            segment.end += len(data)
+        except OSError:
+            self._drop_segments()
+
+    def _drop_segment(self, segment: _SpillSegment) -> None:
+        self._segments.remove(segment)
+        _remove_files([segment.path])
+        if segment.path in self._spill_paths:
+            self._spill_paths.remove(segment.path)
+
+    def _drop_segments(self) -> None:
+        for segment in list(self._segments):
+            self._drop_segment(segment)
+
+    # ── Lectura ────────────────────────────────────────────────────────────
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total
+
+    @property
+    def memory_bytes(self) -> int:
+        return self._memory_bytes
+
+    @property
+    def oldest_offset(self) -> int:
+        """Offset del byte más antiguo aún recuperable (memoria o disco)."""
+        with self._lock:
+            return self._oldest_locked()
+
+    def _oldest_locked(self) -> int:
+        for segment in self._segments:
+            if segment.end > segment.start:
+                return segment.start
+        return self._memory_start
+
+    def _read_range_locked(self, begin: int, end: int) -> bytes:
+        parts = []
+        for segment in self._segments:
+            if begin < segment.end and end > segment.start:
+                parts.append(segment.read(begin, end))
+        if end > self._memory_start:
+            offset = self._memory_start
+            for chunk in self._chunks:
+                chunk_end = offset + len(chunk)
+                if chunk_end > begin and offset < end:
+                    parts.append(chunk[max(begin - offset, 0):min(end, chunk_end) - offset])
+                offset = chunk_end
+                if offset >= end:
+                    break
+        return b"".join(parts)
+
+    def read_since(self, cursor: int = 0, max_bytes: Optional[int] = None) -> Tuple[str, int, int]:
+        """
+        Devuelve (texto, siguiente_cursor, bytes_perdidos) desde `cursor`.
+        `bytes_perdidos` > 0 indica que parte de la salida ya no está disponible.
+        """
+        with self._lock:
+            oldest = self._oldest_locked()
+            lost = max(0, oldest - cursor)
+            begin = max(cursor, oldest)
+            end = self._total if max_bytes is None else min(self._total, begin + max_bytes)
+            data = self._read_range_locked(begin, end)
+        if end < self._total:
+            # No cortar un carácter multibyte: lo incompleto queda para la siguiente lectura
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            text = decoder.decode(data, final=False)
+            end -= len(decoder.getstate()[0])
+            return text, end, lost
+        return data.decode("utf-8", errors="replace"), end, lost
+
+    def read_all(self) -> str:
+        return self.read_since(0)[0]
+
+    def tail(self, lines: int) -> str:
+        """Últimas `lines` líneas, leyendo hacia atrás solo lo necesario."""
+        if lines <= 0:
+            return ""
+        with self._lock:
+            oldest = self._oldest_locked()
+            collected: List[bytes] = []
+            newlines = 0
+            end = self._total
+            # Memoria primero (del final hacia el principio)
+            for chunk in reversed(self._chunks):
+                collected.append(chunk)
+                end -= len(chunk)
+                newlines += chunk.count(b"\n")
+                if newlines > lines:
+                    break
+            # Después el disco, por bloques
+            while newlines <= lines and end > oldest:
+                begin = max(oldest, end - _READ_BLOCK)
+                block = self._read_range_locked(begin, end)
+                collected.append(block)
+                newlines += block.count(b"\n")
+                end = begin
+        data = b"".join(reversed(collected))
+        text_lines = data.decode("utf-8", errors="replace").splitlines(keepends=True)
+        return "".join(text_lines[-lines:])
+
+    def close(self) -> None:
+        """Libera memoria y elimina los archivos de volcado."""
+        with self._lock:
+            self._chunks.clear()
+            self._memory_bytes = 0
+            self._memory_start = self._total
+            self._drop_segments()
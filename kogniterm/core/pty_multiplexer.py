@@ -0,0 +1,273 @@
+"""
+PtyMultiplexer — Lector de PTYs dirigido por eventos.
+
+Un único hilo con `selectors` (epoll en Linux, kqueue en macOS) atiende los
+descriptores de todas las tareas en segundo plano y del shell persistente. La
+salida se entrega en cuanto el kernel la tiene disponible, sin bucles de
+sondeo con timeout: el hilo solo despierta cuando hay datos, cuando un proceso
+vigilado termina o cuando otro hilo modifica el registro (self-pipe).
+
+Uso:
+    mux = get_pty_multiplexer()
+    mux.add_reader(master_fd, on_data=lambda data: ..., on_eof=lambda: ...)
+    mux.watch_process(process, on_exit=lambda code: ...)
+    mux.remove(master_fd, close=True)
+
+Los callbacks se ejecutan en el hilo del multiplexor y deben ser breves (añadir
+a un búfer, encolar); nunca deben bloquear.
+"""
+
+import logging
+import os
+import selectors
+import subprocess
+import threading
+from collections import deque
+from typing import Callable, Deque, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_READ_SIZE = 64 * 1024
+
+DataCallback = Callable[[bytes], None]
+EofCallback = Callable[[], None]
+ExitCallback = Callable[[Optional[int]], None]
+
+
+class _Reader:
+    __slots__ = ("on_data", "on_eof")
+
+    def __init__(self, on_data: DataCallback, on_eof: Optional[EofCallback]):
+        self.on_data = on_data
+        self.on_eof = on_eof
+
+
+class PtyMultiplexer:
+    """Multiplexor de lectura para descriptores de PTY/pipes y fin de procesos."""
+
+    def __init__(self) -> None:
+        self._selector = selectors.DefaultSelector()
+        self._lock = threading.Lock()
+        self._pending: Deque[Tuple[str, tuple]] = deque()
+        self._thread: Optional[threading.Thread] = None
+        self._wakeup_read, self._wakeup_write = os.pipe()
+        os.set_blocking(self._wakeup_read, False)
+        os.set_blocking(self._wakeup_write, False)
+        self._selector.register(self._wakeup_read, selectors.EVENT_READ, None)
+        self._closed = False
+        self.wakeups = 0
+
+    # ── API pública ────────────────────────────────────────────────────────
+
+    def add_reader(self, fd: int, on_data: DataCallback, on_eof: Optional[EofCallback] = None) -> None:
+        """
+        Lee `fd` (en modo no bloqueante) y entrega cada bloque a `on_data`. Al
+        llegar EOF (o EIO, que es como un PTY maestro señala el cierre del
+        esclavo) se desregistra y se llama a `on_eof`.
+        """
+        os.set_blocking(fd, False)
+        self._submit("add", (fd, _Reader(on_data, on_eof)))
+
+    def remove(self, fd: int, close: bool = False) -> None:
+        """
+        Deja de vigilar `fd`. Con `close=True` el multiplexor cierra el
+        descriptor tras desregistrarlo, evitando que un número de fd reutilizado
+        reciba eventos del anterior.
+        """
+        self._submit("remove", (fd, close))
+
+    def watch_process(self, process: subprocess.Popen, on_exit: ExitCallback) -> None:
+        """
+        Llama a `on_exit(returncode)` cuando `process` termina. Usa un pidfd si
+        el sistema lo soporta (Linux >= 5.3); si no, un hilo que espera bloqueado
+        en `wait()`, que tampoco sondea.
+        """
+        pidfd = None
+        if hasattr(os, "pidfd_open"):
+            try:
+                pidfd = os.pidfd_open(process.pid)
+            except OSError:
+                pidfd = None
+        if pidfd is None:
+            # El callback se reenvía al hilo del multiplexor, como con el pidfd
+            threading.Thread(
+                target=lambda: self._submit("call", (on_exit, self._wait(process))),
+                daemon=True,
+                name=f"KogniTerm-PtyWait-{process.pid}",
+            ).start()
+            return
+        self._submit("watch", (pidfd, process, on_exit))
+
+    def close(self) -> None:
+        """Detiene el hilo y libera el selector."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+        if thread is None:
+            self._release()
+            return
+        self._wake()
+        if thread is not threading.current_thread():
+            thread.join(timeout=2)
+
+    # ── Hilo del multiplexor ───────────────────────────────────────────────
+
+    def _submit(self, op: str, args: tuple) -> None:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("PtyMultiplexer cerrado")
+            in_loop = threading.current_thread() is self._thread
+            if not in_loop:
+                self._pending.append((op, args))
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, daemon=True, name="KogniTerm-PtyMultiplexer")
+                    self._thread.start()
+        if in_loop:
+            # Desde un callback: aplicar en el acto, el hilo está fuera de select()
+            self._apply(op, args)
+        else:
+            self._wake()
+
+    def _wake(self) -> None:
+        try:
+            os.write(self._wakeup_write, b"\0")
+        except (BlockingIOError, OSError):
+            pass  # Ya hay un despertar pendiente
+
+    def _apply(self, op: str, args: tuple) -> None:
+        if op == "add":
+            fd, reader = args
+            self._unregister(fd)
+            self._selector.register(fd, selectors.EVENT_READ, reader)
+        elif op == "watch":
+            pidfd, process, on_exit = args
+            self._selector.register(pidfd, selectors.EVENT_READ, (process, on_exit))
+        elif op == "call":
+            callback, arg = args
+            self._call(callback, arg)
+        elif op == "remove":
+            fd, close = args
+            self._unregister(fd)
+            if close:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+
+    def _unregister(self, fd: int) -> None:
+        try:
+            self._selector.unregister(fd)
+        except (KeyError, ValueError):
+            pass
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if self._closed:
+                    break
+                pending = list(self._pending)
+                self._pending.clear()
+            for op, args in pending:
+                try:
+                    self._apply(op, args)
+                except (OSError, ValueError) as e:
+                    logger.debug(f"PtyMultiplexer: operación {op} ignorada: {e}")
+            try:
+                events = self._selector.select()
+            except OSError as e:
+                logger.error(f"PtyMultiplexer: error en select: {e}")
+                continue
+            self.wakeups += 1
+            for key, _ in events:
+                if self._selector.get_map().get(key.fd) is not key:
+                    continue  # Desregistrado por un callback anterior de este mismo lote
+                if key.fd == self._wakeup_read:
+                    self._drain_wakeups()
+                elif isinstance(key.data, _Reader):
+                    self._handle_readable(key.fd, key.data)
+                elif key.data is not None:
+                    self._handle_exit(key.fd, *key.data)
+        self._release()
+
+    def _release(self) -> None:
+        self._selector.close()
+        for fd in (self._wakeup_read, self._wakeup_write):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def _drain_wakeups(self) -> None:
+        try:
+            while os.read(self._wakeup_read, 4096):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+
+    def _handle_readable(self, fd: int, reader: _Reader) -> None:
+        eof = False
+        try:
+            data = os.read(fd, _READ_SIZE)
+            eof = not data
+        except BlockingIOError:
+            return
+        except OSError:
+            eof = True
+        if eof:
+            self._unregister(fd)
+            self._call(reader.on_eof)
+            return
+        self._call(reader.on_data, data)
+
+    def _handle_exit(self, pidfd: int, process: subprocess.Popen, on_exit: ExitCallback) -> None:
+        self._unregister(pidfd)
+        try:
+            os.close(pidfd)
+        except OSError:
+            pass
+        self._call(on_exit, self._wait(process))
+
+    @staticmethod
+    def _wait(process: subprocess.Popen) -> Optional[int]:
+        try:
+            return process.wait()
+        except Exception:
+            return process.returncode
+
+    @staticmethod
+    def _call(callback: Optional[Callable], *args) -> None:
+        if callback is None:
+            return
+        try:
+            callback(*args)
+        except Exception as e:
+            logger.error(f"PtyMultiplexer: error en callback: {e}")
+
+
+_default_multiplexer: Optional[PtyMultiplexer] = None
+_default_lock = threading.Lock()
+
+
+def get_pty_multiplexer() -> PtyMultiplexer:
+    """Obtiene la instancia global del multiplexor (el hilo arranca con el primer registro)."""
+    global _default_multiplexer
+    with _default_lock:
+        if _default_multiplexer is None:
+            _default_multiplexer = PtyMultiplexer()
+        return _default_multiplexer
+
+
+def drain_fd(fd: int) -> bytes:
+    """Lee sin bloquear todo lo disponible en `fd` (usado al finalizar un proceso)."""
+    chunks = []
+    while True:
+        try:
+            data = os.read(fd, _READ_SIZE)
+        except (BlockingIOError, OSError):
+            break
+        if not data:
+            break
+        chunks.append(data)
+    return b"".join(chunks)
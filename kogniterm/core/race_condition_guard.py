@@ -185,6 +185,18 @@ class RaceConditionGuard:
 
         file_state = RaceConditionGuard._compute_file_state(file_path, content)
         state.file_hash_cache[file_path] = file_state
+        RaceConditionGuard._invalidate_tool_results(state, file_path)
+
+    @staticmethod
+    def _invalidate_tool_results(state: Any, file_path: Optional[str] = None) -> None:
+        """Descarta los resultados memorizados (ToolResultCache) que dependen del archivo."""
+        cache = getattr(state, 'tool_result_cache', None)
+        if cache is None:
+            return
+        if file_path is None:
+            cache.clear()
+        else:
+            cache.invalidate_path(file_path)
 
     @staticmethod
     def invalidate(state: Any, file_path: str) -> None:
@@ -197,6 +209,7 @@ class RaceConditionGuard:
         """
         if hasattr(state, 'file_hash_cache') and file_path in state.file_hash_cache:
             del state.file_hash_cache[file_path]
+        RaceConditionGuard._invalidate_tool_results(state, file_path)
 
     @staticmethod
     def clear_cache(state: Any) -> None:
@@ -208,6 +221,7 @@ class RaceConditionGuard:
         """
         if hasattr(state, 'file_hash_cache'):
             state.file_hash_cache.clear()
+        RaceConditionGuard._invalidate_tool_results(state)
 
 
 class RaceConditionDetected(Exception):
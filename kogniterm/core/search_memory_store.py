@@ -0,0 +1,399 @@
+"""
+SearchMemoryStore — Memoria persistente de resultados de búsqueda.
+
+La skill `search_memory` guardaba como mucho 10 resultados en una lista del
+proceso y los comparaba por subcadena: se perdían al reiniciar y no
+reconocían consultas parafraseadas, así que los agentes repetían búsquedas
+caras en Tavily o en la web. Este almacén:
+
+- Persiste las entradas en `<workspace>/.kogniterm/search_memory.jsonl`
+  (una memoria por workspace). Es un registro de solo anexado: cada alta,
+  uso o baja añade una línea, en vez de reescribir todas las entradas (con
+  sus embeddings) en cada operación; cuando crece demasiado se compacta.
+  Las líneas que añaden otros procesos se aplican antes de cada operación.
+- Indexa cada consulta con `EmbeddingsService` (vectores normalizados, así
+  que la similitud coseno es un producto escalar) y solo devuelve entradas
+  por encima de `threshold`.
+- Si no hay proveedor de embeddings, cae a coincidencia léxica (subcadena o
+  solapamiento de palabras), como la versión anterior.
+- Cada entrada caduca a los `ttl` segundos (o con su propio TTL).
+- Por encima de `capacity` se expulsan las entradas usadas hace más tiempo.
+- Las entradas con ámbito `session` solo son visibles en la sesión que las
+  guardó (`session_id` de `put`/`search`, p. ej. `llm_service.session_id`);
+  las de ámbito `workspace`, en cualquier sesión del workspace.
+
+Uso:
+    store = get_search_memory_store(workspace_dir)
+    store.put("cómo instalar python", "apt-get install python3", session_id=sid)
+    store.search("instalación de python", session_id=sid)  # -> [(0.91, SearchMemoryEntry)]
+"""
+
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+STORE_FILE_NAME = "search_memory.jsonl"
+SCOPES = ("workspace", "session")
+# Sesión por defecto de un almacén cuando quien llama no indica la suya
+SESSION_ID = uuid.uuid4().hex[:12]
+# Líneas del registro a partir de las que se compacta (y nunca menos de 4 por entrada viva)
+COMPACT_MIN_RECORDS = 256
+# Umbral de solapamiento de palabras del modo léxico (sin embeddings)
+LEXICAL_THRESHOLD = 0.5
+# Embeddings de consultas recientes que se conservan para no recalcularlos
+QUERY_EMBEDDING_CACHE = 64
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+Embedder = Callable[[List[str]], List[List[float]]]
+
+
+@dataclass
+class SearchMemoryEntry:
+    """Resultado guardado para una consulta."""
+
+    query: str
+    result: str
+    created_at: float
+    last_used: float
+    ttl: Optional[float] = None
+    session: Optional[str] = None
+    embedding: Optional[List[float]] = field(default=None, repr=False)
+
+    def expired(self, now: float, default_ttl: float) -> bool:
+        ttl = self.ttl if self.ttl is not None else default_ttl
+        return ttl > 0 and now - self.created_at > ttl
+
+
+def _normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def _unit(vector: List[float]) -> Optional[List[float]]:
+    norm = math.sqrt(sum(v * v for v in vector))
+    if not norm:
+        return None
+    return [v / norm for v in vector]
+
+
+def _words(text: str) -> set:
+    return set(_WORD_RE.findall(text.lower()))
+
+
+def lexical_similarity(query: str, stored: str) -> float:
+    """Similitud sin embeddings: 1.0 si una consulta contiene a la otra, si no solapamiento de palabras."""
+    a, b = _normalize_query(query), _normalize_query(stored)
+    if not a or not b:
+        return 0.0
+    if a in b or b in a:
+        return 1.0
+    wa, wb = _words(a), _words(b)
+    if not wa or not wb:
+        return 0.0
+    return len(wa & wb) / min(len(wa), len(wb))
+
+
+class SearchMemoryStore:
+    """Memoria de búsquedas de un workspace, con índice de embeddings y persistencia en disco."""
+
+    def __init__(
+        self,
+        path: Optional[str],
+        capacity: Optional[int] = None,
+        ttl: Optional[float] = None,
+        threshold: Optional[float] = None,
+        embedder: Optional[Embedder] = None,
+        session_id: str = SESSION_ID,
+    ):
+        if capacity is None or ttl is None or threshold is None:
+            from .config import settings
+
+            capacity = settings.search_memory_capacity if capacity is None else capacity
+            ttl = settings.search_memory_ttl if ttl is None else ttl
+            threshold = settings.search_memory_threshold if threshold is None else threshold
+        self.path = path
+        self.capacity = capacity
+        self.ttl = ttl
+        self.threshold = threshold
+        self.session_id = session_id
+        self._embedder = embedder
+        self._embeddings_available: Optional[bool] = None if embedder is None else True
+        # clave (consulta normalizada, sesión) -> entrada, en orden de uso (LRU al principio)
+        self._entries: "OrderedDict[Tuple[str, Optional[str]], SearchMemoryEntry]" = OrderedDict()
+        self._query_vectors: "OrderedDict[str, Optional[List[float]]]" = OrderedDict()
+        # Posición del registro ya aplicada (inodo, bytes) y líneas que contiene
+        self._log_inode: Optional[int] = None
+        self._log_offset = 0
+        self._log_records = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    # ── Embeddings ───────────────────────────────────────────────────────────
+
+    def _embed(self, text: str) -> Optional[List[float]]:
+        """Vector unitario de `text`, o None si no hay embeddings disponibles."""
+        key = _normalize_query(text)
+        with self._lock:
+            if key in self._query_vectors:
+                self._query_vectors.move_to_end(key)
+                return self._query_vectors[key]
+        if self._embeddings_available is False:
+            return None
+        if self._embedder is None:
+            try:
+                from .embeddings_service import EmbeddingsService
+
+                self._embedder = EmbeddingsService.get_instance().generate_embeddings
+            except Exception as e:
+                logger.debug("SearchMemoryStore: sin servicio de embeddings: %s", e)
+                self._embeddings_available = False
+                return None
+        try:
+            vectors = self._embedder([text])
+            vector = _unit(list(vectors[0])) if vectors else None
+        except Exception as e:
+            logger.info("SearchMemoryStore: embeddings no disponibles, se usa coincidencia léxica: %s", e)
+            self._embeddings_available = False
+            return None
+        self._embeddings_available = True
+        with self._lock:
+            self._query_vectors[key] = vector
+            while len(self._query_vectors) > QUERY_EMBEDDING_CACHE:
+                self._query_vectors.popitem(last=False)
+        return vector
+
+    # ── Persistencia ─────────────────────────────────────────────────────────
+    #
+    # Registros del archivo (uno por línea):
+    #   {"op": "put", "entry": {...}}                   alta o reemplazo
+    #   {"op": "touch", "keys": [[q, s], ...], "at": t}  uso (last_used)
+    #   {"op": "del", "keys": [[q, s], ...]}             expulsión por capacidad
+    # Aplicar un registro dos veces deja el mismo estado, así que las líneas
+    # propias se vuelven a leer junto con las de otros procesos sin problema.
+
+    def _apply(self, record: dict) -> None:
+        op = record.get("op")
+        if op == "put":
+            entry = SearchMemoryEntry(**record["entry"])
+            key = (_normalize_query(entry.query), entry.session)
+            self._entries.pop(key, None)
+            self._entries[key] = entry
+        elif op == "touch":
+            for query, session in record.get("keys", []):
+                entry = self._entries.get((query, session))
+                if entry is not None:
+                    entry.last_used = max(entry.last_used, record.get("at", 0.0))
+                    self._entries.move_to_end((query, session))
+        elif op == "del":
+            for query, session in record.get("keys", []):
+                self._entries.pop((query, session), None)
+
+    def _sync(self) -> None:
+        """Aplica las líneas del registro que aún no se han leído (todas si se compactó)."""
+        if not self.path:
+            return
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return
+        if st.st_ino != self._log_inode or st.st_size < self._log_offset:
+            # Archivo nuevo o compactado por otro proceso: se relee entero
+            self._entries.clear()
+            self._log_inode, self._log_offset, self._log_records = st.st_ino, 0, 0
+        if st.st_size == self._log_offset:
+            return
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(self._log_offset)
+                data = f.read()
+        except OSError as e:
+            logger.warning("SearchMemoryStore: no se pudo leer %s: %s", self.path, e)
+            return
+        # Una línea sin salto final puede estar escribiéndose todavía
+        complete = data[: data.rfind(b"\n") + 1]
+        for line in complete.splitlines():
+            if not line.strip():
+                continue
+            try:
+                self._apply(json.loads(line))
+            except (ValueError, TypeError, KeyError) as e:
+                logger.warning("SearchMemoryStore: línea inválida en %s: %s", self.path, e)
+            self._log_records += 1
+        self._log_offset += len(complete)
+
+    def _load(self) -> None:
+        with self._lock:
+            self._sync()
+            self._purge(time.time())
+
+    def _append(self, *records: dict) -> None:
+        if not self.path or not records:
+            return
+        lines = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            # Una sola escritura en modo anexado: las líneas de procesos distintos no se mezclan
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+        except OSError as e:
+            logger.warning("SearchMemoryStore: no se pudo guardar %s: %s", self.path, e)
+            return
+        # La posición no avanza: el siguiente `_sync` aplica también las líneas
+        # que otro proceso haya podido intercalar (las propias no cambian nada)
+        if self._log_records + len(records) > max(COMPACT_MIN_RECORDS, 4 * len(self._entries)):
+            self._compact()
+
+    def _compact(self) -> None:
+        """Reescribe el registro con solo las entradas vivas."""
+        if not self.path:
+            return
+        self._sync()
+        self._purge(time.time())
+        tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                for entry in self._entries.values():
+                    f.write(json.dumps({"op": "put", "entry": asdict(entry)}, ensure_ascii=False) + "\n")
+                size = f.tell()
+            os.replace(tmp, self.path)
+            self._log_inode = os.stat(self.path).st_ino
+            self._log_offset, self._log_records = size, len(self._entries)
+        except OSError as e:
+            logger.warning("SearchMemoryStore: no se pudo compactar %s: %s", self.path, e)
+
+    # ── API ──────────────────────────────────────────────────────────────────
+
+    def put(
+        self,
+        query: str,
+        result: str,
+        ttl: Optional[float] = None,
+        scope: str = "workspace",
+        session_id: Optional[str] = None,
+    ) -> SearchMemoryEntry:
+        """Guarda (o reemplaza) el resultado de `query` para la sesión `session_id`."""
+        if scope not in SCOPES:
+            raise ValueError(f"Ámbito no válido: '{scope}'. Usa uno de: {', '.join(SCOPES)}.")
+        now = time.time()
+        session = (session_id or self.session_id) if scope == "session" else None
+        entry = SearchMemoryEntry(
+            query=query,
+            result=result,
+            created_at=now,
+            last_used=now,
+            ttl=ttl,
+            session=session,
+            embedding=self._embed(query),
+        )
+        with self._lock:
+            self._sync()
+            key = (_normalize_query(query), session)
+            self._entries.pop(key, None)
+            self._entries[key] = entry
+            self._purge(now)
+            evicted = []
+            while len(self._entries) > self.capacity > 0:
+                evicted.append(list(self._entries.popitem(last=False)[0]))
+            records = [{"op": "put", "entry": asdict(entry)}]
+            if evicted:
+                records.append({"op": "del", "keys": evicted})
+            self._append(*records)
+        return entry
+
+    def search(
+        self, query: str, limit: int = 3, session_id: Optional[str] = None
+    ) -> List[Tuple[float, SearchMemoryEntry]]:
+        """Entradas visibles para `session_id` más parecidas a `query`, de mayor a menor similitud."""
+        now = time.time()
+        normalized = _normalize_query(query)
+        session = session_id or self.session_id
+        with self._lock:
+            self._sync()
+            self._purge(now)
+            visible_keys = [key for key in self._entries if key[1] is None or key[1] == session]
+            needs_vector = bool(visible_keys) and all(key[0] != normalized for key in visible_keys)
+        # El embedding se calcula fuera del lock (puede ser una llamada de red)
+        vector = self._embed(query) if needs_vector else None
+        with self._lock:
+            self._sync()
+            self._purge(now)
+            visible = [
+                (key, e) for key, e in self._entries.items()
+                if e.session is None or e.session == session
+            ]
+            exact = [(1.0, key, e) for key, e in visible if key[0] == normalized]
+            scored = exact or self._score(query, visible, vector)
+            scored.sort(key=lambda item: item[0], reverse=True)
+            matches = scored[:limit]
+            for _, key, entry in matches:
+                entry.last_used = now
+                self._entries.move_to_end(key)
+            if matches:
+                self.hits += 1
+                self._append({"op": "touch", "keys": [list(key) for _, key, _ in matches], "at": now})
+            else:
+                self.misses += 1
+        return [(score, entry) for score, _, entry in matches]
+
+    def _score(self, query: str, visible, vector: Optional[List[float]]) -> List[Tuple[float, tuple, SearchMemoryEntry]]:
+        scored = []
+        for key, entry in visible:
+            if vector is not None and entry.embedding and len(entry.embedding) == len(vector):
+                score = sum(a * b for a, b in zip(vector, entry.embedding))
+                threshold = self.threshold
+            else:
+                score = lexical_similarity(query, entry.query)
+                threshold = LEXICAL_THRESHOLD
+            if score >= threshold:
+                scored.append((score, key, entry))
+        return scored
+
+    def _purge(self, now: float) -> bool:
+        # Caducar no se registra: al releer el archivo se vuelve a purgar igual
+        expired = [key for key, e in self._entries.items() if e.expired(now, self.ttl)]
+        for key in expired:
+            del self._entries[key]
+        return bool(expired)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sync()
+            self._entries.clear()
+            self._compact()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+_stores: Dict[str, SearchMemoryStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_search_memory_store(workspace_dir: Optional[str] = None) -> SearchMemoryStore:
+    """Memoria de búsquedas del workspace (una instancia por directorio y proceso)."""
+    base_dir = os.path.abspath(workspace_dir or os.getcwd())
+    store = _stores.get(base_dir)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(base_dir)
+            if store is None:
+                store = SearchMemoryStore(os.path.join(base_dir, ".kogniterm", STORE_FILE_NAME))
+                _stores[base_dir] = store
+    return store
@@ -0,0 +1,256 @@
+"""
+Caché de artefactos compartida entre sub-agentes hermanos.
+
+Cuando `call_agents_parallel` lanza varios sub-agentes sobre el mismo
+repositorio, todos leen los mismos archivos, repiten las mismas consultas de
+`codebase_search` y descargan las mismas URLs. Esta caché, de ámbito de sesión
+(una por `llm_service`), se consulta antes de ejecutar cualquier herramienta
+idempotente de un sub-agente:
+
+- Archivos y búsquedas locales: válidos mientras la huella (mtime, tamaño) de
+  las rutas implicadas no cambie, igual que `ToolResultCache`.
+- Resultados locales sin rutas (búsquedas semánticas): válidos durante `ttl`
+  segundos y descartados ante cualquier escritura o comando, porque no se
+  sabe de qué archivos dependen.
+- Resultados de red (páginas, GitHub): válidos durante `ttl` segundos; no
+  dependen de archivos locales aunque sus argumentos se llamen `path`.
+- Si un hermano ya está ejecutando la misma llamada, se espera su resultado
+  en vez de repetirla.
+
+El contenido se guarda una sola vez por hash. Los resultados grandes se
+entregan con su identificador de artefacto; si el mismo agente vuelve a
+pedir un artefacto que ya tiene en su contexto recibe solo una referencia
+compacta (y el contenido completo si insiste, por si ya no lo conserva).
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from .skills.tool_effects import ToolEffects
+from .tool_result_cache import Fingerprint, ToolResultCache, _fingerprint, _normalize_path
+
+logger = logging.getLogger(__name__)
+
+# Por debajo de este tamaño no compensa sustituir el contenido por una referencia
+REFERENCE_MIN_CHARS = 512
+# Espera máxima por el resultado de una llamada idéntica en curso de un hermano
+IN_FLIGHT_WAIT = 120.0
+
+
+@dataclass
+class _Entry:
+    digest: str
+    fingerprint: Fingerprint
+    expires_at: Optional[float]
+    # Resultado local: sin huella, lo invalida cualquier escritura
+    local: bool = True
+
+
+class SharedArtifactCache:
+    """Resultados de herramientas idempotentes compartidos por los sub-agentes de una sesión."""
+
+    def __init__(self, max_bytes: Optional[int] = None, ttl: Optional[float] = None):
+        if max_bytes is None or ttl is None:
+            from .config import settings
+
+            max_bytes = settings.shared_artifact_cache_bytes if max_bytes is None else max_bytes
+            ttl = settings.shared_artifact_ttl if ttl is None else ttl
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        self._blobs: Dict[str, str] = {}
+        self._refcounts: Dict[str, int] = {}
+        self._bytes = 0
+        self._in_flight: Dict[Tuple[str, str], threading.Event] = {}
+        # agent_id -> {digest: "full" | "ref"}
+        self._delivered: Dict[str, Dict[str, str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+
+    @staticmethod
+    def for_service(llm_service: Any) -> "SharedArtifactCache":
+        """Caché de la sesión a la que pertenece `llm_service` (la crea la primera vez)."""
+        cache = getattr(llm_service, "_shared_artifact_cache", None)
+        if not isinstance(cache, SharedArtifactCache):
+            cache = SharedArtifactCache()
+            try:
+                llm_service._shared_artifact_cache = cache
+            except AttributeError:
+                pass
+        return cache
+
+    @staticmethod
+    def fingerprint(args: Any, effects: ToolEffects) -> Fingerprint:
+        if effects.network:
+            return ()
+        return _fingerprint(ToolResultCache._paths(effects, args))
+
+    # ── Lectura ──────────────────────────────────────────────────────────────
+
+    def acquire(self, tool_name: str, args: Any, effects: ToolEffects, agent_id: Optional[str]) -> Optional[str]:
+        """
+        Resultado para `agent_id` si está en caché (esperando a un hermano que
+        lo esté calculando). Si retorna None, quien llama se compromete a
+        ejecutar la herramienta y a llamar a `publish` o `release`.
+        """
+        key = ToolResultCache._key(tool_name, args)
+        deadline = time.monotonic() + IN_FLIGHT_WAIT
+        while True:
+            with self._lock:
+                content = self._lookup(key, args, effects)
+                if content is not None:
+                    self.hits += 1
+                    return self._render(content, agent_id)
+                event = self._in_flight.get(key)
+                if event is None:
+                    self._in_flight[key] = threading.Event()
+                    self.misses += 1
+                    return None
+                self.waits += 1
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not event.wait(remaining):
+                # El hermano tarda demasiado: ejecutar por cuenta propia
+                self.misses += 1
+                return None
+
+    def _lookup(self, key: Tuple[str, str], args: Any, effects: ToolEffects) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expired = entry.expires_at is not None and time.monotonic() > entry.expires_at
+        if expired or (entry.fingerprint and entry.fingerprint != self.fingerprint(args, effects)):
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return self._blobs.get(entry.digest)
+
+    # ── Escritura ────────────────────────────────────────────────────────────
+
+    def publish(
+        self,
+        tool_name: str,
+        args: Any,
+        effects: ToolEffects,
+        output: str,
+        fingerprint: Optional[Fingerprint],
+        agent_id: Optional[str],
+    ) -> str:
+        """Guarda el resultado, despierta a los hermanos que lo esperaban y retorna lo que ve `agent_id`."""
+        key = ToolResultCache._key(tool_name, args)
+        if fingerprint is None or effects.network:
+            fingerprint = self.fingerprint(args, effects)
+        cacheable = bool(output) and not output.startswith("Error")
+        with self._lock:
+            if cacheable:
+                digest = hashlib.sha1(output.encode("utf-8", "replace")).hexdigest()
+                self._drop(key)
+                if digest not in self._blobs:
+                    self._blobs[digest] = output
+                    self._bytes += len(output)
+                self._refcounts[digest] = self._refcounts.get(digest, 0) + 1
+                self._entries[key] = _Entry(
+                    digest=digest,
+                    fingerprint=fingerprint,
+                    expires_at=None if fingerprint else time.monotonic() + self.ttl,
+                    local=not effects.network,
+                )
+                self._evict()
+            event = self._in_flight.pop(key, None)
+            rendered = self._render(output, agent_id) if cacheable else output
+        if event is not None:
+            event.set()
+        return rendered
+
+    def release(self, tool_name: str, args: Any) -> None:
+        """Libera la llamada reservada por `acquire` sin publicar resultado (error o interrupción)."""
+        key = ToolResultCache._key(tool_name, args)
+        with self._lock:
+            event = self._in_flight.pop(key, None)
+        if event is not None:
+            event.set()
+
+    def _drop(self, key: Tuple[str, str]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        count = self._refcounts.get(entry.digest, 0) - 1
+        if count <= 0:
+            self._refcounts.pop(entry.digest, None)
+            blob = self._blobs.pop(entry.digest, None)
+            if blob is not None:
+                self._bytes -= len(blob)
+        else:
+            self._refcounts[entry.digest] = count
+
+    def invalidate_path(self, file_path: str) -> None:
+        """
+        Descarta las entradas que dependen de `file_path` (o de un directorio
+        que lo contiene) y las locales sin rutas conocidas.
+        """
+        target = _normalize_path(file_path)
+        with self._lock:
+            stale = [
+                key for key, entry in self._entries.items()
+                if (entry.local and not entry.fingerprint) or any(
+                    p == target or target.startswith(p + os.sep) for p, _, _ in entry.fingerprint
+                )
+            ]
+            for key in stale:
+                self._drop(key)
+
+    def invalidate_unscoped(self) -> None:
+        """
+        Descarta las entradas locales sin rutas conocidas: tras un comando de
+        shell o una escritura sin rutas declaradas pueden estar obsoletas. Las
+        que tienen huella se revalidan solas al consultarlas.
+        """
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if entry.local and not entry.fingerprint]
+            for key in stale:
+                self._drop(key)
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            self._drop(next(iter(self._entries)))
+
+    # ── Referencias compactas ────────────────────────────────────────────────
+
+    def _render(self, content: str, agent_id: Optional[str]) -> str:
+        """Contenido con su id de artefacto, o una referencia si el agente ya lo tiene."""
+        if agent_id is None or len(content) < REFERENCE_MIN_CHARS:
+            return content
+        digest = hashlib.sha1(content.encode("utf-8", "replace")).hexdigest()
+        artifact_id = f"art:{digest[:12]}"
+        delivered = self._delivered.setdefault(agent_id, {})
+        if delivered.get(digest) == "full":
+            delivered[digest] = "ref"
+            return (
+                f"[Artefacto {artifact_id}: contenido idéntico al que ya recibiste antes en esta tarea "
+                f"({len(content)} caracteres, sin cambios desde entonces). Consulta ese resultado; "
+                "si ya no lo tienes en contexto, repite la llamada y se entregará completo.]"
+            )
+        delivered[digest] = "full"
+        return f"[Artefacto {artifact_id}]\n{content}"
+
+    def forget_agent(self, agent_id: str) -> None:
+        """Olvida qué artefactos recibió un sub-agente que ya terminó."""
+        with self._lock:
+            self._delivered.pop(agent_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "waits": self.waits,
+            }
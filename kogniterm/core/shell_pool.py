@@ -0,0 +1,263 @@
+"""
+ShellPool — Pool de shells persistentes "calientes" para ejecutar comandos en paralelo.
+
+Cada shell es un `CommandExecutor` con su PTY y su bash ya arrancados, de modo
+que un comando no paga el arranque del shell. Los shells se prestan por clave
+(el `agent_id` del sub-agente o, en su defecto, el directorio de trabajo):
+agentes distintos ejecutan comandos a la vez, cada uno en su propio shell.
+
+Aislamiento (`isolation`):
+- "key": cada clave conserva su shell entre préstamos (variables de entorno,
+  venv activado, `cd`) y no lo comparte con otras claves. Por defecto.
+- "shared": cualquier shell libre sirve; el estado puede filtrarse entre agentes.
+- "lease": el shell se descarta al devolverlo y se prepara otro limpio en
+  segundo plano; ningún estado sobrevive al comando.
+
+Los shells ociosos más de `idle_timeout` segundos se cierran. Cada comando
+usa su propio marcador de finalización (ver `CommandExecutor.execute`); un
+shell cuyo comando no llegó a su marcador (timeout, Ctrl+C) se mata en vez de
+devolverse al pool.
+
+Uso:
+    pool = get_shell_pool()
+    with pool.lease(key=agent_id, cwd=cwd) as shell:
+        for chunk in shell.execute(command, cwd=cwd):
+            ...
+"""
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+ISOLATION_MODES = ("key", "shared", "lease")
+
+
+@dataclass
+class _PooledShell:
+    executor: Any
+    key: Optional[str]
+    cwd: Optional[str]
+    busy: bool = False
+    last_used: float = field(default_factory=time.monotonic)
+    commands: int = 0
+
+
+class ShellPool:
+    """Pool acotado de `CommandExecutor` con shells persistentes ya arrancados."""
+
+    def __init__(
+        self,
+        max_shells: Optional[int] = None,
+        idle_timeout: Optional[float] = None,
+        isolation: Optional[str] = None,
+        executor_factory: Optional[Any] = None,
+    ):
+        self.max_shells = max(1, max_shells if max_shells is not None else settings.shell_pool_size)
+        self.idle_timeout = idle_timeout if idle_timeout is not None else settings.shell_pool_idle_timeout
+        isolation = isolation or settings.shell_pool_isolation
+        if isolation not in ISOLATION_MODES:
+            raise ValueError(f"Modo de aislamiento desconocido: {isolation!r} (válidos: {', '.join(ISOLATION_MODES)})")
+        self.isolation = isolation
+        if executor_factory is None:
+            from .command_executor import CommandExecutor
+            executor_factory = CommandExecutor
+        self._factory = executor_factory
+        self._shells: List[_PooledShell] = []
+        self._cond = threading.Condition()
+        self._closed = False
+        self._reaper: Optional[threading.Thread] = None
+        self._stop_reaper = threading.Event()
+        self.created = 0
+
+    # ── Préstamo ───────────────────────────────────────────────────────────
+
+    @contextmanager
+    def lease(self, key: Optional[str] = None, cwd: Optional[str] = None, timeout: Optional[float] = None) -> Iterator[Any]:
+        """
+        Presta un shell para la clave `key` (o, si no hay, para `cwd`). Si todos
+        los shells están ocupados y el pool está lleno, espera a que se libere
+        uno (hasta `timeout` segundos; TimeoutError si se agota).
+        """
+        cwd = os.path.abspath(cwd) if cwd else None
+        lease_key = key or cwd
+        entry = self._acquire(lease_key, cwd, timeout)
+        try:
+            entry.executor.warm_up(cwd)
+            yield entry.executor
+        finally:
+            self._release(entry)
+
+    def _acquire(self, key: Optional[str], cwd: Optional[str], timeout: Optional[float]) -> _PooledShell:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("ShellPool cerrado")
+                entry = self._find_idle(key)
+                if entry is None and len(self._shells) >= self.max_shells:
+                    # Pool lleno: liberar el hueco del shell ocioso menos usado de otra clave
+                    victim = self._least_recently_used_idle()
+                    if victim is not None:
+                        self._discard(victim)
+                if entry is None and len(self._shells) < self.max_shells:
+                    entry = _PooledShell(executor=None, key=key, cwd=cwd)
+                    self._shells.append(entry)
+                if entry is not None:
+                    entry.busy = True
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"No hay shells libres en el pool (máximo {self.max_shells})")
+                self._cond.wait(remaining)
+
+        if entry.executor is None:
+            # Crear el shell fuera del lock: arrancar bash no debe bloquear otros préstamos
+            try:
+                entry.executor = self._factory()
+                self.created += 1
+            except Exception:
+                with self._cond:
+                    self._shells.remove(entry)
+                    self._cond.notify_all()
+                raise
+        entry.key = key
+        entry.cwd = cwd
+        self._ensure_reaper()
+        return entry
+
+    def _find_idle(self, key: Optional[str]) -> Optional[_PooledShell]:
+        idle = [s for s in self._shells if not s.busy and s.executor is not None]
+        if self.isolation == "key":
+            idle = [s for s in idle if s.key == key]
+        if not idle:
+            return None
+        # Preferir un shell que siga vivo y, entre ellos, el usado más recientemente
+        return max(idle, key=lambda s: (s.executor.is_alive(), s.last_used))
+
+    def _least_recently_used_idle(self) -> Optional[_PooledShell]:
+        idle = [s for s in self._shells if not s.busy and s.executor is not None]
+        return min(idle, key=lambda s: s.last_used) if idle else None
+
+    def _release(self, entry: _PooledShell) -> None:
+        # Sin marcador de fin (timeout, interrupción, generador abandonado) el comando
+        # puede seguir corriendo: ese shell no vuelve al pool, se mata
+        discard = (
+            self.isolation == "lease"
+            or not entry.executor.is_alive()
+            or not getattr(entry.executor, "last_command_completed", True)
+        )
+        with self._cond:
+            entry.busy = False
+            entry.commands += 1
+            entry.last_used = time.monotonic()
+            if discard or self._closed:
+                self._discard(entry)
+            self._cond.notify_all()
+        if discard and self.isolation == "lease" and not self._closed:
+            # Dejar preparado un shell limpio para el siguiente préstamo
+            threading.Thread(target=self.prewarm, args=(1, entry.cwd), daemon=True, name="KogniTerm-ShellPrewarm").start()
+
+    def _discard(self, entry: _PooledShell) -> None:
+        """Saca el shell del pool y lo cierra (llamar con el lock tomado)."""
+        if entry in self._shells:
+            self._shells.remove(entry)
+        try:
+            entry.executor.close()
+        except Exception as e:
+            logger.debug(f"ShellPool: error cerrando shell: {e}")
+
+    # ── Mantenimiento ──────────────────────────────────────────────────────
+
+    def prewarm(self, count: int = 1, cwd: Optional[str] = None) -> int:
+        """Arranca hasta `count` shells sin clave para que el siguiente préstamo no espere."""
+        started = 0
+        for _ in range(count):
+            with self._cond:
+                if self._closed or len(self._shells) >= self.max_shells:
+                    break
+                entry = _PooledShell(executor=None, key=None, cwd=cwd, busy=True)
+                self._shells.append(entry)
+            try:
+                entry.executor = self._factory()
+                entry.executor.warm_up(cwd)
+                self.created += 1
+                started += 1
+            except Exception as e:
+                logger.warning(f"ShellPool: no se pudo precalentar un shell: {e}")
+            with self._cond:
+                entry.busy = False
+                if entry.executor is None:
+                    self._shells.remove(entry)
+                self._cond.notify_all()
+        return started
+
+    def reap_idle(self) -> int:
+        """Cierra los shells ociosos más de `idle_timeout` segundos (o ya muertos)."""
+        now = time.monotonic()
+        with self._cond:
+            stale = [
+                s for s in self._shells
+                if not s.busy and s.executor is not None
+                and (now - s.last_used >= self.idle_timeout or not s.executor.is_alive())
+            ]
+            for entry in stale:
+                self._discard(entry)
+            if stale:
+                self._cond.notify_all()
+        if stale:
+            logger.debug(f"ShellPool: {len(stale)} shells ociosos cerrados")
+        return len(stale)
+
+    def _ensure_reaper(self) -> None:
+        if self._reaper is not None or self.idle_timeout <= 0:
+            return
+        with self._cond:
+            if self._reaper is not None:
+                return
+            self._reaper = threading.Thread(target=self._reap_loop, daemon=True, name="KogniTerm-ShellPoolReaper")
+            self._reaper.start()
+
+    def _reap_loop(self) -> None:
+        interval = max(1.0, self.idle_timeout / 2)
+        while not self._stop_reaper.wait(interval):
+            self.reap_idle()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "max_shells": self.max_shells,
+                "isolation": self.isolation,
+                "shells": len(self._shells),
+                "busy": sum(1 for s in self._shells if s.busy),
+                "created": self.created,
+            }
+
+    def close(self) -> None:
+        """Cierra todos los shells ociosos; los prestados se cierran al devolverse."""
+        self._stop_reaper.set()
+        with self._cond:
+            self._closed = True
+            for entry in [s for s in self._shells if not s.busy and s.executor is not None]:
+                self._discard(entry)
+            self._cond.notify_all()
+
+
+_default_pool: Optional[ShellPool] = None
+_default_pool_lock = threading.Lock()
+
+
+def get_shell_pool() -> ShellPool:
+    """Obtiene el pool global de shells (configurable con KOGNITERM_SHELL_POOL_*)."""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None or _default_pool._closed:
+            _default_pool = ShellPool()
+        return _default_pool
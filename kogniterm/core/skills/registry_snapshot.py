@@ -0,0 +1,228 @@
+"""
+Instantánea compilada del registro de skills.
+
+El descubrimiento de skills recorre varios directorios, parsea el YAML de cada
+SKILL.md e importa todos los scripts para conocer sus herramientas. La
+instantánea guarda en disco el resultado (manifiestos, esquemas de
+herramientas y mtimes de los archivos y directorios implicados) para que el
+siguiente arranque lo reutilice tras una simple pasada de `stat`:
+
+- Por cada raíz de búsqueda se registran los mtimes de sus directorios: crear,
+  borrar o renombrar una skill cambia el mtime del directorio que la contiene.
+- Por cada skill se registra (mtime, tamaño) de SKILL.md y de sus scripts.
+
+Si todo coincide, las skills se reconstruyen desde la instantánea y sus
+herramientas se registran como `LazySkillTool`: el módulo Python solo se
+importa la primera vez que la herramienta se usa de verdad.
+"""
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+DEFAULT_SNAPSHOT_PATH = Path.home() / ".kogniterm" / "cache" / "skill_registry.json"
+
+
+def _stat_key(path: str) -> Optional[List[int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _is_hidden(name: str) -> bool:
+    return name.startswith(".") or name.startswith("_")
+
+
+def skill_files(skill_dir: Path) -> List[str]:
+    """Archivos cuyo cambio invalida una skill: SKILL.md y sus scripts Python."""
+    files = [str(skill_dir / "SKILL.md")]
+    scripts_dir = skill_dir / "scripts"
+    if scripts_dir.is_dir():
+        files.extend(str(p) for p in sorted(scripts_dir.rglob("*.py")) if "__pycache__" not in p.parts)
+    else:
+        files.extend(str(p) for p in sorted(skill_dir.glob("*.py")))
+    return files
+
+
+def directory_mtimes(root: Path) -> Dict[str, int]:
+    """mtimes de `root` y sus subdirectorios (sin ocultos ni __pycache__)."""
+    mtimes: Dict[str, int] = {}
+    for current, dirs, _ in os.walk(root):
+        dirs[:] = [d for d in dirs if not _is_hidden(d)]
+        try:
+            mtimes[current] = os.stat(current).st_mtime_ns
+        except OSError:
+            continue
+    return mtimes
+
+
+class SkillRegistrySnapshot:
+    """Instantánea persistente del descubrimiento y las herramientas de cada skill."""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else DEFAULT_SNAPSHOT_PATH
+        self._lock = threading.Lock()
+        self._roots: Dict[str, Dict[str, Any]] = {}
+        self._skills: Dict[str, Dict[str, Any]] = {}
+        self._dirty = False
+        self._load()
+
+    # ── Persistencia ───────────────────────────────────────────────────────
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Instantánea de skills ilegible ({self.path}): {e}. Se regenerará.")
+            return
+        if data.get("version") != SNAPSHOT_VERSION:
+            return
+        self._roots = data.get("roots", {})
+        self._skills = data.get("skills", {})
+
+    def save(self) -> bool:
+        """Escribe la instantánea si cambió (escritura atómica). Retorna True si escribió."""
+        with self._lock:
+            if not self._dirty:
+                return False
+            # Olvidar raíces que ya no existen (p. ej. directorios temporales)
+            for root in [r for r in self._roots if not os.path.isdir(r)]:
+                for skill_dir in self._roots.pop(root).get("skills", []):
+                    self._skills.pop(skill_dir, None)
+            data = {"version": SNAPSHOT_VERSION, "roots": self._roots, "skills": self._skills}
+            self._dirty = False
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, default=str)
+            os.replace(tmp_path, self.path)
+            return True
+        except OSError as e:
+            logger.warning(f"No se pudo guardar la instantánea de skills: {e}")
+            return False
+
+    # ── Descubrimiento ─────────────────────────────────────────────────────
+
+    def _skill_is_fresh(self, skill_dir: str) -> bool:
+        entry = self._skills.get(skill_dir)
+        if not entry:
+            return False
+        files = entry.get("files", {})
+        return all(_stat_key(path) == key for path, key in files.items())
+
+    def cached_root(self, root: Path) -> Optional[List[Dict[str, Any]]]:
+        """
+        Manifiestos de las skills de `root` si nada cambió desde que se guardó la
+        instantánea; None si hay que volver a escanear la raíz.
+        """
+        with self._lock:
+            entry = self._roots.get(str(root))
+            if entry is None:
+                return None
+            for directory, mtime in entry.get("dirs", {}).items():
+                try:
+                    if os.stat(directory).st_mtime_ns != mtime:
+                        return None
+                except OSError:
+                    return None
+            skill_dirs = entry.get("skills", [])
+            if not all(self._skill_is_fresh(d) for d in skill_dirs):
+                return None
+            return [dict(self._skills[d], path=d) for d in skill_dirs]
+
+    def record_root(self, root: Path, skills: Iterable[Dict[str, Any]]) -> None:
+        """
+        Guarda el resultado de escanear `root`: cada elemento tiene `path`,
+        `manifest` (frontmatter YAML) e `instructions`. Las herramientas ya
+        compiladas de skills que no cambiaron se conservan.
+        """
+        with self._lock:
+            skill_dirs = []
+            for item in skills:
+                skill_dir = str(item["path"])
+                files = {path: _stat_key(path) for path in skill_files(Path(skill_dir))}
+                previous = self._skills.get(skill_dir)
+                tools = previous.get("tools") if previous and previous.get("files") == files else None
+                self._skills[skill_dir] = {
+                    "files": files,
+                    "manifest": item["manifest"],
+                    "instructions": item["instructions"],
+                    "tools": tools,
+                }
+                skill_dirs.append(skill_dir)
+            self._roots[str(root)] = {"dirs": directory_mtimes(root), "skills": skill_dirs}
+            self._dirty = True
+
+    # ── Herramientas ───────────────────────────────────────────────────────
+
+    def cached_tools(self, skill_dir: Path) -> Optional[List[Dict[str, Any]]]:
+        """Metadatos de herramientas compilados para la skill, si siguen vigentes."""
+        with self._lock:
+            key = str(skill_dir)
+            if not self._skill_is_fresh(key):
+                return None
+            return self._skills[key].get("tools")
+
+    def record_tools(self, skill_dir: Path, tools: Optional[List[Dict[str, Any]]]) -> None:
+        """Guarda los metadatos (`name`, `description`, `parameters`) de las herramientas; None = no compilable."""
+        with self._lock:
+            entry = self._skills.get(str(skill_dir))
+            if entry is None:
+                return
+            files = {path: _stat_key(path) for path in skill_files(Path(skill_dir))}
+            if entry.get("tools") == tools and entry.get("files") == files:
+                return
+            entry["tools"] = tools
+            entry["files"] = files
+            self._dirty = True
+
+
+class LazySkillTool:
+    """
+    Herramienta registrada desde la instantánea. Expone nombre, descripción y
+    esquema sin importar el módulo; cualquier otro uso (llamarla, `invoke`,
+    atributos propios) importa la skill y delega en la herramienta real.
+    """
+
+    args_schema = None
+
+    def __init__(self, name: str, description: str, parameters_schema: Optional[Dict[str, Any]],
+                 skill_name: str, resolver: Callable[[str], Any]):
+        self.name = name
+        self.description = description
+        self.__doc__ = description or None  # Como la función real; no exponer el docstring del proxy
+        self.parameters_schema = parameters_schema
+        self.skill_name = skill_name
+        self._resolver = resolver
+
+    def resolve(self) -> Any:
+        tool = self._resolver(self.name)
+        if tool is None or tool is self:
+            raise RuntimeError(f"No se pudo cargar la herramienta '{self.name}' de la skill '{self.skill_name}'")
+        return tool
+
+    def __getattr__(self, item: str) -> Any:
+        if item.startswith("__") or item in ("_resolver", "name", "skill_name"):
+            raise AttributeError(item)
+        return getattr(self.resolve(), item)
+
+    def __call__(self, *args, **kwargs) -> Any:
+        return self.resolve()(*args, **kwargs)
+
+    def invoke(self, *args, **kwargs) -> Any:
+        return self.resolve().invoke(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        return f"<LazySkillTool {self.name} (skill: {self.skill_name})>"
@@ -19,11 +19,15 @@ import json
 import queue
 import inspect
 import re
+import threading
 from types import ModuleType
 from dataclasses import dataclass, field
 from datetime import datetime
 from langchain_core.messages import SystemMessage
+from ..config import settings
 from ..utils.tool_utils import sanitize_tool_name
+from .registry_snapshot import LazySkillTool, SkillRegistrySnapshot
+from .tool_effects import ToolEffects, normalize_tool_effects
 
 logger = logging.getLogger(__name__)
 
@@ -50,6 +54,7 @@ class Skill:
     assets: List[str] = field(default_factory=list)
     compatibility: Dict[str, Any] = field(default_factory=dict)
     metadata: Dict[str, Any] = field(default_factory=dict)
+    tool_effects: Dict[str, ToolEffects] = field(default_factory=dict)
     scripts_path: Path = field(init=False)
     references_path: Path = field(init=False)
     assets_path: Path = field(init=False)
@@ -151,6 +156,16 @@ class SkillValidator:
 
     def _parse_skill_file(self, skill_file: Path) -> Tuple[Optional[dict], Optional[str]]:
         """Parsea el SKILL.md con frontmatter YAML."""
+        raw_config, body, error = self._read_skill_file(skill_file)
+        if error:
+            return None, error
+        try:
+            return self.config_from_manifest(raw_config, body), None
+        except ValueError as e:
+            return None, f"Manifiesto inválido: {str(e)}"
+
+    def _read_skill_file(self, skill_file: Path) -> Tuple[Optional[dict], str, Optional[str]]:
+        """Lee el SKILL.md y devuelve (frontmatter YAML sin normalizar, cuerpo, error)."""
         try:
             with open(skill_file, 'r', encoding='utf-8') as f:
                 content = f.read()
@@ -162,14 +177,20 @@ class SkillValidator:
                     yaml_content = content[3:end_idx].strip()
                     body = content[end_idx + 3:].strip()
                     raw_config = yaml.safe_load(yaml_content) or {}
-                    config = self._normalize_manifest(raw_config)
-                    config['instructions'] = body
-                    return config, None
-            return None, "Formato frontmatter YAML inválido (debe empezar con ---)"
+                    if not isinstance(raw_config, dict):
+                        return None, "", "Manifiesto inválido: el frontmatter debe ser un mapa"
+                    return raw_config, body, None
+            return None, "", "Formato frontmatter YAML inválido (debe empezar con ---)"
         except yaml.YAMLError as e:
-            return None, f"Error YAML: {str(e)}"
+            return None, "", f"Error YAML: {str(e)}"
         except Exception as e:
-            return None, f"Error leyendo archivo: {str(e)}"
+            return None, "", f"Error leyendo archivo: {str(e)}"
+
+    def config_from_manifest(self, raw_config: Dict[str, Any], body: str) -> Dict[str, Any]:
+        """Construye los argumentos de `Skill` a partir del frontmatter y el cuerpo del SKILL.md."""
+        config = self._normalize_manifest(dict(raw_config))
+        config['instructions'] = body
+        return config
 
     def _normalize_manifest(self, raw_config: Dict[str, Any]) -> Dict[str, Any]:
         """Normaliza claves del manifiesto al formato interno de KogniTerm."""
@@ -179,6 +200,7 @@ class SkillValidator:
             'required-tools': 'required_tools',
             'security-level': 'security_level',
             'required-permissions': 'required_permissions',
+            'tool-effects': 'tool_effects',
         }
 
         normalized: Dict[str, Any] = {}
@@ -195,6 +217,9 @@ class SkillValidator:
             elif not isinstance(value, list):
                 normalized[list_key] = list(value) if isinstance(value, (tuple, set)) else [value]
 
+        # Efectos secundarios por herramienta (ver tool_effects.py)
+        normalized['tool_effects'] = normalize_tool_effects(normalized.get('tool_effects'))
+
         if 'metadata' not in normalized or normalized['metadata'] is None:
             normalized['metadata'] = {}
         if 'compatibility' not in normalized or normalized['compatibility'] is None:
@@ -537,7 +562,8 @@ class SkillManager:
         terminal_ui=None,
         embeddings_service=None,
         vector_db_manager=None,
-        approval_handler=None
+        approval_handler=None,
+        snapshot_path: Optional[Path] = None
     ):
         """
         Inicializa el SkillManager.
@@ -553,6 +579,9 @@ class SkillManager:
             embeddings_service: Servicio de embeddings
             vector_db_manager: Gestor de base de datos vectorial
             approval_handler: Manejador de aprobación de comandos
+            snapshot_path: Archivo de la instantánea del registro de skills
+                           (por defecto ~/.kogniterm/cache/skill_registry.json;
+                           se desactiva con KOGNITERM_SKILL_SNAPSHOT=0)
         """
         self.base_path = base_path or Path(__file__).parent.parent.parent
         self.user_skills_path = user_skills_path or Path.home() / '.kogniterm' / 'skills'
@@ -587,6 +616,14 @@ class SkillManager:
         self.validator = SkillValidator()
         self.loader = SkillLoader()
 
+        # Instantánea compilada: evita re-escanear e importar skills sin cambios
+        self.registry_snapshot: Optional[SkillRegistrySnapshot] = (
+            SkillRegistrySnapshot(snapshot_path) if settings.skill_registry_snapshot else None
+        )
+        self._lazy_skills: set = set()  # Skills registradas desde la instantánea, aún sin importar
+        self._import_lock = threading.RLock()
+        self._agent_state = None
+
         logger.info(
             f"SkillManager inicializado. Bases: bundled={self.bundled_path}, "
             f"global={self.global_skills_path}, managed={self.managed_path}, "
@@ -645,8 +682,22 @@ class SkillManager:
         return discovered
 
     def _discover_in_dir(self, base_dir: Path, level: str) -> List[Skill]:
-        """Busca skills en un directorio base."""
+        """Busca skills en un directorio base (desde la instantánea si nada cambió)."""
+        if self.registry_snapshot is not None:
+            cached = self.registry_snapshot.cached_root(base_dir)
+            if cached is not None:
+                try:
+                    skills = [
+                        Skill(path=Path(item['path']), **self.validator.config_from_manifest(item['manifest'], item['instructions']))
+                        for item in cached
+                    ]
+                    logger.debug(f"{len(skills)} skills de {base_dir} restauradas desde la instantánea")
+                    return skills
+                except Exception as e:
+                    logger.warning(f"Instantánea de skills inválida para {base_dir}: {e}. Re-escaneando.")
+
         skills = []
+        records = []
 
         seen_paths = set()
         for skill_file in base_dir.rglob('SKILL.md'):
@@ -669,16 +720,19 @@ class SkillManager:
                     logger.warning(f"Skill inválida en {skill_dir}: {errors}")
                     continue
 
-                config, _ = self.validator._parse_skill_file(skill_file)
-                if not config:
+                raw_config, body, error = self.validator._read_skill_file(skill_file)
+                if error:
                     continue
-                skill = Skill(path=skill_dir, **config)
+                skill = Skill(path=skill_dir, **self.validator.config_from_manifest(raw_config, body))
                 skills.append(skill)
+                records.append({'path': skill_dir, 'manifest': raw_config, 'instructions': body})
                 logger.debug(f"Skill descubierta: {skill.name} (nivel: {level})")
 
             except Exception as e:
                 logger.error(f"Error procesando skill {skill_dir}: {e}", exc_info=True)
 
+        if self.registry_snapshot is not None:
+            self.registry_snapshot.record_root(base_dir, records)
         return skills
 
     def load_skill(self, skill_name: str, agent_context: Optional[dict] = None) -> bool:
@@ -707,6 +761,66 @@ class SkillManager:
             logger.warning(f"Skill '{skill_name}' no tiene permisos para este agente")
             return False
 
+        # Si la instantánea conoce sus herramientas, registrarlas sin importar el módulo
+        if self._register_lazy_tools(skill):
+            return True
+
+        with self._import_lock:
+            return self._import_skill(skill)
+
+    def _register_lazy_tools(self, skill: Skill) -> bool:
+        """Registra las herramientas de la skill desde la instantánea (import diferido al primer uso)."""
+        if self.registry_snapshot is None:
+            return False
+        compiled = self.registry_snapshot.cached_tools(skill.path)
+        if compiled is None:
+            return False
+        if not compiled and not skill.instructions.strip():
+            return False
+
+        tools = []
+        for meta in compiled:
+            unique_name = self._get_unique_tool_name(meta['name'], skill.name)
+            tool = LazySkillTool(
+                name=unique_name,
+                description=meta.get('description', ''),
+                parameters_schema=meta.get('parameters'),
+                skill_name=skill.name,
+                resolver=self._resolve_lazy_tool,
+            )
+            self.tool_registry[unique_name] = {
+                'tool': tool,
+                'skill': skill.name,
+                'security_level': skill.security_level,
+                'permissions': skill.required_permissions,
+                'effects': skill.tool_effects.get(meta['name']) or skill.tool_effects.get('*'),
+            }
+            tools.append(tool)
+
+        skill.loaded = True
+        skill.tools = tools
+        self.loaded_skills.add(skill.name)
+        self._lazy_skills.add(skill.name)
+        logger.debug(f"Skill '{skill.name}' registrada desde la instantánea ({len(tools)} herramientas, import diferido)")
+        return True
+
+    def _resolve_lazy_tool(self, tool_name: str) -> Optional[Any]:
+        """Importa la skill de una herramienta diferida y devuelve la herramienta real."""
+        with self._import_lock:
+            info = self.tool_registry.get(tool_name)
+            if info and isinstance(info['tool'], LazySkillTool) and info['skill'] in self._lazy_skills:
+                skill = self.skills.get(info['skill'])
+                self._lazy_skills.discard(info['skill'])
+                if skill is not None:
+                    logger.info(f"Importando skill '{skill.name}' en su primer uso ({tool_name})")
+                    self._import_skill(skill)
+            info = self.tool_registry.get(tool_name)
+        tool = info.get('tool') if info else None
+        return None if isinstance(tool, LazySkillTool) else tool
+
+    def _import_skill(self, skill: Skill) -> bool:
+        """Importa los scripts de la skill y registra sus herramientas reales."""
+        skill_name = skill.name
         try:
             # 1. Validar dependencias
             self._validate_dependencies(skill.dependencies)
@@ -791,6 +905,7 @@ class SkillManager:
                         setattr(module, 'save_skill_state', save_state)
 
             # 3. Registrar cada herramienta en tool_registry
+            compiled: Optional[List[Dict[str, Any]]] = []
             for tool in tools:
                 tool_name = getattr(tool, 'name', tool.__class__.__name__)
                 # Asegurar nombre único
@@ -818,14 +933,27 @@ class SkillManager:
                     'tool': tool,
                     'skill': skill.name,
                     'security_level': skill.security_level,
-                    'permissions': skill.required_permissions
+                    'permissions': skill.required_permissions,
+                    'effects': skill.tool_effects.get(tool_name) or skill.tool_effects.get('*'),
                 }
                 logger.debug(f"Herramienta registrada: {unique_name} (skill: {skill.name})")
+                if compiled is not None:
+                    meta = self._compile_tool_metadata(tool, tool_name)
+                    if meta is None:
+                        compiled = None
+                    else:
+                        compiled.append(meta)
+
+                if self._agent_state is not None and hasattr(tool, 'agent_state'):
+                    tool.agent_state = self._agent_state
 
             # 4. Marcar skill como cargada
             skill.loaded = True
             skill.tools = tools
             self.loaded_skills.add(skill_name)
+            self._lazy_skills.discard(skill_name)
+            if self.registry_snapshot is not None:
+                self.registry_snapshot.record_tools(skill.path, compiled)
 
             logger.info(f"✅ Skill '{skill_name}' cargada ({len(tools)} herramientas)")
             return True
@@ -834,6 +962,41 @@ class SkillManager:
             logger.error(f"❌ Error cargando skill '{skill_name}': {e}", exc_info=True)
             return False
 
+    @staticmethod
+    def _compile_tool_metadata(tool: Any, tool_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Metadatos de la herramienta para la instantánea (nombre, descripción y el
+        mismo esquema JSON que usaría el LLMService); None si no es serializable.
+        """
+        try:
+            parameters = None
+            args_schema = getattr(tool, 'args_schema', None)
+            if isinstance(args_schema, dict):
+                parameters = args_schema
+            elif args_schema is not None:
+                if callable(getattr(args_schema, 'schema', None)):
+                    try:
+                        parameters = args_schema.schema()
+                    except Exception:
+                        parameters = args_schema.model_json_schema()
+                else:
+                    parameters = args_schema.model_json_schema()
+            elif getattr(tool, 'parameters_schema', None) is not None:
+                parameters = tool.parameters_schema
+            description = getattr(tool, 'description', '') or ''
+            meta = {'name': tool_name, 'description': str(description), 'parameters': parameters}
+            json.dumps(meta)
+            return meta
+        except Exception as e:
+            logger.debug(f"Herramienta '{tool_name}' no compilable en la instantánea: {e}")
+            return None
+
+    def save_registry_snapshot(self) -> bool:
+        """Persiste la instantánea del registro (llamar tras cargar las skills)."""
+        if self.registry_snapshot is None:
+            return False
+        return self.registry_snapshot.save()
+
     def _get_unique_tool_name(self, base_name: str, skill_name: Optional[str] = None) -> str:
         """Genera un nombre único y saneado para evitar colisiones e ineficiencias de API."""
         base_name = sanitize_tool_name(base_name)
@@ -907,6 +1070,7 @@ class SkillManager:
             del self.tool_registry[key]
 
         self.loaded_skills.remove(skill_name)
+        self._lazy_skills.discard(skill_name)
         if skill_name in self.skills:
             self.skills[skill_name].loaded = False
             self.skills[skill_name].tools = []
@@ -973,10 +1137,13 @@ class SkillManager:
         logger.info(f"Herramienta dinámica registrada en SkillManager: {unique_name}")
 
     def get_tool(self, tool_name: str) -> Optional[Any]:
-        """Obtiene la instancia de una herramienta por nombre."""
+        """Obtiene la instancia de una herramienta por nombre (importando su skill si estaba diferida)."""
         tool_info = self.tool_registry.get(tool_name) or self.tool_registry.get(sanitize_tool_name(tool_name))
         if tool_info:
-            return tool_info.get('tool')
+            tool = tool_info.get('tool')
+            if isinstance(tool, LazySkillTool):
+                return self._resolve_lazy_tool(tool.name)
+            return tool
         return None
 
     def get_skill_for_tool(self, tool_name: str) -> Optional[Skill]:
@@ -987,6 +1154,13 @@ class SkillManager:
             return self.skills.get(skill_name)
         return None
 
+    def get_tool_effects(self, tool_name: str) -> Optional[ToolEffects]:
+        """Efectos secundarios declarados por la skill para una herramienta (None si no hay)."""
+        tool_info = self.tool_registry.get(tool_name) or self.tool_registry.get(sanitize_tool_name(tool_name))
+        if tool_info:
+            return tool_info.get('effects')
+        return None
+
     def get_available_tools(self, agent_context: Optional[dict] = None) -> List[Dict[str, Any]]:
         """
         Obtiene todas las herramientas disponibles, opcionalmente filtradas por contexto.
@@ -1082,6 +1256,7 @@ class SkillManager:
             'assets': skill.assets,
             'compatibility': skill.compatibility,
             'metadata': skill.metadata,
+            'tool_effects': {name: effects.to_dict() for name, effects in skill.tool_effects.items()},
             'path': str(skill.path)
         }
 
@@ -1301,6 +1476,7 @@ class SkillManager:
         
         # Limpiar registros para forzar recarga limpia
         self.loaded_skills = set()
+        self._lazy_skills = set()
         self.tool_registry = {}
         
         # 1. Re-descubrir skills
@@ -1310,6 +1486,8 @@ class SkillManager:
         for skill_name in self.skills:
             self.load_skill(skill_name, agent_context)
         
+        self.save_registry_snapshot()
+
         # 3. Invalidar la caché del LLMService para que regenere los esquemas
         if self.llm_service:
             self.llm_service.litellm_tools = None
@@ -1410,8 +1588,12 @@ class SkillManager:
 
     def set_agent_state(self, agent_state):
         """Inyecta el estado del agente en todas las herramientas que lo soporten."""
+        # Las herramientas diferidas lo reciben al importarse
+        self._agent_state = agent_state
         for tool_info in self.tool_registry.values():
             tool = tool_info['tool']
+            if isinstance(tool, LazySkillTool):
+                continue
             if hasattr(tool, 'agent_state'):
                 tool.agent_state = agent_state
             # También para clases
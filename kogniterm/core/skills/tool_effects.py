@@ -0,0 +1,146 @@
+"""
+Metadatos declarativos de efectos secundarios por herramienta.
+
+Las skills los declaran en el frontmatter de `SKILL.md` bajo `tool_effects`
+(o `tool-effects`), indexados por nombre de herramienta (`"*"` aplica a todas
+las de la skill):
+
+    tool_effects:
+      read_file_tool: [read_only, idempotent]
+      write_file_tool: {writes_files: true, path_args: [path]}
+      github: {read_only: true, network: true, path_args: []}
+      file_operations:
+        variant_arg: [operation, action]
+        variants:
+          read_file: [read_only]
+          write_file: {writes_files: true}
+
+El planificador de herramientas, la caché de resultados y el manejador de
+aprobaciones los consumen para decidir paralelismo, memoización y
+auto-aprobación sin listas de nombres codificadas.
+
+Sin `path_args`, se asumen los argumentos convencionales de rutas
+(`DEFAULT_PATH_ARGS`); `path_args: []` declara que la herramienta no recibe
+rutas locales (p. ej. la ruta dentro de un repositorio remoto). `variant_arg`
+admite varios nombres: se usa el primero cuyo valor selecciona una variante.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+EFFECT_FLAGS = ("read_only", "writes_files", "network", "spawns_process", "idempotent")
+
+# Argumentos que, por convención, contienen rutas de archivo
+DEFAULT_PATH_ARGS = ("path", "file_path", "destination", "paths")
+
+
+@dataclass(frozen=True)
+class ToolEffects:
+    """Efectos secundarios de una herramienta (o de una variante de ella)."""
+    read_only: bool = False
+    writes_files: bool = False
+    network: bool = False
+    spawns_process: bool = False
+    idempotent: bool = False
+    # None: no declarados (se usan los convencionales); (): ninguna ruta local
+    path_args: Optional[Tuple[str, ...]] = None
+    variant_arg: Tuple[str, ...] = ()
+    variants: Dict[str, "ToolEffects"] = field(default_factory=dict, hash=False, compare=False)
+
+    def resolve(self, args: Optional[Dict[str, Any]]) -> "ToolEffects":
+        """Devuelve los efectos de la variante seleccionada por los argumentos, si la hay."""
+        if self.variant_arg and isinstance(args, dict):
+            for key in self.variant_arg:
+                variant = self.variants.get(str(args.get(key) or ""))
+                if variant is not None:
+                    return variant
+        return self
+
+    def path_keys(self) -> Tuple[str, ...]:
+        """Argumentos que contienen rutas: los declarados o, si no se declararon, los convencionales."""
+        return DEFAULT_PATH_ARGS if self.path_args is None else self.path_args
+
+    def paths_in(self, args: Optional[Dict[str, Any]]) -> List[str]:
+        """Rutas de archivo presentes en los argumentos de la llamada."""
+        if not isinstance(args, dict):
+            return []
+        paths: List[str] = []
+        for key in self.path_keys():
+            value = args.get(key)
+            for v in value if isinstance(value, (list, tuple)) else [value]:
+                if isinstance(v, str) and v.strip():
+                    paths.append(v)
+        return paths
+
+    def to_dict(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {flag: getattr(self, flag) for flag in EFFECT_FLAGS}
+        if self.path_args is not None:
+            data["path_args"] = list(self.path_args)
+        if self.variant_arg:
+            data["variant_arg"] = list(self.variant_arg)
+            data["variants"] = {k: v.to_dict() for k, v in self.variants.items()}
+        return data
+
+
+def _as_bool(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "si", "sí", "on")
+    return bool(value)
+
+
+def _as_str_list(value: Any) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, Iterable):
+        return [str(v) for v in value]
+    return [str(value)]
+
+
+def parse_tool_effects(raw: Any) -> ToolEffects:
+    """
+    Convierte la declaración de una herramienta (lista de flags o mapa) en
+    ToolEffects. Las claves con guiones se aceptan igual que con guion bajo.
+    """
+    if isinstance(raw, ToolEffects):
+        return raw
+    if raw is None:
+        raw = {}
+    if isinstance(raw, (str, list, tuple, set)):
+        raw = {flag: True for flag in _as_str_list(raw)}
+    if not isinstance(raw, dict):
+        raise ValueError(f"Declaración de efectos inválida: {raw!r}")
+
+    data = {str(k).replace("-", "_"): v for k, v in raw.items()}
+    unknown = set(data) - set(EFFECT_FLAGS) - {"path_args", "variant_arg", "variants"}
+    if unknown:
+        raise ValueError(f"Efectos desconocidos: {sorted(unknown)}")
+
+    flags = {flag: _as_bool(data.get(flag, False)) for flag in EFFECT_FLAGS}
+    if flags["read_only"] and flags["writes_files"]:
+        raise ValueError("Una herramienta no puede ser read_only y writes_files a la vez")
+    # Las lecturas locales se repiten sin cambiar el resultado dentro de un turno
+    if "idempotent" not in data:
+        flags["idempotent"] = flags["read_only"] and not flags["network"]
+
+    variants = {
+        str(name): parse_tool_effects(spec)
+        for name, spec in (data.get("variants") or {}).items()
+    }
+    path_args = data.get("path_args")
+    return ToolEffects(
+        path_args=None if path_args is None else tuple(_as_str_list(path_args)),
+        variant_arg=tuple(_as_str_list(data.get("variant_arg") or None)),
+        variants=variants,
+        **flags,
+    )
+
+
+def normalize_tool_effects(raw: Any) -> Dict[str, ToolEffects]:
+    """Normaliza el bloque `tool_effects` completo de un manifiesto."""
+    if not raw:
+        return {}
+    if not isinstance(raw, dict):
+        raise ValueError("tool_effects debe ser un mapa herramienta -> efectos")
+    return {str(tool): parse_tool_effects(spec) for tool, spec in raw.items()}
@@ -0,0 +1,156 @@
+"""
+Memoización por turno de resultados de herramientas idempotentes.
+
+Las herramientas que la skill declara `idempotent` (ver
+`kogniterm.core.skills.tool_effects`) se memorizan durante el turno del
+usuario en curso. La clave combina el nombre de la herramienta, los argumentos
+normalizados y la huella (mtime, tamaño) de cada ruta implicada, de modo que
+un archivo modificado fuera del agente invalida la entrada por sí solo.
+
+Las escrituras del propio agente la invalidan explícitamente a través de
+`RaceConditionGuard.register_write` / `invalidate`, y cualquier herramienta con
+efectos (escritura, procesos, o sin metadatos) vacía la caché completa.
+
+Uso:
+    cache = ToolResultCache.for_state(state)
+    hit = cache.get(tool_name, args, effects)
+    if hit is None:
+        fingerprint = cache.fingerprint(args, effects)
+        output = run_tool()
+        cache.put(tool_name, args, effects, output, fingerprint)
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.messages import HumanMessage
+
+from .skills.tool_effects import ToolEffects
+
+logger = logging.getLogger(__name__)
+
+CACHED_RESULT_NOTICE = (
+    "[Resultado en caché: idéntico al de una llamada anterior de este turno con los mismos "
+    "argumentos; los archivos implicados no han cambiado desde entonces. No es necesario repetirla.]\n"
+)
+
+Fingerprint = Tuple[Tuple[str, Optional[int], Optional[int]], ...]
+
+
+def _normalize_path(path: str) -> str:
+    return os.path.normpath(os.path.abspath(os.path.expanduser(path)))
+
+
+def _fingerprint(paths: List[str]) -> Fingerprint:
+    """Huella (ruta, mtime_ns, tamaño) de cada ruta; (ruta, None, None) si no existe."""
+    prints = []
+    for path in sorted(set(paths)):
+        try:
+            st = os.stat(path)
+            prints.append((path, st.st_mtime_ns, st.st_size))
+        except OSError:
+            prints.append((path, None, None))
+    return tuple(prints)
+
+
+class ToolResultCache:
+    """Caché de resultados de herramientas idempotentes para un AgentState."""
+
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self._entries: Dict[Tuple[str, str], Tuple[Fingerprint, str]] = {}
+        self._turn_marker: Optional[int] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def for_state(state: Any) -> "ToolResultCache":
+        """Obtiene (o crea) la caché asociada al estado y la reinicia si empezó un turno nuevo."""
+        cache = getattr(state, "tool_result_cache", None)
+        if not isinstance(cache, ToolResultCache):
+            cache = ToolResultCache()
+            state.tool_result_cache = cache
+        cache._sync_turn(getattr(state, "messages", None) or [])
+        return cache
+
+    def _sync_turn(self, messages: List[Any]) -> None:
+        marker = sum(1 for m in messages if isinstance(m, HumanMessage))
+        with self._lock:
+            if marker != self._turn_marker:
+                self._entries.clear()
+                self._turn_marker = marker
+
+    @staticmethod
+    def _key(tool_name: str, args: Any) -> Tuple[str, str]:
+        try:
+            normalized = json.dumps(args, sort_keys=True, ensure_ascii=False, default=str)
+        except (TypeError, ValueError):
+            normalized = str(args)
+        return tool_name, normalized
+
+    @staticmethod
+    def _paths(effects: ToolEffects, args: Any) -> List[str]:
+        return [_normalize_path(p) for p in effects.paths_in(args)]
+
+    def get(self, tool_name: str, args: Any, effects: ToolEffects) -> Optional[str]:
+        """Resultado memorizado si las rutas implicadas no han cambiado; None en otro caso."""
+        key = self._key(tool_name, args)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        fingerprint, output = entry
+        if fingerprint != self.fingerprint(args, effects):
+            with self._lock:
+                self._entries.pop(key, None)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return output
+
+    def fingerprint(self, args: Any, effects: ToolEffects) -> Fingerprint:
+        """Huella de las rutas implicadas; tomarla ANTES de ejecutar evita memorizar lecturas obsoletas."""
+        return _fingerprint(self._paths(effects, args))
+
+    def put(
+        self,
+        tool_name: str,
+        args: Any,
+        effects: ToolEffects,
+        output: str,
+        fingerprint: Optional[Fingerprint] = None,
+    ) -> None:
+        key = self._key(tool_name, args)
+        if fingerprint is None:
+            fingerprint = self.fingerprint(args, effects)
+        with self._lock:
+            self._entries[key] = (fingerprint, output)
+            while len(self._entries) > self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+
+    def invalidate_path(self, file_path: str) -> None:
+        """Elimina las entradas que dependen de `file_path` (o de un directorio que lo contiene)."""
+        target = _normalize_path(file_path)
+        with self._lock:
+            stale = [
+                key for key, (fingerprint, _) in self._entries.items()
+                if not fingerprint or any(
+                    p == target or target.startswith(p + os.sep) for p, _, _ in fingerprint
+                )
+            ]
+            for key in stale:
+                del self._entries[key]
+        if stale:
+            logger.debug(f"ToolResultCache: {len(stale)} entradas invalidadas por escritura en {target}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,382 @@
+"""
+Tracing — Spans al estilo OpenTelemetry para desglosar la latencia de un turno.
+
+Cada turno del agente es una traza: un span raíz (`agent.turn`) con hijos
+para el procesamiento del historial, el resumen, la conversión de esquemas de
+herramientas, la petición al proveedor (hasta el primer token), el stream,
+cada herramienta y cada espera de aprobación. El tiempo de renderizado de la
+UI se acumula como contadores en el span raíz (`ui.push.ms`, `ui.push.calls`)
+en lugar de abrir un span por evento.
+
+- El span activo viaja en un `ContextVar`, así que los hilos lanzados con
+  `contextvars.copy_context()` (herramientas en paralelo, `asyncio.to_thread`)
+  cuelgan sus spans del turno correcto.
+- En generadores, `traced_generator` activa el span solo mientras el
+  generador avanza: el consumidor nunca ve el span del productor como propio.
+- Al cerrar un span se cierran los descendientes que sigan abiertos.
+- Las trazas terminadas se guardan en memoria (para `/trace`) y se exportan
+  en formato OTLP/JSON, una petición `ExportTraceServiceRequest` por línea,
+  al archivo `KOGNITERM_TRACE_FILE` (por defecto
+  `~/.kogniterm/telemetry/traces.jsonl`).
+
+Uso:
+    tracer = get_tracer()
+    with tracer.span("history.process", messages=len(history)):
+        ...
+"""
+
+import contextvars
+import functools
+import inspect
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+from kogniterm.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "kogniterm"
+DEFAULT_TRACE_FILE = os.path.join(os.path.expanduser("~"), ".kogniterm", "telemetry", "traces.jsonl")
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("kogniterm_current_span", default=None)
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_ns: int
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    end_ns: Optional[int] = None
+    status: str = "ok"
+    root: Optional["Span"] = field(default=None, repr=False)
+    _tracer: Optional["Tracer"] = field(default=None, repr=False)
+
+    @property
+    def ended(self) -> bool:
+        return self.end_ns is not None
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e6
+
+    def set(self, **attributes: Any) -> "Span":
+        self.attributes.update(attributes)
+        return self
+
+    def end(self, status: Optional[str] = None, **attributes: Any) -> None:
+        if self.ended:
+            return
+        if attributes:
+            self.attributes.update(attributes)
+        if status:
+            self.status = status
+        if self._tracer is not None:
+            self._tracer._finish(self)
+        else:
+            self.end_ns = time.time_ns()
+
+
+class _NoopSpan:
+    """Span inerte que se devuelve con el tracing desactivado."""
+
+    name = ""
+    ended = True
+    duration_ms = 0.0
+    attributes: Dict[str, Any] = {}
+
+    def set(self, **attributes: Any) -> "_NoopSpan":
+        return self
+
+    def end(self, status: Optional[str] = None, **attributes: Any) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """Registro de spans en proceso con historial acotado y exportación OTLP/JSON."""
+
+    def __init__(self, enabled: Optional[bool] = None, export_path: Optional[str] = None, history: int = 20):
+        self.enabled = settings.tracing_enabled if enabled is None else enabled
+        if export_path is None:
+            export_path = settings.trace_file if settings.trace_file is not None else DEFAULT_TRACE_FILE
+        self.export_path = os.path.expanduser(export_path) if export_path else ""
+        self._lock = threading.Lock()
+        self._open: Dict[str, List[Span]] = {}
+        self._traces: Deque[List[Span]] = deque(maxlen=max(1, history))
+        self._sink = None
+
+    # ── Spans ──────────────────────────────────────────────────────────────
+
+    def current_span(self) -> Optional[Span]:
+        span = _current_span.get()
+        return span if isinstance(span, Span) and not span.ended else None
+
+    def start_span(self, name: str, parent: Optional[Span] = None, **attributes: Any):
+        """Abre un span hijo del activo (o de `parent`) sin activarlo; ciérralo con `end()`."""
+        if not self.enabled:
+            return NOOP_SPAN
+        if parent is None or not isinstance(parent, Span) or parent.ended:
+            parent = self.current_span()
+        span = Span(
+            name=name,
+            trace_id=parent.trace_id if parent else uuid.uuid4().hex,
+            span_id=uuid.uuid4().hex[:16],
+            parent_id=parent.span_id if parent else None,
+            start_ns=time.time_ns(),
+            attributes=dict(attributes),
+            _tracer=self,
+        )
+        span.root = parent.root if parent else span
+        with self._lock:
+            self._open.setdefault(span.trace_id, []).append(span)
+        return span
+
+    @contextmanager
+    def activate(self, span) -> Iterator[Any]:
+        """Hace de `span` el padre de los spans abiertos dentro del bloque."""
+        if not isinstance(span, Span):
+            yield span
+            return
+        token = _current_span.set(span)
+        try:
+            yield span
+        finally:
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                # El bloque terminó en otro contexto (p. ej. generador cerrado por el GC)
+                pass
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Any]:
+        """Abre, activa y cierra un span; una excepción lo marca con status=error."""
+        span = self.start_span(name, **attributes)
+        try:
+            with self.activate(span):
+                yield span
+        except BaseException as e:
+            span.end(status="error", error=type(e).__name__)
+            raise
+        finally:
+            span.end()
+
+    def add_time(self, name: str, seconds: float) -> None:
+        """Acumula `seconds` en los contadores `<name>.ms`/`<name>.calls` del span raíz activo."""
+        span = self.current_span()
+        if span is None:
+            return
+        root = span.root or span
+        with self._lock:
+            attrs = root.attributes
+            attrs[f"{name}.calls"] = attrs.get(f"{name}.calls", 0) + 1
+            attrs[f"{name}.ms"] = attrs.get(f"{name}.ms", 0.0) + seconds * 1000
+
+    def _finish(self, span: Span) -> None:
+        now = time.time_ns()
+        finished: Optional[List[Span]] = None
+        with self._lock:
+            if span.ended:
+                return
+            span.end_ns = now
+            spans = self._open.get(span.trace_id, [])
+            # Cerrar descendientes abiertos (streams abandonados, hilos rezagados)
+            closing = {span.span_id}
+            for other in spans:
+                if not other.ended and other.parent_id in closing:
+                    other.end_ns = now
+                    other.attributes.setdefault("closed_by_parent", True)
+                    closing.add(other.span_id)
+            if span.parent_id is None:
+                finished = self._open.pop(span.trace_id, spans)
+                self._traces.append(finished)
+        if finished is not None:
+            self._export(finished)
+
+    # ── Consulta ───────────────────────────────────────────────────────────
+
+    def last_traces(self, count: int = 1, **root_attributes: Any) -> List[List[Span]]:
+        """Últimas `count` trazas terminadas (la más reciente al final), filtradas por atributos del raíz."""
+        with self._lock:
+            traces = list(self._traces)
+        if root_attributes:
+            traces = [
+                t for t in traces
+                if all(t[0].attributes.get(k) == v for k, v in root_attributes.items())
+            ]
+        return traces[-count:] if count > 0 else []
+
+    # ── Exportación ────────────────────────────────────────────────────────
+
+    def _export(self, spans: List[Span]) -> None:
+        if not self.export_path:
+            return
+        try:
+            if self._sink is None:
+                from kogniterm.core.delegation.telemetry import TelemetrySink
+                self._sink = TelemetrySink(self.export_path)
+            self._sink.submit(to_otlp_json(spans))
+        except Exception as e:
+            logger.debug(f"No se pudo exportar la traza: {e}")
+
+    def flush(self) -> None:
+        if self._sink is not None:
+            self._sink.flush()
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp_json(spans: List[Span]) -> Dict[str, Any]:
+    """Convierte una traza en una petición OTLP/JSON (`ExportTraceServiceRequest`)."""
+    otlp_spans = []
+    for span in spans:
+        item = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns or span.start_ns),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in span.attributes.items()],
+            "status": {"code": 2 if span.status == "error" else 1},
+        }
+        if span.parent_id:
+            item["parentSpanId"] = span.parent_id
+        otlp_spans.append(item)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": "kogniterm.tracing"}, "spans": otlp_spans}],
+        }]
+    }
+
+
+def render_waterfall(spans: List[Span], width: int = 40) -> str:
+    """Vista en cascada de una traza: un span por línea, sangrado por profundidad."""
+    if not spans:
+        return "(traza vacía)"
+    start = min(s.start_ns for s in spans)
+    end = max((s.end_ns or s.start_ns) for s in spans)
+    total = max(end - start, 1)
+    children: Dict[Optional[str], List[Span]] = {}
+    for span in spans:
+        children.setdefault(span.parent_id, []).append(span)
+    ids = {s.span_id for s in spans}
+    roots = [s for s in spans if s.parent_id is None or s.parent_id not in ids]
+
+    rows = []
+
+    def walk(span: Span, depth: int) -> None:
+        offset = int((span.start_ns - start) / total * width)
+        length = max(1, int(((span.end_ns or span.start_ns) - span.start_ns) / total * width))
+        bar = " " * offset + "█" * min(length, width - offset)
+        label = "  " * depth + span.name
+        detail = ""
+        for key in ("tool", "model"):
+            if key in span.attributes:
+                detail = f" [{span.attributes[key]}]"
+                break
+        if span.status == "error":
+            detail += " ✗"
+        rows.append((label + detail, bar, f"{span.duration_ms:9.1f} ms"))
+        for child in sorted(children.get(span.span_id, []), key=lambda s: s.start_ns):
+            walk(child, depth + 1)
+
+    for root in sorted(roots, key=lambda s: s.start_ns):
+        walk(root, 0)
+        for key, value in root.attributes.items():
+            if key.endswith(".ms"):
+                name = key[:-3]
+                calls = root.attributes.get(f"{name}.calls", 0)
+                rows.append((f"  {name} (×{calls}, acumulado)", "", f"{value:9.1f} ms"))
+
+    label_width = min(48, max(len(r[0]) for r in rows))
+    return "\n".join(
+        f"{label[:label_width]:<{label_width}} │{bar:<{width}}│ {duration}" for label, bar, duration in rows
+    )
+
+
+def traced(name: str, attributes: Optional[Callable[..., Dict[str, Any]]] = None):
+    """Decorador: ejecuta la función (síncrona o corrutina) dentro de un span."""
+
+    def decorator(func):
+        def _attrs(args, kwargs):
+            if attributes is None:
+                return {}
+            try:
+                return attributes(*args, **kwargs) or {}
+            except Exception:
+                return {}
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with get_tracer().span(name, **_attrs(args, kwargs)):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with get_tracer().span(name, **_attrs(args, kwargs)):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def traced_generator(span, generator):
+    """
+    Itera `generator` con `span` activo solo mientras el generador avanza y
+    cierra el span al agotarse (o al cerrarse el generador).
+    """
+    tracer = get_tracer()
+    try:
+        while True:
+            with tracer.activate(span):
+                try:
+                    item = next(generator)
+                except StopIteration:
+                    return
+            yield item
+    except BaseException as e:
+        if not isinstance(e, GeneratorExit):
+            span.end(status="error", error=type(e).__name__)
+        raise
+    finally:
+        with tracer.activate(span):
+            generator.close()
+        span.end()
+
+
+_tracer: Optional[Tracer] = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """Tracer global del proceso."""
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                _tracer = Tracer()
+    return _tracer
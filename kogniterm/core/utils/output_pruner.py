@@ -1,8 +1,10 @@
 import os
 import re
 import time
+import uuid
 import logging
-from typing import List, Optional
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -137,3 +139,228 @@ def _save_full_log(output: str, tool_name: str) -> str:
     except Exception as e:
         logger.warning(f"No se pudo guardar el log de salida completo: {e}")
         return "~/.kogniterm/logs/output.log"
+
+
+# Secuencias ANSI/VT100: CSI (colores, cursor), OSC (títulos) y escapes de un carácter
+ANSI_ESCAPE = re.compile(r'\x1b(?:\[[0-?]*[ -/]*[@-~]|\][^\x07\x1b]*(?:\x07|\x1b\\)|[@-Z\\-_])')
+
+
+class StreamingOutputPruner:
+    """
+    Versión incremental de `smart_prune_tool_output` para salidas de comandos.
+
+    Procesa la salida a medida que llega, con memoria acotada:
+      1. Elimina secuencias ANSI y enmarca líneas (un `\\r` sin `\\n` reescribe la
+         línea, como en las barras de progreso).
+      2. Conserva una ventana de cabecera y otra de cola de tamaño fijo.
+      3. Captura en línea las líneas de error (ERROR_PATTERNS) con su contexto.
+      4. Al superar los límites, vuelca el log completo directamente a
+         ~/.kogniterm/logs en lugar de acumularlo en memoria.
+
+    `finish()` construye el resumen podado sin volver a recorrer la salida, así
+    que su coste no depende del tamaño total del comando.
+    """
+
+    def __init__(
+        self,
+        tool_name: str = "command",
+        max_lines: int = 100,
+        max_bytes: int = 8192,
+        head_lines: int = 25,
+        tail_lines: int = 25,
+        max_error_lines: int = 300,
+        max_line_chars: int = 2000,
+        display_bytes: int = 64 * 1024,
+    ):
+        self.tool_name = tool_name
+        self.max_lines = max_lines
+        self.max_bytes = max_bytes
+        self.head_lines = head_lines
+        self.max_error_lines = max_error_lines
+        self.max_line_chars = max_line_chars
+        self.display_bytes = display_bytes
+
+        self.total_lines = 0
+        self.total_bytes = 0
+        self.log_filepath: Optional[str] = None
+        self._log_file = None
+        self._partial = ""
+        self._small: Optional[List[str]] = []  # Todas las líneas mientras la salida sea pequeña
+        self._head: List[str] = []
+        self._tail: Deque[Tuple[int, str]] = deque(maxlen=tail_lines)
+        self._errors: Dict[int, str] = {}
+        self._errors_dropped = 0
+        self._prev: Optional[Tuple[int, str]] = None
+        self._capture_next = False
+        self._display: Deque[Tuple[str, int]] = deque()  # (bloque, bytes)
+        self._display_size = 0
+        self._display_truncated = False
+        self._finished: Optional[str] = None
+
+    # ── Entrada ────────────────────────────────────────────────────────────
+
+    def feed(self, chunk: str) -> None:
+        if not chunk:
+            return
+        size = len(chunk.encode("utf-8", errors="replace"))
+        self._remember_display(chunk, size)
+        self.total_bytes += size
+        text = self._partial + chunk
+        # Una secuencia ANSI o un \r\n pueden quedar partidos entre bloques
+        cut = len(text)
+        esc = text.rfind("\x1b", max(0, len(text) - 32))
+        if esc != -1 and not ANSI_ESCAPE.match(text, esc):
+            cut = esc
+        lines = text[:cut].split("\n")
+        self._partial = lines.pop() + text[cut:]
+        for line in lines:
+            self._add_line(line)
+        if len(self._partial) > self.max_line_chars * 8:
+            # Línea sin fin (salida binaria o sin saltos): enmarcarla a la fuerza
+            self._add_line(self._partial)
+            self._partial = ""
+
+    def _frame(self, line: str) -> str:
+        line = ANSI_ESCAPE.sub("", line).rstrip("\r")
+        if "\r" in line:
+            line = line.rsplit("\r", 1)[-1]
+        return line
+
+    def _add_line(self, raw_line: str) -> None:
+        line = self._frame(raw_line)
+        idx = self.total_lines
+        self.total_lines += 1
+
+        if self._small is not None:
+            self._small.append(line)
+            if self.total_lines > self.max_lines or self.total_bytes > self.max_bytes:
+                self._start_spilling()
+            return
+
+        self._write_log(line)
+        self._track(idx, self._clip(line))
+
+    def _clip(self, line: str) -> str:
+        if len(line) > self.max_line_chars:
+            return line[:self.max_line_chars] + f" […{len(line) - self.max_line_chars} caracteres]"
+        return line
+
+    def _track(self, idx: int, line: str) -> None:
+        if idx < self.head_lines:
+            self._head.append(line)
+        else:
+            if self._capture_next:
+                self._keep_error(idx, line)
+                self._capture_next = False
+            if ERROR_PATTERNS.search(line):
+                if self._prev is not None:
+                    self._keep_error(*self._prev)
+                self._keep_error(idx, line)
+                self._capture_next = True
+            self._tail.append((idx, line))
+        self._prev = (idx, line)
+
+    def _keep_error(self, idx: int, line: str) -> None:
+        if idx in self._errors:
+            return
+        if len(self._errors) >= self.max_error_lines:
+            self._errors_dropped += 1
+            return
+        self._errors[idx] = line
+
+    def _start_spilling(self) -> None:
+        buffered, self._small = self._small, None
+        self._open_log()
+        for idx, line in enumerate(buffered):
+            self._write_log(line)
+            self._track(idx, self._clip(line))
+
+    def _open_log(self) -> None:
+        try:
+            os.makedirs(LOGS_DIR, exist_ok=True)
+            safe_name = re.sub(r'[^a-zA-Z0-9_]', '_', self.tool_name)
+            filename = f"{safe_name}_{int(time.time())}_{uuid.uuid4().hex[:6]}.log"
+            self.log_filepath = os.path.join(LOGS_DIR, filename)
+            self._log_file = open(self.log_filepath, "w", encoding="utf-8", errors="replace")
+        except Exception as e:
+            logger.warning(f"No se pudo abrir el log de salida completo: {e}")
+            self.log_filepath = "~/.kogniterm/logs/output.log"
+            self._log_file = None
+
+    def _write_log(self, line: str) -> None:
+        if self._log_file is None:
+            return
+        try:
+            self._log_file.write(line + "\n")
+        except Exception as e:
+            logger.warning(f"Error escribiendo el log de salida: {e}")
+            self._close_log()
+
+    def _close_log(self) -> None:
+        if self._log_file is not None:
+            try:
+                self._log_file.close()
+            except Exception:
+                pass
+            self._log_file = None
+
+    # ── Vista para la UI ───────────────────────────────────────────────────
+
+    def _remember_display(self, chunk: str, size: int) -> None:
+        self._display.append((chunk, size))
+        self._display_size += size
+        while self._display_size > self.display_bytes and len(self._display) > 1:
+            self._display_size -= self._display.popleft()[1]
+            self._display_truncated = True
+
+    def display_text(self) -> str:
+        """Salida en bruto (con colores) para la UI: completa si es pequeña, si no su final."""
+        text = "".join(chunk for chunk, _ in self._display)
+        if self._display_truncated:
+            return f"[... salida anterior omitida ({self.total_bytes // 1024} KB en total) ...]\n" + text
+        return text
+
+    # ── Resultado ──────────────────────────────────────────────────────────
+
+    def close(self) -> None:
+        """Cierra el log volcado aunque el flujo no llegue a `finish()` (p. ej. si la herramienta falla)."""
+        self._close_log()
+
+    def finish(self) -> str:
+        """Cierra el flujo y devuelve la salida (intacta si es pequeña, podada si no)."""
+        if self._finished is not None:
+            return self._finished
+        if self._partial:
+            self._add_line(self._partial)
+            self._partial = ""
+
+        if self._small is not None:
+            self._finished = "\n".join(self._small)
+            return self._finished
+
+        self._close_log()
+        selected: Dict[int, str] = dict(enumerate(self._head))
+        selected.update(self._errors)
+        selected.update(self._tail)
+
+        pruned_lines: List[str] = []
+        prev_idx = -1
+        for idx in sorted(selected):
+            if prev_idx != -1 and idx > prev_idx + 1:
+                omitted_count = idx - prev_idx - 1
+                pruned_lines.append(
+                    f"\n--- [... {omitted_count} líneas omitidas (sin errores). Log completo en: {self.log_filepath} ...] ---\n"
+                )
+            pruned_lines.append(selected[idx])
+            prev_idx = idx
+        if self._errors_dropped:
+            pruned_lines.append(
+                f"\n--- [... {self._errors_dropped} líneas de error adicionales en {self.log_filepath} ...] ---"
+            )
+
+        header_notice = (
+            f"ℹ️ [KogniTerm: Salida de {self.tool_name} estructurada ({self.total_lines} líneas, "
+            f"{self.total_bytes // 1024} KB). Log completo guardado en: {self.log_filepath}]\n"
+        )
+        self._finished = header_notice + "\n".join(pruned_lines)
+        return self._finished
@@ -49,6 +49,7 @@ from starlette.requests import HTTPConnection
 from pydantic import BaseModel, Field
 
 from kogniterm.core.llm_service import LLMService
+from kogniterm.core.context.indexing_jobs import indexing_jobs
 from kogniterm.server.session_pool import pool, safe_abs_path
 from kogniterm.server.config import server_config, ChannelConfig, HeartbeatConfig
 from kogniterm.server.heartbeat_manager import heartbeat_scheduler
@@ -170,6 +171,17 @@ async def lifespan(app: FastAPI):
 
     asyncio.create_task(load_llm_service_background())
 
+    # Conectar servidores MCP en segundo plano (en paralelo; con manifiesto en caché no hay espera)
+    from kogniterm.core.mcp.mcp_manager import MCPManager
+
+    async def load_mcp_servers_background():
+        try:
+            await MCPManager.get_instance().reload()
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudieron cargar los servidores MCP: {e}")
+
+    asyncio.create_task(load_mcp_servers_background())
+
     # Inicializar canales externos configurados
     active_tasks = []
     for cfg in server_config.settings.channels:
@@ -190,12 +202,18 @@ async def lifespan(app: FastAPI):
     # Inicializar scheduler de heartbeats
     heartbeat_scheduler.start()
 
+    # Barrido periódico de sesiones inactivas (hibernación LRU + TTL)
+    pool.start_eviction()
+
     logger.info("✅ KogniTerm Server listo.")
     yield
 
     logger.info("🛑 Cerrando KogniTerm Server...")
     # Detener scheduler de heartbeats
     heartbeat_scheduler.stop()
+    pool.stop_eviction()
+    await indexing_jobs.shutdown()
+    await MCPManager.get_instance().shutdown()
 
     # Detener canales activos
     for adapter, task in active_tasks:
@@ -206,7 +224,45 @@ async def lifespan(app: FastAPI):
             logger.warning(f"Error al detener canal {adapter}: {e}")
         task.cancel()
 
-    pool._executor.shutdown(wait=False)
+
+# ── Indexación del workspace ──────────────────────────────────────────────────
+
+
+class _SessionIndexingListener:
+    """Reenvía eventos de un trabajo de indexación al WebSocket de una sesión."""
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, _SessionIndexingListener) and other.session_id == self.session_id
+
+    def __hash__(self) -> int:
+        return hash(self.session_id)
+
+    def __call__(self, event_type: str, data: dict) -> None:
+        # Se resuelve en cada evento: la sesión puede haberse hibernado y rehidratado.
+        # Una sesión hibernada no tiene websockets conectados, así que no se despierta.
+        s = pool.get(self.session_id)
+        if s:
+            s.ui._push(event_type, data)
+
+
+def _indexing_workspace(session_id: Optional[str]) -> str:
+    if session_id:
+        workspace = pool.workspace_dir_of(session_id)
+        if workspace:
+            return workspace
+    return os.getcwd()
+
+
+def start_indexing(session_id: Optional[str] = None, full: bool = False):
+    """Encola (o fusiona) la indexación del workspace de la sesión. Devuelve (job, fusionado)."""
+    workspace = _indexing_workspace(session_id)
+    existing = indexing_jobs.get(workspace)
+    coalesced = bool(existing and existing.active)
+    listener = _SessionIndexingListener(session_id) if session_id else None
+    return indexing_jobs.submit(workspace, listener=listener, full=full), coalesced
 
 
 # ── Seguridad y Autenticación ──────────────────────────────────────────────────
@@ -323,6 +379,7 @@ def create_app() -> FastAPI:
             "status": "online",
             "active_sessions": len(sessions),
             "sessions": sessions,
+            "session_metrics": pool.metrics(),
             "configured_channels": [
                 c.name for c in server_config.settings.channels if c.enabled
             ],
@@ -994,14 +1051,13 @@ def create_app() -> FastAPI:
             indexed = False
 
             if session_id:
-                s = pool.get(session_id)
-                if s and getattr(s, "workspace_dir", None):
-                    workspace_path = s.workspace_dir
+                session_workspace = pool.workspace_dir_of(session_id)
+                if session_workspace:
+                    workspace_path = session_workspace
                     from kogniterm.core.context.vector_db_manager import VectorDBManager
                     try:
-                        vdb = VectorDBManager(workspace_path)
+                        vdb = VectorDBManager.get_for_path(workspace_path)
                         indexed = vdb.is_indexed()
-                        vdb.close()
                     except Exception:
                         pass
             else:
@@ -1022,9 +1078,7 @@ def create_app() -> FastAPI:
         try:
             workspace_path = os.getcwd()
             if session_id:
-                s = pool.get(session_id)
-                if s and getattr(s, "workspace_dir", None):
-                    workspace_path = s.workspace_dir
+                workspace_path = pool.workspace_dir_of(session_id) or workspace_path
 
             from kogniterm.terminal.file_completer import is_ignored_path, fuzzy_match_files
 
@@ -1084,71 +1138,24 @@ def create_app() -> FastAPI:
             return {"query": query, "results": [], "error": str(e)}
 
     @application.post("/api/workspace/index", tags=["Desktop"])
-    async def trigger_indexing(session_id: Optional[str] = None):
-        """Inicia el proceso de indexación del codebase en segundo plano."""
-        asyncio.create_task(run_indexing_task(session_id))
-        return {"status": "started", "message": "Indexación iniciada en segundo plano."}
-
-    async def run_indexing_task(session_id: Optional[str] = None):
-        """Tarea de fondo para indexar el codebase."""
-        project_path = os.getcwd()
-        if session_id:
-            s = pool.get(session_id)
-            if s and getattr(s, "workspace_dir", None):
-                project_path = s.workspace_dir
-        try:
-            from kogniterm.core.context.codebase_indexer import CodebaseIndexer
-            from kogniterm.core.context.vector_db_manager import VectorDBManager
-
-            # Helper para enviar progreso si hay una sesión asociada
-            def progress_callback(current, total, description):
-                if session_id:
-                    s = pool.get(session_id)
-                    if s:
-                        s.ui._push(
-                            "indexing_progress",
-                            {
-                                "current": current,
-                                "total": total,
-                                "description": description,
-                                "percentage": int((current / total) * 100)
-                                if total > 0
-                                else 0,
-                            },
-                        )
-
-            indexer = CodebaseIndexer(project_path)
-            chunks = await indexer.index_project(
-                project_path, show_progress=False, progress_callback=progress_callback
-            )
-
-            if chunks:
-                if pool._llm_service and pool._llm_service.vector_db_manager:
-                    vdb = pool._llm_service.vector_db_manager
-                    vdb.clear_collection()
-                    vdb.add_chunks(chunks)
-                else:
-                    vdb = VectorDBManager(project_path)
-                    vdb.clear_collection()
-                    vdb.add_chunks(chunks)
-                    vdb.close()
-
-                if session_id:
-                    s = pool.get(session_id)
-                    if s:
-                        s.ui._push("indexing_complete", {"chunks": len(chunks)})
-            else:
-                if session_id:
-                    s = pool.get(session_id)
-                    if s:
-                        s.ui._push("indexing_complete", {"chunks": 0})
-
-        except Exception as e:
-            logger.error(f"Error en tarea de indexación: {e}")
-            if session_id:
-                s = pool.get(session_id)
-                if s:
-                    s.ui._push("indexing_error", {"message": str(e)})
+    async def trigger_indexing(session_id: Optional[str] = None, full: bool = False):
+        """Encola la indexación del codebase (un trabajo por workspace, peticiones repetidas se fusionan)."""
+        job, coalesced = start_indexing(session_id, full=full)
+        if coalesced:
+            return {"status": "coalesced", "message": "Ya hay una indexación en curso para este workspace.", "job": job.to_dict()}
+        return {"status": "started", "message": "Indexación iniciada en segundo plano.", "job": job.to_dict()}
+
+    @application.get("/api/workspace/index", tags=["Desktop"])
+    async def indexing_status(session_id: Optional[str] = None):
+        """Estado del trabajo de indexación del workspace de la sesión."""
+        job = indexing_jobs.get(_indexing_workspace(session_id))
+        return {"job": job.to_dict() if job else None}
+
+    @application.delete("/api/workspace/index", tags=["Desktop"])
+    async def cancel_indexing(session_id: Optional[str] = None):
+        """Cancela la indexación en curso; la próxima petición reanuda desde el checkpoint."""
+        cancelled = indexing_jobs.cancel(_indexing_workspace(session_id))
+        return {"status": "cancelled" if cancelled else "idle"}
 
     @application.post("/api/execute", response_model=CommandResponse, tags=["Desktop"])
     async def execute_command(request: CommandRequest):
@@ -1239,6 +1246,9 @@ def create_app() -> FastAPI:
                 )
             logger.info(f"[Server] Sesión {session_id} cerrada correctamente.")
             return {"status": "closed", "session_id": session_id}
+        if pool.is_hibernated(session_id):
+            # Su historial se guardó al hibernarla: no hace falta despertarla
+            return {"status": "closed", "session_id": session_id}
         return {"status": "not_found", "session_id": session_id}
 
     # ── Gestión de Hilos de Chat (Threads) ─────────────────────────────────────
@@ -1395,7 +1405,7 @@ def create_app() -> FastAPI:
                     break
 
         collect_task = asyncio.create_task(collector())
-        await session.send(req.message, pool._executor)
+        await session.send(req.message)
         done_event.set()
         await asyncio.sleep(0)
         collect_task.cancel()
@@ -1440,7 +1450,7 @@ def create_app() -> FastAPI:
                     break
 
         collect_task = asyncio.create_task(collector())
-        await session.send(req.message, pool._executor)
+        await session.send(req.message)
         done_event.set()  # Asegurar que collector termine
         await asyncio.sleep(0)
         collect_task.cancel()
@@ -1469,7 +1479,7 @@ def create_app() -> FastAPI:
         session = pool.get_or_create(session_id)
 
         async def event_generator() -> AsyncIterator[str]:
-            send_task = asyncio.create_task(session.send(message, pool._executor))
+            send_task = asyncio.create_task(session.send(message))
 
             async for event in session.ui.events():
                 # Formato SSE: "data: <json>\n\n"
@@ -1507,6 +1517,9 @@ def create_app() -> FastAPI:
           {"type": "interrupt"}                    → interrumpir ejecución actual
           {"type": "ping"}                         → keep-alive
 
+        Reanudación: `?last_seq=N&epoch=E` reproduce los eventos con seq > N del
+        búfer de la sesión; si ya no están disponibles llega `resync_required`.
+
         Protocolo servidor → cliente (JSON):
           {"type": "stream",       "data": "...", "ts": "..."}  → chunk de texto
           {"type": "tool_start",   "data": {...}, "ts": "..."}  → inicio de herramienta
@@ -1517,6 +1530,9 @@ def create_app() -> FastAPI:
           {"type": "done",         "data": {...}, "ts": "..."}  → fin de ciclo
           {"type": "error",        "data": {...}, "ts": "..."}  → error
           {"type": "pong",         "data": {},    "ts": "..."}  → respuesta keep-alive
+          {"type": "resync_required", "data": {...}}          → backfill imposible, recargar hilo
+
+        Todos los eventos del agente llevan `seq` (monótono por sesión).
         """
         # Validar Origin (Cross-Site WebSocket Hijacking Protection)
         origin = websocket.headers.get("origin")
@@ -1538,7 +1554,7 @@ def create_app() -> FastAPI:
         await pool.wait_until_ready()
 
         # Reconocer cuando una sesión es nueva o existente
-        is_new = session_id not in pool._sessions
+        is_new = not pool.exists(session_id)
         session = pool.get_or_create(session_id, workspace_dir=workspace_dir)
 
         logger.info(
@@ -1553,10 +1569,21 @@ def create_app() -> FastAPI:
             or os.environ.get("LITELLM_MODEL", "google/gemini-1.5-flash"),
         }
 
+        # Reanudación: el cliente indica el último evento que vio (last_seq) y la
+        # época del stream; el relay reproduce lo perdido antes de los eventos nuevos.
+        last_seq: Optional[int] = None
+        raw_last_seq = websocket.query_params.get("last_seq")
+        if raw_last_seq is not None:
+            try:
+                last_seq = int(raw_last_seq)
+            except ValueError:
+                last_seq = None
+        stream_epoch = websocket.query_params.get("epoch")
+
         # Tarea A: relay de eventos del agente → cliente WS
         async def relay_events():
             try:
-                async for event in session.ui.events():
+                async for event in session.ui.events(last_seq=last_seq, epoch=stream_epoch):
                     await websocket.send_json(event)
             except WebSocketDisconnect:
                 logger.info(f"[WS:{session_id}] relay_events: cliente desconectado")
@@ -1577,6 +1604,11 @@ def create_app() -> FastAPI:
                         "is_new": is_new,
                         "persistent": True,
                         "is_running": session.is_running,
+                        "stream": {
+                            "epoch": session.ui.stream_epoch,
+                            "seq": session.ui.last_seq,
+                            "resumed_from": last_seq,
+                        },
                         "live_state": {
                             "thinking": getattr(session.ui, "current_thinking", ""),
                             "response": getattr(session.ui, "current_response", ""),
@@ -1602,7 +1634,7 @@ def create_app() -> FastAPI:
                     images = data.get("images", [])
                     if not text and not images:
                         continue
-                    asyncio.create_task(session.send(text, pool._executor, images=images))
+                    asyncio.create_task(session.send(text, images=images))
 
                 elif msg_type == "interrupt":
                     session.interrupt()
@@ -1611,11 +1643,17 @@ def create_app() -> FastAPI:
                     )
 
                 elif msg_type == "start_indexing":
-                    asyncio.create_task(run_indexing_task(session_id))
+                    start_indexing(session_id, full=bool(data.get("full", False)))
                     await websocket.send_json(
                         {"type": "info", "data": "Indexación iniciada."}
                     )
 
+                elif msg_type == "cancel_indexing":
+                    cancelled = indexing_jobs.cancel(_indexing_workspace(session_id))
+                    await websocket.send_json(
+                        {"type": "info", "data": "Indexación cancelada." if cancelled else "No hay indexación en curso."}
+                    )
+
                 elif msg_type == "approval_response":
                     request_id = data.get("id")
                     approved = data.get("approved", False)
@@ -37,8 +37,9 @@ class ChannelAdapter:
         self._session: Optional[AgentSession] = None
 
     def _get_session(self) -> AgentSession:
-        if self._session is None:
-            self._session = pool.get_or_create(self.session_id)
+        # Se resuelve siempre contra el pool: la sesión puede haber sido
+        # hibernada por inactividad y rehidratada como un objeto nuevo.
+        self._session = pool.get_or_create(self.session_id)
         return self._session
 
     async def send_message(self, message: str) -> None:
@@ -47,7 +48,7 @@ class ChannelAdapter:
         session = self._get_session()
         # Procesar eventos en background mientras el agente trabaja
         process_task = asyncio.create_task(self._process_events(session))
-        await session.send(message, pool._executor)
+        await session.send(message)
         # Esperar a que se terminen de procesar todos los eventos de la cola de respuesta.
         # El timeout es generoso (10 min) para no cortar generaciones largas del LLM
         # que emiten tool_calls, índices o respuestas extensas.
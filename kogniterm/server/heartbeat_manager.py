@@ -128,7 +128,7 @@ class HeartbeatScheduler:
                     logger.warning(f"No se pudo actualizar título del hilo para {target_session_id}: {ex}")
 
             # Enviar prompt al agente en la sesión elegida
-            await session.send(hb.prompt, pool._executor)
+            await session.send(hb.prompt)
 
             # Extraer el último texto de respuesta generado por el agente
             last_response = ""
@@ -12,9 +12,11 @@ import asyncio
 import logging
 import queue
 import threading
+import time
 import uuid
 
 import os
+from collections import OrderedDict, deque
 from datetime import datetime
 from io import StringIO
 from typing import Any, AsyncIterator, Callable, Dict, Optional
@@ -44,7 +46,11 @@ def custom_getcwd():
 def custom_chdir(path):
     abs_path = safe_abs_path(path)
     if session_cwd_var.get() is not None:
-        session_cwd_var.set(abs_path)
+        # Dentro de una sesión del servidor el cwd es por contexto: no se toca
+        # el cwd del proceso, que es compartido por todas las sesiones.
+        if os.path.isdir(abs_path):
+            session_cwd_var.set(abs_path)
+        return
     try:
         _original_chdir(abs_path)
     except Exception:
@@ -54,14 +60,24 @@ os.getcwd = custom_getcwd
 os.chdir = custom_chdir
 
 @contextlib.contextmanager
-def session_context(cwd, llm_service=None, history_manager=None, workspace_context=None, vector_db_manager=None):
-    """Context manager for isolating session workspace and context."""
+def session_context(
+    cwd,
+    llm_service=None,
+    history_manager=None,
+    workspace_context=None,
+    vector_db_manager=None,
+    terminal_ui=None,
+    telemetry_tracker=None,
+    session_id=None,
+):
+    """Context manager for isolating session workspace and context.
+
+    El aislamiento es únicamente por contextvars: el cwd del proceso no se
+    modifica, de modo que varias sesiones pueden ejecutarse en paralelo sobre
+    el mismo LLMService sin carreras de `chdir`.
+    """
     cwd = safe_abs_path(cwd)
     cwd_token = session_cwd_var.set(cwd)
-    try:
-        _original_chdir(cwd)
-    except Exception:
-        pass
     tokens = []
     if llm_service:
         llm_service._use_context_vars = True
@@ -73,6 +89,12 @@ def session_context(cwd, llm_service=None, history_manager=None, workspace_conte
             tokens.append((llm_service._context_workspace_context, llm_service._context_workspace_context.set(workspace_context)))
         if vector_db_manager:
             tokens.append((llm_service._context_vector_db_manager, llm_service._context_vector_db_manager.set(vector_db_manager)))
+        if terminal_ui:
+            tokens.append((llm_service._context_terminal_ui, llm_service._context_terminal_ui.set(terminal_ui)))
+        if telemetry_tracker:
+            tokens.append((llm_service._context_telemetry_tracker, llm_service._context_telemetry_tracker.set(telemetry_tracker)))
+        if session_id:
+            tokens.append((llm_service._context_session_id, llm_service._context_session_id.set(session_id)))
     try:
         yield
     finally:
@@ -86,6 +108,7 @@ from kogniterm.core.agent_state import AgentState
 from kogniterm.core.llm_service import LLMService
 from kogniterm.core.thread_manager import ThreadManager
 from kogniterm.core.agent_interaction import AgentInteractionRegistry
+from kogniterm.core.tracing import get_tracer, render_waterfall
 from kogniterm.ui.terminal_ui import TerminalUI
 from rich.console import Console
 
@@ -248,6 +271,18 @@ class ServerUI(TerminalUI):
         self.current_thinking: str = ""
         self.current_response: str = ""
         self.active_terminal_entries: list = []
+        # Búfer de reproducción: eventos secuenciados para que un cliente que
+        # reconecta con `last_seq` reciba exactamente lo que se perdió.
+        # `stream_epoch` cambia si la sesión se recrea (reinicio, hibernación).
+        self.stream_epoch = uuid.uuid4().hex[:12]
+        self._seq = 0
+        self._replay: deque = deque(
+            maxlen=int(os.getenv("KOGNITERM_EVENT_REPLAY_SIZE", "2000"))
+        )
+
+    @property
+    def last_seq(self) -> int:
+        return self._seq
 
     def reset_live_buffer(self) -> None:
         """Limpia el búfer del estado en vivo cuando concluye la generación."""
@@ -274,6 +309,7 @@ class ServerUI(TerminalUI):
         Si se provee agent_id, se incluye en el evento para que la TUI pueda
         enrutar el output al panel/pestaña del subagente correspondiente.
         """
+        started = time.perf_counter()
         event = {"type": event_type, "data": data, "ts": datetime.utcnow().isoformat()}
         if agent_id:
             event["agent_id"] = agent_id
@@ -295,8 +331,12 @@ class ServerUI(TerminalUI):
             })
 
         try:
-            # Broadcast a todas las colas activas
+            # Secuenciar, guardar en el búfer de reproducción y hacer broadcast
+            # bajo el mismo lock: el orden de `seq` es el orden de entrega.
             with self._queues_lock:
+                self._seq += 1
+                event["seq"] = self._seq
+                self._replay.append(event)
                 for q in self._queues:
                     self._loop.call_soon_threadsafe(q.put_nowait, event)
 
@@ -319,6 +359,7 @@ class ServerUI(TerminalUI):
             logger.warning(
                 f"[{self.session_id}] No se pudo enviar evento {event_type}: {exc}"
             )
+        get_tracer().add_time("ui.push", time.perf_counter() - started)
 
     def _render_rich(self, renderable: Any) -> str:
         """Convierte un renderable de Rich a texto con formato ANSI."""
@@ -621,14 +662,63 @@ class ServerUI(TerminalUI):
 
         logger.warning(f"[{self.session_id}] Advertencia: request_id={request_id} no se encontró en las preguntas pendientes de esta sesión.")
 
+    def has_pending_requests(self) -> bool:
+        """True si hay aprobaciones o preguntas esperando respuesta del cliente."""
+        with self._pending_lock:
+            return bool(
+                self._pending_approvals
+                or self._pending_approvals_async
+                or self._pending_questions
+            )
+
+    def has_consumers(self) -> bool:
+        """True si algún cliente (WebSocket, SSE, canal) está escuchando eventos."""
+        with self._queues_lock:
+            return bool(self._queues)
+
     # ── Consumer API ───────────────────────────────────────────────────────────
 
-    async def events(self) -> AsyncIterator[dict]:
-        """Generador asíncrono: yield de eventos registrando una cola de broadcast por consumidor."""
+    def _backlog_since(self, last_seq: int, epoch: Optional[str]) -> Optional[list]:
+        """Eventos posteriores a `last_seq`, o None si ya no se pueden reproducir. Requiere `_queues_lock`."""
+        if (epoch and epoch != self.stream_epoch) or last_seq > self._seq:
+            return None
+        oldest = self._replay[0]["seq"] if self._replay else self._seq + 1
+        if last_seq + 1 < oldest:
+            return None
+        return [e for e in self._replay if e["seq"] > last_seq]
+
+    async def events(
+        self, last_seq: Optional[int] = None, epoch: Optional[str] = None
+    ) -> AsyncIterator[dict]:
+        """Generador asíncrono: yield de eventos registrando una cola de broadcast por consumidor.
+
+        Con `last_seq`, primero se reproducen los eventos perdidos desde ese punto.
+        Si ya no están en el búfer (o la sesión se recreó), se emite un único
+        `resync_required` para que el cliente recargue el hilo completo.
+        """
         q = asyncio.Queue()
+        backlog: list = []
         with self._queues_lock:
+            if last_seq is not None:
+                replay = self._backlog_since(last_seq, epoch)
+                if replay is None:
+                    oldest = self._replay[0]["seq"] if self._replay else self._seq + 1
+                    backlog = [{
+                        "type": "resync_required",
+                        "data": {
+                            "last_seq": last_seq,
+                            "oldest_seq": oldest,
+                            "current_seq": self._seq,
+                            "epoch": self.stream_epoch,
+                        },
+                        "ts": datetime.utcnow().isoformat(),
+                    }]
+                else:
+                    backlog = replay
             self._queues.append(q)
         try:
+            for event in backlog:
+                yield event
             while True:
                 event = await q.get()
                 yield event
@@ -639,6 +729,66 @@ class ServerUI(TerminalUI):
                     self._queues.remove(q)
 
 
+# ── Recursos compartidos entre sesiones ───────────────────────────────────────
+
+
+class SharedSessionResources:
+    """
+    Recursos pesados e inmutables compartidos por todas las sesiones del pool.
+
+    El LLMService ya centraliza el registro de skills, los esquemas de
+    herramientas, el servicio de embeddings y el ProviderManager; aquí se
+    añade una caché por workspace del cliente ChromaDB y del WorkspaceContext,
+    para que N sesiones sobre el mismo directorio no abran N conexiones.
+    Cada AgentSession conserva solo su estado mutable (historial, UI, colas).
+    """
+
+    def __init__(self, llm_service: LLMService):
+        self.llm_service = llm_service
+        self._workspace_contexts: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def skill_manager(self):
+        return getattr(self.llm_service, "skill_manager", None)
+
+    @property
+    def tool_schemas(self) -> list:
+        return getattr(self.llm_service, "tool_schemas", None) or []
+
+    @property
+    def embeddings_service(self):
+        return getattr(self.llm_service, "embeddings_service", None)
+
+    @property
+    def provider_manager(self):
+        return getattr(self.llm_service, "provider_manager", None)
+
+    @property
+    def tokenizer(self):
+        return getattr(self.llm_service, "tokenizer", None)
+
+    def vector_db_for(self, workspace_dir: str):
+        """Cliente ChromaDB compartido para el workspace (o None en modo seguro)."""
+        from kogniterm.core.context.vector_db_manager import VectorDBManager
+        try:
+            return VectorDBManager.get_for_path(workspace_dir)
+        except Exception as exc:
+            logger.warning(f"No se pudo abrir ChromaDB en {workspace_dir}: {exc}")
+            return None
+
+    def workspace_context_for(self, workspace_dir: str):
+        """WorkspaceContext compartido para el workspace."""
+        from kogniterm.core.context.workspace_context import WorkspaceContext
+        workspace_dir = safe_abs_path(workspace_dir)
+        with self._lock:
+            context = self._workspace_contexts.get(workspace_dir)
+            if context is None:
+                context = WorkspaceContext(root_dir=workspace_dir)
+                self._workspace_contexts[workspace_dir] = context
+            return context
+
+
 # ── Sesión individual ──────────────────────────────────────────────────────────
 
 
@@ -655,11 +805,13 @@ class AgentSession:
         loop: asyncio.AbstractEventLoop,
         thread_manager: Optional[ThreadManager] = None,
         workspace_dir: Optional[str] = None,
+        shared: Optional[SharedSessionResources] = None,
     ):
         self.session_id = session_id
         self.created_at = datetime.utcnow()
         self.last_activity = datetime.utcnow()
         self.llm_service = llm_service
+        self.shared = shared or SharedSessionResources(llm_service)
 
         # Determinar el workspace_dir correcto
         if not workspace_dir and thread_manager:
@@ -677,51 +829,34 @@ class AgentSession:
         self.thread_manager = thread_manager or ThreadManager(workspace_dir=self.workspace_dir)
         self._thread_manager_owned = thread_manager is None
 
-        # Inicializar vector_db_manager para la sesión
-        from kogniterm.core.context.vector_db_manager import VectorDBManager
-        try:
-            self.vector_db_manager = VectorDBManager(project_path=self.workspace_dir)
-        except Exception:
-            self.vector_db_manager = None
+        # Recursos por workspace compartidos entre sesiones (ChromaDB, contexto)
+        self.vector_db_manager = self.shared.vector_db_for(self.workspace_dir)
+        self.workspace_context = self.shared.workspace_context_for(self.workspace_dir)
 
-        # Inicializar history_manager para la sesión
-        from kogniterm.core.history_manager import HistoryManager
-        history_file_path = os.path.join(self.workspace_dir, ".kogniterm", "history.json")
-        self.history_manager = HistoryManager(
-            history_file_path=history_file_path,
-            max_history_messages=llm_service.max_history_messages,
-            max_history_chars=llm_service.max_history_chars,
-            auto_save_interval=llm_service.auto_save_interval
-        )
-
-        # Inicializar workspace_context para la sesión
-        from kogniterm.core.context.workspace_context import WorkspaceContext
-        self.workspace_context = WorkspaceContext(root_dir=self.workspace_dir)
+        # Estado mutable propio de la sesión
+        self.history_manager = self._create_history_manager(self.workspace_dir)
 
         # UI adapter (sin pantalla)
         self.ui = ServerUI(loop=loop, session_id=session_id)
 
-        # Inyectar terminal_ui en el LLMService y SkillManager para que
-        # skills como task_tracker puedan acceder al canal de eventos.
-        llm_service.terminal_ui = self.ui
+        # La UI y la telemetría de la sesión se exponen al LLMService y a las
+        # skills mediante contextvars (ver `session_context`), no mutando el
+        # servicio compartido: así cada sesión recibe solo sus propios eventos.
         if hasattr(llm_service, "skill_manager") and llm_service.skill_manager:
-            llm_service.skill_manager.terminal_ui = self.ui
-            # Inyectar retroactivamente en los módulos de herramientas cargadas
             import sys
 
+            from kogniterm.core.skills.registry_snapshot import LazySkillTool
+
             try:
                 for tool in llm_service.skill_manager.get_tools():
+                    if isinstance(tool, LazySkillTool):
+                        continue  # Se inyecta al importarse (SkillManager._import_skill)
                     module_name = getattr(tool, "__module__", None)
                     if module_name:
                         module = sys.modules.get(module_name)
                         if module:
-                            if hasattr(module, "_terminal_ui"):
-                                setattr(module, "_terminal_ui", self.ui)
                             if hasattr(module, "_llm_service"):
                                 setattr(module, "_llm_service", llm_service)
-                            # También inyectar como atributo de la función/herramienta si lo requiere
-                            if hasattr(tool, "terminal_ui"):
-                                setattr(tool, "terminal_ui", self.ui)
                             if hasattr(tool, "llm_service"):
                                 setattr(tool, "llm_service", llm_service)
             except Exception as e:
@@ -793,8 +928,6 @@ class AgentSession:
             session_id=session_id,
             workspace_dir=self.workspace_dir,
         )
-        llm_service.telemetry_tracker = self.telemetry_tracker
-
 
         # Bandera de sesión activa
         self.is_running = False
@@ -807,6 +940,18 @@ class AgentSession:
 
         logger.info(f"[Session:{session_id}] Inicializada.")
 
+    def _create_history_manager(self, workspace_dir: str):
+        """Crea el HistoryManager de la sesión reutilizando el tokenizer compartido."""
+        from kogniterm.core.history_manager import HistoryManager
+        history_file_path = os.path.join(workspace_dir, ".kogniterm", "history.json")
+        return HistoryManager(
+            history_file_path=history_file_path,
+            max_history_messages=self.llm_service.max_history_messages,
+            max_history_chars=self.llm_service.max_history_chars,
+            auto_save_interval=self.llm_service.auto_save_interval,
+            tokenizer=self.shared.tokenizer,
+        )
+
     def update_workspace_dir(self, workspace_dir: str) -> None:
         """Actualiza dinámicamente el workspace_dir para esta sesión."""
         if not workspace_dir:
@@ -824,27 +969,9 @@ class AgentSession:
             from kogniterm.core.thread_manager import ThreadManager
             self.thread_manager = ThreadManager(workspace_dir=workspace_dir)
 
-        # Actualizar vector_db_manager para la sesión
-        from kogniterm.core.context.vector_db_manager import VectorDBManager
-        try:
-            self.vector_db_manager = VectorDBManager(project_path=workspace_dir)
-        except Exception:
-            self.vector_db_manager = None
-
-        # Actualizar history_manager para la sesión
-        from kogniterm.core.history_manager import HistoryManager
-        history_file_path = os.path.join(workspace_dir, ".kogniterm", "history.json")
-        self.history_manager = HistoryManager(
-            history_file_path=history_file_path,
-            max_history_messages=self.llm_service.max_history_messages,
-            max_history_chars=self.llm_service.max_history_chars,
-            tokenizer=self.llm_service.tokenizer,
-            auto_save_interval=self.llm_service.auto_save_interval
-        )
-
-        # Actualizar workspace_context para la sesión
-        from kogniterm.core.context.workspace_context import WorkspaceContext
-        self.workspace_context = WorkspaceContext(root_dir=workspace_dir)
+        self.vector_db_manager = self.shared.vector_db_for(workspace_dir)
+        self.workspace_context = self.shared.workspace_context_for(workspace_dir)
+        self.history_manager = self._create_history_manager(workspace_dir)
 
         # Actualizar command_executor
         if hasattr(self, "command_executor") and self.command_executor:
@@ -868,13 +995,13 @@ class AgentSession:
         if hasattr(self, "command_executor") and self.command_executor:
             self.command_executor.write_input(text)
 
-    async def send(self, message: str, executor, images: Optional[List[str]] = None) -> None:
+    async def send(self, message: str, images: Optional[List[str]] = None) -> None:
         """
-        Envía un mensaje al agente y lo ejecuta en un hilo worker.
+        Envía un mensaje al agente y ejecuta el turno como corrutina en el event loop.
         Los eventos se emiten en tiempo real a `self.ui._async_queue`.
         """
         async with self._agent_lock:
-            self.last_activity = datetime.utcnow()
+            self.touch()
             if self.is_running:
                 self._pending_messages.append(message)
                 self.interrupt()
@@ -896,8 +1023,8 @@ class AgentSession:
                 processed = True
             elif msg_lower in ("%index", "/index", "%init", "/init"):
                 self.ui.print_message("Iniciando re-indexación del espacio de trabajo...", style="cyan")
-                from kogniterm.server.app import run_indexing_task
-                asyncio.create_task(run_indexing_task(self.session_id))
+                from kogniterm.server.app import start_indexing
+                start_indexing(self.session_id, full=True)
                 processed = True
             elif msg_lower in ("%undo", "/undo"):
                 if len(self.agent_state.messages) >= 2:
@@ -915,9 +1042,7 @@ class AgentSession:
                 if len(self.agent_state.messages) > 2:
                     self.ui.print_message("Comprimiendo historial de conversación...", style="cyan")
                     try:
-                        loop = asyncio.get_event_loop()
-                        summary = await loop.run_in_executor(
-                            executor,
+                        summary = await asyncio.to_thread(
                             self.llm_service.compress_history,
                             self.agent_state.messages
                         )
@@ -946,6 +1071,7 @@ class AgentSession:
                     "• `/plan` : Estado del modo planificación.\n"
                     "• `/init` o `/index` : Re-indexar archivos del workspace.\n"
                     "• `/session` o `/resume` : Gestionar hilos y sesiones guardadas.\n"
+                    "• `/trace [n]` : Desglose de latencia (cascada) de los últimos turnos.\n"
                     "• `/theme` : Tema visual.\n"
                     "• `/help` : Mostrar este menú de ayuda."
                 )
@@ -982,6 +1108,9 @@ class AgentSession:
             elif msg_lower in ("%plan", "/plan"):
                 self.ui.print_message("📋 **Modo Planificación:** Activo por defecto en KogniTerm Agent. Los cambios complejos generarán un `implementation_plan.md` antes de ejecutarse.", style="cyan")
                 processed = True
+            elif msg_lower.startswith(("/trace", "%trace")):
+                self.ui.print_message(self._trace_report(message), style="cyan")
+                processed = True
             elif msg_lower.startswith(("/session", "%session")):
                 if self.thread_manager:
                     threads = self.thread_manager.list_threads()
@@ -1069,8 +1198,9 @@ class AgentSession:
 
             self.agent_state.add_message(human_msg)
             if self.thread_manager:
-                self.thread_manager.save_thread_messages(
-                    self.session_id, self.agent_state.messages
+                await asyncio.to_thread(
+                    self.thread_manager.save_thread_messages,
+                    self.session_id, self.agent_state.messages,
                 )
 
             # Nombrado inmediato del hilo si aún no tiene título significativo
@@ -1099,13 +1229,13 @@ class AgentSession:
                         f"[Session:{self.session_id}] No se pudo aplicar nombrado inmediato: {exc}"
                     )
 
-            loop = asyncio.get_event_loop()
             try:
-                await loop.run_in_executor(executor, self._run_agent_loop, message)
+                await self._run_agent_loop(message)
                 # Guardar después de cada interacción exitosa
                 if self.thread_manager:
-                    self.thread_manager.save_thread_messages(
-                        self.session_id, self.agent_state.messages
+                    await asyncio.to_thread(
+                        self.thread_manager.save_thread_messages,
+                        self.session_id, self.agent_state.messages,
                     )
 
                     # Autónombrado de hilo
@@ -1119,32 +1249,42 @@ class AgentSession:
                 self.ui._push("error", {"message": str(exc)})
             finally:
                 self.is_running = False
-
-    def _run_agent_loop(self, user_input: Optional[str]) -> None:
+                self.touch()
+
+    def _trace_report(self, message: str) -> str:
+        """Cascada de spans de los últimos `n` turnos de esta sesión (`/trace [n]`)."""
+        parts = message.split()
+        count = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 1
+        traces = get_tracer().last_traces(count, session_id=self.session_id)
+        if not traces:
+            return "No hay trazas registradas en esta sesión todavía."
+        blocks = [f"```\n{render_waterfall(spans)}\n```" for spans in traces]
+        return "⏱️ **Desglose de latencia del turno:**\n\n" + "\n\n".join(blocks)
+
+    async def _run_agent_loop(self, user_input: Optional[str]) -> None:
         """
-        Ejecuta el bucle de interacción del agente de forma síncrona en el hilo worker,
+        Ejecuta el bucle de interacción del agente en el event loop del servidor,
         procesando confirmaciones de comandos y de skills de la misma manera que la TUI local.
+
+        Las aprobaciones son futuros esperados con `await` (no hilos aparcados), así
+        que el número de turnos concurrentes no está acotado por el pool de workers.
         """
         with session_context(
             cwd=self.workspace_dir,
             llm_service=self.llm_service,
             history_manager=self.history_manager,
             workspace_context=self.workspace_context,
-            vector_db_manager=self.vector_db_manager
-        ):
-            old_cwd = os.getcwd()
+            vector_db_manager=self.vector_db_manager,
+            terminal_ui=self.ui,
+            telemetry_tracker=self.telemetry_tracker,
+            session_id=self.session_id,
+        ), get_tracer().span("session.turn", session_id=self.session_id):
             try:
-                # Cambiar al workspace_dir de la sesión
-                if hasattr(self, "workspace_dir") and self.workspace_dir and os.path.exists(self.workspace_dir):
-                    try:
-                        os.chdir(self.workspace_dir)
-                    except Exception as e:
-                        logger.error(f"[Session:{self.session_id}] Error al cambiar de directorio a {self.workspace_dir}: {e}")
-
                 # Actualizar dinámicamente el workspace en el llm_service de la sesión
                 if self.llm_service and hasattr(self.llm_service, "update_workspace"):
                     try:
-                        self.llm_service.update_workspace(self.workspace_dir)
+                        # Reindexa/relee el workspace: bloqueante, fuera del event loop
+                        await asyncio.to_thread(self.llm_service.update_workspace, self.workspace_dir)
                     except Exception as e:
                         logger.error(f"[Session:{self.session_id}] Error al actualizar el workspace en el LLMService: {e}")
 
@@ -1161,7 +1301,7 @@ class AgentSession:
                     is_first_iteration = False
 
                     # 1. Invocar al agente
-                    final_state = self.manager.invoke_agent(user_input)
+                    final_state = await self.manager.ainvoke_agent(user_input)
 
                     self.agent_state.messages = final_state.get(
                         "messages", self.agent_state.messages
@@ -1184,12 +1324,12 @@ class AgentSession:
                         command = self.agent_state.command_to_confirm
 
                         if command and self.command_approval_handler:
-                            approval_result = self.command_approval_handler.handle_command_approval(
+                            approval_result = await self.command_approval_handler.ahandle_command_approval(
                                 command_to_execute=command
                             )
                             approved = approval_result.get("approved", False)
                         else:
-                            approved = self.ui.ask_approval_sync(
+                            approved = await self.ui.ask_approval_async(
                                 message=f"¿Ejecutar comando: {command}?",
                                 title="Confirmación de Comando",
                                 diff_content=command,
@@ -1228,7 +1368,7 @@ class AgentSession:
                             diff_content = diff_info
 
                         if self.command_approval_handler:
-                            approval_result = self.command_approval_handler.handle_command_approval(
+                            approval_result = await self.command_approval_handler.ahandle_command_approval(
                                 command_to_execute="",  # No es un comando bash
                                 raw_tool_output=diff_info
                                 if isinstance(diff_info, dict)
@@ -1243,7 +1383,7 @@ class AgentSession:
                             )
                             approved = approval_result.get("approved", False)
                         else:
-                            approved = self.ui.ask_approval_sync(
+                            approved = await self.ui.ask_approval_async(
                                 message=message,
                                 title=f"Confirmación: {tool_name}",
                                 diff_content=diff_content,
@@ -1267,11 +1407,6 @@ class AgentSession:
                     exc_info=True,
                 )
                 raise e
-            finally:
-                try:
-                    os.chdir(old_cwd)
-                except Exception:
-                    pass
 
     @property
     def message_count(self) -> int:
@@ -1288,6 +1423,54 @@ class AgentSession:
             "is_running": self.is_running,
         }
 
+    def touch(self) -> None:
+        """Marca actividad reciente (mensajes, conexiones) para la política de desalojo."""
+        self.last_activity = datetime.utcnow()
+
+    def idle_seconds(self, now: Optional[datetime] = None) -> float:
+        return ((now or datetime.utcnow()) - self.last_activity).total_seconds()
+
+    def can_hibernate(self) -> bool:
+        """Una sesión solo se hiberna si no hay trabajo ni clientes en curso."""
+        if self.is_running or self._pending_messages:
+            return False
+        if self.ui.has_pending_requests() or self.ui.has_consumers():
+            return False
+        executor = getattr(self, "command_executor", None)
+        bg_manager = getattr(executor, "background_task_manager", None)
+        if bg_manager:
+            try:
+                if any(t.get("status") == "running" for t in bg_manager.list_tasks()):
+                    return False
+            except Exception:
+                pass
+        return True
+
+    def close(self) -> None:
+        """Persiste el historial y libera los recursos propios de la sesión."""
+        if self.thread_manager:
+            try:
+                self.thread_manager.save_thread_messages(
+                    self.session_id, self.agent_state.messages
+                )
+            except Exception as exc:
+                logger.warning(f"[Session:{self.session_id}] No se pudo guardar el hilo al cerrar: {exc}")
+        try:
+            if self.history_manager:
+                self.history_manager.stop_auto_save()
+        except Exception:
+            pass
+        try:
+            if getattr(self, "command_executor", None):
+                self.command_executor.close()
+        except Exception:
+            pass
+        try:
+            if getattr(self, "telemetry_tracker", None):
+                self.telemetry_tracker.close()
+        except Exception:
+            pass
+
     async def _try_generate_title(self):
         """Intenta generar un título en background y notifica al cliente si se generó."""
         if self.thread_manager and self.llm_service:
@@ -1307,22 +1490,37 @@ class SessionPool:
     """
     Registro global de todas las sesiones activas del servidor.
     Thread-safe para creación/obtención de sesiones.
+
+    Las sesiones inactivas se desalojan según una política LRU + TTL: su
+    historial ya vive en el almacén de hilos (ThreadManager), así que al
+    desalojarlas solo se conserva un registro ligero ("hibernada") y se
+    rehidratan de forma transparente en el siguiente `get_or_create`.
+
+    Variables de entorno:
+      KOGNITERM_SESSION_IDLE_TTL_S     Inactividad máxima antes de hibernar (default 3600, 0 = sin TTL)
+      KOGNITERM_MAX_LIVE_SESSIONS      Máximo de sesiones en memoria (default 64, 0 = sin límite)
+      KOGNITERM_MAX_HIBERNATED_SESSIONS  Registros de sesiones hibernadas que se conservan (default 4096, 0 = sin límite)
+      KOGNITERM_SESSION_SWEEP_S        Intervalo del barrido de desalojo (default 60)
     """
 
     def __init__(self):
-        self._sessions: Dict[str, AgentSession] = {}
+        self._sessions: "OrderedDict[str, AgentSession]" = OrderedDict()
+        self._hibernated: "OrderedDict[str, dict]" = OrderedDict()
         self._lock = threading.Lock()
         self._llm_service: Optional[LLMService] = None
         self._loop: Optional[asyncio.AbstractEventLoop] = None
         self._thread_manager: Optional[ThreadManager] = None
-        # Executor para correr el agente (hilo dedicado por tarea)
-        from concurrent.futures import ThreadPoolExecutor
-
-        self._executor = ThreadPoolExecutor(
-            max_workers=20, thread_name_prefix="kt-agent"
-        )
+        self._shared: Optional[SharedSessionResources] = None
         self._ready_event: Optional[asyncio.Event] = None
 
+        self.idle_ttl_seconds = float(os.getenv("KOGNITERM_SESSION_IDLE_TTL_S", "3600"))
+        self.max_live_sessions = int(os.getenv("KOGNITERM_MAX_LIVE_SESSIONS", "64"))
+        self.max_hibernated_sessions = int(os.getenv("KOGNITERM_MAX_HIBERNATED_SESSIONS", "4096"))
+        self.sweep_interval_seconds = float(os.getenv("KOGNITERM_SESSION_SWEEP_S", "60"))
+        self._eviction_task: Optional[asyncio.Task] = None
+        self._evictions = 0
+        self._rehydrations = 0
+
     @property
     def ready_event(self) -> asyncio.Event:
         if self._ready_event is None:
@@ -1341,6 +1539,7 @@ class SessionPool:
         """Debe llamarse en el lifespan de la app, una sola vez."""
         self._llm_service = llm_service
         self._loop = loop
+        self._shared = SharedSessionResources(llm_service)
         self._thread_manager = ThreadManager(workspace_dir=os.getcwd())
         logger.info("SessionPool inicializado con LLMService y ThreadManager.")
 
@@ -1351,31 +1550,58 @@ class SessionPool:
         loop.call_soon_threadsafe(set_event)
 
     def get_or_create(self, session_id: str, workspace_dir: Optional[str] = None) -> AgentSession:
-        """Obtiene una sesión existente o crea una nueva (thread-safe)."""
+        """Obtiene una sesión existente, rehidrata una hibernada o crea una nueva (thread-safe)."""
         with self._lock:
             if session_id not in self._sessions:
                 if not self._llm_service or not self._loop:
                     raise RuntimeError(
                         "SessionPool no inicializado. Llama a initialize() primero."
                     )
+                hibernated = self._hibernated.pop(session_id, None)
+                if hibernated:
+                    workspace_dir = workspace_dir or hibernated.get("workspace_dir")
+                    self._rehydrations += 1
+                    logger.info(f"Rehidratando sesión hibernada {session_id}.")
                 self._sessions[session_id] = AgentSession(
                     session_id=session_id,
                     llm_service=self._llm_service,
                     loop=self._loop,
                     thread_manager=self._thread_manager,
                     workspace_dir=workspace_dir,
+                    shared=self._shared,
                 )
             else:
                 session = self._sessions[session_id]
                 if workspace_dir and session.workspace_dir != workspace_dir:
                     session.update_workspace_dir(workspace_dir)
-            return self._sessions[session_id]
+            self._sessions.move_to_end(session_id)
+            session = self._sessions[session_id]
+            session.touch()
+            return session
 
     def get(self, session_id: str) -> Optional[AgentSession]:
+        """Sesión viva (sin rehidratar): None si no existe o está hibernada."""
         return self._sessions.get(session_id)
 
+    def workspace_dir_of(self, session_id: str) -> Optional[str]:
+        """Workspace de una sesión viva o hibernada, sin rehidratarla."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                return session.workspace_dir
+            hibernated = self._hibernated.get(session_id)
+            return hibernated.get("workspace_dir") if hibernated else None
+
+    def exists(self, session_id: str) -> bool:
+        """True si la sesión está viva o hibernada."""
+        return session_id in self._sessions or session_id in self._hibernated
+
+    def is_hibernated(self, session_id: str) -> bool:
+        return session_id in self._hibernated
+
     def delete(self, session_id: str) -> bool:
         with self._lock:
+            self._hibernated.pop(session_id, None)
             if session_id in self._sessions:
                 del self._sessions[session_id]
                 logger.info(f"Sesión {session_id} eliminada.")
@@ -1389,6 +1615,107 @@ class SessionPool:
     def new_session_id(self) -> str:
         return str(uuid.uuid4())
 
+    # ── Desalojo / hibernación ─────────────────────────────────────────────────
+
+    def hibernate(self, session_id: str) -> bool:
+        """Persiste y descarga de memoria una sesión inactiva."""
+        session = self._detach(session_id)
+        if session is None:
+            return False
+        self._close_hibernated(session)
+        return True
+
+    def _detach(self, session_id: str) -> Optional["AgentSession"]:
+        """Saca la sesión del pool y la registra como hibernada; cerrarla queda para quien llama."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or not session.can_hibernate():
+                return None
+            del self._sessions[session_id]
+            self._hibernated[session_id] = {
+                "session_id": session_id,
+                "workspace_dir": session.workspace_dir,
+                "message_count": session.message_count,
+                "last_activity": session.last_activity.isoformat(),
+                "hibernated_at": datetime.utcnow().isoformat(),
+            }
+            # El historial sigue en el almacén de hilos: olvidar el registro más
+            # antiguo solo pierde su workspace, no la conversación.
+            while 0 < self.max_hibernated_sessions < len(self._hibernated):
+                self._hibernated.popitem(last=False)
+            self._evictions += 1
+        return session
+
+    @staticmethod
+    def _close_hibernated(session: "AgentSession") -> None:
+        session.close()
+        logger.info(f"Sesión {session.session_id} hibernada en el almacén de hilos.")
+
+    def evict_idle(self, now: Optional[datetime] = None) -> list:
+        """Aplica la política LRU + TTL y devuelve los IDs hibernados."""
+        detached = self._detach_idle(now)
+        for session in detached:
+            self._close_hibernated(session)
+        return [session.session_id for session in detached]
+
+    def _detach_idle(self, now: Optional[datetime] = None) -> list:
+        """Sesiones que la política LRU + TTL saca del pool (aún sin cerrar)."""
+        now = now or datetime.utcnow()
+        with self._lock:
+            # Orden LRU: la menos usada primero
+            candidates = list(self._sessions.values())
+        evicted = []
+        overflow = (
+            len(candidates) - self.max_live_sessions if self.max_live_sessions > 0 else 0
+        )
+        for session in candidates:
+            expired = (
+                self.idle_ttl_seconds > 0
+                and session.idle_seconds(now) >= self.idle_ttl_seconds
+            )
+            if not expired and overflow <= 0:
+                continue
+            if self._detach(session.session_id) is not None:
+                evicted.append(session)
+                overflow -= 1
+        return evicted
+
+    async def _eviction_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval_seconds)
+            try:
+                evicted = self._detach_idle()
+                # Cerrar guarda el historial y libera recursos (bloqueante): fuera del
+                # event loop, para no frenar el stream del resto de sesiones
+                for session in evicted:
+                    await asyncio.to_thread(self._close_hibernated, session)
+                if evicted:
+                    logger.info(f"SessionPool: {len(evicted)} sesiones hibernadas por inactividad.")
+            except Exception as exc:
+                logger.error(f"SessionPool: error en el barrido de desalojo: {exc}")
+
+    def start_eviction(self) -> None:
+        """Arranca el barrido periódico de sesiones inactivas (llamar desde el lifespan)."""
+        if self._eviction_task is None or self._eviction_task.done():
+            self._eviction_task = asyncio.create_task(self._eviction_loop())
+
+    def stop_eviction(self) -> None:
+        if self._eviction_task is not None:
+            self._eviction_task.cancel()
+            self._eviction_task = None
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "live_sessions": len(self._sessions),
+                "hibernated_sessions": len(self._hibernated),
+                "running_sessions": sum(1 for s in self._sessions.values() if s.is_running),
+                "evictions": self._evictions,
+                "rehydrations": self._rehydrations,
+                "idle_ttl_seconds": self.idle_ttl_seconds,
+                "max_live_sessions": self.max_live_sessions,
+            }
+
 
 # Instancia global (singleton)
 pool = SessionPool()
@@ -277,8 +277,7 @@ def call_agent_skill(
 
     # --- Resolver la configuración del agente declarativamente ---
     from kogniterm.core.agents.config_manager import AgentConfigManager
-    config_mgr = AgentConfigManager(workspace_dir=getattr(llm_service, "current_workspace_dir", None))
-    config_mgr.discover_configs()
+    config_mgr = AgentConfigManager.shared(getattr(llm_service, "current_workspace_dir", None))
     agent_config = config_mgr.get_agent_config(agent_name)
     
     role = AgentRole.LEAF
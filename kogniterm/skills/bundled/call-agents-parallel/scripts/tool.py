@@ -17,6 +17,7 @@ import uuid
 from typing import Any, List, Dict, Optional
 
 from kogniterm.core.delegation.agent_pool import AgentPool
+from kogniterm.core.delegation.scheduler import AgentPreempted
 
 from rich.console import Console
 
@@ -313,6 +314,38 @@ def _build_agent_graph(
     return create_dynamic_agent(llm_service, prompt, agent_ui, interrupt_queue)
 
 
+def _get_agent_graph(
+    agent_type: str,
+    system_prompt: Optional[str],
+    llm_service: Any,
+    role: Any,
+    allowed_tools: Optional[List[str]],
+):
+    """
+    Grafo compilado compartido entre sub-agentes idénticos. Se compila contra
+    proxies de UI/cola que cada ejecución fija con `bind_agent_runtime`.
+    """
+    from kogniterm.core.agents.graph_cache import (
+        BOUND_INTERRUPT_QUEUE,
+        BOUND_UI,
+        get_agent_graph_cache,
+    )
+
+    tool_names = frozenset(getattr(llm_service, "tool_map", None) or ())
+    key = (
+        agent_type,
+        system_prompt,
+        getattr(role, "value", role),
+        frozenset(allowed_tools) if allowed_tools is not None else None,
+        tool_names,
+    )
+    return get_agent_graph_cache().get_or_build(
+        key,
+        llm_service,
+        lambda: _build_agent_graph(agent_type, system_prompt, llm_service, BOUND_UI, BOUND_INTERRUPT_QUEUE),
+    )
+
+
 # ─── Función principal ────────────────────────────────────────────────────────
 
 
@@ -332,6 +365,8 @@ def call_agents_parallel(
         - type  (str, opcional): "code_agent" | "researcher_agent" | cualquier rol dinámico.
                                   Por defecto "researcher_agent".
         - system_prompt (str, opcional): Prompt del sistema para agentes dinámicos.
+        - priority (int, opcional): Menor valor = sus llamadas LLM se atienden antes. Por defecto 0.
+        - deadline (float, opcional): Segundos máximos; al superarlos el agente se detiene.
 
     Args:
         agents: Lista de especificaciones de agentes.
@@ -448,8 +483,7 @@ def call_agents_parallel(
 
         # --- Resolver la configuración del agente declarativamente ---
         from kogniterm.core.agents.config_manager import AgentConfigManager
-        config_mgr = AgentConfigManager(workspace_dir=getattr(llm_service, "current_workspace_dir", None))
-        config_mgr.discover_configs()
+        config_mgr = AgentConfigManager.shared(getattr(llm_service, "current_workspace_dir", None))
         agent_config = config_mgr.get_agent_config(agent_type) or config_mgr.get_agent_config(name)
         
         role = AgentRole.LEAF
@@ -522,8 +556,10 @@ def call_agents_parallel(
                     "🏁 **IMPORTANTE**: Eres un subagente autónomo. No te detengas al actualizar el plan de tareas; ejecuta tus herramientas hasta completar el análisis y entrega SIEMPRE tu informe técnico completo dentro del parámetro `result` de la herramienta `complete_task`."
                 )
 
-            agent_graph = _build_agent_graph(
-                agent_type, system_prompt, llm_service, agent_ui, interrupt_queue
+            from kogniterm.core.agents.graph_cache import bind_agent_runtime
+
+            agent_graph = _get_agent_graph(
+                agent_type, system_prompt, llm_service, role, allowed_tools
             )
             initial_state = AgentState(
                 messages=[_HumanMessage(content=task_message)],
@@ -538,10 +574,11 @@ def call_agents_parallel(
                 llm_service.current_delegation_context = child_ctx
 
             try:
-                final_state = await agent_graph.ainvoke(
-                    initial_state,
-                    config={"recursion_limit": AGENT_RECURSION_LIMIT},
-                )
+                with bind_agent_runtime(agent_ui, interrupt_queue):
+                    final_state = await agent_graph.ainvoke(
+                        initial_state,
+                        config={"recursion_limit": AGENT_RECURSION_LIMIT},
+                    )
             except AgentTaskCompleted as task_exc:
                 result = task_exc.result
                 delegation_result = result
@@ -558,6 +595,17 @@ def call_agents_parallel(
                     except Exception as ex:
                         pass
                 return result
+            except AgentPreempted as preempt_exc:
+                delegation_status = "preempted"
+                result = f"Agente {name} detenido por el planificador: {preempt_exc.reason}"
+                delegation_result = result
+                logger.info("run_agent[%s]: %s", name, result)
+                if agent_ui and hasattr(agent_ui, "update_agent_tab_title"):
+                    try:
+                        agent_ui.update_agent_tab_title(panel_id, f"{name} ⏹")
+                    except Exception:
+                        pass
+                return result
             finally:
                 if child_ctx:
                     llm_service.current_delegation_context = old_ctx
@@ -617,6 +665,10 @@ def call_agents_parallel(
                     pass
             return f"Error en {name}: {e}"
         finally:
+            if llm_service is not None:
+                from kogniterm.core.shared_artifact_cache import SharedArtifactCache
+
+                SharedArtifactCache.for_service(llm_service).forget_agent(child_id)
             if llm_service and hasattr(llm_service, "telemetry_tracker") and llm_service.telemetry_tracker:
                 duration = time.time() - t0
                 summary = delegation_result[:200] + "..." if len(delegation_result) > 200 else delegation_result
@@ -647,7 +699,10 @@ def call_agents_parallel(
         return name, res
 
     async def _run_all_parallel():
-        pool = AgentPool(max_concurrent=len(authorized))
+        pool = AgentPool(
+            max_concurrent=len(authorized),
+            limits=getattr(getattr(llm_service, "delegation_manager", None), "limits", None),
+        )
 
         # Wrap cada agente como un grafo compatible con AgentPool
         class _AgentGraphWrapper:
@@ -672,6 +727,8 @@ def call_agents_parallel(
                 "graph": _AgentGraphWrapper(spec, agent_ui, pid),
                 "initial_state": {},
                 "recursion_limit": 1000,
+                "priority": int(spec.get("priority", 0) or 0),
+                "deadline": spec.get("deadline"),
             }
             for i, (spec, agent_ui, pid) in enumerate(zip(authorized, agent_uis, panel_ids))
         ]
@@ -904,6 +961,14 @@ tool_schema = {
                             "type": "string",
                             "description": "Opcional. Prompt de sistema personalizado para agentes con type dinámico.",
                         },
+                        "priority": {
+                            "type": "integer",
+                            "description": "Opcional. Prioridad de sus llamadas al modelo (menor = antes). Por defecto 0.",
+                        },
+                        "deadline": {
+                            "type": "number",
+                            "description": "Opcional. Segundos máximos de ejecución; al superarlos el agente se detiene.",
+                        },
                     },
                 },
             }
@@ -241,7 +241,7 @@ def _analyze_lint(path: str, recursive: bool) -> str:
             for f in py_files:
                 try:
                     cmd = ['pylint', f, '--output-format=text', '--score=n', '--reports=n']
-                    result = subprocess.run(cmd, capture_output=True, text=True)
+                    result = subprocess.run(cmd, capture_output=True, text=True, cwd=os.getcwd())
                     output = result.stdout.strip()
                     if output:
                         results.append(f"Archivo: {f}\n{output}\n")
@@ -258,7 +258,7 @@ def _analyze_lint(path: str, recursive: bool) -> str:
             for f in js_files:
                 try:
                     cmd = ['eslint', f, '--format', 'stylish']
-                    result = subprocess.run(cmd, capture_output=True, text=True)
+                    result = subprocess.run(cmd, capture_output=True, text=True, cwd=os.getcwd())
                     output = result.stdout.strip()
                     if output:
                         results.append(f"Archivo: {f}\n{output}\n")
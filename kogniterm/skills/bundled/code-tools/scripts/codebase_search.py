@@ -40,6 +40,7 @@ def codebase_search(
     try:
         from kogniterm.core.embeddings_service import EmbeddingsService
         from kogniterm.core.context.vector_db_manager import VectorDBManager
+        from kogniterm.core.context.indexing_jobs import interactive_priority
     except ImportError as e:
         yield f"Error: No se pudieron importar los servicios necesarios: {str(e)}"
         return
@@ -60,34 +61,44 @@ def codebase_search(
         yield "Error: VectorDBManager no está inicializado. Por favor indexe el proyecto primero."
         return
 
-    # 1. Generar embedding de la consulta
-    try:
-        logger.info(f"CodebaseSearch: Generando embedding para la consulta: '{query}'")
-        query_embeddings = embeddings_service.generate_embeddings([query])
-    except Exception as e:
-        logger.error(f"CodebaseSearch: Error generando embedding para la consulta: {e}")
-        yield f"Error generando embedding para query: {str(e)}"
-        return
-
-    if not query_embeddings:
-        logger.warning("CodebaseSearch: No se pudo generar embedding para la consulta.")
-        yield "Error: No se pudo generar embedding para la consulta."
+    # La búsqueda interactiva tiene prioridad: los trabajos de indexación en
+    # segundo plano pausan entre lotes mientras dure el embedding + consulta.
+    # Dentro del bloque no se cede (yield): si el generador se abandonara a
+    # medias, el contador de prioridad quedaría tomado.
+    error = None
+    search_results = None
+    with interactive_priority():
+        # 1. Generar embedding de la consulta
+        try:
+            logger.info(f"CodebaseSearch: Generando embedding para la consulta: '{query}'")
+            query_embeddings = embeddings_service.generate_embeddings([query])
+        except Exception as e:
+            logger.error(f"CodebaseSearch: Error generando embedding para la consulta: {e}")
+            query_embeddings = None
+            error = f"Error generando embedding para query: {str(e)}"
+
+        if error is None and not query_embeddings:
+            logger.warning("CodebaseSearch: No se pudo generar embedding para la consulta.")
+            error = "Error: No se pudo generar embedding para la consulta."
+
+        # 2. Buscar en la base de datos vectorial
+        if error is None:
+            try:
+                logger.info(f"CodebaseSearch: Realizando búsqueda en la base de datos vectorial con k={k}, file_path_filter={file_path_filter}, language_filter={language_filter}")
+                search_results = vector_db_manager.search(
+                    query_embeddings[0], 
+                    k=k,
+                    file_path_filter=file_path_filter,
+                    language_filter=language_filter
+                )
+            except Exception as e:
+                logger.error(f"CodebaseSearch: Error buscando en la base de datos vectorial: {e}")
+                error = f"Error searching vector database: {str(e)}"
+
+    if error is not None:
+        yield error
         return
 
-    # 2. Buscar en la base de datos vectorial
-    try:
-        logger.info(f"CodebaseSearch: Realizando búsqueda en la base de datos vectorial con k={k}, file_path_filter={file_path_filter}, language_filter={language_filter}")
-        search_results = vector_db_manager.search(
-            query_embeddings[0], 
-            k=k,
-            file_path_filter=file_path_filter,
-            language_filter=language_filter
-        )
-    except Exception as e:
-         logger.error(f"CodebaseSearch: Error buscando en la base de datos vectorial: {e}")
-         yield f"Error searching vector database: {str(e)}"
-         return
-
     # 3. Formatear resultados
     if not search_results:
         yield "No se encontraron snippets de código relevantes para la consulta."
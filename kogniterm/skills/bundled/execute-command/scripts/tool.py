@@ -6,11 +6,11 @@ Provee funcionalidad para ejecutar comandos bash y obtener su salida.
 """
 
 import os
-import re
+import queue
 import shlex
 import subprocess
 import selectors
-import tempfile
+import threading
 import time
 from typing import Optional, Generator, Any
 
@@ -19,129 +19,64 @@ name = "execute_command"
 description = "Ejecuta un comando bash y devuelve su salida en tiempo real. Para comandos de larga duración (>30s), servidores/demonios (ej. 'npm run dev', 'python app.py') o descargas pesadas, usa 'is_background: true' para ejecutarlos asíncronamente en segundo plano sin bloquear."
 
 
-def _transform_python3_dash_c(command: str) -> tuple[str, bool, Optional[str]]:
+def _execute_pooled(command: str, timeout: int, key: Optional[str]) -> Generator[str, None, None]:
     """
-    Transforma comandos python -c "..." o python -c '...' (con cualquier ruta de python,
-    comillas simples, dobles o triples) a ejecución desde un archivo temporal.
-    
-    Procesamiento determinista en tiempo lineal O(N) sin retroceso catastrófico de regex.
-    
-    Returns:
-        (comando_transformado, fue_transformado, ruta_temp)
+    Ejecuta el comando en un shell persistente prestado por el pool: sin
+    arranque de shell por comando, y agentes distintos en paralelo.
     """
-    cmd_stripped = command.strip()
-    
-    # Localizar la invocación de python seguida de flags opcionales y -c
-    match_py = re.search(r'(?:^|(?<=[\s&|;]))([^\s&|;]*python[0-9.]*)\s+((?:-[a-zA-Z0-9]+\s+)*)-c(?=\s|$)', cmd_stripped)
-    if not match_py:
-        return command, False, None
-    
-    py_bin = match_py.group(1)
-    py_flags = match_py.group(2) or ""
-    
-    start_pos = match_py.start()
-    end_c_pos = match_py.end()
-    
-    rest = cmd_stripped[end_c_pos:].lstrip()
-    if not rest:
-        return command, False, None
-    
-    code = ""
-    quote_str = None
-    if rest.startswith('"""'):
-        quote_str = '"""'
-    elif rest.startswith("'''"):
-        quote_str = "'''"
-    elif rest.startswith('"'):
-        quote_str = '"'
-    elif rest.startswith("'"):
-        quote_str = "'"
-    
-    if quote_str:
-        q_len = len(quote_str)
-        content_start = q_len
-        i = content_start
-        escaped = False
-        found_end = False
-        content_end = i
-        
-        while i < len(rest):
-            if escaped:
-                escaped = False
-                i += 1
-                continue
-            if rest[i] == '\\':
-                escaped = True
-                i += 1
-                continue
-            if rest.startswith(quote_str, i):
-                found_end = True
-                content_end = i
-                break
-            i += 1
-            
-        if not found_end:
-            return command, False, None
-            
-        code_raw = rest[content_start:content_end]
-        suffix = rest[content_end + q_len:]
-        
-        if quote_str in ('"', '"""'):
-            code = code_raw.replace('\\"', '"').replace('\\\\', '\\')
-        else:
-            code = code_raw.replace("\\'", "'").replace('\\\\', '\\')
-    else:
-        # Ejecución sin comillas
-        i = 0
-        escaped = False
-        while i < len(rest):
-            if escaped:
-                escaped = False
-                i += 1
-                continue
-            if rest[i] == '\\':
-                escaped = True
-                i += 1
-                continue
-            if rest[i] in ('&', '|', ';', '\n'):
-                break
-            i += 1
-        code = rest[:i].strip()
-        suffix = rest[i:]
-        if not code:
-            return command, False, None
+    from kogniterm.core.command_executor import INTERRUPTED_NOTICE
+    from kogniterm.core.shell_pool import get_shell_pool
 
-    # Crear archivo temporal
-    fd, temp_path = tempfile.mkstemp(suffix='.py', prefix='kogniterm_py_')
-    os.close(fd)
-    
-    # Escribir código al archivo
-    with open(temp_path, 'w', encoding='utf-8') as f:
-        f.write(code)
-        
-    prefix_before = cmd_stripped[:start_pos]
-    u_flag = "" if "-u" in py_flags.split() else "-u "
-    transformed = f"{prefix_before}{py_bin} {py_flags}{u_flag}{temp_path}{suffix}"
-    
-    return transformed, True, temp_path
+    target_cwd = os.getcwd()
+    interrupt_queue: queue.Queue = queue.Queue()
+    timed_out = threading.Event()
+
+    def _on_timeout():
+        timed_out.set()
+        interrupt_queue.put(True)
 
+    timer = threading.Timer(timeout, _on_timeout)
+    timer.daemon = True
+    with get_shell_pool().lease(key=key, cwd=target_cwd) as pooled_shell:
+        timer.start()
+        try:
+            for chunk in pooled_shell.execute(command, cwd=target_cwd, interrupt_queue=interrupt_queue):
+                if timed_out.is_set() and chunk == INTERRUPTED_NOTICE:
+                    continue
+                # Yield data y permitir recibir input vía .send()
+                input_data = yield chunk
+                if input_data:
+                    pooled_shell.write_input(input_data)
+            exit_code = pooled_shell.last_exit_code
+        finally:
+            timer.cancel()
+    if exit_code and not timed_out.is_set():
+        yield f"\n[KogniTerm] El comando terminó con código de salida {exit_code}\n"
+    if timed_out.is_set():
+        yield f"\nError: Timeout después de {timeout} segundos\n"
 
 
 def execute_command(
     command: str,
     timeout: int = 30,
     shell: bool = True,
-    is_background: bool = False
+    is_background: bool = False,
+    delegation_context: Optional[Any] = None,
 ) -> Generator[str, None, None]:
     """
     Ejecuta un comando en la terminal y produce su salida en tiempo real.
     Si is_background es True, la tarea se lanza en segundo plano y retorna de inmediato el ID.
 
+    Los comandos con shell se ejecutan en un shell persistente del pool
+    (`kogniterm.core.shell_pool`), prestado por agente: cada sub-agente tiene el
+    suyo y sus comandos corren en paralelo con los de los demás.
+
     Args:
         command: El comando a ejecutar
         timeout: Timeout en segundos (default: 30, max: 300)
         shell: Usar shell=True (default: True)
         is_background: Ejecutar asíncronamente en segundo plano (default: False)
+        delegation_context: Contexto del sub-agente (inyectado); su agent_id es la clave del shell
 
     Yields:
         str: Fragmentos de la salida del comando o la confirmación de inicio en segundo plano.
@@ -192,12 +127,11 @@ def execute_command(
             yield f"Error al cambiar de directorio: {e}\n"
             return
 
-    # Transformar python3 -c "..." a archivo temporal para evitar problemas con comillas en PTY
-    original_command = command
-    command, was_transformed, temp_path = _transform_python3_dash_c(command)
-    
-    if was_transformed:
-        yield f"[KogniTerm] Transformando comando python -c a archivo temporal: {temp_path}\n"
+    from kogniterm.core.config import settings
+    if shell and settings.shell_pool_size > 0:
+        agent_key = getattr(delegation_context, "agent_id", None)
+        yield from _execute_pooled(command, timeout, agent_key)
+        return
 
     # Ejecutar comando con PTY para permitir streaming, colores e interactividad real
     import pty
@@ -227,7 +161,9 @@ def execute_command(
             bufsize=1,
             universal_newlines=True,
             preexec_fn=os.setsid,  # Crear un nuevo grupo de procesos
-            cwd=target_cwd
+            cwd=target_cwd,
+            # Streaming de python sin reescribir `python -c` a un archivo temporal
+            env={**os.environ, "PYTHONUNBUFFERED": "1"},
         )
         
         # Cerrar el slave_fd en el proceso padre ya que lo usará el hijo
@@ -281,13 +217,7 @@ def execute_command(
             os.close(master_fd)
         except:
             pass
-        
-        # Limpiar archivo temporal si fue creado
-        if was_transformed and temp_path and os.path.exists(temp_path):
-            try:
-                os.unlink(temp_path)
-            except:
-                pass
+
         
     except Exception as e:
         yield f"Error al ejecutar comando con PTY: {str(e)}\n"
@@ -27,7 +27,8 @@ def _get_background_manager():
 def manage_background_task(
     action: str,
     task_id: Optional[str] = None,
-    tail_lines: int = 50
+    tail_lines: int = 50,
+    only_new: bool = False
 ) -> str:
     """
     Gestiona tareas en segundo plano.
@@ -36,6 +37,7 @@ def manage_background_task(
         action: Acción a realizar: 'list' (listar tareas), 'status' (consultar estado y logs), 'kill' (cancelar tarea).
         task_id: ID de la tarea (requerido para 'status' y 'kill').
         tail_lines: Número de últimas líneas a obtener en 'status' (default: 50).
+        only_new: En 'status', devolver solo la salida nueva desde la consulta anterior.
 
     Returns:
         str: Resultado de la operación en texto plano o JSON.
@@ -55,14 +57,16 @@ def manage_background_task(
     elif action == "status":
         if not task_id:
             return "❌ Error: 'task_id' es requerido para consultar el estado."
-        info = bg_manager.get_task_status(task_id)
+        info = bg_manager.get_task_status(task_id, tail_lines=tail_lines, only_new=only_new)
         if not info:
             return f"❌ Error: Tarea '{task_id}' no encontrada."
-        
+
         output_snippet = info.get("output", "").rstrip()
         if not output_snippet:
-            output_snippet = "(Sin salida registrada aún)"
-            
+            output_snippet = "(Sin salida nueva)" if only_new else "(Sin salida registrada aún)"
+        if info.get("lost_bytes"):
+            output_snippet = f"[... {info['lost_bytes']} bytes de salida descartados ...]\n{output_snippet}"
+
         res = [
             f"🔍 Estado de la tarea {info['task_id']}:",
             f" - Estado: {info['status'].upper()}",
@@ -70,7 +74,7 @@ def manage_background_task(
             f" - PID: {info['pid'] or 'N/A'}",
             f" - Código de salida: {info['exit_code'] if info['exit_code'] is not None else 'N/A'}",
             f" - Duración: {info['duration_seconds']}s",
-            "\n--- Última salida ---",
+            "\n--- Salida nueva ---" if only_new else "\n--- Última salida ---",
             output_snippet
         ]
         return "\n".join(res)
@@ -113,6 +117,11 @@ parameters_schema = {
             "type": "integer",
             "description": "Número de últimas líneas a mostrar al consultar el estado (default: 50).",
             "default": 50
+        },
+        "only_new": {
+            "type": "boolean",
+            "description": "En 'status', devolver solo la salida producida desde la consulta anterior (útil para seguir servidores de larga duración).",
+            "default": False
         }
     },
     "required": ["action"]
@@ -12,6 +12,8 @@ import logging
 import json
 from typing import Generator, Optional, Any
 
+from kogniterm.core.kernel_pool import close_kernel_pool, get_kernel_pool, register_kernel_factory
+
 logger = logging.getLogger(__name__)
 
 _jupyter_client_available = False
@@ -49,8 +51,39 @@ class KogniTermKernel:
             return False
         return True
 
-    def start_kernel(self) -> bool:
-        """Inicia el kernel de Jupyter."""
+    @property
+    def pid(self) -> Optional[int]:
+        """PID del proceso del kernel (para medir su memoria)."""
+        provisioner = getattr(self.km, "provisioner", None)
+        process = getattr(provisioner, "process", None) or getattr(self.km, "kernel", None)
+        return getattr(process, "pid", None)
+
+    @staticmethod
+    def _memory_limiter(memory_limit_mb: Optional[int]):
+        """
+        preexec_fn que limita el espacio de direcciones del proceso del kernel.
+        Solo se aplica si el pool lo pide (KOGNITERM_KERNEL_POOL_HARD_MEMORY_LIMIT).
+        """
+        if not memory_limit_mb:
+            return None
+        try:
+            import resource
+        except ImportError:
+            return None
+        # El espacio virtual siempre excede la memoria residente (hilos, mapeos):
+        # el límite duro es holgado y el pool recicla el kernel por memoria residente.
+        limit = memory_limit_mb * 2 * 1024 * 1024
+
+        def _apply_limit():
+            try:
+                resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+            except (ValueError, OSError):
+                pass
+
+        return _apply_limit
+
+    def start_kernel(self, memory_limit_mb: Optional[int] = None) -> bool:
+        """Inicia el kernel de Jupyter (con `memory_limit_mb`, limitando su memoria)."""
         self.last_error = None
         if not _jupyter_client_available:
             self.last_error = "jupyter_client no está disponible. Instálalo con 'pip install jupyter_client ipykernel'."
@@ -65,20 +98,25 @@ class KogniTermKernel:
             logger.error(self.last_error)
             return False
 
+        launch_kwargs = {}
+        limiter = self._memory_limiter(memory_limit_mb)
+        if limiter is not None:
+            launch_kwargs["preexec_fn"] = limiter
+
         try:
             # 1. Intentar lanzar usando el ejecutable Python actual (sys.executable)
             try:
                 self.km = KernelManager(kernel_cmd=[sys.executable, "-m", "ipykernel_launcher", "-f", "{connection_file}"])
-                self.km.start_kernel()
+                self.km.start_kernel(**launch_kwargs)
             except Exception as e:
                 logger.info(f"Arranque directo con sys.executable falló ({e}), intentando con kernel spec 'kogniterm_venv'...")
                 try:
                     self.km = KernelManager(kernel_name='kogniterm_venv')
-                    self.km.start_kernel()
+                    self.km.start_kernel(**launch_kwargs)
                 except Exception as e2:
                     logger.info(f"Kernel 'kogniterm_venv' no disponible ({e2}), usando kernel por defecto...")
                     self.km = KernelManager()
-                    self.km.start_kernel()
+                    self.km.start_kernel(**launch_kwargs)
                 
             self.kc = self.km.client()
             self.kc.start_channels()
@@ -205,6 +243,27 @@ class KogniTermKernel:
         
 
 
+    def interrupt(self, timeout: float = 5.0) -> bool:
+        """
+        Interrumpe la ejecución en curso y espera a que el kernel quede ocioso,
+        descartando la salida pendiente. Retorna False si no se pudo (hay que
+        reciclar el kernel para que la siguiente ejecución no herede su salida).
+        """
+        if not self.is_alive():
+            return False
+        try:
+            self.km.interrupt_kernel()
+        except Exception as e:
+            logger.warning(f"No se pudo interrumpir el kernel: {e}")
+            return False
+        if not self.execution_complete_event.wait(timeout):
+            return False
+        while True:
+            try:
+                self.output_queue.get_nowait()
+            except queue.Empty:
+                return True
+
     def stop_kernel(self):
         """Detiene el kernel de forma segura."""
         # 1. Avisar al hilo que debe detenerse
@@ -231,38 +290,24 @@ class KogniTermKernel:
             self.km = None
 
 
-# Instancia global del kernel
-_kernel_instance = None
+def _new_kernel(memory_limit_mb: Optional[int] = None) -> KogniTermKernel:
+    """Fábrica del pool de kernels: arranca un kernel listo o lanza RuntimeError."""
+    kernel = KogniTermKernel()
+    if not kernel.start_kernel(memory_limit_mb=memory_limit_mb):
+        raise RuntimeError(kernel.last_error or "El kernel no está iniciado o falló al arrancar.")
+    return kernel
 
 
-def _get_kernel_instance() -> Optional[KogniTermKernel]:
-    """Obtiene o crea la instancia del kernel, auto-recuperándose de fallos."""
-    global _kernel_instance
-    if _kernel_instance is not None:
-        if _kernel_instance.is_alive():
-            return _kernel_instance
-        else:
-            logger.warning("Instancia de kernel inactiva o muerta. Limpiando recursos para reiniciar...")
-            try:
-                _kernel_instance.stop_kernel()
-            except Exception:
-                pass
-            _kernel_instance = None
-
-    if _jupyter_client_available:
-        kernel = KogniTermKernel()
-        if kernel.start_kernel():
-            _kernel_instance = kernel
-            return _kernel_instance
-        else:
-            # Retornar temporalmente para extraer last_error sin dejar singleton roto
-            temp_kernel = kernel
-            _kernel_instance = None
-            return temp_kernel
-    return None
+# Los kernels los gestiona el pool del núcleo: precalentados al iniciar la sesión
+# y uno por agente, para que sub-agentes en paralelo no compartan estado.
+if _jupyter_client_available:
+    register_kernel_factory(_new_kernel)
+
+# Último kernel utilizado (para _get_last_structured_output)
+_last_kernel: Optional[KogniTermKernel] = None
 
 
-def python_executor(code: str, terminal_ui: Any = None, auto_confirm: bool = False, confirm: bool = False) -> Generator[str, None, None]:
+def python_executor(code: str, terminal_ui: Any = None, auto_confirm: bool = False, confirm: bool = False, delegation_context: Any = None) -> Generator[str, None, None]:
     """
     Ejecuta código Python en un kernel de Jupyter.
 
@@ -271,6 +316,7 @@ def python_executor(code: str, terminal_ui: Any = None, auto_confirm: bool = Fal
         terminal_ui: Interfaz de terminal para mostrar mensajes
         auto_confirm: Si True, ejecuta sin pedir confirmación
         confirm: Alias de auto_confirm
+        delegation_context: Contexto del sub-agente (cada agente usa su propio kernel)
 
     Yields:
         str: Resultados de la ejecución formateados
@@ -278,8 +324,8 @@ def python_executor(code: str, terminal_ui: Any = None, auto_confirm: bool = Fal
     Raises:
         Exception: Errores durante la ejecución
     """
-    global _kernel_instance
-    
+    global _last_kernel
+
     if not _jupyter_client_available:
         yield "Error: La herramienta PythonExecutor no está disponible porque jupyter_client no está instalado."
         return
@@ -296,14 +342,39 @@ def python_executor(code: str, terminal_ui: Any = None, auto_confirm: bool = Fal
         })
         return
 
-    kernel = _get_kernel_instance()
-    if kernel is None:
+    pool = get_kernel_pool()
+    if pool is None:
         yield "Error: No se pudo iniciar el kernel de Jupyter. Verifica que 'jupyter_client' e 'ipykernel' estén instalados."
         return
 
+    key = getattr(delegation_context, "agent_id", None) or "main"
     cmd_title = "python"
-    for chunk in kernel.execute_code_stream(code, terminal_ui=terminal_ui, command_title=cmd_title):
-        yield chunk
+    try:
+        with pool.lease(key=key) as kernel:
+            _last_kernel = kernel
+            if pool.pop_eviction_notice(key):
+                yield (
+                    "[KogniTerm] El kernel de este agente se cerró mientras estaba inactivo; "
+                    "las variables e imports definidos antes se perdieron.\n"
+                )
+            finished = False
+            try:
+                for chunk in kernel.execute_code_stream(code, terminal_ui=terminal_ui, command_title=cmd_title):
+                    yield chunk
+                finished = True
+            finally:
+                # Generador cerrado a medias (interrupción, error): el código sigue
+                # corriendo en el kernel, que no puede volver al pool así.
+                if not finished and not kernel.interrupt():
+                    pool.recycle(kernel)
+            usage = pool.enforce_memory_limit(kernel)
+            if usage is not None:
+                yield (
+                    f"\n[KogniTerm] El kernel usa {usage:.0f} MB (límite {pool.memory_limit_mb} MB); "
+                    "se reiniciará y las variables definidas se perderán.\n"
+                )
+    except (RuntimeError, TimeoutError) as e:
+        yield f"Error: {e}\n"
 
 
 # Función alternativa para ejecución síncrona
@@ -323,19 +394,17 @@ def _get_last_structured_output() -> Optional[dict]:
     """
     Devuelve la última salida estructurada generada por la ejecución del código Python.
     """
-    global _kernel_instance
-    if _kernel_instance:
-        return _kernel_instance.current_execution_outputs
+    if _last_kernel:
+        return _last_kernel.current_execution_outputs
     return None
 
 
 # Función de limpieza
 def _cleanup():
     """Limpia recursos del kernel."""
-    global _kernel_instance
-    if _kernel_instance:
-        _kernel_instance.stop_kernel()
-        _kernel_instance = None
+    global _last_kernel
+    _last_kernel = None
+    close_kernel_pool()
 
 
 # Schema de parámetros para el LLM
@@ -3,10 +3,14 @@ Search Memory Skill - Busca en memoria de resultados de búsqueda.
 
 Esta es una skill migrada desde search_memory_tool.py.
 Provee funcionalidad para guardar y consultar resultados de búsqueda.
+La memoria es persistente por workspace (ver `SearchMemoryStore`) y reconoce
+consultas parafraseadas mediante embeddings.
 """
 
-# Memoria global para almacenar resultados de búsqueda (en memoria del proceso)
-_search_memory_store = []
+import os
+from typing import Optional
+
+from kogniterm.core.search_memory_store import get_search_memory_store
 
 
 # Metadata de la herramienta
@@ -16,7 +20,10 @@ description = "Permite al agente guardar y consultar resultados de búsqueda par
 
 def search_memory(
     query: str,
-    result: str = None
+    result: str = None,
+    ttl: Optional[float] = None,
+    scope: str = "workspace",
+    llm_service=None
 ) -> str:
     """
     Guarda o busca resultados en la memoria de búsqueda.
@@ -24,42 +31,53 @@ def search_memory(
     Args:
         query: La consulta de búsqueda original
         result: El resultado relevante de la búsqueda para guardar (opcional)
+        ttl: Segundos de validez del resultado guardado (opcional)
+        scope: 'workspace' (visible en todas las sesiones) o 'session'
+        llm_service: Servicio LLM inyectado (opcional, para el workspace actual)
 
     Returns:
         str: Mensaje de éxito o resultados de la búsqueda
     """
-    global _search_memory_store
-
     # Si se proporciona result, guardar en memoria
     if result is not None:
-        return _add_search_result(query, result)
+        return _add_search_result(query, result, ttl=ttl, scope=scope, llm_service=llm_service)
     # Si solo se proporciona query, buscar resultados
     else:
-        return _get_relevant_search_results(query)
+        return _get_relevant_search_results(query, llm_service=llm_service)
+
+
+def _store(llm_service=None):
+    workspace_dir = getattr(llm_service, "_current_workspace_dir", None) if llm_service else None
+    return get_search_memory_store(workspace_dir or os.getcwd())
+
+
+def _session_id(llm_service=None) -> Optional[str]:
+    # Sesión del servidor (o de esta instancia del LLMService) para el ámbito `session`
+    return getattr(llm_service, "session_id", None) if llm_service else None
 
 
-def _add_search_result(query: str, result: str) -> str:
+def _add_search_result(query: str, result: str, ttl: Optional[float] = None,
+                       scope: str = "workspace", llm_service=None) -> str:
     """
     Añade un resultado de búsqueda a la memoria.
 
     Args:
         query: La consulta de búsqueda original
         result: El resultado a guardar
+        ttl: Segundos de validez (por defecto, el de la configuración)
+        scope: Ámbito de la entrada ('workspace' o 'session')
 
     Returns:
         str: Mensaje de confirmación
     """
-    global _search_memory_store
-
-    # Limitar el tamaño de la memoria para evitar que crezca indefinidamente
-    if len(_search_memory_store) >= 10:  # Mantener un máximo de 10 resultados en memoria
-        _search_memory_store.pop(0)  # Eliminar el más antiguo
-
-    _search_memory_store.append({"query": query, "result": result})
+    try:
+        _store(llm_service).put(query, result, ttl=ttl, scope=scope, session_id=_session_id(llm_service))
+    except ValueError as e:
+        return f"Error: {e}"
     return f"Resultado de búsqueda guardado en memoria para la consulta: '{query}'."
 
 
-def _get_relevant_search_results(query: str) -> str:
+def _get_relevant_search_results(query: str, llm_service=None) -> str:
     """
     Busca resultados relevantes en la memoria de búsqueda.
 
@@ -69,14 +87,11 @@ def _get_relevant_search_results(query: str) -> str:
     Returns:
         str: Resultados relevantes o mensaje de no hallazgos
     """
-    global _search_memory_store
-
-    relevant_results = []
-    for item in _search_memory_store:
-        # Una lógica simple para determinar la relevancia: si la consulta está contenida en la consulta guardada
-        # o viceversa. Esto podría mejorarse con embeddings o algoritmos de similitud.
-        if query.lower() in item["query"].lower() or item["query"].lower() in query.lower():
-            relevant_results.append(f"Consulta anterior: '{item['query']}'\nResultado: {item['result']}")
+    matches = _store(llm_service).search(query, session_id=_session_id(llm_service))
+    relevant_results = [
+        f"Consulta anterior: '{entry.query}' (similitud {score:.2f})\nResultado: {entry.result}"
+        for score, entry in matches
+    ]
 
     if relevant_results:
         return "Resultados relevantes encontrados en la memoria de búsqueda:\n" + "\n---\n".join(relevant_results)
@@ -84,15 +99,14 @@ def _get_relevant_search_results(query: str) -> str:
         return "No se encontraron resultados relevantes en la memoria de búsqueda."
 
 
-def _clear_search_memory() -> str:
+def _clear_search_memory(llm_service=None) -> str:
     """
     Limpia la memoria de búsqueda.
 
     Returns:
         str: Mensaje de confirmación
     """
-    global _search_memory_store
-    _search_memory_store = []
+    _store(llm_service).clear()
     return "Memoria de búsqueda limpiada exitosamente."
 
 
@@ -107,6 +121,15 @@ parameters_schema = {
         "result": {
             "type": "string",
             "description": "El resultado relevante de la búsqueda para guardar (opcional)"
+        },
+        "ttl": {
+            "type": "number",
+            "description": "Segundos durante los que el resultado guardado es válido (opcional)"
+        },
+        "scope": {
+            "type": "string",
+            "enum": ["workspace", "session"],
+            "description": "Ámbito del resultado guardado: todo el workspace (por defecto) o solo esta sesión"
         }
     },
     "required": ["query"]
@@ -4,12 +4,19 @@ Herramienta unificada para interactuar con repositorios de GitHub
 """
 
 import os
+import base64
 import logging
-from typing import Type, Optional, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Type, Optional, Dict, Any, List, Tuple
+from urllib.parse import quote
+
+import requests
 from pydantic import BaseModel, Field
 from github import GithubException, Github
 import json
 
+from kogniterm.core.http_cache import get_http_cache
+
 logger = logging.getLogger(__name__)
 
 # Metadata de la herramienta
@@ -37,12 +44,109 @@ def _get_github_instance(github_token: Optional[str]) -> Github:
     except GithubException as e:
         raise ValueError(f"Error al crear la instancia de GitHub: {e}")
 
-def _get_repo(g: Github, repo_name: str):
+# Las lecturas de repositorios van por la API REST a través de la caché HTTP
+# compartida: las respuestas llevan ETag y max-age, así que volver a leer un
+# repo o directorio se sirve localmente o con un 304 (que no consume cuota).
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+MAX_TREE_WORKERS = 8
+
+
+class _ContentFile:
+    """Entrada de la API de contenidos con la forma de `github.ContentFile` que usan los helpers."""
+
+    def __init__(self, repo: "_CachedRepo", data: Dict[str, Any]):
+        self._repo = repo
+        self._data = data
+        self.type = data.get("type")
+        self.name = data.get("name")
+        self.path = data.get("path")
+        self.sha = data.get("sha")
+
+    @property
+    def decoded_content(self) -> bytes:
+        if self._data.get("encoding") == "base64" and self._data.get("content") is not None:
+            return base64.b64decode(self._data["content"])
+        # Archivos de más de 1 MB: la API no incluye el contenido, se descarga en crudo
+        download_url = self._data.get("download_url")
+        if not download_url:
+            raise GithubException(404, {"message": "Contenido no disponible"}, None)
+        return self._repo._request(download_url).content
+
+
+class _CachedRepo:
+    """Repositorio de GitHub leído con la API REST mediante la caché HTTP (ETag/max-age)."""
+
+    def __init__(self, repo_name: str, github_token: Optional[str] = None):
+        self._headers = {"Accept": "application/vnd.github+json"}
+        if github_token:
+            self._headers["Authorization"] = f"Bearer {github_token}"
+        data = self._get(f"/repos/{repo_name}")
+        self.full_name = data.get("full_name", repo_name)
+        self.name = data.get("name")
+        self.description = data.get("description")
+        self.html_url = data.get("html_url")
+        self.stargazers_count = data.get("stargazers_count")
+        self.default_branch = data.get("default_branch") or "HEAD"
+
+    def _request(self, url: str):
+        resp = get_http_cache().get(url, headers=self._headers)
+        if resp.status_code >= 400:
+            try:
+                data = resp.json()
+            except ValueError:
+                data = {"message": resp.text[:200]}
+            raise GithubException(resp.status_code, data, resp.headers)
+        return resp
+
+    def _get(self, endpoint: str) -> Any:
+        return self._request(GITHUB_API_URL + endpoint).json()
+
+    def get_contents(self, path: str):
+        data = self._get(f"/repos/{self.full_name}/contents/{quote(path.strip('/'), safe='/')}")
+        if isinstance(data, list):
+            return [_ContentFile(self, item) for item in data]
+        return _ContentFile(self, data)
+
+    def get_tree(self, path: str) -> Optional[List[Tuple[str, str]]]:
+        """
+        (tipo, ruta) de todo lo que cuelga de `path` con una sola petición al
+        árbol git recursivo de ese directorio (no del repositorio entero); None
+        si GitHub lo devuelve truncado. Lista vacía si `path` no existe.
+        """
+        prefix = path.strip("/")
+        tree_sha = quote(self.default_branch, safe="")
+        if prefix:
+            # El sha del subárbol sale del listado de su directorio padre
+            parent, _, name = prefix.rpartition("/")
+            listing = self.get_contents(parent)
+            entry = next((c for c in listing if c.name == name), None) if isinstance(listing, list) else None
+            if entry is None:
+                return []
+            if entry.type != "dir":
+                return [("file", prefix)]
+            tree_sha = entry.sha
+        data = self._get(f"/repos/{self.full_name}/git/trees/{tree_sha}?recursive=1")
+        if data.get("truncated"):
+            return None
+        entries = []
+        for item in data.get("tree", []):
+            kind = {"tree": "dir", "blob": "file"}.get(item.get("type"))
+            if kind:
+                item_path = item.get("path", "")
+                entries.append((kind, f"{prefix}/{item_path}" if prefix else item_path))
+        return entries
+
+
+def _get_repo(repo_name: str, github_token: Optional[str] = None) -> _CachedRepo:
     """Obtener repositorio"""
+    if github_token is None:
+        github_token = os.getenv("GITHUB_TOKEN")
     try:
-        return g.get_repo(repo_name)
+        return _CachedRepo(repo_name, github_token)
     except GithubException as e:
         raise ValueError(f"Error al acceder al repositorio '{repo_name}': {e}")
+    except requests.RequestException as e:
+        raise ValueError(f"Error al acceder al repositorio '{repo_name}': {e}")
 
 MAX_GITHUB_FILE_CONTENT_LENGTH = 100000  # Límite de caracteres para el contenido del archivo de GitHub
 
@@ -78,22 +182,69 @@ def _list_contents(repo, path: str) -> str:
     except GithubException as e:
         raise ValueError(f"Error al listar contenidos en '{path}': {e}")
 
+def _walk_contents(repo, path: str) -> List[Tuple[str, str]]:
+    """(tipo, ruta) bajo `path` listando los directorios nivel a nivel y en paralelo."""
+    entries: List[Tuple[str, str]] = []
+    level = [path]
+    with ThreadPoolExecutor(max_workers=MAX_TREE_WORKERS) as pool:
+        while level:
+            next_level = []
+            for listing in pool.map(repo.get_contents, level):
+                for content in listing if isinstance(listing, list) else []:
+                    kind = "dir" if content.type == "dir" else "file"
+                    entries.append((kind, content.path))
+                    if kind == "dir":
+                        next_level.append(content.path)
+            level = next_level
+    return entries
+
+
 def _read_directory_recursive(repo, path: str) -> str:
-    """Leer directorio recursivamente"""
+    """
+    Leer directorio recursivamente. El árbol se obtiene en una sola petición
+    (o nivel a nivel si GitHub lo trunca) y los archivos se descargan en
+    paralelo; la salida conserva el orden en profundidad del recorrido original.
+    """
+    root = path.strip("/")
     output = f"### Contenido recursivo de '{path}' en '{repo.full_name}'\n"
     try:
-        contents = repo.get_contents(path)
-        if not isinstance(contents, list):  # Es un solo archivo
+        entries = repo.get_tree(root)
+        if entries is not None and (("file", root) in entries):
             return _get_file_content(repo, path)
+        if entries is None:
+            contents = repo.get_contents(path)
+            if not isinstance(contents, list):  # Es un solo archivo
+                return _get_file_content(repo, path)
+            entries = _walk_contents(repo, path)
+        if root and not any(entry_path != root for _, entry_path in entries):
+            raise ValueError(f"La ruta '{path}' no existe en '{repo.full_name}'.")
 
-        for content in contents:
-            if content.type == "dir":
-                output += f"\n#### Directorio: {content.path}\n"
-                output += _read_directory_recursive(repo, content.path)  # Llamada recursiva
-            else:
-                output += f"- Archivo: {content.path}\n"
-                output += _get_file_content(repo, content.path) + "\n"
-        return output
+        children: Dict[str, List[Tuple[str, str]]] = {}
+        for kind, entry_path in entries:
+            if entry_path == root:
+                continue
+            parent = entry_path.rsplit("/", 1)[0] if "/" in entry_path else ""
+            children.setdefault(parent, []).append((kind, entry_path))
+        for listing in children.values():
+            listing.sort(key=lambda e: e[1])
+
+        files = [p for kind, p in entries if kind == "file" and p != root]
+        with ThreadPoolExecutor(max_workers=MAX_TREE_WORKERS) as pool:
+            file_contents = dict(zip(files, pool.map(lambda p: _get_file_content(repo, p), files)))
+
+        def emit(directory: str) -> str:
+            text = ""
+            for kind, entry_path in children.get(directory, []):
+                if kind == "dir":
+                    text += f"\n#### Directorio: {entry_path}\n"
+                    text += f"### Contenido recursivo de '{entry_path}' en '{repo.full_name}'\n"
+                    text += emit(entry_path)
+                else:
+                    text += f"- Archivo: {entry_path}\n"
+                    text += file_contents[entry_path] + "\n"
+            return text
+
+        return output + emit(root)
     except GithubException as e:
         raise ValueError(f"Error al leer recursivamente el directorio '{path}': {e}")
 
@@ -167,7 +318,7 @@ def github(action: str, repo_name: Optional[str] = None, path: Optional[str] = "
         if not repo_name:
             return f"Error: 'repo_name' es requerido para la acción '{action}'."
 
-        repo = _get_repo(g, repo_name)
+        repo = _get_repo(repo_name, github_token)
 
         if action == 'get_repo_info':
             return f"""Obteniendo información del repositorio: {repo.full_name}...\n\n### Información del Repositorio: {repo.name}\n- **Descripción:** {repo.description}\n- **URL:** {repo.html_url}\n- **Estrellas:** {repo.stargazers_count} ⭐"""
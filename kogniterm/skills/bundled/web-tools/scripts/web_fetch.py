@@ -64,18 +64,12 @@ def web_fetch(url: str) -> Generator[str, None, None]:
         yield f"Error: La URL '{url}' fue bloqueada por la política de seguridad anti-SSRF.\n"
         return
 
-    try:
-        from langchain_community.utilities import RequestsWrapper
-    except ImportError:
-        yield "Error: El paquete 'langchain-community' no está instalado.\n"
-        yield "Ejecuta: pip install langchain-community\n"
-        return
+    from kogniterm.core.http_cache import get_http_cache
 
     try:
-        requests_wrapper = RequestsWrapper()
-        content = requests_wrapper.get(url)
-
-        yield content
+        # Sesión compartida y caché en disco: una página fresca o no modificada
+        # (ETag/Last-Modified) se sirve sin volver a descargarla
+        yield get_http_cache().get(url).text
 
     except Exception as e:
         yield f"Error al obtener la URL {url}: {str(e)}\n"
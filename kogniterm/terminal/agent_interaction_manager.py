@@ -3,6 +3,7 @@ import sys
 import time
 import threading
 from kogniterm.core.config import settings
+from kogniterm.core.tracing import get_tracer
 from rich.console import Console
 from rich.spinner import Spinner
 from rich.live import Live
@@ -57,6 +58,30 @@ class AgentInteractionManager(BaseAgentInteractionManager):
                         break
 
     def invoke_agent(self, user_input: Optional[str]) -> Dict[str, Any]:
+        self._prepare_invocation()
+
+        sys.stderr.flush()
+        
+        with get_tracer().span("agent.turn"):
+            # Ejecutar invoke sin timeout
+            final_state_dict = self.bash_agent_app.invoke(self.agent_state, config={"recursion_limit": 1000})
+
+        sys.stderr.flush()
+
+        return self._finalize_invocation(final_state_dict)
+
+    async def ainvoke_agent(self, user_input: Optional[str]) -> Dict[str, Any]:
+        """Igual que `invoke_agent`, pero el turno corre en el event loop del llamador."""
+        if not hasattr(self.bash_agent_app, "ainvoke"):
+            return await super().ainvoke_agent(user_input)
+
+        self._prepare_invocation()
+        with get_tracer().span("agent.turn"):
+            final_state_dict = await self.bash_agent_app.ainvoke(self.agent_state, config={"recursion_limit": 1000})
+        return self._finalize_invocation(final_state_dict)
+
+    def _prepare_invocation(self) -> None:
+        """Inyecta el contexto de directorio y registra el orquestador antes de cada turno."""
         import os
         
         # El mensaje ya fue añadido al historial por KogniTermApp antes de llamar a este método.
@@ -107,16 +132,8 @@ Cuando ejecutes comandos o manipules archivos, ten en cuenta esta ubicación.
             except Exception as e:
                 logger.error(f"Error al registrar el orquestador principal en la delegación: {e}")
 
-        sys.stderr.flush()
-        
-        try:
-            # Ejecutar invoke sin timeout
-            final_state_dict = self.bash_agent_app.invoke(self.agent_state, config={"recursion_limit": 1000})
-        finally:
-            pass
-
-        sys.stderr.flush()
-        
+    def _finalize_invocation(self, final_state_dict: Dict[str, Any]) -> Dict[str, Any]:
+        """Vuelca el estado final del turno en `agent_state` y lanza el aprendizaje posterior."""
         # Actualizar el estado del agente con los valores del final_state_dict
         self.agent_state.command_to_confirm = final_state_dict.get('command_to_confirm')
         self.agent_state.tool_code_to_confirm = final_state_dict.get('tool_code_to_confirm')
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from typing import Optional, Dict, Any
 import os
@@ -5,6 +6,8 @@ from prompt_toolkit import PromptSession
 from kogniterm.core.llm_service import LLMService
 from kogniterm.core.delegation.command_rules import CommandRulesResolver
 from kogniterm.core.command_executor import CommandExecutor
+from kogniterm.core.skills.tool_effects import ToolEffects
+from kogniterm.core.tracing import get_tracer
 from kogniterm.core.agents.bash_agent import AgentState
 from kogniterm.terminal.terminal_ui import TerminalUI
 from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
@@ -347,7 +350,15 @@ class CommandApprovalHandler:
         """
         if not tool_name:
             return False
-        
+
+        # Efectos declarados por la skill: solo lectura sin procesos ni escritura
+        sm = getattr(self.llm_service, "skill_manager", None)
+        get_effects = getattr(sm, "get_tool_effects", None)
+        effects = get_effects(tool_name) if callable(get_effects) else None
+        if isinstance(effects, ToolEffects):
+            resolved = effects.resolve(tool_args)
+            return resolved.read_only and not resolved.writes_files and not resolved.spawns_process
+
         SAFE_TOOLS = {
             'file_read_directory', 'codebase_search_tool', 'code_search',
             'search_memory', 'memory_read', 'web_search', 'read_url',
@@ -368,6 +379,61 @@ class CommandApprovalHandler:
                                  is_user_confirmation: bool = False, is_file_update_confirmation: bool = False, confirmation_prompt: Optional[str] = None,
                                  tool_name: Optional[str] = None, raw_tool_output: Optional[str] = None,
                                  original_tool_args: Optional[Dict[str, Any]] = None) -> dict:
+        """Versión síncrona: la aprobación se pide con `ask_approval_sync` (bloquea el hilo actual)."""
+        flow = self._approval_flow(
+            command_to_execute, auto_approve, is_user_confirmation, is_file_update_confirmation,
+            confirmation_prompt, tool_name, raw_tool_output, original_tool_args,
+        )
+        finished, payload = self._advance_flow(flow, None)
+        while not finished:
+            with get_tracer().span("tool.approval_wait", tool=tool_name or ""):
+                answer = self.terminal_ui.ask_approval_sync(**payload)
+            finished, payload = self._advance_flow(flow, answer)
+        return payload
+
+    async def ahandle_command_approval(self, command_to_execute: str, auto_approve: Optional[bool] = None,
+                                        is_user_confirmation: bool = False, is_file_update_confirmation: bool = False, confirmation_prompt: Optional[str] = None,
+                                        tool_name: Optional[str] = None, raw_tool_output: Optional[str] = None,
+                                        original_tool_args: Optional[Dict[str, Any]] = None) -> dict:
+        """
+        Versión asíncrona de `handle_command_approval`.
+
+        Los tramos bloqueantes (explicación del LLM, ejecución del comando o de la
+        herramienta) corren en hilos efímeros; la espera de la aprobación es un
+        `await` sobre `ask_approval_async` y no retiene ningún hilo.
+        """
+        flow = self._approval_flow(
+            command_to_execute, auto_approve, is_user_confirmation, is_file_update_confirmation,
+            confirmation_prompt, tool_name, raw_tool_output, original_tool_args,
+        )
+        ask_async = getattr(self.terminal_ui, "ask_approval_async", None)
+        finished, payload = await asyncio.to_thread(self._advance_flow, flow, None)
+        while not finished:
+            with get_tracer().span("tool.approval_wait", tool=tool_name or ""):
+                if ask_async is not None:
+                    answer = await ask_async(**payload)
+                else:
+                    answer = await asyncio.to_thread(self.terminal_ui.ask_approval_sync, **payload)
+            finished, payload = await asyncio.to_thread(self._advance_flow, flow, answer)
+        return payload
+
+    @staticmethod
+    def _advance_flow(flow, answer):
+        """Avanza el generador de aprobación; StopIteration no puede cruzar un Future."""
+        try:
+            return False, flow.send(answer)
+        except StopIteration as done:
+            return True, done.value
+
+    def _approval_flow(self, command_to_execute: str, auto_approve: Optional[bool] = None,
+                       is_user_confirmation: bool = False, is_file_update_confirmation: bool = False, confirmation_prompt: Optional[str] = None,
+                       tool_name: Optional[str] = None, raw_tool_output: Optional[str] = None,
+                       original_tool_args: Optional[Dict[str, Any]] = None):
+        """
+        Flujo completo de aprobación como generador: cede (`yield`) los argumentos de
+        la solicitud de aprobación cuando necesita una decisión del usuario, recibe el
+        booleano vía `send()` y devuelve el dict de resultado al terminar.
+        """
         # Usar el estado interno si no se pasa uno explícito (re-consultando ConfigManager)
         if auto_approve is None:
             from kogniterm.terminal.config_manager import ConfigManager
@@ -579,7 +645,7 @@ class CommandApprovalHandler:
                  diff_to_pass = command_to_execute
                  file_path_to_pass = "bash"
 
-            run_action = self.terminal_ui.ask_approval_sync(
+            run_action = yield dict(
                 message=approval_message,
                 title=panel_title,
                 diff_content=diff_to_pass,
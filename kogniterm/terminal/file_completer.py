@@ -64,6 +64,7 @@ class FileCompleter(Completer):
         ("/summarymodel", "Cambiar modelo de resumen"),
         ("/embeddings", "Configurar embeddings"),
         ("/insights", "Analítica de uso"),
+        ("/trace", "Desglose de latencia de los últimos turnos"),
     ]
 
     SESSION_SUBCOMMANDS = [
@@ -5,6 +5,7 @@ import threading
 from .security import scrub_secrets, mask_url_credentials
 from kogniterm.core.llm_service import LLMService
 from kogniterm.core.insights import KogniInsightsEngine
+from kogniterm.core.tracing import get_tracer, render_waterfall
 from kogniterm.core.agents.bash_agent import AgentState, get_system_message
 from kogniterm.terminal.terminal_ui import TerminalUI
 from langchain_core.messages import AIMessage, SystemMessage, ToolMessage, HumanMessage
@@ -581,6 +582,7 @@ Example: /autosave restore autosave_20250515_141530
                 ("/resume", "▶️ Resume a saved thread"),
                 ("/instructions", "🧾 Agent Instructions (Global / Workspace)"),
                 ("/autosave", "💾 Manage autosave versions (list, restore)"),
+                ("/trace", "⏱️ Latency breakdown (waterfall) of the last turns"),
                 ("/clear", "🧹 Clear current conversation history"),
                 ("/exit", "🚪 Exit KogniTerm"),
             ]
@@ -609,6 +611,8 @@ Example: /autosave restore autosave_20250515_141530
                     
                     "/autosave": "Manage autosave versions of the current conversation.\n\nSubcommands:\n  • list              : List all autosave versions\n  • restore [file]    : Restore a specific autosave version\n  • restore           : Restore (interactive selector)",
                     
+                    "/trace": "Show where the wall time of the last turns went (history, LLM request/stream, tools, approvals, UI).\nUsage: /trace [n]\nSpans are also exported as OTLP/JSON to ~/.kogniterm/telemetry/traces.jsonl.",
+                    
                     "/clear": "Clear the current conversation history.\nUsage: /clear\nThis action cannot be undone.",
                     
                     "/exit": "Exit KogniTerm.\nUsage: /exit",
@@ -1557,6 +1561,9 @@ Example: /autosave restore autosave_20250515_141530
         if user_input.lower().strip().startswith('/insights'):
             await self._process_insights_command(user_input)
             return True
+        if user_input.lower().strip().startswith('/trace'):
+            self._process_trace_command(user_input)
+            return True
 
         # ─────────────────────── SKILL COMMANDS ───────────────────────
         # /skills → listar todas las skills disponibles
@@ -2049,6 +2056,24 @@ Example: /autosave restore autosave_20250515_141530
             self.terminal_ui.print_message(f"Error al generar reporte: {e}", style="red")
 
 
+    def _process_trace_command(self, user_input: str):
+        """Procesa /trace [n]: cascada de spans de los últimos n turnos."""
+        parts = user_input.strip().split()
+        count = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 1
+        traces = get_tracer().last_traces(count)
+        if not traces:
+            self.terminal_ui.print_message("No hay trazas registradas todavía.", style="yellow")
+            return
+        from rich.text import Text
+        for spans in traces:
+            root = spans[0]
+            started = datetime.fromtimestamp(root.start_ns / 1e9).strftime("%H:%M:%S")
+            self.terminal_ui.console.print(Panel(
+                Text(render_waterfall(spans)),
+                title=f"⏱️ {root.name} · {started} · {root.duration_ms / 1000:.2f}s",
+                border_style="cyan",
+            ))
+
     async def _manage_embeddings_interactive(self):
         """Muestra una interfaz interactiva para gestionar la configuración de embeddings."""
         from prompt_toolkit.shortcuts import radiolist_dialog, message_dialog
@@ -1811,6 +1811,7 @@ class KogniTermTUI(App):
                         "%skills",
                         "%instructions",
                         "%insights",
+                        "%trace",
                         "%reasoning",
                         "%summarize",
                         "%summarymodel",
@@ -1838,6 +1839,7 @@ class KogniTermTUI(App):
                         "/skills",
                         "/instructions",
                         "/insights",
+                        "/trace",
                         "/reasoning",
                         "/summarize",
                         "/summarymodel",
@@ -1970,6 +1972,7 @@ class KogniTermTUI(App):
                         "%skills",
                         "%instructions",
                         "%insights",
+                        "%trace",
                         "%reasoning",
                         "%summarize",
                         "%summarymodel",
@@ -1997,6 +2000,7 @@ class KogniTermTUI(App):
                         "/skills",
                         "/instructions",
                         "/insights",
+                        "/trace",
                         "/reasoning",
                         "/summarize",
                         "/summarymodel",
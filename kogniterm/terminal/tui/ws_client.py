@@ -139,6 +139,9 @@ class TUIWebSocketClient:
         self._stream_accumulators: dict = {}
         # Tiempo del último live_update (solo para agente principal)
         self._last_live_update_time = 0.0
+        # Posición en el stream de eventos de la sesión para reanudar al reconectar
+        self._last_seq: Optional[int] = None
+        self._stream_epoch: Optional[str] = None
 
     # ── Propiedades públicas ────────────────────────────────────────────────────
 
@@ -202,6 +205,9 @@ class TUIWebSocketClient:
         params = [f"workspace_dir={encoded_workspace}"]
         if token:
             params.append(f"token={urllib.parse.quote(token)}")
+        if self._last_seq is not None and self._stream_epoch:
+            params.append(f"last_seq={self._last_seq}")
+            params.append(f"epoch={urllib.parse.quote(self._stream_epoch)}")
         ws_url = f"{self._server_url}/ws/{self._session_id}?{'&'.join(params)}"
         logger.info(f"[WS] Conectando a {ws_url} …")
 
@@ -264,13 +270,33 @@ class TUIWebSocketClient:
         event_type = event.get("type", "")
         data = event.get("data", {})
 
+        seq = event.get("seq")
+        if isinstance(seq, int) and (self._last_seq is None or seq > self._last_seq):
+            self._last_seq = seq
+
         if event_type == "connected":
+            stream = data.get("stream", {}) if isinstance(data, dict) else {}
+            if stream.get("epoch") and stream.get("epoch") != self._stream_epoch:
+                # Stream nuevo (primera conexión o sesión recreada en el servidor)
+                self._stream_epoch = stream.get("epoch")
+                self._last_seq = stream.get("seq")
             # El servidor confirmó la conexión — actualizar info del modelo si aplica
             config = data.get("config", {}) if isinstance(data, dict) else {}
             model = config.get("model")
             if model:
                 self._app.call_from_thread(self._app.update_status_footer, model)
 
+        elif event_type == "resync_required":
+            # Los eventos perdidos ya no están en el búfer del servidor
+            self._stream_epoch = data.get("epoch", self._stream_epoch)
+            self._last_seq = data.get("current_seq", self._last_seq)
+            logger.warning(f"[WS] No se pudo reanudar el stream desde seq={data.get('last_seq')}.")
+            self._app.call_from_thread(
+                self._app.tui_ui.print_message,
+                "⚠️  Se perdieron eventos durante la desconexión; recarga la sesión para ver el historial completo.",
+                "yellow",
+            )
+
         elif event_type == "stream":
             # Fragmento de texto del LLM
             agent_id = event.get("agent_id")
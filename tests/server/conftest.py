@@ -0,0 +1,11 @@
+import pytest
+
+from kogniterm.core.agent_interaction import AgentInteractionRegistry
+
+
+@pytest.fixture(autouse=True)
+def agent_interaction_factory(monkeypatch):
+    """Registra la factory real: otros tests pueden haber dejado el registro vacío."""
+    from kogniterm.terminal.agent_interaction_manager import AgentInteractionManager
+
+    monkeypatch.setattr(AgentInteractionRegistry, "_factory", AgentInteractionManager)
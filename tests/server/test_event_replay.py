@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+from kogniterm.server.session_pool import ServerUI
+
+
+async def _take(agen, n, timeout=2.0):
+    events = []
+    for _ in range(n):
+        events.append(await asyncio.wait_for(agen.__anext__(), timeout))
+    return events
+
+
+@pytest.mark.asyncio
+async def test_events_are_sequenced_and_resume_from_last_seq():
+    ui = ServerUI(asyncio.get_running_loop(), "replay")
+    for i in range(5):
+        ui._push("stream", f"chunk-{i}")
+    assert ui.last_seq == 5
+
+    stream = ui.events(last_seq=2, epoch=ui.stream_epoch)
+    backlog = await _take(stream, 3)
+    assert [e["seq"] for e in backlog] == [3, 4, 5]
+    assert [e["data"] for e in backlog] == ["chunk-2", "chunk-3", "chunk-4"]
+
+    ui._push("done", {})
+    (live,) = await _take(stream, 1)
+    assert live["seq"] == 6 and live["type"] == "done"
+    await stream.aclose()
+
+
+@pytest.mark.asyncio
+async def test_fresh_consumer_only_gets_new_events():
+    ui = ServerUI(asyncio.get_running_loop(), "fresh")
+    ui._push("stream", "old")
+
+    stream = ui.events()
+    # Registrar el consumidor antes de emitir
+    pending = asyncio.ensure_future(stream.__anext__())
+    await asyncio.sleep(0)
+    ui._push("stream", "new")
+    event = await asyncio.wait_for(pending, 2)
+    assert event["data"] == "new"
+    await stream.aclose()
+
+
+@pytest.mark.asyncio
+async def test_resync_required_when_backlog_was_evicted(monkeypatch):
+    monkeypatch.setenv("KOGNITERM_EVENT_REPLAY_SIZE", "3")
+    ui = ServerUI(asyncio.get_running_loop(), "overflow")
+    for i in range(10):
+        ui._push("stream", i)
+
+    stream = ui.events(last_seq=2, epoch=ui.stream_epoch)
+    (event,) = await _take(stream, 1)
+    assert event["type"] == "resync_required"
+    assert event["data"]["oldest_seq"] == 8
+    assert event["data"]["current_seq"] == 10
+    await stream.aclose()
+
+
+@pytest.mark.asyncio
+async def test_resync_required_when_session_was_recreated():
+    ui = ServerUI(asyncio.get_running_loop(), "recreated")
+    ui._push("stream", "a")
+
+    stream = ui.events(last_seq=1, epoch="old-epoch")
+    (event,) = await _take(stream, 1)
+    assert event["type"] == "resync_required"
+    assert event["data"]["epoch"] == ui.stream_epoch
+    await stream.aclose()
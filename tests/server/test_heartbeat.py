@@ -124,7 +124,6 @@ async def test_heartbeat_scheduler_execution():
     with patch("kogniterm.server.heartbeat_manager.pool") as mock_pool:
         mock_pool.wait_until_ready = AsyncMock()
         mock_pool.get_or_create.return_value = mock_session
-        mock_pool._executor = MagicMock()
 
         # Disparar ejecución manual
         success = await scheduler.trigger_heartbeat("hb_async")
@@ -132,7 +131,7 @@ async def test_heartbeat_scheduler_execution():
 
         mock_pool.wait_until_ready.assert_awaited_once()
         mock_pool.get_or_create.assert_called_once_with("heartbeat_hb_async")
-        mock_session.send.assert_awaited_once_with("Say hello", mock_pool._executor)
+        mock_session.send.assert_awaited_once_with("Say hello")
 
         # Verificar actualización de status
         hb_config = server_config.settings.heartbeats[0]
@@ -171,7 +170,6 @@ async def test_heartbeat_telegram_notification():
          patch("httpx.AsyncClient.post", new_callable=AsyncMock) as mock_post:
         mock_pool.wait_until_ready = AsyncMock()
         mock_pool.get_or_create.return_value = mock_session
-        mock_pool._executor = MagicMock()
 
         mock_response = MagicMock()
         mock_response.status_code = 200
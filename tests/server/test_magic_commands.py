@@ -15,7 +15,7 @@ async def test_agent_session_magic_command_clear():
     session.ui._push = MagicMock()
     
     # Send /clear
-    await session.send("/clear", executor=None)
+    await session.send("/clear")
     
     assert len(session.agent_state.messages) == 0
     mock_thread_mgr.save_thread_messages.assert_called_with("test-magic-clear", [])
@@ -31,7 +31,7 @@ async def test_agent_session_magic_command_help():
     session.ui._push = MagicMock()
     
     # Send /help
-    await session.send("/help", executor=None)
+    await session.send("/help")
     
     # Check that info/message was printed via ui
     pushed_events = [call.args[0] for call in session.ui._push.call_args_list]
@@ -47,7 +47,7 @@ async def test_agent_session_unrecognized_slash_command():
     session.ui._push = MagicMock()
     
     # Send unknown slash command
-    await session.send("/invalid_command_xyz", executor=None)
+    await session.send("/invalid_command_xyz")
     
     # Check that it did NOT add a human message to agent_state
     assert len(session.agent_state.messages) == 0
@@ -0,0 +1,138 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from kogniterm.server.session_pool import SessionPool, SharedSessionResources
+
+
+@pytest.fixture
+def session_pool(tmp_path):
+    loop = asyncio.new_event_loop()
+    llm = MagicMock()
+    llm.auto_save_interval = None
+    thread_manager = MagicMock()
+    thread_manager.load_thread_messages.return_value = []
+    thread_manager.get_thread.return_value = None
+
+    pool = SessionPool()
+    pool._llm_service = llm
+    pool._loop = loop
+    pool._thread_manager = thread_manager
+    pool._shared = SharedSessionResources(llm)
+    pool.idle_ttl_seconds = 60
+    pool.max_live_sessions = 0
+
+    with patch.object(pool._shared, "vector_db_for", return_value=MagicMock()):
+        yield pool
+    loop.close()
+
+
+def _age(session, seconds):
+    session.last_activity = datetime.utcnow() - timedelta(seconds=seconds)
+
+
+def test_idle_sessions_are_hibernated_after_ttl(session_pool, tmp_path):
+    stale = session_pool.get_or_create("stale", workspace_dir=str(tmp_path))
+    session_pool.get_or_create("fresh", workspace_dir=str(tmp_path))
+    _age(stale, 120)
+
+    assert session_pool.evict_idle() == ["stale"]
+    assert session_pool.get("stale") is None
+    assert session_pool.is_hibernated("stale")
+    assert session_pool.exists("stale")
+    session_pool._thread_manager.save_thread_messages.assert_called_once()
+
+
+def test_lru_overflow_evicts_least_recently_used(session_pool, tmp_path):
+    session_pool.idle_ttl_seconds = 0
+    session_pool.max_live_sessions = 2
+    for sid in ("a", "b", "c"):
+        session_pool.get_or_create(sid, workspace_dir=str(tmp_path))
+    # Volver a usar "a" la convierte en la más reciente
+    session_pool.get_or_create("a")
+
+    assert session_pool.evict_idle() == ["b"]
+    assert set(session_pool._sessions) == {"c", "a"}
+
+
+def test_busy_sessions_are_not_hibernated(session_pool, tmp_path):
+    session = session_pool.get_or_create("busy", workspace_dir=str(tmp_path))
+    _age(session, 120)
+    session.is_running = True
+    assert session_pool.evict_idle() == []
+
+    session.is_running = False
+    # Un websocket conectado cuenta como consumidor activo
+    session.ui._queues.append(object())
+    assert session_pool.evict_idle() == []
+
+    session.ui._queues.clear()
+    assert session_pool.evict_idle() == ["busy"]
+
+
+def test_hibernated_session_rehydrates_transparently(session_pool, tmp_path):
+    session = session_pool.get_or_create("s1", workspace_dir=str(tmp_path))
+    _age(session, 120)
+    session_pool.evict_idle()
+
+    restored = session_pool.get_or_create("s1")
+
+    assert restored is not session
+    assert restored.workspace_dir == str(tmp_path)
+    assert not session_pool.is_hibernated("s1")
+    session_pool._thread_manager.load_thread_messages.assert_called_with("s1")
+
+    metrics = session_pool.metrics()
+    assert metrics["live_sessions"] == 1
+    assert metrics["hibernated_sessions"] == 0
+    assert metrics["evictions"] == 1
+    assert metrics["rehydrations"] == 1
+
+
+def test_delete_forgets_hibernated_session(session_pool, tmp_path):
+    session = session_pool.get_or_create("gone", workspace_dir=str(tmp_path))
+    _age(session, 120)
+    session_pool.evict_idle()
+
+    session_pool.delete("gone")
+    assert not session_pool.exists("gone")
+
+
+def test_hibernated_workspace_is_known_without_rehydrating(session_pool, tmp_path):
+    session = session_pool.get_or_create("h", workspace_dir=str(tmp_path))
+    _age(session, 120)
+    session_pool.evict_idle()
+
+    assert session_pool.workspace_dir_of("h") == str(tmp_path)
+    assert session_pool.is_hibernated("h")
+    assert session_pool.workspace_dir_of("desconocida") is None
+
+
+def test_hibernated_records_are_capped(session_pool, tmp_path):
+    session_pool.max_hibernated_sessions = 2
+    for sid in ("a", "b", "c"):
+        _age(session_pool.get_or_create(sid, workspace_dir=str(tmp_path)), 120)
+    session_pool.evict_idle()
+
+    assert list(session_pool._hibernated) == ["b", "c"]
+
+
+def test_eviction_loop_closes_sessions_off_the_event_loop(session_pool, tmp_path):
+    session = session_pool.get_or_create("lenta", workspace_dir=str(tmp_path))
+    _age(session, 120)
+    closed_in = []
+    session.close = lambda: closed_in.append(threading.current_thread())
+    session_pool.sweep_interval_seconds = 0
+
+    async def sweep_once():
+        task = asyncio.create_task(session_pool._eviction_loop())
+        while not closed_in:
+            await asyncio.sleep(0.01)
+        task.cancel()
+
+    asyncio.run(asyncio.wait_for(sweep_once(), 5))
+    assert closed_in == [closed_in[0]] and closed_in[0] is not threading.main_thread()
+    assert session_pool.is_hibernated("lenta")
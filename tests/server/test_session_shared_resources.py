@@ -0,0 +1,117 @@
+import os
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from kogniterm.server.session_pool import (
+    AgentSession,
+    SharedSessionResources,
+    session_context,
+)
+
+
+def test_session_context_does_not_change_process_cwd(tmp_path):
+    process_cwd = os.path.realpath(os.getcwd())
+    workspace = tmp_path / "ws"
+    workspace.mkdir()
+    (workspace / "sub").mkdir()
+
+    with session_context(cwd=str(workspace)):
+        assert os.getcwd() == str(workspace)
+        os.chdir("sub")
+        assert os.getcwd() == str(workspace / "sub")
+        assert os.path.abspath("file.txt") == str(workspace / "sub" / "file.txt")
+
+    assert os.path.realpath(os.getcwd()) == process_cwd
+
+
+def test_session_context_exposes_ui_and_telemetry_per_context(tmp_path):
+    from kogniterm.core.llm_service import LLMService
+
+    llm_service = LLMService.__new__(LLMService)
+    ui_a, ui_b = MagicMock(), MagicMock()
+
+    with session_context(cwd=str(tmp_path), llm_service=llm_service, terminal_ui=ui_a):
+        assert llm_service.terminal_ui is ui_a
+        with session_context(cwd=str(tmp_path), llm_service=llm_service, terminal_ui=ui_b):
+            assert llm_service.terminal_ui is ui_b
+        assert llm_service.terminal_ui is ui_a
+
+    assert llm_service.terminal_ui is None
+
+
+def test_session_context_exposes_session_id(tmp_path):
+    from kogniterm.core.llm_service import LLMService
+
+    llm_service = LLMService.__new__(LLMService)
+    own = llm_service.session_id
+
+    with session_context(cwd=str(tmp_path), llm_service=llm_service, session_id="s-a"):
+        assert llm_service.session_id == "s-a"
+    assert llm_service.session_id == own
+
+
+def test_shared_resources_cache_per_workspace(tmp_path):
+    shared = SharedSessionResources(MagicMock())
+    ws = str(tmp_path)
+
+    assert shared.workspace_context_for(ws) is shared.workspace_context_for(ws + "/")
+
+    sentinel = object()
+    with patch(
+        "kogniterm.core.context.vector_db_manager.VectorDBManager.get_for_path",
+        return_value=sentinel,
+    ) as get_for_path:
+        assert shared.vector_db_for(ws) is sentinel
+        get_for_path.assert_called_once_with(ws)
+
+
+@pytest.mark.asyncio
+async def test_sessions_share_heavy_resources(tmp_path):
+    loop = asyncio.get_event_loop()
+    llm = MagicMock()
+    llm.auto_save_interval = None
+    shared = SharedSessionResources(llm)
+    vdb = MagicMock()
+
+    with patch.object(shared, "vector_db_for", return_value=vdb):
+        a = AgentSession("a", llm, loop, thread_manager=MagicMock(), workspace_dir=str(tmp_path), shared=shared)
+        b = AgentSession("b", llm, loop, thread_manager=MagicMock(), workspace_dir=str(tmp_path), shared=shared)
+
+    assert a.vector_db_manager is b.vector_db_manager is vdb
+    assert a.workspace_context is b.workspace_context
+    # El estado mutable sigue siendo por sesión
+    assert a.history_manager is not b.history_manager
+    assert a.ui is not b.ui
+
+
+def test_relative_tool_paths_resolve_against_session_cwd(tmp_path):
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    from langchain_core.tools import tool
+
+    from kogniterm.core.llm_service import LLMService
+
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "dentro.txt").write_text("x", encoding="utf-8")
+
+    @tool
+    def listar(path: str) -> str:
+        """Lista un directorio."""
+        return ",".join(sorted(os.listdir(path)))
+
+    llm_service = LLMService.__new__(LLMService)
+    llm_service.skill_manager = None
+    llm_service.interrupt_queue = None
+    llm_service.tool_poll_timeout = 0.1
+    llm_service.tool_execution_lock = threading.Lock()
+    llm_service.tool_executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        with session_context(cwd=str(tmp_path), llm_service=llm_service):
+            out = list(llm_service._invoke_tool_with_interrupt(listar, {"path": "sub"}))
+    finally:
+        llm_service.tool_executor.shutdown()
+
+    assert out == ["dentro.txt"]
@@ -0,0 +1,157 @@
+import asyncio
+import functools
+import importlib
+import os
+from typing import TypedDict
+from unittest.mock import MagicMock, patch
+
+from langgraph.graph import END, StateGraph
+
+from kogniterm.core.agents.config_manager import AgentConfigManager
+from kogniterm.core.agents.graph_cache import (
+    BOUND_INTERRUPT_QUEUE,
+    BOUND_UI,
+    AgentGraphCache,
+    bind_agent_runtime,
+    bound_node,
+    get_agent_graph_cache,
+)
+from kogniterm.core.delegation import AgentRole, DelegationManager
+
+
+def _write_agent(workspace, prompt="Prompt inicial."):
+    agents_dir = workspace / ".agents"
+    agents_dir.mkdir(parents=True, exist_ok=True)
+    path = agents_dir / "cached_agent.md"
+    path.write_text(f"---\nname: cached_agent\nrole: leaf\n---\n{prompt}\n", encoding="utf-8")
+    return path
+
+
+def test_shared_config_manager_parses_once_until_files_change(tmp_path, monkeypatch):
+    path = _write_agent(tmp_path)
+    parsed = []
+    original = AgentConfigManager._parse_file
+    monkeypatch.setattr(AgentConfigManager, "_parse_file", lambda self, p: (parsed.append(p), original(self, p))[1])
+
+    first = AgentConfigManager.shared(str(tmp_path))
+    count = len(parsed)
+    for _ in range(8):
+        manager = AgentConfigManager.shared(str(tmp_path))
+        assert manager is first
+        assert manager.get_agent_config("cached_agent")["system_prompt"] == "Prompt inicial."
+    assert len(parsed) == count
+
+    _write_agent(tmp_path, prompt="Prompt editado.")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert AgentConfigManager.shared(str(tmp_path)).get_agent_config("cached_agent")["system_prompt"] == "Prompt editado."
+    assert len(parsed) > count
+
+
+class _State(TypedDict):
+    seen: str
+
+
+def _node(state, terminal_ui=None):
+    return {"seen": terminal_ui.panel_id}
+
+
+def test_cached_graph_sees_the_ui_bound_by_each_run():
+    cache = AgentGraphCache()
+    service = MagicMock()
+
+    def build():
+        workflow = StateGraph(_State)
+        workflow.add_node("n", functools.partial(_node, terminal_ui=BOUND_UI))
+        workflow.set_entry_point("n")
+        workflow.add_edge("n", END)
+        return workflow.compile()
+
+    async def run(panel_id):
+        graph = cache.get_or_build(("dynamic", None), service, build)
+        with bind_agent_runtime(MagicMock(panel_id=panel_id), None):
+            return (await graph.ainvoke({"seen": ""}))["seen"]
+
+    async def main():
+        return await asyncio.gather(*(run(f"panel_{i}") for i in range(8)))
+
+    assert asyncio.run(main()) == [f"panel_{i}" for i in range(8)]
+    assert cache.stats() == {"entries": 1, "hits": 7, "builds": 1}
+    assert not BOUND_UI
+
+
+def _keyboard_node(state, interrupt_queue=None):
+    # Como KeyboardHandler: la cola se usa desde un hilo sin el contexto del nodo
+    import threading
+
+    errors = []
+
+    def press_esc():
+        try:
+            interrupt_queue.put(True)
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=press_esc)
+    thread.start()
+    thread.join()
+    return {"seen": repr(errors)}
+
+
+def test_bound_node_resolves_proxies_before_handing_them_to_threads():
+    import queue
+
+    workflow = StateGraph(_State)
+    workflow.add_node("n", bound_node(_keyboard_node, interrupt_queue=BOUND_INTERRUPT_QUEUE))
+    workflow.set_entry_point("n")
+    workflow.add_edge("n", END)
+    graph = workflow.compile()
+
+    interrupts = queue.Queue()
+    with bind_agent_runtime(None, interrupts):
+        assert graph.invoke({"seen": ""})["seen"] == "[]"
+    assert interrupts.get_nowait() is True
+
+
+def test_graph_cache_is_per_llm_service_and_key():
+    cache = AgentGraphCache()
+    a, b = MagicMock(), MagicMock()
+    assert cache.get_or_build("k", a, object) is cache.get_or_build("k", a, object)
+    assert cache.get_or_build("k", a, object) is not cache.get_or_build("k", b, object)
+    assert cache.get_or_build("k", a, object) is not cache.get_or_build("otra", a, object)
+
+
+def test_parallel_fan_out_builds_one_graph(tmp_path):
+    _write_agent(tmp_path)
+    tool_module = importlib.import_module("kogniterm.skills.bundled.call-agents-parallel.scripts.tool")
+
+    llm_service = MagicMock()
+    llm_service.current_workspace_dir = str(tmp_path)
+    llm_service.delegation_manager = DelegationManager()
+    llm_service.delegation_manager.register_agent(
+        agent_id="parallel_orchestrator", parent_id=None, role=AgentRole.ORCHESTRATOR
+    )
+
+    builds, panels = [], []
+
+    def fake_build(agent_type, system_prompt, svc, ui, interrupt):
+        builds.append(agent_type)
+        graph = MagicMock()
+
+        async def ainvoke(state, config=None):
+            panels.append(BOUND_UI.panel_id)
+            return {"completed": True, "result": "ok"}
+
+        graph.ainvoke = ainvoke
+        return graph
+
+    specs = [{"name": f"agente_{i}", "type": "cached_agent", "task": "t"} for i in range(8)]
+    with patch.object(tool_module, "_build_agent_graph", side_effect=fake_build), \
+         patch.object(tool_module, "_request_autonomous_execution", return_value=True), \
+         patch.object(tool_module, "_activate_parallel_container", return_value=None):
+        res = tool_module.call_agents_parallel(agents=specs, llm_service=llm_service, terminal_ui=None)
+
+    assert res.count("ok") == 8
+    assert builds == ["cached_agent"]
+    assert len(set(panels)) == 8
+    get_agent_graph_cache().clear()
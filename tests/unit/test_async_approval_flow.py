@@ -0,0 +1,137 @@
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from kogniterm.core.agent_state import AgentState
+from kogniterm.terminal.command_approval_handler import CommandApprovalHandler
+
+
+class DummyLLMService:
+    def _save_history(self, messages):
+        pass
+
+
+class DummyCommandExecutor:
+    workspace_directory = "/tmp"
+
+
+class AsyncOnlyUI:
+    """UI que solo admite aprobaciones esperadas: bloquear un hilo es un error."""
+
+    def __init__(self, answer: bool):
+        self.answer = answer
+        self.requests = []
+
+    async def ask_approval_async(self, message: str, title: str = "", **kwargs) -> bool:
+        self.requests.append({"message": message, **kwargs})
+        await asyncio.sleep(0)
+        return self.answer
+
+    def ask_approval_sync(self, *args, **kwargs):
+        raise AssertionError("ask_approval_sync no debe usarse en la ruta asíncrona")
+
+    def update_live(self, renderable):
+        pass
+
+    def stop_live(self):
+        pass
+
+    def print_message(self, *args, **kwargs):
+        pass
+
+    def get_interrupt_queue(self):
+        return None
+
+
+def _handler(ui):
+    return CommandApprovalHandler(
+        llm_service=DummyLLMService(),
+        command_executor=DummyCommandExecutor(),
+        prompt_session=None,
+        terminal_ui=ui,
+        agent_state=AgentState(messages=[AIMessage(content="Escribiendo archivo")]),
+    )
+
+
+def _write_request(file_path):
+    return dict(
+        command_to_execute="",
+        raw_tool_output={
+            "status": "requires_confirmation",
+            "operation": "write_file",
+            "path": str(file_path),
+            "args": {"path": str(file_path), "content": "line 1\nline 2\n"},
+        },
+        tool_name="write_file",
+        original_tool_args={"path": str(file_path), "content": "line 1\nline 2\n"},
+    )
+
+
+@pytest.mark.asyncio
+async def test_async_approval_is_awaited_and_applies_change(tmp_path):
+    file_path = tmp_path / "output.txt"
+    file_path.write_text("line 1\n", encoding="utf-8")
+    ui = AsyncOnlyUI(answer=True)
+
+    result = await _handler(ui).ahandle_command_approval(**_write_request(file_path))
+
+    assert result["approved"] is True
+    assert len(ui.requests) == 1
+    assert "+line 2" in ui.requests[0]["diff_content"]
+    assert file_path.read_text(encoding="utf-8") == "line 1\nline 2\n"
+
+
+@pytest.mark.asyncio
+async def test_async_denial_leaves_file_untouched(tmp_path):
+    file_path = tmp_path / "output.txt"
+    file_path.write_text("line 1\n", encoding="utf-8")
+
+    result = await _handler(AsyncOnlyUI(answer=False)).ahandle_command_approval(
+        **_write_request(file_path)
+    )
+
+    assert result["approved"] is False
+    assert file_path.read_text(encoding="utf-8") == "line 1\n"
+
+
+@pytest.mark.asyncio
+async def test_session_turn_awaits_approval_on_event_loop(tmp_path):
+    from kogniterm.server.session_pool import AgentSession
+
+    loop = asyncio.get_running_loop()
+    llm = MagicMock()
+    llm.auto_save_interval = None
+    thread_manager = MagicMock()
+    thread_manager.load_thread_messages.return_value = []
+    session = AgentSession(
+        "async-turn", llm, loop, thread_manager=thread_manager, workspace_dir=str(tmp_path)
+    )
+    session.command_approval_handler = None
+
+    turns = [{"command_to_confirm": "ls -la"}, {}]
+    manager = MagicMock()
+
+    async def ainvoke_agent(user_input):
+        return turns.pop(0)
+
+    manager.ainvoke_agent = ainvoke_agent
+    session.manager = manager
+
+    task = asyncio.create_task(session._run_agent_loop("hola"))
+    for _ in range(100):
+        if session.ui.has_pending_requests():
+            break
+        await asyncio.sleep(0.01)
+
+    # La espera es un futuro asíncrono, no un hilo aparcado
+    assert session.ui._pending_approvals_async
+    assert not session.ui._pending_approvals
+
+    request_id = next(iter(session.ui._pending_approvals_async))
+    session.ui.handle_approval_response(request_id, True)
+    await asyncio.wait_for(task, timeout=5)
+
+    assert turns == []
+    assert session.agent_state.command_to_confirm is None
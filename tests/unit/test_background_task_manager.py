@@ -56,3 +56,48 @@ def test_background_task_kill():
     success = manager.kill_task(task.task_id)
     assert success is True
     assert task.status == STATUS_KILLED
+
+
+def test_output_memory_is_bounded_and_spills_to_disk():
+    from kogniterm.core.output_ring_buffer import OutputRingBuffer
+
+    buf = OutputRingBuffer(max_memory_bytes=1024, max_spill_bytes=4096)
+    for i in range(2000):
+        buf.append(f"line {i}\n")
+
+    assert buf.memory_bytes <= 1024 + 16
+    assert buf.tail(3) == "line 1997\nline 1998\nline 1999\n"
+    # Las líneas volcadas a disco siguen accesibles mientras no se roten
+    assert "line 1500\n" in buf.tail(500)
+
+    text, cursor, lost = buf.read_since(0)
+    assert lost > 0
+    assert text.endswith("line 1999\n")
+    assert cursor == buf.total_bytes
+    buf.close()
+
+
+def test_incremental_reads_return_only_new_output():
+    from kogniterm.core.background_task_manager import BackgroundTask
+
+    task = BackgroundTask("task-x", "tail -f log")
+    task.append_output("uno\n")
+    assert task.read_output()["output"] == "uno\n"
+    assert task.read_output()["output"] == ""
+
+    task.append_output("dos\ntres\n")
+    chunk = task.read_output()
+    assert chunk["output"] == "dos\ntres\n"
+    assert chunk["lost_bytes"] == 0
+    assert task.get_output(tail_lines=1) == "tres\n"
+    assert task.to_dict()["output_bytes"] == len("uno\ndos\ntres\n")
+
+
+def test_cursor_reads_do_not_split_multibyte_characters():
+    from kogniterm.core.output_ring_buffer import OutputRingBuffer
+
+    buf = OutputRingBuffer()
+    buf.append("ñandú")
+    text, cursor, _ = buf.read_since(0, max_bytes=2)
+    rest, _, _ = buf.read_since(cursor)
+    assert text + rest == "ñandú"
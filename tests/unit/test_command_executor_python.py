@@ -1,44 +1,31 @@
 import os
 import pytest
-from kogniterm.core.command_executor import CommandExecutor, _transform_python3_dash_c
+from kogniterm.core.command_executor import CommandExecutor, _inline_python3_dash_c
 
 
-def test_transform_python3_dash_c_double_quotes():
+def test_inline_python3_dash_c_double_quotes():
     cmd = 'python3 -c "import time; print(\'hello\')"'
-    transformed, was_transformed, temp_path = _transform_python3_dash_c(cmd)
-    
+    transformed, was_transformed = _inline_python3_dash_c(cmd)
+
     assert was_transformed is True
-    assert temp_path is not None
     assert "-u" in transformed
-    assert temp_path in transformed
-    
-    # Cleanup temp file
-    if os.path.exists(temp_path):
-        os.unlink(temp_path)
+    assert transformed == "python3 -u -c $'import time; print(\\'hello\\')'"
 
 
-def test_transform_python3_dash_c_single_quotes():
+def test_inline_python3_dash_c_single_quotes():
     cmd = "python -c 'print(\"test\")'"
-    transformed, was_transformed, temp_path = _transform_python3_dash_c(cmd)
-    
+    transformed, was_transformed = _inline_python3_dash_c(cmd)
+
     assert was_transformed is True
-    assert temp_path is not None
-    assert "-u" in transformed
-    assert temp_path in transformed
-    
-    if os.path.exists(temp_path):
-        os.unlink(temp_path)
+    assert transformed == "python -u -c $'print(\"test\")'"
 
 
-def test_transform_python3_dash_c_already_has_unbuffered_flag():
+def test_inline_python3_dash_c_already_has_unbuffered_flag():
     cmd = 'python3 -u -c "print(123)"'
-    transformed, was_transformed, temp_path = _transform_python3_dash_c(cmd)
-    
+    transformed, was_transformed = _inline_python3_dash_c(cmd)
+
     assert was_transformed is True
     assert transformed.count("-u") == 1
-    
-    if temp_path and os.path.exists(temp_path):
-        os.unlink(temp_path)
 
 
 def test_command_executor_python_execution():
@@ -64,36 +51,73 @@ def test_command_executor_python_multiline():
     assert "num_2" in output
 
 
-def test_transform_python3_dash_c_triple_quotes():
+def test_inline_python3_dash_c_triple_quotes():
     cmd = 'python3 -c """import sys\nfor i in range(2):\n    print(f"triple_{i}")"""'
-    transformed, was_transformed, temp_path = _transform_python3_dash_c(cmd)
-    
+    transformed, was_transformed = _inline_python3_dash_c(cmd)
+
     assert was_transformed is True
-    assert temp_path is not None
     assert "-u" in transformed
-    
-    with open(temp_path, "r", encoding="utf-8") as f:
-        content = f.read()
-    assert 'print(f"triple_{i}")' in content
-    
-    if os.path.exists(temp_path):
-        os.unlink(temp_path)
+    assert 'print(f"triple_{i}")' in transformed
 
 
-def test_transform_python3_dash_c_no_catastrophic_backtracking():
+def test_inline_python3_dash_c_no_catastrophic_backtracking():
     import time
     # Comando extenso con múltiples espacios y flags que anteriormente causaba congelamiento por ReDoS
     cmd = "python " + " -v" * 30 + " -c \"print(" + "1 + " * 50 + "1)\""
-    
+
     t0 = time.time()
-    transformed, was_transformed, temp_path = _transform_python3_dash_c(cmd)
+    transformed, was_transformed = _inline_python3_dash_c(cmd)
     t1 = time.time()
-    
+
     # Debe completarse casi instantáneamente (< 0.05 segundos) sin bloquear el hilo
     assert (t1 - t0) < 0.05
     assert was_transformed is True
-    assert temp_path is not None
-    
-    if os.path.exists(temp_path):
-        os.unlink(temp_path)
 
+
+def test_inline_python3_dash_c_passes_code_as_single_line_argument():
+    cmd = 'python3 -c "for i in range(2):\n    print(\'it\\\'s\', i)"'
+    transformed, was_transformed = _inline_python3_dash_c(cmd)
+
+    assert was_transformed is True
+    assert "\n" not in transformed
+    assert transformed.startswith("python3 -u -c $'for i in range(2):\\n")
+
+
+def test_command_executor_runs_multiline_without_temp_files(monkeypatch):
+    import tempfile
+
+    def _no_temp_files(*args, **kwargs):
+        raise AssertionError("execute no debe crear archivos temporales")
+
+    monkeypatch.setattr(tempfile, "mkstemp", _no_temp_files)
+    executor = CommandExecutor()
+    try:
+        output = "".join(executor.execute("export KT_VAR=multi\nfor i in 1 2; do echo \"$KT_VAR-$i\"; done"))
+        assert "multi-1" in output and "multi-2" in output
+        assert executor.last_exit_code == 0
+
+        output = "".join(executor.execute('python3 -c "import sys\nprint(\'py-ok\')\nsys.exit(3)"'))
+        assert "py-ok" in output
+        assert executor.last_exit_code == 3
+        assert "##KOGNITERM_DONE" not in output
+    finally:
+        executor.close()
+
+
+def test_command_executor_feeds_large_commands_without_echo_or_hang():
+    executor = CommandExecutor()
+    try:
+        for size in (3500, 7000, 14000, 70000):
+            body = "\n".join(f"x{i} = {i}  # relleno" for i in range(size // 20))
+            cmd = f'python3 -c "{body}\nprint(\'grande-ok\', x1)"'
+            output = "".join(executor.execute(cmd))
+            assert output == "grande-ok 1\n"
+            assert executor.last_exit_code == 0
+
+        # Un comando multilínea largo sigue ejecutándose en el mismo shell
+        script = "\n".join(["export KT_LARGE=si"] + ["true"] * 400)
+        assert "".join(executor.execute(script)) == ""
+        assert "".join(executor.execute('echo "[$KT_LARGE]"')) == "[si]\n"
+        assert os.listdir(executor._fifo_dir) == []
+    finally:
+        executor.close()
@@ -0,0 +1,120 @@
+import json
+import queue
+import threading
+from types import SimpleNamespace
+
+from kogniterm.core.agents.tool_executor import ToolExecutor
+from kogniterm.core.early_tool_dispatch import EarlyToolDispatcher
+from kogniterm.core.llm.streaming_executor import StreamingExecutor
+from kogniterm.core.skills.tool_effects import parse_tool_effects
+
+EFFECTS = {
+    "read_file_tool": parse_tool_effects(["read_only", "idempotent"]),
+    "write_file_tool": parse_tool_effects(["writes_files"]),
+}
+
+
+class _SkillManager:
+    def get_tool_effects(self, name):
+        return EFFECTS.get(name)
+
+    def get_skill_for_tool(self, name):
+        return None
+
+
+class _LLM:
+    def __init__(self):
+        self.skill_manager = _SkillManager()
+        self.calls = []
+        self.started = threading.Event()
+
+    def get_tool(self, name):
+        return name
+
+    def _invoke_tool_with_interrupt(self, tool, tool_args, delegation_context=None):
+        self.calls.append((tool, dict(tool_args)))
+        self.started.set()
+        yield f"{tool}:{tool_args.get('path')}"
+
+
+def _tool_chunk(index, id=None, name=None, arguments=None):
+    function = SimpleNamespace(name=name, arguments=arguments)
+    tc = SimpleNamespace(index=index, id=id, function=function)
+    delta = SimpleNamespace(content=None, reasoning_content=None, tool_calls=[tc])
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+def _text_chunk(text):
+    delta = SimpleNamespace(content=text, reasoning_content=None, tool_calls=None)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+def _run(chunks, llm, interrupt_queue=None):
+    stream = EarlyToolDispatcher.for_service(llm).stream()
+    executor = StreamingExecutor(provider_config=None, interrupt_queue=interrupt_queue)
+    out = list(executor.execute_stream(
+        {"model": "m", "response_generator": chunks}, lambda text: [], lambda: "gen", early_dispatch=stream
+    ))
+    return out[-1], stream
+
+
+def test_read_only_call_runs_while_stream_continues_and_is_claimed():
+    llm = _LLM()
+    seen_mid_stream = []
+
+    def chunks():
+        yield _tool_chunk(0, id="c1", name="read_file_tool", arguments='{"path": ')
+        yield _tool_chunk(0, arguments='"a.py"}')
+        yield _tool_chunk(1, id="c2", name="read_file_tool", arguments='{"path": "b.py"}')
+        # El modelo sigue generando: la primera lectura ya debe estar en marcha
+        seen_mid_stream.append(llm.started.wait(2))
+        yield _text_chunk("Leyendo ambos archivos...")
+
+    message, stream = _run(chunks(), llm)
+    assert seen_mid_stream == [True]
+    assert stream.dispatched == {"c1", "c2"}
+
+    results = [ToolExecutor.execute_single_tool(tc, llm)[1] for tc in message.tool_calls]
+    assert results == ["read_file_tool:a.py", "read_file_tool:b.py"]
+    assert len(llm.calls) == 2
+    assert llm._early_tool_dispatcher.stats["claimed"] == 2
+
+
+def test_calls_after_a_write_are_not_dispatched_early():
+    llm = _LLM()
+
+    def chunks():
+        yield _tool_chunk(0, id="w", name="write_file_tool", arguments='{"path": "a.py"}')
+        yield _tool_chunk(1, id="r", name="read_file_tool", arguments='{"path": "a.py"}')
+        yield _text_chunk("hecho")
+
+    message, stream = _run(chunks(), llm)
+    assert stream.dispatched == set()
+    assert llm.calls == []
+    assert [tc["name"] for tc in message.tool_calls] == ["write_file_tool", "read_file_tool"]
+
+
+def test_interrupted_stream_cancels_early_calls():
+    llm = _LLM()
+    interrupts = queue.Queue()
+
+    def chunks():
+        yield _tool_chunk(0, id="c1", name="read_file_tool", arguments='{"path": "a.py"}')
+        llm.started.wait(2)
+        interrupts.put("stop")
+        yield _text_chunk("...")
+
+    message, stream = _run(chunks(), llm, interrupt_queue=interrupts)
+    assert stream.dispatched == set()
+    assert llm._early_tool_dispatcher.stats["cancelled"] == 1
+
+    # El agente vuelve a ejecutarla de la forma habitual (sin reutilizar nada)
+    tc = {"id": "c1", "name": "read_file_tool", "args": {"path": "a.py"}}
+    assert EarlyToolDispatcher.claim_for(llm, tc) is None
+
+
+def test_claim_rejects_mismatched_arguments():
+    llm = _LLM()
+    stream = EarlyToolDispatcher.for_service(llm).stream()
+    stream.observe([{"id": "c1", "function": {"name": "read_file_tool", "arguments": json.dumps({"path": "a.py"})}}])
+    assert EarlyToolDispatcher.claim_for(llm, {"id": "c1", "name": "read_file_tool", "args": {"path": "b.py"}}) is None
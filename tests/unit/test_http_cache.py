@@ -0,0 +1,171 @@
+import base64
+import importlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from kogniterm.core.http_cache import HttpCache, freshness_lifetime
+
+FILES = {
+    "README.md": "# Demo\n",
+    "src/app.py": "print('hola')\n",
+    "src/util/helpers.py": "def ayuda():\n    pass\n",
+}
+
+DIRS = {
+    "": [{"type": "file", "name": "README.md", "path": "README.md", "sha": "sha-readme"},
+         {"type": "dir", "name": "src", "path": "src", "sha": "sha-src"}],
+    "src": [{"type": "file", "name": "app.py", "path": "src/app.py", "sha": "sha-app"},
+            {"type": "dir", "name": "util", "path": "src/util", "sha": "sha-util"}],
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    requests_seen = []
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json(self, data, etag):
+        if self.headers.get("If-None-Match") == etag:
+            return self._send(304, headers={"ETag": etag})
+        self._send(200, json.dumps(data).encode(), {
+            "Content-Type": "application/json; charset=utf-8",
+            "ETag": etag,
+            "Cache-Control": "private, max-age=60",
+        })
+
+    def do_GET(self):
+        self.requests_seen.append((self.path, self.headers.get("If-None-Match")))
+        if self.path == "/etag":
+            if self.headers.get("If-None-Match") == '"v1"':
+                return self._send(304, headers={"ETag": '"v1"'})
+            return self._send(200, "versión 1".encode(), {
+                "Content-Type": "text/plain; charset=utf-8", "ETag": '"v1"', "Cache-Control": "no-cache",
+            })
+        if self.path == "/fresh":
+            return self._send(200, b"fresco", {"Cache-Control": "max-age=60"})
+        if self.path == "/nostore":
+            return self._send(200, b"privado", {"Cache-Control": "no-store", "ETag": '"x"'})
+        if self.path == "/repos/o/r":
+            return self._json({"full_name": "o/r", "name": "r", "default_branch": "main"}, '"repo"')
+        if self.path == "/repos/o/r/git/trees/main?recursive=1":
+            tree = [{"path": "README.md", "type": "blob"}, {"path": "src", "type": "tree"},
+                    {"path": "src/app.py", "type": "blob"}, {"path": "src/util", "type": "tree"},
+                    {"path": "src/util/helpers.py", "type": "blob"}]
+            return self._json({"tree": tree, "truncated": False}, '"tree"')
+        if self.path == "/repos/o/r/git/trees/sha-src?recursive=1":
+            tree = [{"path": "app.py", "type": "blob"}, {"path": "util", "type": "tree"},
+                    {"path": "util/helpers.py", "type": "blob"}]
+            return self._json({"tree": tree, "truncated": False}, '"tree-src"')
+        prefix = "/repos/o/r/contents/"
+        if self.path.startswith(prefix) and self.path[len(prefix):] in DIRS:
+            return self._json(DIRS[self.path[len(prefix):]], f'"dir-{self.path}"')
+        if self.path.startswith(prefix) and self.path[len(prefix):] in FILES:
+            path = self.path[len(prefix):]
+            content = base64.b64encode(FILES[path].encode()).decode()
+            return self._json({"type": "file", "name": path.rsplit("/", 1)[-1], "path": path,
+                               "encoding": "base64", "content": content}, f'"{path}"')
+        self._send(404, b'{"message": "Not Found"}')
+
+
+@pytest.fixture
+def server():
+    _Handler.requests_seen = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+
+def test_etag_revalidation_reuses_stored_body(server, tmp_path):
+    cache = HttpCache(cache_dir=str(tmp_path), max_bytes=10**6, enabled=True)
+    first = cache.get(server + "/etag")
+    second = HttpCache(cache_dir=str(tmp_path), max_bytes=10**6, enabled=True).get(server + "/etag")
+
+    assert first.text == second.text == "versión 1"
+    assert not first.from_cache and second.revalidated
+    assert _Handler.requests_seen == [("/etag", None), ("/etag", '"v1"')]
+
+
+def test_max_age_serves_without_network_and_no_store_is_never_kept(server, tmp_path):
+    cache = HttpCache(cache_dir=str(tmp_path), max_bytes=10**6, enabled=True)
+    assert cache.get(server + "/fresh").content == b"fresco"
+    assert cache.get(server + "/fresh").from_cache
+    cache.get(server + "/nostore")
+    assert not cache.get(server + "/nostore").from_cache
+    assert [p for p, _ in _Handler.requests_seen] == ["/fresh", "/nostore", "/nostore"]
+
+
+def test_authorization_separates_entries_and_eviction_keeps_size_bounded(server, tmp_path):
+    assert HttpCache.cache_key("u", {"Authorization": "a"}) != HttpCache.cache_key("u", {"Authorization": "b"})
+    cache = HttpCache(cache_dir=str(tmp_path), max_bytes=10, enabled=True)
+    cache.get(server + "/fresh")
+    cache.get(server + "/etag")
+    assert cache._size <= 10
+
+
+def test_storing_a_key_again_replaces_its_size(server, tmp_path):
+    cache = HttpCache(cache_dir=str(tmp_path), max_bytes=10**6, enabled=True)
+    cache.get(server + "/fresh")
+    cache._store(HttpCache.cache_key(server + "/fresh"), server + "/fresh", 200, {}, b"fresco")
+    assert cache._size == len(b"fresco") == cache._scan_size()
+
+
+def test_freshness_lifetime():
+    assert freshness_lifetime({"cache-control": "public, max-age=120"}) == 120
+    assert freshness_lifetime({"cache-control": "no-cache, max-age=120"}) == 0
+    assert freshness_lifetime({
+        "date": "Mon, 10 Jun 2024 10:00:00 GMT", "last-modified": "Mon, 10 Jun 2024 00:00:00 GMT",
+    }) == pytest.approx(3600)
+
+
+def test_github_recursive_read_uses_tree_and_cache(server, tmp_path, monkeypatch):
+    github_tool = importlib.import_module("kogniterm.skills.bundled.web-tools.scripts.github")
+    cache = HttpCache(cache_dir=str(tmp_path), max_bytes=10**6, enabled=True)
+    monkeypatch.setattr(github_tool, "GITHUB_API_URL", server)
+    monkeypatch.setattr(github_tool, "get_http_cache", lambda: cache)
+    monkeypatch.delenv("GITHUB_TOKEN", raising=False)
+
+    out = github_tool.github("read_recursive_directory", repo_name="o/r", path="")
+    assert out.index("- Archivo: README.md") < out.index("#### Directorio: src\n") < out.index(
+        "- Archivo: src/app.py") < out.index("#### Directorio: src/util\n") < out.index("def ayuda()")
+    assert "### Contenido de 'src/util/helpers.py'" in out
+    network_calls = len(_Handler.requests_seen)
+    assert network_calls == 2 + len(FILES)
+
+    assert github_tool.github("read_recursive_directory", repo_name="o/r", path="") == out
+    assert len(_Handler.requests_seen) == network_calls
+
+    single = github_tool.github("read_recursive_directory", repo_name="o/r", path="src/app.py")
+    assert "print('hola')" in single
+    assert "Error" in github_tool.github("read_file", repo_name="o/r", path="falta.py")
+
+
+def test_github_subdirectory_reads_only_its_subtree(server, tmp_path, monkeypatch):
+    github_tool = importlib.import_module("kogniterm.skills.bundled.web-tools.scripts.github")
+    cache = HttpCache(cache_dir=str(tmp_path), max_bytes=10**6, enabled=True)
+    monkeypatch.setattr(github_tool, "GITHUB_API_URL", server)
+    monkeypatch.setattr(github_tool, "get_http_cache", lambda: cache)
+    monkeypatch.delenv("GITHUB_TOKEN", raising=False)
+
+    out = github_tool.github("read_recursive_directory", repo_name="o/r", path="src")
+    assert out.index("- Archivo: src/app.py") < out.index("#### Directorio: src/util\n") < out.index("def ayuda()")
+    assert "README.md" not in out
+    paths = [p for p, _ in _Handler.requests_seen]
+    assert "/repos/o/r/git/trees/sha-src?recursive=1" in paths
+    assert "/repos/o/r/git/trees/main?recursive=1" not in paths
+
+    missing = github_tool.github("read_recursive_directory", repo_name="o/r", path="src/nada")
+    assert missing.startswith("Error") and "no existe" in missing
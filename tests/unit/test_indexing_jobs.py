@@ -0,0 +1,243 @@
+import asyncio
+import os
+
+import pytest
+
+from kogniterm.core.context.indexing_jobs import (
+    IndexingJobManager,
+    _checkpoint_path,
+    interactive_priority,
+)
+
+
+class FakeEmbeddings:
+    def generate_embeddings(self, texts):
+        return [[0.1, 0.2] for _ in texts]
+
+
+class FakeIndexer:
+    """Indexador mínimo: un chunk por archivo, estado de archivos en memoria compartida."""
+
+    state = {}
+
+    def __init__(self, workspace, gate=None, block_on=None):
+        self.workspace = workspace
+        self.gate = gate
+        self.block_on = block_on
+        self.embeddings_service = FakeEmbeddings()
+        self.chunked = []
+
+    def list_code_files(self, path):
+        return sorted(os.path.join(path, f) for f in os.listdir(path) if f.endswith(".py"))
+
+    def chunk_file(self, file_path):
+        if self.gate is not None and file_path == self.block_on and not self.gate.is_set():
+            self.gate.wait()
+            return []
+        self.chunked.append(file_path)
+        return [{"content": open(file_path).read(), "file_path": file_path,
+                 "start_line": 1, "end_line": 1}]
+
+    def _load_file_state(self):
+        return FakeIndexer.state.get(self.workspace, {})
+
+    def build_current_file_state(self):
+        return {f: os.stat(f).st_mtime for f in self.list_code_files(self.workspace)}
+
+    def _save_file_state(self, state):
+        FakeIndexer.state[self.workspace] = state
+
+    def get_changed_files(self):
+        stored = self._load_file_state()
+        current = self.build_current_file_state()
+        return {
+            "changed": [f for f in current if f in stored and stored[f] != current[f]],
+            "new": [f for f in current if f not in stored],
+            "deleted": [f for f in stored if f not in current],
+        }
+
+
+class FakeVDB:
+    def __init__(self):
+        self.chunks = []
+        self.cleared = 0
+        self.deleted = []
+
+    def clear_collection(self):
+        self.cleared += 1
+        self.chunks = []
+
+    def add_chunks(self, chunks):
+        self.chunks.extend(chunks)
+
+    def delete_file_chunks(self, paths):
+        self.deleted.extend(paths)
+        self.chunks = [c for c in self.chunks if c["file_path"] not in paths]
+
+    def is_indexed(self):
+        return bool(self.chunks)
+
+
+def _workspace(tmp_path, n=4):
+    for i in range(n):
+        (tmp_path / f"mod{i}.py").write_text(f"x = {i}\n")
+    return str(tmp_path)
+
+
+def _manager(indexers, vdb, gate=None, block_on=None, batch_size=1):
+    def make_indexer(ws):
+        indexer = FakeIndexer(ws, gate, block_on)
+        indexers.append(indexer)
+        return indexer
+
+    return IndexingJobManager(batch_size=batch_size, indexer_factory=make_indexer,
+                              vdb_factory=lambda ws: vdb)
+
+
+@pytest.fixture(autouse=True)
+def _reset_state():
+    FakeIndexer.state = {}
+
+
+@pytest.mark.asyncio
+async def test_repeated_requests_coalesce_into_one_job(tmp_path):
+    ws = _workspace(tmp_path)
+    indexers, vdb = [], FakeVDB()
+    manager = _manager(indexers, vdb)
+    events = []
+
+    job = manager.submit(ws, listener=lambda t, d: events.append(t))
+    assert manager.submit(ws) is job
+    await job.task
+
+    assert job.status == "completed"
+    assert len(vdb.chunks) == 4
+    assert vdb.cleared == 1
+    assert events.count("indexing_complete") == 1
+    assert "indexing_progress" in events
+    assert not os.path.exists(_checkpoint_path(ws))
+
+
+@pytest.mark.asyncio
+async def test_request_during_run_triggers_single_incremental_pass(tmp_path):
+    ws = _workspace(tmp_path)
+    indexers, vdb = [], FakeVDB()
+    manager = _manager(indexers, vdb)
+
+    job = manager.submit(ws)
+    await asyncio.sleep(0)
+    while job.status != "running":
+        await asyncio.sleep(0.01)
+    for _ in range(3):
+        assert manager.submit(ws) is job
+    await job.task
+
+    # Pasada completa + una sola pasada incremental (sin cambios: no re-indexa nada)
+    assert len(indexers) == 2
+    assert indexers[1].chunked == []
+    assert vdb.cleared == 1
+
+
+@pytest.mark.asyncio
+async def test_cancel_keeps_checkpoint_and_resume_skips_done_files(tmp_path):
+    import threading
+
+    ws = _workspace(tmp_path)
+    vdb = FakeVDB()
+    gate = threading.Event()
+    indexers = []
+    manager = _manager(indexers, vdb, gate=gate, block_on=os.path.join(ws, "mod2.py"))
+
+    job = manager.submit(ws)
+    while job.files_done < 2:
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.05)
+    manager.cancel(ws)
+    await asyncio.gather(job.task, return_exceptions=True)
+    gate.set()
+
+    assert job.status == "cancelled"
+    assert os.path.exists(_checkpoint_path(ws))
+    first_pass = set(indexers[0].chunked)
+
+    resumed = manager.submit(ws)
+    await resumed.task
+
+    assert resumed.status == "completed"
+    assert resumed.resumed
+    assert not first_pass & set(indexers[1].chunked)
+    assert len({c["file_path"] for c in vdb.chunks}) == 4
+    assert vdb.cleared == 1
+
+
+@pytest.mark.asyncio
+async def test_resumed_incremental_pass_does_not_duplicate_chunks(tmp_path):
+    import threading
+
+    ws = _workspace(tmp_path)
+    vdb = FakeVDB()
+    await _manager([], vdb).submit(ws).task
+
+    for name in ("mod1.py", "mod2.py"):
+        changed = tmp_path / name
+        changed.write_text("x = 'changed'\n")
+        os.utime(changed, (0, 0))
+
+    gate = threading.Event()
+    indexers = []
+    manager = _manager(indexers, vdb, gate=gate, block_on=os.path.join(ws, "mod2.py"))
+    job = manager.submit(ws)
+    while job.files_done < 1:
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.05)
+    manager.cancel(ws)
+    await asyncio.gather(job.task, return_exceptions=True)
+    gate.set()
+
+    # Cabecera con la lista exacta de la pasada + una línea por lote terminado
+    with open(_checkpoint_path(ws), encoding="utf-8") as f:
+        assert len(f.read().splitlines()) == 2
+
+    resumed = manager.submit(ws)
+    await resumed.task
+
+    assert resumed.resumed
+    assert indexers[-1].chunked == [os.path.join(ws, "mod2.py")]
+    assert sorted(c["file_path"] for c in vdb.chunks) == sorted(
+        os.path.join(ws, f"mod{i}.py") for i in range(4)
+    )
+    assert vdb.cleared == 1
+
+
+@pytest.mark.asyncio
+async def test_background_indexing_yields_to_interactive_search(tmp_path):
+    ws = _workspace(tmp_path)
+    indexers, vdb = [], FakeVDB()
+    manager = _manager(indexers, vdb)
+
+    with interactive_priority():
+        job = manager.submit(ws)
+        await asyncio.sleep(0.2)
+        assert job.files_done == 0
+    await job.task
+    assert job.files_done == 4
+
+
+@pytest.mark.asyncio
+async def test_incremental_reindex_only_touches_changed_files(tmp_path):
+    ws = _workspace(tmp_path)
+    indexers, vdb = [], FakeVDB()
+    manager = _manager(indexers, vdb)
+    await manager.submit(ws).task
+
+    changed = tmp_path / "mod1.py"
+    changed.write_text("x = 'changed'\n")
+    os.utime(changed, (0, 0))
+    (tmp_path / "mod0.py").unlink()
+
+    await manager.submit(ws).task
+
+    assert indexers[-1].chunked == [str(changed)]
+    assert set(vdb.deleted) == {str(changed), str(tmp_path / "mod0.py")}
+    assert vdb.cleared == 1
+    assert len(vdb.chunks) == 3
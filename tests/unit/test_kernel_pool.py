@@ -0,0 +1,235 @@
+import importlib.util
+import os
+import threading
+import time
+from pathlib import Path
+
+from kogniterm.core.delegation.models import DelegationContext
+from kogniterm.core.kernel_pool import KernelPool, get_kernel_pool
+
+root_dir = Path(__file__).parent.parent.parent
+py_exec_path = root_dir / "kogniterm" / "skills" / "bundled" / "python-executor" / "scripts" / "tool.py"
+
+
+class _FakeKernel:
+    """Kernel simulado: arrancarlo tarda y guarda variables por instancia."""
+
+    def __init__(self, memory_limit_mb=None, pid=None):
+        time.sleep(0.2)
+        self.memory_limit_mb = memory_limit_mb
+        self.pid = pid
+        self.vars = {}
+        self.alive = True
+
+    def is_alive(self):
+        return self.alive
+
+    def stop_kernel(self):
+        self.alive = False
+
+
+def _pool(**kwargs):
+    kwargs.setdefault("idle_timeout", 60)
+    kwargs.setdefault("memory_limit_mb", 0)
+    kwargs.setdefault("spares", 1)
+    return KernelPool(kwargs.pop("factory", _FakeKernel), **kwargs)
+
+
+def _wait_for_spares(pool, count=1, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while pool.stats()["spares"] < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return pool.stats()["spares"]
+
+
+def test_prewarmed_kernel_is_leased_without_cold_start():
+    pool = _pool()
+    try:
+        assert pool.prewarm() == 1
+        start = time.monotonic()
+        with pool.lease(key="main") as kernel:
+            assert time.monotonic() - start < 0.1
+            kernel.vars["x"] = 1
+        # La reserva consumida se repone en segundo plano
+        assert _wait_for_spares(pool) == 1
+    finally:
+        pool.close()
+
+
+def test_each_agent_keeps_its_own_kernel():
+    pool = _pool(spares=0)
+    try:
+        with pool.lease(key="a") as kernel_a:
+            kernel_a.vars["x"] = "a"
+        with pool.lease(key="b") as kernel_b:
+            assert "x" not in kernel_b.vars
+        with pool.lease(key="a") as again:
+            assert again is kernel_a and again.vars["x"] == "a"
+    finally:
+        pool.close()
+
+
+def test_same_agent_waits_for_its_busy_kernel():
+    pool = _pool(spares=0)
+    order = []
+    try:
+        with pool.lease(key="a"):
+            def second():
+                with pool.lease(key="a"):
+                    order.append("second")
+
+            thread = threading.Thread(target=second)
+            thread.start()
+            time.sleep(0.3)
+            order.append("first")
+        thread.join(2)
+        assert order == ["first", "second"]
+        assert pool.stats()["kernels"] == 1
+    finally:
+        pool.close()
+
+
+def test_idle_agent_kernels_are_culled_but_spares_are_kept():
+    pool = _pool()
+    try:
+        pool.prewarm()
+        with pool.lease(key="a"):
+            pass
+        assert _wait_for_spares(pool) == 1
+        pool.idle_timeout = 0.05
+        time.sleep(0.1)
+        assert pool.reap_idle() == 1
+        assert pool.kernel_for("a") is None
+        assert pool.stats()["spares"] == 1
+    finally:
+        pool.close()
+
+
+def test_kernel_over_memory_limit_is_recycled():
+    # El "kernel" apunta a este proceso de pytest, que usa más de 1 MB
+    pool = _pool(spares=0, memory_limit_mb=1, factory=lambda limit: _FakeKernel(limit, pid=os.getpid()))
+    try:
+        with pool.lease(key="a") as kernel:
+            # Sin límite duro la fábrica no recibe el límite: solo se recicla por RSS
+            assert kernel.memory_limit_mb is None
+            assert pool.enforce_memory_limit(kernel) > 1
+        assert pool.kernel_for("a") is None
+        assert pool.stats()["recycled"] == 1
+        with pool.lease(key="a") as fresh:
+            assert fresh is not kernel
+    finally:
+        pool.close()
+
+
+def test_hard_memory_limit_is_opt_in():
+    pool = _pool(spares=0, memory_limit_mb=512, hard_memory_limit=True)
+    try:
+        with pool.lease(key="a") as kernel:
+            assert kernel.memory_limit_mb == 512
+    finally:
+        pool.close()
+
+
+def test_full_pool_waits_then_evicts_the_idle_agent_and_notifies_it():
+    pool = _pool(spares=0, max_kernels=2, eviction_grace=0.3)
+    try:
+        with pool.lease(key="main") as kernel:
+            kernel.vars["x"] = "main"
+        with pool.lease(key="a") as kernel:
+            kernel.vars["x"] = "a"
+        start = time.monotonic()
+        with pool.lease(key="b"):
+            assert time.monotonic() - start >= 0.3
+        # "main" se conserva aunque sea el ocioso menos usado
+        assert pool.kernel_for("main").vars["x"] == "main"
+        assert pool.kernel_for("a") is None
+        assert pool.pop_eviction_notice("a") is True
+        assert pool.pop_eviction_notice("a") is False
+        assert pool.pop_eviction_notice("main") is False
+        assert pool.stats()["evicted"] == 1
+    finally:
+        pool.close()
+
+
+def test_full_pool_does_not_evict_agent_kernels_before_the_grace_period():
+    pool = _pool(spares=0, max_kernels=2, eviction_grace=60)
+    try:
+        with pool.lease(key="a"):
+            pass
+        with pool.lease(key="b"):
+            pass
+        try:
+            with pool.lease(key="c", timeout=0.2):
+                raise AssertionError("no debería haber hueco para 'c'")
+        except TimeoutError:
+            pass
+        assert pool.kernel_for("a") is not None and pool.kernel_for("b") is not None
+        assert pool.stats()["evicted"] == 0
+    finally:
+        pool.close()
+
+
+def test_full_pool_takes_the_slot_of_a_stateless_kernel_at_once():
+    pool = _pool(spares=0, max_kernels=2, eviction_grace=60)
+    try:
+        with pool.lease(key="a"):
+            pass
+        pool.prewarm(1)
+        # La reserva ocupa el segundo hueco: una clave nueva la toma sin esperar
+        start = time.monotonic()
+        with pool.lease(key="b"):
+            assert time.monotonic() - start < 0.1
+        assert pool.kernel_for("a") is not None
+        assert pool.stats()["evicted"] == 0
+    finally:
+        pool.close()
+
+
+def test_python_executor_uses_one_kernel_per_agent():
+    spec = importlib.util.spec_from_file_location("py_exec_tool_pool", py_exec_path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    sub = DelegationContext(agent_id="sub-1", parent_id=None, role=None, depth=1)
+    try:
+        get_kernel_pool().prewarm()
+        assert "42" in "".join(mod.python_executor("x = 41; print(x + 1)", confirm=True))
+        assert "41" in "".join(mod.python_executor("print(x)", confirm=True))
+        assert "NameError" in "".join(mod.python_executor("print(x)", confirm=True, delegation_context=sub))
+    finally:
+        mod._cleanup()
+
+
+def test_closing_the_generator_mid_execution_interrupts_the_kernel():
+    spec = importlib.util.spec_from_file_location("py_exec_tool_interrupt", py_exec_path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    try:
+        gen = mod.python_executor("import time\nprint('start', flush=True)\ntime.sleep(60)", confirm=True)
+        assert "start" in next(gen)
+        start = time.monotonic()
+        gen.close()
+        assert time.monotonic() - start < 10
+
+        output = "".join(mod.python_executor("print('after')", confirm=True))
+        assert "after" in output
+        assert "KeyboardInterrupt" not in output
+    finally:
+        mod._cleanup()
+
+
+def test_python_executor_warns_when_the_agent_kernel_was_closed():
+    spec = importlib.util.spec_from_file_location("py_exec_tool_evicted", py_exec_path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    try:
+        output = "".join(mod.python_executor("x = 1", confirm=True))
+        assert "se perdieron" not in output
+        pool = get_kernel_pool()
+        pool.idle_timeout = 0
+        pool.reap_idle()
+
+        output = "".join(mod.python_executor("print('otra vez')", confirm=True))
+        assert "se perdieron" in output and "otra vez" in output
+        assert "se perdieron" not in "".join(mod.python_executor("pass", confirm=True))
+    finally:
+        mod._cleanup()
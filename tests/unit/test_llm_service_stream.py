@@ -0,0 +1,186 @@
+import threading
+from collections import deque
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from kogniterm.core.agents.tool_executor import ToolExecutor
+from kogniterm.core.llm_service import LLMService
+from kogniterm.core.skills.tool_effects import parse_tool_effects
+from kogniterm.core.tool_result_cache import CACHED_RESULT_NOTICE, ToolResultCache
+
+EFFECTS = {"read_file": parse_tool_effects(["read_only", "idempotent"])}
+
+
+class _SkillManager:
+    def build_skill_context_message(self, query=""):
+        return None
+
+    def get_tool_effects(self, name):
+        return EFFECTS.get(name)
+
+    def get_skill_for_tool(self, name):
+        return None
+
+
+def _service(tool_names=("read_file", "execute_command")):
+    llm = LLMService.__new__(LLMService)
+    llm._use_context_vars = False
+    llm._thread_local = threading.local()
+    llm.model_name = "openai/gpt-test"
+    llm.api_key = "sk-test"
+    llm.api_base = None
+    llm.headers = None
+    llm.generation_params = {}
+    llm.use_multi_provider = False
+    llm.provider_manager = None
+    llm.console = None
+    llm.max_history_messages = 50
+    llm.max_continuations = 0
+    llm.workspace_context_initialized = False
+    llm.call_timestamps = deque()
+    llm.rate_limit_calls = 100
+    llm.rate_limit_period = 60
+    llm.stream_chunk_timeout = 60
+    llm.stream_overall_timeout = 600
+    llm.api_timeout_seconds = 60
+    llm.skill_manager = _SkillManager()
+    llm.tool_map = {name: MagicMock(name=name) for name in tool_names}
+    llm._get_litellm_tools = lambda: [
+        {"type": "function", "function": {"name": name, "parameters": {"type": "object", "properties": {}}}}
+        for name in tool_names
+    ]
+    history_manager = MagicMock()
+    history_manager.get_processed_history_for_llm.side_effect = lambda **kwargs: kwargs["history"]
+    llm.history_manager = history_manager
+    llm.tool_runs = []
+    llm.get_tool = lambda name: name
+
+    def run_tool(tool, tool_args, delegation_context=None):
+        llm.tool_runs.append((tool, dict(tool_args)))
+        yield f"{tool}:{tool_args.get('path')}"
+
+    llm._invoke_tool_with_interrupt = run_tool
+    return llm
+
+
+def _delta(content=None, reasoning=None, tool_calls=None):
+    delta = SimpleNamespace(content=content, reasoning_content=reasoning, tool_calls=tool_calls)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta, finish_reason=None)])
+
+
+def _native(index, id=None, name=None, arguments=None):
+    function = SimpleNamespace(name=name, arguments=arguments)
+    return [SimpleNamespace(index=index, id=id, function=function)]
+
+
+def _run(llm, chunks):
+    with patch("kogniterm.core.llm_service.completion", return_value=iter(chunks)):
+        out = list(llm._invoke_inner(history=[HumanMessage(content="hola")], save_history=False))
+    messages = [m for m in out if isinstance(m, AIMessage)]
+    assert len(messages) == 1
+    return messages[0]
+
+
+def test_text_tool_calls_are_detected_while_streaming():
+    llm = _service()
+    chunks = [
+        _delta(content='Voy a leerlo: {"name": "read_file", '),
+        _delta(content='"args": {"path": "a.py"}}\n'),
+        _delta(content="y nada más."),
+    ]
+    with patch.object(LLMService, "_parse_tool_calls_from_text", side_effect=AssertionError("reparse")):
+        message = _run(llm, chunks)
+    assert [(tc["name"], tc["args"]) for tc in message.tool_calls] == [("read_file", {"path": "a.py"})]
+
+
+def test_call_repeated_in_content_and_reasoning_is_reported_once():
+    llm = _service()
+    call = '{"name": "read_file", "args": {"path": "a.py"}}'
+    chunks = [
+        _delta(reasoning=f"Primero pienso usar {call}\n"),
+        _delta(content=f"Llamada: {call}\n"),
+        _delta(content="<thought>de nuevo " + call + "</thought>"),
+        _delta(content='Y también {"name": "execute_command", "args": {"command": "ls"}}\n'),
+    ]
+    message = _run(llm, chunks)
+    assert sorted((tc["name"], str(tc["args"])) for tc in message.tool_calls) == [
+        ("execute_command", "{'command': 'ls'}"),
+        ("read_file", "{'path': 'a.py'}"),
+    ]
+
+
+def test_read_only_call_is_dispatched_during_the_stream_and_claimed():
+    llm = _service()
+    seen_mid_stream = []
+
+    def chunks():
+        yield _delta(tool_calls=_native(0, id="c1", name="read_file", arguments='{"path": '))
+        yield _delta(tool_calls=_native(0, arguments='"a.py"}'))
+        # El modelo sigue escribiendo: la lectura ya está despachada
+        seen_mid_stream.append(llm._early_tool_dispatcher.stats["dispatched"])
+        yield _delta(content="Leyendo...")
+
+    message = _run(llm, chunks())
+    assert seen_mid_stream == [1]
+    assert llm._early_tool_dispatcher.stats["dispatched"] == 1
+    result = ToolExecutor.execute_single_tool(message.tool_calls[0], llm)[1]
+    assert result == "read_file:a.py"
+    assert len(llm.tool_runs) == 1
+    assert llm._early_tool_dispatcher.stats["claimed"] == 1
+
+
+def test_closing_the_stream_early_cancels_dispatched_calls():
+    llm = _service()
+    chunks = [
+        _delta(tool_calls=_native(0, id="c1", name="read_file", arguments='{"path": "a.py"}')),
+        _delta(content="Leyendo..."),
+        _delta(content=" y sigo."),
+    ]
+    with patch("kogniterm.core.llm_service.completion", return_value=iter(chunks)):
+        gen = llm._invoke_inner(history=[HumanMessage(content="hola")], save_history=False)
+        assert next(gen) == "Leyendo..."
+        # Quien consume abandona el turno (GeneratorExit dentro del bucle del stream)
+        gen.close()
+    stats = llm._early_tool_dispatcher.stats
+    assert stats["dispatched"] == 1 and stats["cancelled"] == 1 and stats["pending"] == 0
+
+
+@pytest.mark.parametrize("fail", [True, False])
+def test_failed_stream_cancels_dispatched_calls_but_completed_turn_keeps_them(fail):
+    llm = _service()
+
+    def chunks():
+        yield _delta(tool_calls=_native(0, id="c1", name="read_file", arguments='{"path": "a.py"}'))
+        if fail:
+            raise RuntimeError("conexión perdida")
+        yield _delta(content="hecho")
+
+    _run(llm, chunks())
+    stats = llm._early_tool_dispatcher.stats
+    assert stats["dispatched"] == 1
+    assert (stats["cancelled"], stats["pending"]) == ((1, 0) if fail else (0, 1))
+
+
+def test_cache_hit_cancels_the_call_dispatched_during_the_stream():
+    llm = _service()
+    result_cache = ToolResultCache()
+    call = {"id": "c0", "name": "read_file", "args": {"path": "a.py"}}
+    assert ToolExecutor.execute_single_tool(call, llm, result_cache=result_cache)[1] == "read_file:a.py"
+
+    message = _run(llm, [_delta(tool_calls=_native(0, id="c1", name="read_file", arguments='{"path": "a.py"}'))])
+    result = ToolExecutor.execute_single_tool(message.tool_calls[0], llm, result_cache=result_cache)[1]
+    assert result == CACHED_RESULT_NOTICE + "read_file:a.py"
+    stats = llm._early_tool_dispatcher.stats
+    assert (stats["dispatched"], stats["claimed"], stats["cancelled"], stats["pending"]) == (1, 0, 1, 0)
+
+
+def test_blocked_call_cancels_the_call_dispatched_during_the_stream():
+    llm = _service()
+    message = _run(llm, [_delta(tool_calls=_native(0, id="c1", name="read_file", arguments='{"path": "a.py"}'))])
+    ctx = SimpleNamespace(agent_id="sub", blocked_tools=frozenset({"read_file"}), role="leaf")
+    content = ToolExecutor.execute_single_tool(message.tool_calls[0], llm, delegation_context=ctx)[1]
+    assert content.startswith("Error: La herramienta 'read_file' está deshabilitada")
+    assert llm._early_tool_dispatcher.stats["pending"] == 0
@@ -0,0 +1,177 @@
+import asyncio
+import sys
+import textwrap
+import threading
+import time
+
+import pytest
+
+from kogniterm.core.mcp.manifest_cache import MCPManifestCache, config_hash
+from kogniterm.core.mcp.mcp_manager import MCPManager
+from kogniterm.core.mcp.session_pool import MCPSessionPool
+
+SERVER = textwrap.dedent(
+    """
+    import os
+    from mcp.server.fastmcp import FastMCP
+
+    mcp = FastMCP("demo")
+
+    @mcp.tool()
+    def pid() -> str:
+        \"\"\"PID del proceso servidor.\"\"\"
+        return str(os.getpid())
+
+    @mcp.tool()
+    def sumar(a: int, b: int) -> str:
+        \"\"\"Suma dos enteros.\"\"\"
+        return str(a + b)
+
+    mcp.run()
+    """
+)
+
+
+class _Config:
+    def __init__(self, servers):
+        self.servers = servers
+
+    def get_mcp_servers(self):
+        return self.servers
+
+
+@pytest.fixture
+def servers(tmp_path):
+    script = tmp_path / "server.py"
+    script.write_text(SERVER, encoding="utf-8")
+    return {
+        "demo": {"transport": "stdio", "command": sys.executable, "args": [str(script)]},
+        "colgado": {"transport": "stdio", "command": sys.executable, "args": ["-c", "import time; time.sleep(60)"]},
+        "apagado": {"transport": "stdio", "command": "no-existe", "disabled": True},
+    }
+
+
+def _manager(servers, tmp_path, pool):
+    return MCPManager(
+        config_manager=_Config(servers),
+        pool=pool,
+        manifest_cache=MCPManifestCache(str(tmp_path / "manifests")),
+        connect_timeout=5,
+        call_timeout=10,
+    )
+
+
+def test_concurrent_reload_isolates_hanging_server_and_reuses_session(servers, tmp_path):
+    pool = MCPSessionPool()
+    manager = _manager(servers, tmp_path, pool)
+    try:
+        started = time.monotonic()
+        asyncio.run(manager.reload())
+        assert time.monotonic() - started < 9
+
+        statuses = manager.server_statuses
+        assert statuses["demo"]["status"] == "connected"
+        assert sorted(statuses["demo"]["tools"]) == ["pid", "sumar"]
+        assert statuses["colgado"]["status"] == "error"
+        assert statuses["apagado"]["status"] == "disabled"
+
+        tools = {t.name: t for t in manager.active_tools}
+        assert tools["sumar"].invoke({"a": 2, "b": 3}) == "5"
+        assert tools["pid"].invoke({}) == tools["pid"].invoke({})
+        assert asyncio.run(tools["pid"].ainvoke({})) == tools["pid"].invoke({})
+    finally:
+        asyncio.run(manager.shutdown())
+
+
+def test_cached_manifest_registers_tools_without_handshake(servers, tmp_path):
+    demo = {"demo": servers["demo"]}
+    cache = MCPManifestCache(str(tmp_path / "manifests"))
+    cache.save("demo", config_hash(demo["demo"]), [
+        {"name": "sumar", "description": "Suma dos enteros.", "inputSchema": {
+            "type": "object", "properties": {"a": {"type": "integer"}, "b": {"type": "integer"}},
+            "required": ["a", "b"]}},
+    ])
+
+    pool = MCPSessionPool()
+    manager = _manager(demo, tmp_path, pool)
+    try:
+        started = time.monotonic()
+        asyncio.run(manager.reload())
+        assert time.monotonic() - started < 0.5
+        assert manager.server_statuses["demo"]["manifest"] == "cached"
+
+        tool = next(t for t in manager.active_tools if t.name == "sumar")
+        assert tool.invoke({"a": 1, "b": 1}) == "2"
+
+        # El refresco en segundo plano guarda el manifiesto real del servidor
+        deadline = time.monotonic() + 5
+        while "manifest" in manager.server_statuses["demo"] and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert sorted(t.name for t in manager.active_tools) == ["pid", "sumar"]
+        assert len(cache.load("demo", config_hash(demo["demo"]))) == 2
+
+        changed = dict(demo["demo"], env={"X": "1"})
+        assert cache.load("demo", config_hash(changed)) is None
+    finally:
+        asyncio.run(manager.shutdown())
+
+
+def test_test_connection_reports_tools_and_errors(servers, tmp_path):
+    pool = MCPSessionPool()
+    manager = _manager(servers, tmp_path, pool)
+    ok = asyncio.run(manager.test_connection(servers["demo"]))
+    assert ok == {"status": "ok", "tools": ["pid", "sumar"]}
+    assert not pool.is_connected("test")
+    assert asyncio.run(manager.test_connection({"transport": "sse"}))["status"] == "error"
+    assert asyncio.run(manager.test_connection({"transport": "ws"}))["status"] == "error"
+
+
+class _BlockingPool:
+    """Pool falso: el refresco en segundo plano espera a `release` en su propio loop."""
+
+    def __init__(self, manifest):
+        self.manifest = manifest
+        self.release = None
+        self.done = []
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, daemon=True).start()
+
+    def submit(self, coro):
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        future.add_done_callback(self.done.append)
+        return future
+
+    async def connect_on_loop(self, name, config, timeout):
+        self.release = asyncio.Event()
+        await self.release.wait()
+        return self.manifest
+
+    async def disconnect(self, name):
+        pass
+
+
+def test_background_refresh_from_a_previous_reload_is_discarded(tmp_path):
+    demo = {"transport": "stdio", "command": "demo"}
+    cache = MCPManifestCache(str(tmp_path / "manifests"))
+    cache.save("demo", config_hash(demo), [{"name": "sumar"}])
+    pool = _BlockingPool([{"name": "sumar"}, {"name": "pid"}])
+    config = _Config({"demo": demo})
+    manager = MCPManager(config_manager=config, pool=pool, manifest_cache=cache, connect_timeout=5, call_timeout=5)
+
+    asyncio.run(manager.reload())
+    assert [t.name for t in manager.active_tools] == ["sumar"]
+    deadline = time.monotonic() + 5
+    while pool.release is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    # El servidor se elimina mientras su refresco sigue en curso
+    config.servers = {}
+    asyncio.run(manager.reload())
+    pool._loop.call_soon_threadsafe(pool.release.set)
+    while not pool.done and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert pool.done[0].exception() is None
+    assert manager.active_tools == []
+    assert manager.server_statuses == {}
+    pool._loop.call_soon_threadsafe(pool._loop.stop)
@@ -0,0 +1,73 @@
+import os
+import threading
+import time
+
+from kogniterm.core.background_task_manager import BackgroundTaskManager, STATUS_COMPLETED, STATUS_RUNNING
+from kogniterm.core.command_executor import CommandExecutor
+from kogniterm.core.pty_multiplexer import PtyMultiplexer
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_reader_delivers_data_and_eof_without_polling():
+    mux = PtyMultiplexer()
+    read_fd, write_fd = os.pipe()
+    received, eof = [], threading.Event()
+    mux.add_reader(read_fd, received.append, on_eof=eof.set)
+
+    os.write(write_fd, b"hola")
+    assert _wait_for(lambda: received == [b"hola"])
+    idle_wakeups = mux.wakeups
+    time.sleep(0.3)
+    # Sin datos no hay despertares (un bucle con timeout de 100 ms daría ~3)
+    assert mux.wakeups == idle_wakeups
+
+    os.close(write_fd)
+    assert eof.wait(2)
+    mux.remove(read_fd, close=True)
+    mux.close()
+
+
+def test_background_tasks_share_one_reader_thread():
+    manager = BackgroundTaskManager()
+    tasks = [manager.start_task(f"echo tarea-{i}") for i in range(6)]
+
+    assert _wait_for(lambda: all(t.status != STATUS_RUNNING for t in tasks))
+    for i, task in enumerate(tasks):
+        assert task.status == STATUS_COMPLETED
+        assert task.exit_code == 0
+        assert f"tarea-{i}" in task.get_output()
+
+    names = [t.name for t in threading.enumerate()]
+    assert names.count("KogniTerm-PtyMultiplexer") == 1
+    assert not any(n.startswith("KogniTerm-BackgroundTask") for n in names)
+
+
+def test_background_output_is_delivered_while_the_task_runs():
+    manager = BackgroundTaskManager()
+    task = manager.start_task("echo primero; sleep 0.5; echo segundo", approved=True)
+
+    assert _wait_for(lambda: "primero" in task.get_output(), timeout=0.4)
+    assert task.status == STATUS_RUNNING
+    assert _wait_for(lambda: task.status == STATUS_COMPLETED)
+    assert "segundo" in task.get_output()
+
+
+def test_persistent_shell_reads_through_the_multiplexer():
+    executor = CommandExecutor()
+    try:
+        first = "".join(executor.execute("echo uno"))
+        second = "".join(executor.execute("printf 'ñandú\\n'"))
+    finally:
+        executor.close()
+
+    assert "uno" in first
+    assert "ñandú" in second
+    assert "##KOGNITERM_DONE_MARKER##" not in first + second
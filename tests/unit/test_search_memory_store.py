@@ -0,0 +1,126 @@
+import importlib
+import time
+from types import SimpleNamespace
+
+from kogniterm.core import search_memory_store
+from kogniterm.core.search_memory_store import SearchMemoryStore
+
+# Embeddings de juguete: cada concepto es un eje, así las paráfrasis coinciden
+CONCEPTS = {
+    "python": ("python",),
+    "instalar": ("instalar", "instalación", "install"),
+    "docker": ("docker", "contenedor"),
+    "red": ("red", "redes", "network"),
+}
+
+
+def fake_embedder(texts):
+    vectors = []
+    for text in texts:
+        words = text.lower().split()
+        vectors.append([float(any(w in syn for w in words)) for syn in CONCEPTS.values()])
+    return vectors
+
+
+def _store(tmp_path, **kwargs):
+    params = dict(capacity=10, ttl=3600, threshold=0.8, embedder=fake_embedder)
+    params.update(kwargs)
+    return SearchMemoryStore(str(tmp_path / "search_memory.jsonl"), **params)
+
+
+def test_paraphrased_query_matches_and_unrelated_does_not(tmp_path):
+    store = _store(tmp_path)
+    store.put("cómo instalar python", "apt-get install python3")
+    store.put("redes en docker", "docker network create")
+
+    matches = store.search("instalación de python")
+    assert [e.result for _, e in matches] == ["apt-get install python3"]
+    assert matches[0][0] > 0.99
+    assert store.search("instalar docker") == []
+
+
+def test_entries_persist_across_instances_and_sessions(tmp_path):
+    _store(tmp_path, session_id="s1").put("cómo instalar python", "apt-get install python3")
+    _store(tmp_path, session_id="s1").put("nota privada", "solo s1", scope="session")
+
+    other = _store(tmp_path, session_id="s2")
+    assert [e.result for _, e in other.search("instalar python")] == ["apt-get install python3"]
+    assert other.search("nota privada") == []
+    assert [e.result for _, e in _store(tmp_path, session_id="s1").search("nota privada")] == ["solo s1"]
+
+
+def test_ttl_and_lru_capacity(tmp_path):
+    store = _store(tmp_path, capacity=2)
+    store.put("python", "efímero", ttl=0.01)
+    time.sleep(0.02)
+    assert store.search("python") == []
+    assert len(store) == 0
+
+    store.put("docker", "a")
+    store.put("red", "b")
+    store.search("docker")  # docker pasa a ser la más reciente
+    store.put("python", "c")
+    assert sorted(e.query for e in store._entries.values()) == ["docker", "python"]
+
+
+def test_lexical_fallback_without_embeddings(tmp_path):
+    def broken(texts):
+        raise ValueError("EmbeddingsService is not initialized properly.")
+
+    store = _store(tmp_path, embedder=broken)
+    store.put("cómo instalar python en ubuntu", "apt-get install python3")
+    assert [e.result for _, e in store.search("python")] == ["apt-get install python3"]
+    assert [e.result for _, e in store.search("instalar python ubuntu 22.04")] == ["apt-get install python3"]
+    assert store.search("kubernetes") == []
+
+
+def test_skill_uses_workspace_store(tmp_path, monkeypatch):
+    skill = importlib.import_module("kogniterm.skills.bundled.search-memory.scripts.tool")
+    store = _store(tmp_path)
+    monkeypatch.setattr(skill, "get_search_memory_store", lambda workspace_dir: store)
+
+    assert "guardado" in skill.search_memory("cómo instalar python", "apt-get install python3")
+    found = skill.search_memory("instalación de python")
+    assert found.startswith("Resultados relevantes") and "apt-get install python3" in found
+    assert "Error" in skill.search_memory("x", "y", scope="global")
+    assert skill.search_memory("docker") == "No se encontraron resultados relevantes en la memoria de búsqueda."
+
+
+def test_session_scope_follows_the_caller_session(tmp_path, monkeypatch):
+    skill = importlib.import_module("kogniterm.skills.bundled.search-memory.scripts.tool")
+    store = _store(tmp_path)
+    monkeypatch.setattr(skill, "get_search_memory_store", lambda workspace_dir: store)
+    alice = SimpleNamespace(_current_workspace_dir=str(tmp_path), session_id="alice")
+    bob = SimpleNamespace(_current_workspace_dir=str(tmp_path), session_id="bob")
+
+    skill.search_memory("nota privada", "solo alice", scope="session", llm_service=alice)
+    assert "solo alice" in skill.search_memory("nota privada", llm_service=alice)
+    assert skill.search_memory("nota privada", llm_service=bob).startswith("No se encontraron")
+
+
+def test_writes_append_and_usage_is_persisted(tmp_path):
+    path = tmp_path / "search_memory.jsonl"
+    store = _store(tmp_path, capacity=2)
+    store.put("docker", "a")
+    first = path.read_text(encoding="utf-8")
+    store.put("red", "b")
+    # Se añade una línea; lo ya escrito (con su embedding) no se reescribe
+    assert path.read_text(encoding="utf-8").startswith(first)
+
+    store.search("docker")
+    reopened = _store(tmp_path, capacity=2)
+    assert reopened._entries[("docker", None)].last_used == store._entries[("docker", None)].last_used
+    # El uso también cuenta para el LRU de otra instancia
+    reopened.put("python", "c")
+    assert sorted(e.query for e in _store(tmp_path, capacity=2)._entries.values()) == ["docker", "python"]
+
+
+def test_log_is_compacted(tmp_path, monkeypatch):
+    monkeypatch.setattr(search_memory_store, "COMPACT_MIN_RECORDS", 8)
+    path = tmp_path / "search_memory.jsonl"
+    store = _store(tmp_path, capacity=2)
+    for i in range(20):
+        store.put("docker", f"v{i}")
+        store.search("docker")
+    assert len(path.read_text(encoding="utf-8").splitlines()) <= 8
+    assert [e.result for _, e in _store(tmp_path).search("docker")] == ["v19"]
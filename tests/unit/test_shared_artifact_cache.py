@@ -0,0 +1,197 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from kogniterm.core.agents.tool_executor import ToolExecutor
+from kogniterm.core.shared_artifact_cache import SharedArtifactCache
+from kogniterm.core.skills.tool_effects import parse_tool_effects
+
+EFFECTS = {
+    "read_file_tool": parse_tool_effects({"read_only": True, "path_args": ["path"]}),
+    "write_file_tool": parse_tool_effects({"writes_files": True, "path_args": ["path"]}),
+    "web_fetch": parse_tool_effects(["read_only", "network", "idempotent"]),
+    "github": parse_tool_effects(["read_only", "network", "idempotent"]),
+    "codebase_search": parse_tool_effects(["read_only"]),
+    "execute_command": parse_tool_effects(["spawns_process"]),
+}
+
+BIG = "linea de código\n" * 100
+
+
+class _SkillManager:
+    def get_tool_effects(self, name):
+        return EFFECTS.get(name)
+
+    def get_skill_for_tool(self, name):
+        return None
+
+
+class _LLM:
+    def __init__(self, delay=0.0, fail=False):
+        self.skill_manager = _SkillManager()
+        self.calls = []
+        self.delay = delay
+        self.fail = fail
+
+    def get_tool(self, name):
+        return name
+
+    def _invoke_tool_with_interrupt(self, tool, tool_args, delegation_context=None):
+        self.calls.append(tool)
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("caída")
+        if tool == "web_fetch":
+            return f"página {tool_args['url']} " * 50
+        if tool == "github":
+            return f"remoto {tool_args['path']} " * 50
+        if tool == "codebase_search":
+            return f"snippets para {tool_args['query']} " * 50
+        if tool == "execute_command":
+            return "ok"
+        if tool == "write_file_tool":
+            with open(tool_args["path"], "w", encoding="utf-8") as f:
+                f.write(tool_args["content"])
+            return "escrito"
+        with open(tool_args["path"], encoding="utf-8") as f:
+            return f.read()
+
+
+def _ctx(agent_id):
+    return SimpleNamespace(agent_id=agent_id, blocked_tools=frozenset(), role="leaf")
+
+
+def _call(llm, agent_id, name, **args):
+    _, content, _ = ToolExecutor.execute_single_tool(
+        {"id": "c", "name": name, "args": args}, llm, None, _ctx(agent_id)
+    )
+    return content
+
+
+def test_sibling_fan_out_reads_each_file_once(tmp_path):
+    target = tmp_path / "mod.py"
+    target.write_text(BIG, encoding="utf-8")
+    llm = _LLM(delay=0.1)
+    results = {}
+
+    def agent(i):
+        results[i] = _call(llm, f"agente_{i}", "read_file_tool", path=str(target))
+
+    threads = [threading.Thread(target=agent, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+
+    assert llm.calls == ["read_file_tool"]
+    assert len(set(results.values())) == 1
+    assert results[0].startswith("[Artefacto art:") and results[0].endswith(BIG)
+    stats = SharedArtifactCache.for_service(llm).stats()
+    assert stats["misses"] == 1 and stats["hits"] == 3
+
+
+def test_agent_gets_compact_reference_for_content_it_already_has(tmp_path):
+    target = tmp_path / "mod.py"
+    target.write_text(BIG, encoding="utf-8")
+    llm = _LLM()
+
+    first = _call(llm, "a", "read_file_tool", path=str(target))
+    second = _call(llm, "a", "read_file_tool", path=str(target))
+    third = _call(llm, "a", "read_file_tool", path=str(target))
+
+    artifact_id = first.split("]")[0].split()[-1]
+    assert second.startswith(f"[Artefacto {artifact_id}: contenido idéntico")
+    assert len(second) < len(BIG) // 2
+    # Si insiste (p. ej. porque ya no lo tiene en contexto) recibe el contenido completo
+    assert third == first and third.endswith(BIG)
+    # Otro agente, y el mismo una vez olvidado, reciben el contenido completo
+    assert _call(llm, "b", "read_file_tool", path=str(target)) == first
+    SharedArtifactCache.for_service(llm).forget_agent("a")
+    assert _call(llm, "a", "read_file_tool", path=str(target)) == first
+    assert llm.calls == ["read_file_tool"]
+
+
+def test_writes_and_external_changes_invalidate_shared_entries(tmp_path):
+    target = tmp_path / "mod.py"
+    target.write_text(BIG, encoding="utf-8")
+    llm = _LLM()
+
+    _call(llm, "a", "read_file_tool", path=str(target))
+    _call(llm, "b", "write_file_tool", path=str(target), content="nuevo = 1\n")
+    assert _call(llm, "c", "read_file_tool", path=str(target)) == "nuevo = 1\n"
+
+    target.write_text("otro = 2\n" * 10, encoding="utf-8")
+    assert _call(llm, "c", "read_file_tool", path=str(target)) == "otro = 2\n" * 10
+    assert llm.calls.count("read_file_tool") == 3
+
+
+def test_pages_expire_by_ttl_and_errors_are_not_shared():
+    llm = _LLM()
+    SharedArtifactCache.for_service(llm).ttl = 0.05
+    _call(llm, "a", "web_fetch", url="https://example.com")
+    _call(llm, "b", "web_fetch", url="https://example.com")
+    assert llm.calls == ["web_fetch"]
+    time.sleep(0.06)
+    _call(llm, "b", "web_fetch", url="https://example.com")
+    assert llm.calls == ["web_fetch", "web_fetch"]
+
+    failing = _LLM(fail=True)
+    assert _call(failing, "a", "web_fetch", url="https://x").startswith("Error")
+    assert _call(failing, "b", "web_fetch", url="https://x").startswith("Error")
+    assert failing.calls == ["web_fetch", "web_fetch"]
+
+
+def test_main_agent_does_not_use_shared_cache(tmp_path):
+    target = tmp_path / "mod.py"
+    target.write_text(BIG, encoding="utf-8")
+    llm = _LLM()
+    for _ in range(2):
+        _, content, _ = ToolExecutor.execute_single_tool(
+            {"id": "c", "name": "read_file_tool", "args": {"path": str(target)}}, llm
+        )
+        assert content == BIG
+    assert llm.calls == ["read_file_tool", "read_file_tool"]
+
+
+def test_remote_results_ignore_local_writes_and_expire_by_ttl(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    llm = _LLM()
+    SharedArtifactCache.for_service(llm).ttl = 0.05
+
+    _call(llm, "a", "github", repo="o/r", path="README.md")
+    # Un README.md local homónimo no tiene nada que ver con el del repositorio
+    _call(llm, "b", "write_file_tool", path=str(tmp_path / "README.md"), content="local\n")
+    _call(llm, "b", "github", repo="o/r", path="README.md")
+    assert llm.calls.count("github") == 1
+
+    time.sleep(0.06)
+    _call(llm, "c", "github", repo="o/r", path="README.md")
+    assert llm.calls.count("github") == 2
+
+
+def test_pathless_local_results_are_dropped_on_any_write(tmp_path):
+    llm = _LLM()
+
+    _call(llm, "a", "codebase_search", query="parser")
+    _call(llm, "b", "codebase_search", query="parser")
+    assert llm.calls == ["codebase_search"]
+
+    _call(llm, "b", "write_file_tool", path=str(tmp_path / "otro.py"), content="x = 1\n")
+    _call(llm, "c", "codebase_search", query="parser")
+    assert llm.calls.count("codebase_search") == 2
+
+
+def test_pathless_local_results_are_dropped_after_shell_commands(tmp_path):
+    llm = _LLM()
+
+    _call(llm, "a", "codebase_search", query="parser")
+    _call(llm, "b", "execute_command", command="sed -i s/a/b/ mod.py")
+    _call(llm, "c", "codebase_search", query="parser")
+    assert llm.calls.count("codebase_search") == 2
+
+    # Una herramienta de solo lectura no invalida nada
+    target = tmp_path / "mod.py"
+    target.write_text("x = 1\n", encoding="utf-8")
+    _call(llm, "c", "read_file_tool", path=str(target))
+    _call(llm, "d", "codebase_search", query="parser")
+    assert llm.calls.count("codebase_search") == 2
@@ -0,0 +1,134 @@
+import importlib.util
+import threading
+import time
+from pathlib import Path
+
+from kogniterm.core.delegation.models import DelegationContext
+from kogniterm.core.shell_pool import ShellPool
+
+root_dir = Path(__file__).parent.parent.parent
+exec_cmd_path = root_dir / "kogniterm" / "skills" / "bundled" / "execute-command" / "scripts" / "tool.py"
+spec = importlib.util.spec_from_file_location("exec_cmd_tool_pool", exec_cmd_path)
+exec_cmd_mod = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(exec_cmd_mod)
+
+
+def _run(pool, command, key=None, cwd=None):
+    with pool.lease(key=key, cwd=cwd) as shell:
+        return "".join(shell.execute(command, cwd=cwd))
+
+
+def test_different_agents_run_commands_concurrently(tmp_path):
+    pool = ShellPool(max_shells=2, idle_timeout=60)
+    try:
+        # Calentar un shell por agente para medir solo la ejecución
+        _run(pool, "true", key="a", cwd=str(tmp_path))
+        _run(pool, "true", key="b", cwd=str(tmp_path))
+        outputs = {}
+
+        def worker(key):
+            outputs[key] = _run(pool, f"sleep 0.5; echo fin-{key}", key=key, cwd=str(tmp_path))
+
+        threads = [threading.Thread(target=worker, args=(k,)) for k in ("a", "b")]
+        start = time.monotonic()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert time.monotonic() - start < 0.9
+        assert "fin-a" in outputs["a"] and "fin-b" in outputs["b"]
+        assert pool.created == 2
+    finally:
+        pool.close()
+
+
+def test_key_isolation_keeps_state_per_agent(tmp_path):
+    pool = ShellPool(max_shells=2, idle_timeout=60, isolation="key")
+    try:
+        _run(pool, "export KT_POOL_VAR=agente-a", key="a", cwd=str(tmp_path))
+        assert "agente-a" not in _run(pool, "echo \"[$KT_POOL_VAR]\"", key="b", cwd=str(tmp_path))
+        assert "[agente-a]" in _run(pool, "echo \"[$KT_POOL_VAR]\"", key="a", cwd=str(tmp_path))
+        assert pool.created == 2
+    finally:
+        pool.close()
+
+
+def test_lease_isolation_discards_state(tmp_path):
+    pool = ShellPool(max_shells=1, idle_timeout=60, isolation="lease")
+    try:
+        _run(pool, "export KT_POOL_VAR=sucio", key="a", cwd=str(tmp_path))
+        assert "[]" in _run(pool, "echo \"[$KT_POOL_VAR]\"", key="a", cwd=str(tmp_path))
+    finally:
+        pool.close()
+
+
+def test_idle_shells_are_reaped(tmp_path):
+    pool = ShellPool(max_shells=2, idle_timeout=60)
+    try:
+        _run(pool, "true", key="a", cwd=str(tmp_path))
+        assert pool.stats()["shells"] == 1
+        assert pool.reap_idle() == 0
+        pool.idle_timeout = 0.05
+        time.sleep(0.1)
+        assert pool.reap_idle() == 1
+        assert pool.stats()["shells"] == 0
+    finally:
+        pool.close()
+
+
+def test_execute_command_uses_a_pooled_shell_per_agent(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    ctx = DelegationContext(agent_id="sub-1", parent_id=None, role=None, depth=1)
+
+    out = "".join(exec_cmd_mod.execute_command("echo desde-el-pool", delegation_context=ctx))
+    assert "desde-el-pool" in out
+
+    out = "".join(exec_cmd_mod.execute_command("ls /no/existe", delegation_context=ctx))
+    assert "código de salida 2" in out
+
+    out = "".join(exec_cmd_mod.execute_command("sleep 5", timeout=1, delegation_context=ctx))
+    assert "Timeout después de 1 segundos" in out
+    assert "interrumpido" not in out
+
+
+def test_pooled_output_has_no_bracketed_paste_prefix(tmp_path):
+    pool = ShellPool(max_shells=1, idle_timeout=60)
+    try:
+        _run(pool, "true", key="a", cwd=str(tmp_path))
+        assert _run(pool, "printf abc", key="a", cwd=str(tmp_path)) == "abc"
+    finally:
+        pool.close()
+
+
+def test_exiting_shell_ends_the_command_and_is_discarded(tmp_path):
+    pool = ShellPool(max_shells=1, idle_timeout=60)
+    try:
+        with pool.lease(key="a", cwd=str(tmp_path)) as shell:
+            start = time.monotonic()
+            out = "".join(shell.execute("echo antes-de-salir; exit 3", cwd=str(tmp_path)))
+            assert time.monotonic() - start < 2
+            assert "antes-de-salir" in out
+            assert shell.last_exit_code == 3
+        assert pool.stats()["shells"] == 0
+    finally:
+        pool.close()
+
+
+def test_timed_out_shell_is_killed_instead_of_returned(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    pool = ShellPool(max_shells=1, idle_timeout=60)
+    monkeypatch.setattr("kogniterm.core.shell_pool.get_shell_pool", lambda: pool)
+    try:
+        # El comando ignora Ctrl+C: si el shell volviera al pool seguiría ocupándolo
+        stubborn = "bash -c 'trap \"\" INT TERM HUP; sleep 30'"
+        out = "".join(exec_cmd_mod.execute_command(stubborn, timeout=1))
+        assert "Timeout después de 1 segundos" in out
+        assert pool.stats()["shells"] == 0
+
+        start = time.monotonic()
+        out = "".join(exec_cmd_mod.execute_command("echo siguiente", timeout=10))
+        assert "siguiente" in out
+        assert time.monotonic() - start < 5
+    finally:
+        pool.close()
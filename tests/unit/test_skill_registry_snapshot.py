@@ -0,0 +1,136 @@
+import os
+import sys
+import textwrap
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from kogniterm.core.delegation.models import DelegationContext
+from kogniterm.core.llm_service import LLMService
+from kogniterm.core.skills.registry_snapshot import LazySkillTool
+from kogniterm.core.skills.skill_manager import SkillManager
+
+MODULE = "kogniterm_dynamic_skills.snapshot_demo.scripts.tool"
+
+
+def _write_skill(root, name="snapshot-demo", description="Saluda"):
+    skill_dir = root / "skills" / "bundled" / name
+    (skill_dir / "scripts").mkdir(parents=True, exist_ok=True)
+    (skill_dir / "SKILL.md").write_text(textwrap.dedent(f"""\
+        ---
+        name: {name.replace('-', '_')}
+        description: "Skill de prueba"
+        tool_effects:
+          greet: [read_only]
+        ---
+        Instrucciones.
+        """), encoding="utf-8")
+    (skill_dir / "scripts" / "tool.py").write_text(textwrap.dedent(f"""\
+        name = "greet"
+        description = "{description}"
+        parameters_schema = {{"type": "object", "properties": {{"who": {{"type": "string"}}}}, "required": ["who"]}}
+
+        def greet(who: str, llm_service=None, delegation_context=None) -> str:
+            injected = [n for n, v in (("llm_service", llm_service), ("delegation_context", delegation_context)) if v is not None]
+            return "hola " + who + "".join(" +" + n for n in injected)
+        """), encoding="utf-8")
+    return skill_dir
+
+
+def _start(root):
+    for mod in [m for m in sys.modules if m.startswith("kogniterm_dynamic_skills.snapshot_demo")]:
+        sys.modules.pop(mod)
+    sm = SkillManager(
+        base_path=root,
+        user_skills_path=root / "user",
+        global_skills_path=root / "global",
+        snapshot_path=root / "cache" / "skill_registry.json",
+    )
+    sm.discover_all_skills()
+    for skill_name in sm.skills:
+        sm.load_skill(skill_name)
+    sm.save_registry_snapshot()
+    return sm
+
+
+def test_second_start_uses_snapshot_and_imports_on_first_use(tmp_path):
+    _write_skill(tmp_path)
+    first = _start(tmp_path)
+    assert not isinstance(first.tool_registry["greet"]["tool"], LazySkillTool)
+
+    second = _start(tmp_path)
+    lazy = second.tool_registry["greet"]["tool"]
+    assert isinstance(lazy, LazySkillTool)
+    assert MODULE not in sys.modules
+    assert lazy.description == "Saluda"
+    assert lazy.parameters_schema["required"] == ["who"]
+    assert second.get_tool_effects("greet").read_only
+    assert second.skills["snapshot_demo"].instructions == "Instrucciones."
+
+    tool = second.get_tool("greet")
+    assert MODULE in sys.modules
+    assert tool("mundo") == "hola mundo"
+    assert second.tool_registry["greet"]["tool"] is tool
+
+
+def test_snapshot_skips_manifest_parsing_when_nothing_changed(tmp_path, monkeypatch):
+    _write_skill(tmp_path)
+    _start(tmp_path)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("no debería parsear SKILL.md")
+
+    monkeypatch.setattr("kogniterm.core.skills.skill_manager.SkillValidator.validate_skill", fail)
+    sm = _start(tmp_path)
+    assert "snapshot_demo" in sm.skills
+
+
+def test_lazy_tool_is_callable_through_the_proxy(tmp_path):
+    _write_skill(tmp_path)
+    _start(tmp_path)
+    sm = _start(tmp_path)
+    assert sm.tool_registry["greet"]["tool"].invoke({"who": "proxy"}) == "hola proxy"
+
+
+def test_llm_service_injects_parameters_into_lazy_tools(tmp_path):
+    _write_skill(tmp_path)
+    _start(tmp_path)
+    sm = _start(tmp_path)
+    proxy = sm.get_tools()[0]
+    assert isinstance(proxy, LazySkillTool)
+
+    llm = LLMService.__new__(LLMService)
+    llm._use_context_vars = False
+    llm.skill_manager = sm
+    llm.interrupt_queue = None
+    llm.tool_poll_timeout = 0.01
+    llm.tool_execution_lock = threading.Lock()
+    llm.tool_executor = ThreadPoolExecutor(max_workers=1)
+    ctx = DelegationContext(agent_id="sub-1", parent_id=None, role=None, depth=1)
+    try:
+        output = list(llm._invoke_tool_with_interrupt(proxy, {"who": "lazy"}, delegation_context=ctx))
+    finally:
+        llm.tool_executor.shutdown(wait=True)
+    assert output == ["hola lazy +llm_service +delegation_context"]
+
+
+def test_changed_script_invalidates_compiled_tools(tmp_path):
+    skill_dir = _write_skill(tmp_path)
+    _start(tmp_path)
+    _write_skill(tmp_path, description="Saluda con entusiasmo")
+    script = skill_dir / "scripts" / "tool.py"
+    stat = script.stat()
+    os.utime(script, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    sm = _start(tmp_path)
+    tool = sm.tool_registry["greet"]["tool"]
+    assert not isinstance(tool, LazySkillTool)
+    assert tool.description == "Saluda con entusiasmo"
+
+
+def test_new_skill_directory_triggers_rescan(tmp_path):
+    _write_skill(tmp_path)
+    _start(tmp_path)
+    _write_skill(tmp_path, name="snapshot-extra")
+
+    sm = _start(tmp_path)
+    assert {"snapshot_demo", "snapshot_extra"} <= set(sm.skills)
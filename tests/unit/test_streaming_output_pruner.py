@@ -0,0 +1,99 @@
+import os
+
+from kogniterm.core.agents.tool_executor import ToolExecutor
+from kogniterm.core.utils import output_pruner
+from kogniterm.core.utils.output_pruner import StreamingOutputPruner
+
+
+def test_small_output_kept_intact_without_ansi():
+    stream = StreamingOutputPruner(tool_name="execute_command")
+    stream.feed("\x1b[32mok\x1b")
+    stream.feed("[0m\nsegunda línea\n")
+
+    assert stream.finish() == "ok\nsegunda línea"
+    assert stream.log_filepath is None
+    assert "\x1b[32m" in stream.display_text()
+
+
+def test_progress_bars_collapse_to_last_rewrite():
+    stream = StreamingOutputPruner(tool_name="execute_command")
+    stream.feed("descargando 10%\rdescargando 50%\r")
+    stream.feed("descargando 100%\r\nlisto\n")
+
+    assert stream.finish() == "descargando 100%\nlisto"
+
+
+def test_large_output_is_spilled_with_bounded_memory(tmp_path, monkeypatch):
+    monkeypatch.setattr(output_pruner, "LOGS_DIR", str(tmp_path))
+    stream = StreamingOutputPruner(tool_name="execute_command", display_bytes=4096)
+
+    for i in range(200_000):
+        line = "Traceback: ValueError en el paso" if i == 100_000 else f"línea normal {i}"
+        stream.feed(line + "\n")
+        if i % 50_000 == 0:
+            assert len(stream._head) <= 25 and len(stream._tail) <= 25
+            assert len("".join(c for c, _ in stream._display).encode("utf-8")) <= 4096
+
+    result = stream.finish()
+    assert "200000 líneas" in result
+    assert "línea normal 0" in result and "línea normal 199999" in result
+    assert "Traceback: ValueError en el paso" in result
+    assert "línea normal 99999" in result and "línea normal 100001" in result
+    assert "línea normal 150000" not in result
+    assert len(result) < 8192
+
+    with open(stream.log_filepath, encoding="utf-8") as f:
+        assert sum(1 for _ in f) == 200_000
+    assert os.path.dirname(stream.log_filepath) == str(tmp_path)
+
+
+class _CommandLLM:
+    def get_tool(self, name):
+        return name
+
+    def _invoke_tool_with_interrupt(self, tool, tool_args, delegation_context=None):
+        return (f"\x1b[1mlínea {i}\x1b[0m\n" for i in range(1000))
+
+
+def test_terminal_tool_generator_is_pruned_while_streaming(tmp_path, monkeypatch):
+    monkeypatch.setattr(output_pruner, "LOGS_DIR", str(tmp_path))
+    tc = {"id": "call_1", "name": "execute_command", "args": {"command": "seq"}}
+
+    _, content, exc = ToolExecutor.execute_single_tool(tc, _CommandLLM())
+
+    assert exc is None
+    assert content.startswith("ℹ️ [KogniTerm: Salida de execute_command estructurada (1000 líneas")
+    assert "línea 0" in content and "línea 999" in content
+    assert "\x1b[" not in content
+    assert len(os.listdir(tmp_path)) == 1
+
+
+class _FailingCommandLLM:
+    def get_tool(self, name):
+        return name
+
+    def _invoke_tool_with_interrupt(self, tool, tool_args, delegation_context=None):
+        def _gen():
+            for i in range(1000):
+                yield f"línea {i}\n"
+            raise RuntimeError("el comando se cayó")
+        return _gen()
+
+
+def test_spill_log_is_closed_when_the_tool_fails(tmp_path, monkeypatch):
+    monkeypatch.setattr(output_pruner, "LOGS_DIR", str(tmp_path))
+    opened = []
+    real_init = StreamingOutputPruner.__init__
+
+    def _track(self, *args, **kwargs):
+        real_init(self, *args, **kwargs)
+        opened.append(self)
+
+    monkeypatch.setattr(StreamingOutputPruner, "__init__", _track)
+    tc = {"id": "call_1", "name": "execute_command", "args": {"command": "seq"}}
+
+    _, content, exc = ToolExecutor.execute_single_tool(tc, _FailingCommandLLM())
+
+    assert isinstance(exc, RuntimeError)
+    assert opened and opened[0].log_filepath is not None
+    assert opened[0]._log_file is None
@@ -0,0 +1,150 @@
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from kogniterm.core.delegation import AgentPool, AgentPreempted, DelegationLimits, SubAgentScheduler
+from kogniterm.core.delegation.scheduler import parse_provider_limits, provider_for_model
+
+
+def _run_steps(scheduler, jobs, hold=0.05):
+    """Lanza un hilo por (agent_id, provider) y registra la concurrencia máxima por proveedor."""
+    lock = threading.Lock()
+    active, peak, order = {}, {}, []
+
+    def work(agent_id, provider):
+        with scheduler.bind(agent_id), scheduler.step(provider):
+            with lock:
+                order.append(agent_id)
+                active[provider] = active.get(provider, 0) + 1
+                peak[provider] = max(peak.get(provider, 0), active[provider])
+            time.sleep(hold)
+            with lock:
+                active[provider] -= 1
+
+    threads = [threading.Thread(target=work, args=job) for job in jobs]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    return peak, order
+
+
+def test_provider_caps_do_not_block_other_providers():
+    scheduler = SubAgentScheduler(max_concurrent=3, provider_limits={"openai": 1})
+    jobs = [(f"o{i}", "openai") for i in range(3)] + [(f"a{i}", "anthropic") for i in range(2)]
+    peak, order = _run_steps(scheduler, jobs)
+
+    assert peak == {"openai": 1, "anthropic": 2}
+    # Los dos de anthropic no esperan detrás de la cola de openai
+    assert {"a0", "a1"} <= set(order[:3])
+    assert scheduler.stats()["granted"] == 5
+
+
+def test_free_slot_goes_to_highest_priority_waiter():
+    scheduler = SubAgentScheduler(max_concurrent=1)
+    scheduler.register("low", priority=5)
+    scheduler.register("high", priority=0)
+    order = []
+
+    def work(agent_id):
+        with scheduler.step("openai", agent_id):
+            order.append(agent_id)
+
+    with scheduler.step("openai", "holder"):
+        low = threading.Thread(target=work, args=("low",))
+        low.start()
+        time.sleep(0.05)
+        high = threading.Thread(target=work, args=("high",))
+        high.start()
+        time.sleep(0.05)
+    low.join(2)
+    high.join(2)
+
+    assert order == ["high", "low"]
+
+
+def test_budget_and_deadline_preempt_agents():
+    scheduler = SubAgentScheduler()
+    scheduler.register("a", limits=DelegationLimits(max_tokens_per_child=100))
+    with scheduler.step("openai", "a") as step:
+        step.check(80)
+        with pytest.raises(AgentPreempted, match="tokens"):
+            step.check(150)
+    with pytest.raises(AgentPreempted):
+        with scheduler.step("openai", "a"):
+            pass
+
+    scheduler.register("b", deadline=0.01)
+    time.sleep(0.02)
+    with pytest.raises(AgentPreempted, match="deadline"):
+        with scheduler.step("openai", "b"):
+            pass
+    assert scheduler.stats() == {
+        "active": 0, "waiting": 0, "granted": 1, "preemptions": 2, "providers": {"openai": (0, 4, 4)},
+    }
+
+
+def test_rate_limit_halves_provider_cap_and_recovers():
+    scheduler = SubAgentScheduler(max_concurrent=8, provider_limits={"openai": 4})
+    with scheduler.step("openai") as step:
+        step.rate_limited = True
+    assert scheduler.stats()["providers"]["openai"] == (0, 2, 4)
+    for _ in range(2 + 3):
+        with scheduler.step("openai"):
+            pass
+    assert scheduler.stats()["providers"]["openai"] == (0, 4, 4)
+
+
+def test_helpers():
+    assert provider_for_model("openrouter/anthropic/claude-3.5") == "openrouter"
+    assert provider_for_model("gpt-4o") == "openai"
+    assert provider_for_model(None) == "default"
+    assert parse_provider_limits("openai=4, anthropic=2,roto") == {"openai": 4, "anthropic": 2}
+
+
+@pytest.mark.asyncio
+async def test_pool_charges_llm_calls_and_preempts_over_budget():
+    from kogniterm.core.llm_service import LLMService
+
+    llm_service = LLMService.__new__(LLMService)
+    llm_service.model_name = "gpt-4o"
+    llm_service.telemetry_tracker = None
+    llm_service.history_manager = MagicMock()
+    llm_service._thread_local = threading.local()
+
+    def invoke_inner(*args, **kwargs):
+        for _ in range(10):
+            yield "x" * 40
+
+    llm_service._invoke_inner = invoke_inner
+
+    scheduler = SubAgentScheduler(max_concurrent=1)
+    pool = AgentPool(scheduler=scheduler, limits=DelegationLimits(max_tokens_per_child=60))
+    charged = {}
+
+    class Graph:
+        def __init__(self, agent_id, chunks):
+            self.agent_id, self.chunks = agent_id, chunks
+
+        async def ainvoke(self, state, config=None):
+            def node():
+                gen = llm_service.invoke(history=[HumanMessage(content="hola")])
+                out = [next(gen) for _ in range(self.chunks)]
+                gen.close()
+                charged[self.agent_id] = scheduler.budget(self.agent_id).tokens_used
+                return out
+
+            return await asyncio.to_thread(node)
+
+    results = await pool.execute_parallel([
+        {"id": "ok", "graph": Graph("ok", 2), "initial_state": {}},
+        {"id": "greedy", "graph": Graph("greedy", 10), "initial_state": {}},
+    ])
+
+    assert len(results[0]) == 2 and charged["ok"] == 1 + 20
+    assert isinstance(results[1], AgentPreempted)
+    assert scheduler.budget("ok") is None and scheduler.stats()["active"] == 0
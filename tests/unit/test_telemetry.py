@@ -17,6 +17,7 @@ def test_telemetry_recording(tmp_path):
         duration=2.5,
         summary="All tests passed",
     )
+    tracker.flush()
 
     # Verify saved JSON trace
     trace_file = tmp_path / ".kogniterm" / "telemetry" / "session_test_session.json"
@@ -45,14 +46,19 @@ def test_telemetry_accumulates_multiple_calls(tmp_path):
     assert len(tracker.llm_calls) == 2
 
 
-def test_telemetry_saves_after_each_record(tmp_path):
-    """Cada record_* debe persistir el archivo inmediatamente."""
-    tracker = TelemetryTracker(session_id="persist_test", workspace_dir=str(tmp_path))
+def test_telemetry_persists_in_background(tmp_path):
+    """record_* no escribe en disco; el hilo de fondo persiste el lote."""
+    import time
+    tracker = TelemetryTracker(session_id="persist_test", workspace_dir=str(tmp_path), flush_interval=0.05)
     trace_file = tmp_path / ".kogniterm" / "telemetry" / "session_persist_test.json"
 
     assert not trace_file.exists()
     tracker.record_llm_call(model="gpt-4o-mini", input_tokens=100, output_tokens=50, cost=0.001)
-    assert trace_file.exists()  # El archivo debe existir después del primer record
+    deadline = time.monotonic() + 2
+    while not trace_file.exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert trace_file.exists()
+    tracker.close()
 
 
 def test_telemetry_duration_is_positive(tmp_path):
@@ -60,6 +66,7 @@ def test_telemetry_duration_is_positive(tmp_path):
     tracker = TelemetryTracker(session_id="dur_test", workspace_dir=str(tmp_path))
     time.sleep(0.01)
     tracker.record_llm_call(model="gpt-4o", input_tokens=10, output_tokens=5, cost=0.0001)
+    tracker.flush()
 
     trace_file = tmp_path / ".kogniterm" / "telemetry" / "session_dur_test.json"
     with open(trace_file) as f:
@@ -79,6 +86,7 @@ def test_telemetry_delegation_fields(tmp_path):
         duration=5.0,
         summary="Encountered import error",
     )
+    tracker.flush()
 
     trace_file = tmp_path / ".kogniterm" / "telemetry" / "session_deleg_test.json"
     with open(trace_file) as f:
@@ -120,6 +128,7 @@ def test_llm_service_telemetry_integration(tmp_path):
     assert results[0].content == "Hello from mock LLM response"
     
     # Comprobar que se grabó la llamada en telemetría
+    tracker.flush()
     trace_file = tmp_path / ".kogniterm" / "telemetry" / "session_integration_session.json"
     assert trace_file.exists()
     
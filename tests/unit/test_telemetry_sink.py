@@ -0,0 +1,73 @@
+import json
+import time
+
+from kogniterm.core.delegation.telemetry import TelemetrySink, TelemetryTracker
+
+
+def _read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_record_does_not_touch_disk(tmp_path, monkeypatch):
+    tracker = TelemetryTracker(session_id="hot", workspace_dir=str(tmp_path), flush_interval=60)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("record_* no debería escribir de forma síncrona")
+
+    monkeypatch.setattr(tracker.sink, "flush", fail)
+    for _ in range(100):
+        tracker.record_llm_call(model="m", input_tokens=1, output_tokens=1, cost=0.0)
+    assert len(tracker.sink._queue) == 100
+    monkeypatch.undo()
+    tracker.close()
+    assert len(_read_jsonl(tracker.events_path)) == 100
+
+
+def test_events_are_appended_and_rollup_is_bounded(tmp_path):
+    tracker = TelemetryTracker(session_id="roll", workspace_dir=str(tmp_path), flush_interval=60)
+    for i in range(120):
+        tracker.record_llm_call(model="a" if i % 2 else "b", input_tokens=10, output_tokens=5, cost=0.01)
+    tracker.flush()
+    tracker.record_delegation("s1", "coder", "t", 1, "success", 1.0, "ok")
+    tracker.close()
+
+    events = _read_jsonl(tracker.events_path)
+    assert [e["type"] for e in events].count("llm_call") == 120
+    assert events[-1]["type"] == "delegation"
+
+    with open(tracker.trace_path, encoding="utf-8") as f:
+        rollup = json.load(f)
+    assert rollup["llm_call_count"] == 120
+    assert rollup["total_input_tokens"] == 1200
+    assert rollup["models"]["a"]["calls"] == 60
+    assert rollup["delegation_status"] == {"success": 1}
+    assert len(rollup["llm_calls"]) == 50
+    assert rollup["events_file"] == "session_roll.jsonl"
+
+
+def test_batch_size_wakes_flusher(tmp_path):
+    path = tmp_path / "events.jsonl"
+    sink = TelemetrySink(str(path), flush_interval=60, batch_size=10)
+    for i in range(10):
+        sink.submit({"i": i})
+    deadline = time.monotonic() + 2
+    while sink.written < 10 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert sink.written == 10
+    sink.close()
+
+
+def test_rotation_keeps_bounded_backups(tmp_path):
+    path = tmp_path / "events.jsonl"
+    sink = TelemetrySink(str(path), flush_interval=60, max_bytes=200, backups=2)
+    for i in range(20):
+        sink.submit({"i": i, "pad": "x" * 50})
+        sink.flush()
+    sink.close()
+
+    assert (tmp_path / "events.1.jsonl").exists()
+    assert (tmp_path / "events.2.jsonl").exists()
+    assert not (tmp_path / "events.3.jsonl").exists()
+    assert _read_jsonl(path)[-1]["i"] == 19
+    assert _read_jsonl(tmp_path / "events.1.jsonl")[-1]["i"] == _read_jsonl(path)[0]["i"] - 1
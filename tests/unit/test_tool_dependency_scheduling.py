@@ -0,0 +1,100 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+from langchain_core.messages import AIMessage, ToolMessage
+
+from kogniterm.core.agent_state import AgentState
+from kogniterm.core.agents.parallel_tool_dispatcher import ParallelToolDispatcher, ToolCallItem
+from kogniterm.core.agents.tool_executor import ToolExecutor
+from kogniterm.core.skills.tool_effects import parse_tool_effects
+
+EFFECTS = {
+    "read_file_tool": parse_tool_effects({"read_only": True, "path_args": ["path"]}),
+    "glob_search_tool": parse_tool_effects(["read_only"]),
+    "write_file_tool": parse_tool_effects({"writes_files": True, "path_args": ["path"]}),
+    "execute_command": parse_tool_effects(["spawns_process"]),
+}
+
+
+def _item(i, name, **args):
+    return ToolCallItem(id=f"call_{i}", name=name, args=args)
+
+
+def test_dependencies_follow_paths_and_barriers(tmp_path):
+    a, b = str(tmp_path / "a.py"), str(tmp_path / "b.py")
+    calls = [
+        _item(0, "read_file_tool", path=a),
+        _item(1, "read_file_tool", path=b),
+        _item(2, "write_file_tool", path=a, content="x"),
+        _item(3, "write_file_tool", path=b, content="y"),
+        _item(4, "write_file_tool", path=a, content="z"),
+        _item(5, "execute_command", command="make"),
+        _item(6, "glob_search_tool", pattern="*.py"),
+    ]
+    deps = ParallelToolDispatcher(effects_lookup=EFFECTS.get).build_dependencies(calls)
+
+    assert deps[1] == set()
+    assert deps[2] == {0}
+    assert deps[3] == {1}
+    assert deps[4] == {0, 2}
+    assert deps[5] == {0, 1, 2, 3, 4}
+    # Una lectura sin ruta solo espera a la barrera del proceso
+    assert deps[6] == {5}
+
+
+class _RecordingLLM:
+    """LLMService mínimo: cada herramienta duerme y registra su intervalo de ejecución."""
+
+    def __init__(self, delay=0.2):
+        self.delay = delay
+        self.intervals = {}
+        self._lock = threading.Lock()
+
+    def get_tool(self, name):
+        return MagicMock(name=name)
+
+    def _invoke_tool_with_interrupt(self, tool, tool_args, delegation_context=None):
+        start = time.monotonic()
+        time.sleep(self.delay)
+        with self._lock:
+            self.intervals[tool_args["tag"]] = (start, time.monotonic())
+        return f"ok:{tool_args['tag']}"
+
+
+def _state(calls):
+    tool_calls = [{"id": f"call_{i}", "name": name, "args": args} for i, (name, args) in enumerate(calls)]
+    return AgentState(messages=[AIMessage(content="", tool_calls=tool_calls)])
+
+
+def test_read_only_turn_takes_the_time_of_the_slowest_call(tmp_path):
+    llm = _RecordingLLM(delay=0.2)
+    state = _state([
+        ("read_file_tool", {"path": str(tmp_path / f"f{i}.py"), "tag": i}) for i in range(5)
+    ])
+
+    start = time.monotonic()
+    ToolExecutor.execute_tool_node(state, llm)
+    elapsed = time.monotonic() - start
+
+    assert elapsed < 0.6
+    results = [m for m in state.messages if isinstance(m, ToolMessage)]
+    assert [m.tool_call_id for m in results] == [f"call_{i}" for i in range(5)]
+    assert [m.content for m in results] == [f"ok:{i}" for i in range(5)]
+
+
+def test_writes_to_the_same_file_are_serialized(tmp_path):
+    llm = _RecordingLLM(delay=0.1)
+    target = str(tmp_path / "same.py")
+    state = _state([
+        ("write_file_tool", {"path": target, "tag": "first"}),
+        ("write_file_tool", {"path": str(tmp_path / "other.py"), "tag": "other"}),
+        ("write_file_tool", {"path": target, "tag": "second"}),
+    ])
+
+    ToolExecutor.execute_tool_node(state, llm)
+
+    first, other, second = (llm.intervals[t] for t in ("first", "other", "second"))
+    assert second[0] >= first[1]
+    # La escritura en otra ruta se solapa con la primera
+    assert other[0] < first[1]
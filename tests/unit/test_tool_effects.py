@@ -0,0 +1,110 @@
+from pathlib import Path
+
+import pytest
+
+from kogniterm.core.agents.parallel_tool_dispatcher import ParallelToolDispatcher, ToolCallItem
+from kogniterm.core.skills.skill_manager import SkillValidator
+from kogniterm.core.skills.tool_effects import ToolEffects, parse_tool_effects
+
+
+def _write_skill(tmp_path: Path, frontmatter: str) -> Path:
+    skill_dir = tmp_path / "demo-skill"
+    skill_dir.mkdir()
+    (skill_dir / "SKILL.md").write_text(
+        f"---\nname: demo-skill\ndescription: demo\n{frontmatter}---\n\nInstrucciones.\n",
+        encoding="utf-8",
+    )
+    return skill_dir
+
+
+def test_manifest_effects_are_normalized(tmp_path):
+    skill_dir = _write_skill(
+        tmp_path,
+        "tool-effects:\n"
+        "  reader: [read-only]\n"
+        "  fetcher: [read_only, network]\n"
+        "  writer: {writes-files: true, path-args: [target]}\n",
+    )
+    config, error = SkillValidator()._parse_skill_file(skill_dir / "SKILL.md")
+
+    assert error is None
+    effects = config["tool_effects"]
+    assert effects["reader"] == ToolEffects(read_only=True, idempotent=True)
+    # Las lecturas de red no se consideran idempotentes salvo declaración explícita
+    assert effects["fetcher"].network and not effects["fetcher"].idempotent
+    assert effects["writer"].writes_files and effects["writer"].path_args == ("target",)
+
+
+def test_invalid_effects_make_the_skill_invalid(tmp_path):
+    skill_dir = _write_skill(tmp_path, "tool_effects:\n  broken: [read_only, writes_files]\n")
+    is_valid, errors = SkillValidator().validate_skill(skill_dir)
+
+    assert not is_valid
+    assert "Manifiesto inválido" in errors[0]
+
+
+def test_dispatcher_resolves_variants_and_process_barriers(tmp_path):
+    file_ops = parse_tool_effects({
+        "variant_arg": "operation",
+        "variants": {
+            "read_file": {"read_only": True},
+            "write_file": {"writes_files": True},
+        },
+    })
+    effects = {"file_operations": file_ops, "runner": parse_tool_effects(["spawns_process"])}
+    dispatcher = ParallelToolDispatcher(effects_lookup=effects.get)
+    a = str(tmp_path / "a.txt")
+
+    calls = [
+        ToolCallItem("1", "file_operations", {"operation": "read_file", "path": a}),
+        ToolCallItem("2", "file_operations", {"operation": "read_file", "path": a}),
+        ToolCallItem("3", "file_operations", {"operation": "write_file", "path": a}),
+        ToolCallItem("4", "runner", {"path": str(tmp_path / "other.txt")}),
+    ]
+    deps = dispatcher.build_dependencies(calls)
+
+    assert deps == [set(), set(), {0, 1}, {0, 1, 2}]
+
+
+@pytest.mark.parametrize("args, expected", [
+    ({"operation": "read_file", "path": "x"}, True),
+    ({"operation": "write_file", "path": "x"}, False),
+])
+def test_approval_handler_auto_approves_declared_read_only_tools(args, expected):
+    from unittest.mock import MagicMock
+    from kogniterm.terminal.command_approval_handler import CommandApprovalHandler
+
+    effects = parse_tool_effects({
+        "variant_arg": "operation",
+        "variants": {"read_file": ["read_only"], "write_file": {"writes_files": True}},
+    })
+    handler = CommandApprovalHandler.__new__(CommandApprovalHandler)
+    handler.llm_service = MagicMock()
+    handler.llm_service.skill_manager.get_tool_effects.return_value = effects
+
+    assert handler._is_tool_safe("file_operations", args) is expected
+
+
+def test_bundled_manifests_declare_remote_paths_and_action_variants():
+    bundled = Path(__file__).resolve().parents[2] / "kogniterm" / "skills" / "bundled"
+    validator = SkillValidator()
+
+    web, error = validator._parse_skill_file(bundled / "web-tools" / "SKILL.md")
+    assert error is None
+    # `path` de github es una ruta del repositorio remoto, no un archivo local
+    assert web["tool_effects"]["github"].paths_in({"action": "read_file", "path": "README.md"}) == []
+    assert web["tool_effects"]["web_fetch"].paths_in({"url": "https://example.com"}) == []
+
+    file_ops, error = validator._parse_skill_file(bundled / "file-operations" / "SKILL.md")
+    assert error is None
+    resolved = file_ops["tool_effects"]["file_operations"].resolve({"action": "write_file", "path": "a.txt"})
+    assert resolved.writes_files and resolved.paths_in({"path": "a.txt"}) == ["a.txt"]
+
+    tasks, error = validator._parse_skill_file(bundled / "manage-background-task" / "SKILL.md")
+    assert error is None
+    assert not tasks["tool_effects"]["manage_background_task"].resolve({"action": "kill"}).spawns_process
+
+
+def test_undeclared_path_args_fall_back_to_conventional_names():
+    assert parse_tool_effects(["read_only"]).paths_in({"path": "a.txt"}) == ["a.txt"]
+    assert parse_tool_effects({"read_only": True, "path_args": []}).paths_in({"path": "a.txt"}) == []
@@ -1,7 +1,7 @@
 """Tests unitarios para el parser de tool calls"""
 
 import pytest
-from kogniterm.core.llm.tool_parser import parse_tool_calls_from_text
+from kogniterm.core.llm.tool_parser import IncrementalToolCallParser, parse_tool_calls_from_text
 
 
 def test_parse_simple_tool_call():
@@ -88,3 +88,98 @@ def test_parse_nested_json_arguments():
     
     if tool_calls:
         assert tool_calls[0]["args"]["param"]["nested"]["value"] == 123
+
+
+def _stream(parser, text, chunk=5):
+    detected = []
+    for i in range(0, len(text), chunk):
+        detected.extend(parser.feed(text[i:i + chunk]))
+    return detected
+
+
+def _norm(calls):
+    return sorted((tc["name"], repr(tc["args"])) for tc in calls)
+
+
+def test_incremental_parser_matches_full_parse():
+    """El modo incremental, troceado de cualquier forma, da el mismo resultado que el análisis completo"""
+    tool_names = ["search", "read_file", "execute_command"]
+    text = (
+        "Voy a revisar el código { con llaves sueltas } y pensar.\n"
+        'LLAMADA_A_HERRAMIENTA: execute_command {"command": "ls -la"}\n'
+        "Primero usa read_file, luego search con {\"query\": \"test\"}\n"
+        '```json\n{"name": "read_file", "args": {"path": "src/{a}.py"}}\n```\n'
+        'search({"query": "hola"})'
+    )
+    expected = _norm(parse_tool_calls_from_text(text, tool_names, lambda: "x"))
+    for chunk in (1, 4, 17):
+        parser = IncrementalToolCallParser(tool_names, lambda: "x")
+        _stream(parser, text, chunk)
+        assert _norm(parser.finish()) == expected
+
+
+def test_incremental_parser_reports_calls_as_they_complete():
+    """Cada llamada se notifica en cuanto su JSON se cierra, no al final del stream"""
+    parser = IncrementalToolCallParser(["read_file", "search"])
+    first = 'Leo el archivo: {"name": "read_file", "args": {"path": "a.py"}}'
+    assert [tc["args"] for tc in _stream(parser, first)] == [{"path": "a.py"}]
+    assert _stream(parser, "\nSigo razonando un buen rato " * 50) == []
+
+    # Una mención sin argumentos se resuelve al final: aún podrían llegar sus argumentos
+    assert _stream(parser, "\nusa search\n") == []
+    assert _stream(parser, 'con {"query": "x"}\n') == [
+        {"id": parser.tool_calls[-1]["id"], "name": "search", "args": {"query": "x"}}
+    ]
+    assert _norm(parser.finish()) == _norm([
+        {"name": "read_file", "args": {"path": "a.py"}},
+        {"name": "search", "args": {"query": "x"}},
+    ])
+
+
+def test_sibling_parsers_dedupe_across_content_and_reasoning():
+    """Contenido y razonamiento por separado dan lo mismo que el análisis del texto combinado"""
+    tool_names = ["read_file", "search"]
+    content = 'Leo: {"name": "read_file", "args": {"path": "a.py"}}\nDespués usa search\n'
+    reasoning = (
+        'Pienso en {"name": "read_file", "args": {"path": "a.py"}}\n'
+        'y luego usa search con {"query": "x"}\n'
+    )
+    expected = _norm(parse_tool_calls_from_text(content + "\n" + reasoning, tool_names, lambda: "x"))
+
+    content_parser = IncrementalToolCallParser(tool_names, lambda: "x")
+    reasoning_parser = content_parser.sibling()
+    for i in range(0, max(len(content), len(reasoning)), 5):
+        _stream(content_parser, content[i:i + 5])
+        _stream(reasoning_parser, reasoning[i:i + 5])
+    content_parser.finish()
+    calls = reasoning_parser.finish()
+    assert _norm(content_parser.tool_calls) == _norm(calls)
+    assert _norm(calls) == expected == _norm([
+        {"name": "read_file", "args": {"path": "a.py"}},
+        {"name": "search", "args": {"query": "x"}},
+    ])
+
+
+def test_streaming_executor_uses_incremental_parser():
+    """StreamingExecutor detecta las llamadas del texto durante el stream"""
+    from types import SimpleNamespace
+    from kogniterm.core.llm.streaming_executor import StreamingExecutor
+
+    def chunk(content=None, reasoning=None):
+        delta = SimpleNamespace(content=content, reasoning_content=reasoning, tool_calls=None)
+        return SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+    text = 'Voy a usar la herramienta "search" con argumentos {"query": "test"}'
+    chunks = [chunk(reasoning="pienso...")] + [chunk(content=text[i:i + 6]) for i in range(0, len(text), 6)]
+
+    def parse_fn(_):
+        raise AssertionError("no debe re-analizarse el texto completo")
+
+    executor = StreamingExecutor(provider_config=None)
+    out = list(executor.execute_stream(
+        {"model": "m", "response_generator": iter(chunks)}, parse_fn, lambda: "id1", tool_names=["search"]
+    ))
+    message = out[-1]
+    assert message.tool_calls[0]["name"] == "search"
+    assert message.tool_calls[0]["args"] == {"query": "test"}
+    assert [tc["name"] for tc in executor.detected_tool_calls] == ["search"]
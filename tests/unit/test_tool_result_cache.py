@@ -0,0 +1,120 @@
+import os
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from kogniterm.core.agent_state import AgentState
+from kogniterm.core.agents.tool_executor import ToolExecutor
+from kogniterm.core.race_condition_guard import RaceConditionGuard
+from kogniterm.core.skills.tool_effects import parse_tool_effects
+from kogniterm.core.tool_result_cache import CACHED_RESULT_NOTICE, ToolResultCache
+
+EFFECTS = {
+    "read_file_tool": parse_tool_effects({"read_only": True, "path_args": ["path"]}),
+    "write_file_tool": parse_tool_effects({"writes_files": True, "path_args": ["path"]}),
+}
+
+
+class _SkillManager:
+    def get_tool_effects(self, name):
+        return EFFECTS.get(name)
+
+    def get_skill_for_tool(self, name):
+        return None
+
+
+class _FileLLM:
+    """LLMService mínimo que lee y escribe archivos de verdad y cuenta invocaciones."""
+
+    def __init__(self):
+        self.skill_manager = _SkillManager()
+        self.calls = []
+
+    def get_tool(self, name):
+        return name
+
+    def _invoke_tool_with_interrupt(self, tool, tool_args, delegation_context=None):
+        self.calls.append(tool)
+        if tool == "write_file_tool":
+            with open(tool_args["path"], "w", encoding="utf-8") as f:
+                f.write(tool_args["content"])
+            return "escrito"
+        with open(tool_args["path"], encoding="utf-8") as f:
+            return f.read()
+
+
+def _turn(state, *calls):
+    tool_calls = [
+        {"id": f"call_{len(state.messages)}_{i}", "name": name, "args": args}
+        for i, (name, args) in enumerate(calls)
+    ]
+    state.messages.append(AIMessage(content="", tool_calls=tool_calls))
+    return tool_calls
+
+
+def _results(state, n):
+    return [m.content for m in state.messages if isinstance(m, ToolMessage)][-n:]
+
+
+def test_repeated_read_is_served_from_cache(tmp_path):
+    target = tmp_path / "mod.py"
+    target.write_text("x = 1\n", encoding="utf-8")
+    llm = _FileLLM()
+    state = AgentState(messages=[HumanMessage(content="revisa mod.py")])
+
+    _turn(state, ("read_file_tool", {"path": str(target)}))
+    ToolExecutor.execute_tool_node(state, llm)
+    _turn(state, ("read_file_tool", {"path": str(target)}))
+    ToolExecutor.execute_tool_node(state, llm)
+
+    first, second = _results(state, 2)
+    assert llm.calls == ["read_file_tool"]
+    assert first == "x = 1\n"
+    assert second == CACHED_RESULT_NOTICE + "x = 1\n"
+
+
+def test_external_modification_invalidates_by_fingerprint(tmp_path):
+    target = tmp_path / "mod.py"
+    target.write_text("x = 1\n", encoding="utf-8")
+    llm = _FileLLM()
+    state = AgentState(messages=[HumanMessage(content="hola")])
+
+    _turn(state, ("read_file_tool", {"path": str(target)}))
+    ToolExecutor.execute_tool_node(state, llm)
+    target.write_text("x = 22\n", encoding="utf-8")
+    _turn(state, ("read_file_tool", {"path": str(target)}))
+    ToolExecutor.execute_tool_node(state, llm)
+
+    assert llm.calls == ["read_file_tool", "read_file_tool"]
+    assert _results(state, 1) == ["x = 22\n"]
+
+
+def test_writes_and_new_turns_invalidate_entries(tmp_path):
+    target = tmp_path / "mod.py"
+    target.write_text("x = 1\n", encoding="utf-8")
+    llm = _FileLLM()
+    state = AgentState(messages=[HumanMessage(content="hola")])
+    read = ("read_file_tool", {"path": str(target)})
+
+    _turn(state, read)
+    ToolExecutor.execute_tool_node(state, llm)
+    cache = ToolResultCache.for_state(state)
+    assert len(cache) == 1
+
+    # Escritura registrada por las skills de edición
+    RaceConditionGuard.register_write(state, str(target), "x = 1\n")
+    assert len(cache) == 0
+
+    _turn(state, read)
+    ToolExecutor.execute_tool_node(state, llm)
+    assert len(cache) == 1
+
+    # Una herramienta con efectos vacía la caché
+    _turn(state, ("write_file_tool", {"path": str(tmp_path / "other.py"), "content": "y"}))
+    ToolExecutor.execute_tool_node(state, llm)
+    assert len(cache) == 0
+
+    _turn(state, read)
+    ToolExecutor.execute_tool_node(state, llm)
+    state.messages.append(HumanMessage(content="otra pregunta"))
+    assert len(ToolResultCache.for_state(state)) == 0
+    assert os.path.exists(target)
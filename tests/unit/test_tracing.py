@@ -0,0 +1,123 @@
+import contextvars
+import json
+import threading
+
+import pytest
+
+from kogniterm.core import tracing
+from kogniterm.core.tracing import Tracer, render_waterfall, traced, traced_generator
+
+
+@pytest.fixture
+def tracer(tmp_path, monkeypatch):
+    t = Tracer(enabled=True, export_path=str(tmp_path / "traces.jsonl"))
+    monkeypatch.setattr(tracing, "_tracer", t)
+    return t
+
+
+def test_nested_spans_form_one_trace(tracer):
+    with tracer.span("agent.turn") as root:
+        with tracer.span("history.process"):
+            pass
+        with tracer.span("tool.execute", tool="read_file") as tool_span:
+            pass
+
+    (spans,) = tracer.last_traces()
+    assert [s.name for s in spans] == ["agent.turn", "history.process", "tool.execute"]
+    assert all(s.trace_id == root.trace_id for s in spans)
+    assert tool_span.parent_id == root.span_id
+    waterfall = render_waterfall(spans)
+    assert "  tool.execute [read_file]" in waterfall
+    assert waterfall.count("ms") == 3
+
+
+def test_generator_span_is_only_active_while_advancing(tracer):
+    seen = []
+
+    def producer():
+        with tracer.span("llm.request"):
+            pass
+        yield "a"
+        yield "b"
+
+    with tracer.span("agent.turn") as root:
+        llm_span = tracer.start_span("llm.invoke")
+        for chunk in traced_generator(llm_span, producer()):
+            seen.append(tracer.current_span())
+
+    assert seen == [root, root]
+    (spans,) = tracer.last_traces()
+    request = next(s for s in spans if s.name == "llm.request")
+    assert request.parent_id == llm_span.span_id
+    assert llm_span.ended
+
+
+def test_closing_a_span_closes_open_descendants_and_exports_otlp(tracer):
+    with tracer.span("agent.turn"):
+        stream = tracer.start_span("llm.stream")
+    assert stream.ended and stream.attributes["closed_by_parent"]
+
+    tracer.flush()
+    with open(tracer.export_path, encoding="utf-8") as f:
+        (line,) = f.readlines()
+    otlp = json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert [s["name"] for s in otlp] == ["agent.turn", "llm.stream"]
+    assert otlp[1]["parentSpanId"] == otlp[0]["spanId"]
+    assert int(otlp[1]["endTimeUnixNano"]) >= int(otlp[1]["startTimeUnixNano"])
+
+
+def test_worker_threads_attach_to_the_turn_and_ui_time_accumulates(tracer):
+    @traced("tool.execute", lambda name: {"tool": name})
+    def run_tool(name):
+        tracer.add_time("ui.push", 0.002)
+
+    with tracer.span("session.turn", session_id="s1"):
+        threads = [
+            threading.Thread(target=contextvars.copy_context().run, args=(run_tool, f"t{i}"))
+            for i in range(3)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    (spans,) = tracer.last_traces(session_id="s1")
+    root = spans[0]
+    assert sorted(s.attributes["tool"] for s in spans[1:]) == ["t0", "t1", "t2"]
+    assert all(s.parent_id == root.span_id for s in spans[1:])
+    assert root.attributes["ui.push.calls"] == 3
+    assert root.attributes["ui.push.ms"] == pytest.approx(6.0)
+    assert "ui.push (×3, acumulado)" in render_waterfall(spans)
+    assert tracer.last_traces(session_id="otra") == []
+
+
+def test_disabled_tracer_records_nothing(tmp_path):
+    t = Tracer(enabled=False, export_path=str(tmp_path / "traces.jsonl"))
+    with t.span("agent.turn") as span:
+        span.set(x=1)
+    assert t.last_traces() == []
+
+
+def test_llm_invoke_span_wraps_inner_generator(tracer):
+    from unittest.mock import MagicMock
+    from langchain_core.messages import AIMessage, HumanMessage
+    from kogniterm.core.llm_service import LLMService
+
+    llm_service = LLMService.__new__(LLMService)
+    llm_service.model_name = "gemini-1.5-flash"
+    llm_service.telemetry_tracker = None
+    llm_service.history_manager = MagicMock()
+
+    def mock_invoke_inner(*args, **kwargs):
+        with tracer.span("history.process"):
+            pass
+        yield AIMessage(content="ok")
+
+    llm_service._invoke_inner = mock_invoke_inner
+    with tracer.span("agent.turn"):
+        assert [m.content for m in llm_service.invoke(history=[HumanMessage(content="hola")])] == ["ok"]
+
+    (spans,) = tracer.last_traces()
+    names = {s.name: s for s in spans}
+    assert names["llm.invoke"].attributes["model"] == "gemini-1.5-flash"
+    assert names["history.process"].parent_id == names["llm.invoke"].span_id